@@ -8,18 +8,31 @@ para verificar concordancia y detectar posibles divergencias.
 Autor: Sistema de Análisis de Complejidad
 """
 
-from typing import Dict, Any, List, Tuple
-from langchain_anthropic import ChatAnthropic
+from typing import Dict, Any, List, Optional, Tuple
 from langchain_core.messages import HumanMessage, SystemMessage
 import re
 import logging
 from config.settings import settings
+from shared.services.llm_servicio import LLMService
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Salida estructurada: solo el argumento de O() de cada caso (ver LLMService.invocar_estructurado)
+HERRAMIENTA_COMPLEJIDADES = LLMService.herramienta(
+    "entregar_complejidades",
+    "Complejidades Big-O del algoritmo en sus tres casos",
+    {
+        "mejor_caso": {"type": "string", "description": "Solo el argumento de O(), p. ej. 'n log n'"},
+        "caso_promedio": {"type": "string", "description": "Solo el argumento de O(), p. ej. 'n'"},
+        "peor_caso": {"type": "string", "description": "Solo el argumento de O(), p. ej. 'n^2'"},
+        "justificacion": {"type": "string", "description": "Explicación breve"},
+    },
+)
+
+
 class AgenteValidadorComplejidades:
     """
     Valida complejidades comparando resultados del sistema con análisis LLM.
@@ -33,11 +46,8 @@ class AgenteValidadorComplejidades:
         self.use_llm = use_llm
         
         if self.use_llm:
-            self.llm = ChatAnthropic(
-                model=settings.model_name,
-                temperature=0.1,
-                max_tokens=2000,
-                api_key=settings.anthropic_api_key
+            self.llm = LLMService.get_llm(
+                temperature=0.1, max_tokens=settings.llm_max_tokens_validacion, etapa="validacion"
             )
     
     def validar_complejidades(
@@ -90,7 +100,7 @@ class AgenteValidadorComplejidades:
         try:
             # 1. Obtener análisis del LLM
             logger.info("\n[WAIT] Solicitando análisis de complejidad al LLM...")
-            complejidades_llm = self._analizar_con_llm(pseudocodigo, algorithm_name)
+            complejidades_llm = self._analizar_con_llm(pseudocodigo, algorithm_name, complejidades_sistema)
             resultado['complejidades_llm'] = complejidades_llm
             
             logger.info("[OK] LLM respondió exitosamente")
@@ -123,9 +133,17 @@ class AgenteValidadorComplejidades:
             resultado['recomendacion'] = f"Error en validación: {str(e)}"
             return resultado
     
-    def _analizar_con_llm(self, pseudocodigo: str, algorithm_name: str) -> Dict[str, str]:
+    def _analizar_con_llm(
+        self,
+        pseudocodigo: str,
+        algorithm_name: str,
+        complejidades_sistema: Optional[Dict[str, str]] = None
+    ) -> Dict[str, str]:
         """
         Pide al LLM que analice las complejidades del algoritmo.
+        
+        Si el modelo rápido no concuerda con `complejidades_sistema`, la
+        divergencia se confirma con el modelo fuerte antes de reportarla.
         """
         system_prompt = """Eres un experto en análisis de complejidad algorítmica.
 
@@ -140,16 +158,12 @@ INSTRUCCIONES:
 IMPORTANTE: Usa O() para todo, incluso para mejor caso y caso promedio.
 
 FORMATO DE RESPUESTA (ESTRICTO):
-Mejor caso: O(...)
-Caso promedio: O(...)
-Peor caso: O(...)
-Justificación: [breve explicación]
+Entrega el resultado con la herramienta entregar_complejidades. En cada caso
+escribe solo lo que va dentro de O(...).
 
-EJEMPLO:
-Mejor caso: O(1)
-Caso promedio: O(n)
-Peor caso: O(n)
-Justificación: Búsqueda lineal que puede encontrar el elemento inmediatamente (mejor) o recorrer todo el arreglo (peor).
+EJEMPLO (búsqueda lineal):
+mejor_caso: "1", caso_promedio: "n", peor_caso: "n"
+justificacion: Puede encontrar el elemento inmediatamente (mejor) o recorrer todo el arreglo (peor).
 """
         
         user_prompt = f"""Analiza la complejidad del siguiente algoritmo:
@@ -161,52 +175,41 @@ Pseudocódigo:
 {pseudocodigo}
 ```
 
-Proporciona las complejidades en el formato especificado."""
+Proporciona las complejidades con la herramienta indicada."""
         
         messages = [
             SystemMessage(content=system_prompt),
             HumanMessage(content=user_prompt)
         ]
         
-        response = self.llm.invoke(messages)
-        return self._parsear_respuesta_llm(response.content)
+        def verificar(salida: Dict[str, str]) -> None:
+            if not complejidades_sistema:
+                return
+            comparacion = self._comparar_complejidades(complejidades_sistema, self._convertir_notacion(salida))
+            if not comparacion['concordancia']:
+                raise ValueError(f"Concordancia baja con el sistema ({comparacion['confianza']:.0%})")
+        
+        salida = LLMService.invocar_estructurado(
+            self.llm, messages, HERRAMIENTA_COMPLEJIDADES, verificar=verificar
+        )
+        return self._convertir_notacion(salida)
     
-    def _parsear_respuesta_llm(self, respuesta: str) -> Dict[str, str]:
+    def _convertir_notacion(self, salida: Dict[str, str]) -> Dict[str, str]:
         """
-        Parsea la respuesta del LLM extrayendo las complejidades.
+        Convierte la salida estructurada del LLM a la notación de cada caso.
         
-        El LLM devuelve todo en notación O(), nosotros lo convertimos
+        El LLM devuelve el argumento de O() de cada caso, nosotros lo convertimos
         a la notación apropiada (Ω para mejor, Θ para promedio, O para peor).
         """
-        complejidades = {
-            'mejor_caso': None,
-            'caso_promedio': None,
-            'peor_caso': None,
-            'justificacion': None
-        }
+        notaciones = {'mejor_caso': "Ω", 'caso_promedio': "Θ", 'peor_caso': "O"}
+        complejidades = {'justificacion': salida['justificacion'].strip()}
         
-        # Patrones para extraer complejidades (solo O() del LLM)
-        patrones = {
-            'mejor_caso': r'Mejor caso:\s*O\(([^)]+)\)',
-            'caso_promedio': r'Caso promedio:\s*O\(([^)]+)\)',
-            'peor_caso': r'Peor caso:\s*O\(([^)]+)\)',
-            'justificacion': r'Justificación:\s*(.+?)(?=\n\n|\Z)'
-        }
-        
-        for clave, patron in patrones.items():
-            match = re.search(patron, respuesta, re.IGNORECASE | re.DOTALL)
-            if match:
-                if clave == 'justificacion':
-                    complejidades[clave] = match.group(1).strip()
-                else:
-                    # Convertir a notación apropiada
-                    complejidad_base = match.group(1).strip()
-                    if clave == 'mejor_caso':
-                        complejidades[clave] = f"Ω({complejidad_base})"
-                    elif clave == 'caso_promedio':
-                        complejidades[clave] = f"Θ({complejidad_base})"
-                    else:  # peor_caso
-                        complejidades[clave] = f"O({complejidad_base})"
+        for clave, notacion in notaciones.items():
+            complejidad_base = salida[clave].strip()
+            # Tolerar que el modelo escriba la notación completa: "O(n)" -> "n"
+            if re.fullmatch(r'[OΘΩ]\((.*)\)', complejidad_base):
+                complejidad_base = complejidad_base[2:-1].strip()
+            complejidades[clave] = f"{notacion}({complejidad_base})"
         
         return complejidades
     
@@ -5,11 +5,14 @@ Aplicación FastAPI principal del Analizador de Complejidad
 Integra todos los routers y configura la aplicación web.
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
+import threading
 
-from core.analizador.router import router as analizador_router
+from config.settings import settings
+from core.analizador.router import precargar_analizador, router as analizador_router
 from core.validador.router import router as validador_router
 
 # Configurar logging
@@ -18,13 +21,22 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Precarga opcional del analizador en segundo plano (el worker ya acepta solicitudes)."""
+    if settings.analizador_precarga:
+        threading.Thread(target=precargar_analizador, name="precarga-analizador", daemon=True).start()
+    yield
+
+
 # Crear aplicación FastAPI
 app = FastAPI(
     title="Analizador de Complejidad Algorítmica",
     description="API para análisis de complejidad de algoritmos y validación de pseudocódigo",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configurar CORS
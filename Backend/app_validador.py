@@ -0,0 +1,84 @@
+"""
+Servicio de Validación (modo liviano)
+=====================================
+
+Aplicación FastAPI que sirve solo /validador (validación por capas y
+clasificación ML), separada de la API completa para escalarla por su cuenta:
+el editor valida mientras el usuario escribe, así que es el endpoint de
+mayor volumen.
+
+No importa el analizador (LangChain, LangGraph, SymPy, agentes): arranca en
+una fracción del tiempo de app.py y cada worker ocupa poca memoria. El
+clasificador se carga desde el bundle con mmap (ml/bundle.py), de modo que
+los workers comparten sus páginas.
+
+Uso:
+    python app_validador.py                      # settings.validador_workers procesos
+    uvicorn app_validador:app --workers 8 --port 8001
+"""
+
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from config.settings import settings
+from core.validador.router import router as validador_router
+from ml.clasificador import obtener_clasificador
+
+# Sin logs INFO por solicitud: a miles de solicitudes por segundo dominan el costo
+logging.basicConfig(
+    level=getattr(logging, settings.validador_log_nivel.upper(), logging.WARNING),
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Carga el clasificador antes de la primera solicitud."""
+    try:
+        obtener_clasificador()
+    except Exception as e:
+        logger.warning(f"Clasificador ML no disponible: {e}")
+    yield
+
+
+app = FastAPI(
+    title="Servicio de Validación de Pseudocódigo",
+    description="Validación por capas de la gramática y clasificación del algoritmo",
+    version="1.0.0",
+    docs_url="/docs",
+    redoc_url="/redoc",
+    lifespan=lifespan
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # En producción, especificar orígenes permitidos
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.include_router(validador_router)
+
+
+@app.get("/health")
+async def health_check():
+    """Endpoint de salud"""
+    return {"status": "healthy", "service": "validador", "pid": os.getpid()}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(
+        "app_validador:app",
+        host="0.0.0.0",
+        port=settings.validador_puerto,
+        workers=settings.validador_workers or os.cpu_count() or 1,
+        log_level=settings.validador_log_nivel.lower(),
+        access_log=False,
+    )
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from pathlib import Path
 
 from pydantic_settings import BaseSettings
@@ -16,6 +16,8 @@ class Settings(BaseSettings):
 
     # API Keys
     anthropic_api_key: Optional[str] = None
+    # URL alternativa de la API (p. ej. el stub de tests/stub_anthropic.py para pruebas de carga)
+    anthropic_base_url: Optional[str] = None
 
     # Model Configuration
     claude_model: str = "claude-sonnet-4-5-20250929"
@@ -23,6 +25,123 @@ class Settings(BaseSettings):
     max_tokens: int = 4096
     temperature: float = 0.0
 
+    # Gobernador de llamadas LLM (límites compartidos por todo el proceso)
+    llm_rpm: int = 50
+    llm_tpm: int = 80000
+    # Si el límite TPM del proveedor cuenta los tokens leídos de la caché de prompts
+    # (los escritos en la caché siempre cuentan)
+    llm_tpm_cuenta_cache_leida: bool = False
+    llm_concurrencia_max: int = 8
+    llm_max_reintentos: int = 4
+    # Tope de cada llamada HTTP al proveedor (se acorta a lo que quede del plazo del análisis)
+    llm_timeout_s: float = 120.0
+
+    # Backend LLM: live | record | replay | fail (ver shared/services/casetes_llm.py)
+    llm_modo: str = "live"
+    llm_casetes_dir: Optional[str] = None
+    llm_replay_latencia_ms: int = 0
+
+    # Analizar mejor/peor/promedio en una sola llamada (con re-análisis por caso si falla)
+    llm_analisis_combinado: bool = True
+
+    # Ejemplos few-shot por prompt de análisis: máximo y presupuesto de tokens (ver core/analizador/tools/few_shot.py)
+    llm_few_shot_k: int = 1
+    llm_few_shot_tokens: int = 600
+
+    # Prompt caching del proveedor sobre los prefijos fijos de cada etapa
+    llm_cache_prompts: bool = True
+
+    # max_tokens de salida por etapa, dimensionado al esquema de su herramienta de salida
+    llm_max_tokens_caso: int = 2048
+    llm_max_tokens_combinado: int = 6144
+    llm_max_tokens_escenarios: int = 512
+    llm_max_tokens_traduccion: int = 1536
+    llm_max_tokens_correccion: int = 1536
+    llm_max_tokens_validacion: int = 512
+    llm_max_tokens_ecuaciones: int = 1024
+
+    # Solicitudes de respaldo (hedging) en el camino interactivo: una llamada con temperatura 0
+    # que supera el percentil de latencia reciente de su etapa se duplica (ver shared/services/cobertura_llm.py)
+    llm_cobertura: bool = True
+    llm_cobertura_percentil: float = 95.0
+    llm_cobertura_min_muestras: int = 20
+    llm_cobertura_ventana: int = 200
+
+    # Interruptor de circuito del proveedor: con esa tasa de fallos en los últimos intentos las
+    # etapas pasan a sus caminos deterministas y se prueba otra llamada tras la espera
+    # (ver shared/services/circuito_llm.py)
+    llm_circuito_tasa_fallos: float = 0.5
+    llm_circuito_min_intentos: int = 10
+    llm_circuito_ventana: int = 20
+    llm_circuito_espera_s: float = 30.0
+
+    # Puntos de control por fase: un reintento (o POST /analisis/{id}/reanudar) continúa desde
+    # la última fase completada (ver shared/services/puntos_control.py; None = data/puntos_control)
+    puntos_control: bool = True
+    puntos_control_dir: Optional[str] = None
+    puntos_control_ttl_h: float = 24.0
+
+    # Caché por forma canónica: programas que solo difieren en nombres de variables, espacios o
+    # comentarios reutilizan clasificación, validación y fases 6-8.5 (ver core/analizador/tools/canonico.py)
+    cache_canonico: bool = True
+    cache_canonico_max: int = 1024
+
+    # Análisis similares (MinHash/LSH sobre la forma canónica): un programa con similitud estimada
+    # >= umbral respecto de uno ya analizado recibe su análisis como referencia en los prompts de
+    # casos, dentro de similitud_tokens (ver shared/services/indice_similitud.py)
+    similitud: bool = True
+    similitud_umbral: float = 0.8
+    similitud_permutaciones: int = 64
+    similitud_bandas: int = 16
+    similitud_max: int = 100000
+    similitud_tokens: int = 800
+
+    # Ejemplos de referencia de traductor y corrector: índice BM25 con postings ordenados por
+    # impacto, rag_postings_max entradas por término y consulta; el traductor usa el modo
+    # "conocido" si su mejor ejemplo puntúa >= rag_puntaje_minimo (ver shared/services/indice_rag.py;
+    # rag_indices_dir None = data/indices_rag)
+    rag_dataset: bool = True
+    rag_postings_max: int = 256
+    rag_puntaje_minimo: float = 8.0
+    rag_indices_dir: Optional[str] = None
+
+    # Corrector: reglas deterministas (then/do, begin/end, flechas, CALL, tipos y comas en
+    # declaraciones) antes del LLM; solo se llama al LLM si el programa sigue inválido
+    # (ver shared/services/correccion_local.py)
+    corrector_local: bool = True
+
+    # Arranque: el analizador (LangChain, LangGraph, SymPy) se importa en la primera
+    # solicitud de análisis. Con analizador_precarga la app lo importa en segundo plano
+    # al iniciar, sin demorar que el worker acepte solicitudes (ver tests/benchmark_arranque.py)
+    analizador_precarga: bool = False
+
+    # Servicio de validación liviano (app_validador.py): solo /validador, sin el
+    # analizador. validador_workers None = un proceso por CPU
+    validador_workers: Optional[int] = None
+    validador_puerto: int = 8001
+    validador_log_nivel: str = "WARNING"
+
+    # Presupuesto por análisis (None = sin límite; ver shared/services/presupuesto_llm.py).
+    # Las etapas opcionales se omiten cuando queda menos de la reserva.
+    analisis_tokens_max: Optional[int] = 80000
+    analisis_segundos_max: Optional[float] = 240.0
+    analisis_reserva_opcional: float = 0.25
+
+    # Ruteo de modelos por etapa: "rapido" usa llm_modelo_rapido, "fuerte" usa model_name.
+    # Las etapas rápidas se repiten con el modelo fuerte si su salida no pasa el esquema
+    # o la verificación de confianza de la etapa (ver LLMService.invocar_estructurado).
+    llm_modelo_rapido: str = "claude-haiku-4-5-20251001"
+    llm_ruteo_etapas: Dict[str, str] = {
+        "traduccion": "fuerte",
+        "correccion": "rapido",
+        "caso": "fuerte",
+        "combinado": "fuerte",
+        "escenarios": "rapido",
+        "validacion": "rapido",
+        "ecuaciones": "rapido",
+    }
+    llm_escalado: bool = True
+
     # LangSmith (opcional - para monitoring)
     langsmith_api_key: Optional[str] = None
     langsmith_project: str = "complexity-analyzer"
@@ -0,0 +1,74 @@
+"""
+Nodo: LLM Analyze All Cases - Análisis combinado de los tres casos
+
+Pide al LLM mejor, peor y caso promedio en una sola llamada (el
+pseudocódigo y el prompt de sistema viajan una vez en lugar de tres).
+Los casos que pasan la validación quedan en state.combined_analysis y los
+nodos de cada caso los usan sin volver a llamar al LLM; los que fallan se
+re-analizan por separado en su nodo.
+
+Se desactiva con settings.llm_analisis_combinado = False.
+"""
+
+from config.settings import settings
+from core.analizador.models.scenario_state import ScenarioState
+from core.analizador.tools.llm_analyzer import LLMAnalyzer
+from core.analizador.tools.subroutine_costs import analyze_all_cases_by_subroutine
+
+
+def llm_analyze_all_cases_node(state: ScenarioState) -> ScenarioState:
+    """
+    Analiza los tres casos con una sola llamada al LLM.
+
+    Args:
+        state: Estado actual del workflow con pseudocode, algorithm_name, is_iterative
+
+    Returns:
+        Estado con combined_analysis = {results, errors}; sin cambios si el
+        modo combinado está desactivado o la llamada falla
+    """
+    if not settings.llm_analisis_combinado:
+        return state
+
+    print("=" * 80)
+    print("NODO: LLM Analyze All Cases (combinado)")
+    print("=" * 80)
+    print(f"Algoritmo: {state.algorithm_name}")
+    print(f"Tipo: {'Iterativo' if state.is_iterative else 'Recursivo'}")
+    print()
+
+    try:
+        analyzer = LLMAnalyzer(temperature=0.0, category=state.algorithm_category)
+
+        print("[WAIT] Invocando LLM para MEJOR, PEOR y CASO PROMEDIO en una llamada...")
+        combined = analyze_all_cases_by_subroutine(
+            analyzer,
+            pseudocode=state.pseudocode,
+            algorithm_name=state.algorithm_name,
+            is_iterative=state.is_iterative
+        )
+
+        print(f"[OK] Casos válidos: {list(combined['results']) or 'ninguno'}")
+        for case_type, reason in combined['errors'].items():
+            print(f"[WARN] {case_type} se re-analizará por separado: {reason}")
+        print()
+
+        return state.model_copy(update={"combined_analysis": combined})
+
+    except Exception as e:
+        print(f"[WARN] Análisis combinado no disponible, se analiza caso por caso: {str(e)}")
+        print()
+
+        warnings = list(state.warnings) if state.warnings else []
+        warnings.append(f"Análisis combinado no disponible: {str(e)}")
+        return state.model_copy(update={"warnings": warnings})
+
+
+def get_precomputed_case(state: ScenarioState, case_type: str):
+    """
+    Resultado validado del análisis combinado para un caso, o None si hay
+    que analizarlo por separado.
+    """
+    if not state.combined_analysis:
+        return None
+    return state.combined_analysis.get("results", {}).get(case_type)
@@ -12,6 +12,8 @@ del CASO PROMEDIO, incluyendo:
 from typing import Dict, Any, List
 from core.analizador.models.scenario_state import ScenarioState
 from core.analizador.tools.llm_analyzer import LLMAnalyzer
+from core.analizador.tools.subroutine_costs import analyze_case_by_subroutine
+from .llm_analyze_all_cases_node import get_precomputed_case
 from .llm_analyze_best_case_node import create_fallback_scenario
 
 
@@ -49,22 +51,30 @@ def llm_analyze_average_case_node(state: ScenarioState) -> ScenarioState:
         print(f"  - Peor caso: {worst_case_summary}")
         print()
 
-        # Invocar LLM para análisis del caso promedio
-        analyzer = LLMAnalyzer(temperature=0.0)
-
-        print("[WAIT] Invocando LLM para análisis del CASO PROMEDIO...")
-        llm_result = analyzer.analyze_average_case(
-            pseudocode=state.pseudocode,
-            algorithm_name=state.algorithm_name,
-            is_iterative=state.is_iterative,
-            best_case_summary=best_case_summary,
-            worst_case_summary=worst_case_summary
-        )
-
-        print("[OK] LLM respondió exitosamente")
+        llm_result = get_precomputed_case(state, "average_case")
+        if llm_result is not None:
+            print("[OK] Usando CASO PROMEDIO del análisis combinado")
+        else:
+            # Invocar LLM para análisis del caso promedio
+            analyzer = LLMAnalyzer(temperature=0.0, category=state.algorithm_category)
+
+            print("[WAIT] Invocando LLM para análisis del CASO PROMEDIO...")
+            llm_result = analyze_case_by_subroutine(
+                analyzer,
+                "average_case",
+                pseudocode=state.pseudocode,
+                algorithm_name=state.algorithm_name,
+                is_iterative=state.is_iterative,
+                best_case_summary=best_case_summary,
+                worst_case_summary=worst_case_summary
+            )
+
+            print("[OK] LLM respondió exitosamente")
         print()
         print("RESULTADO DEL LLM:")
         print(f"  - Tipo: {llm_result.get('scenario_type')}")
+        for name, info in llm_result.get('subroutine_costs', {}).items():
+            print(f"  - Subrutina {name}: T = {info['T']}{' (cache)' if info['from_cache'] else ''}")
         
         # Detectar formato y mostrar campos apropiados
         if "input_condition" in llm_result:
@@ -12,6 +12,9 @@ del MEJOR CASO, incluyendo:
 from typing import Dict, Any
 from core.analizador.models.scenario_state import ScenarioState
 from core.analizador.tools.llm_analyzer import LLMAnalyzer
+from core.analizador.tools.loop_counter import LoopCounter
+from core.analizador.tools.subroutine_costs import analyze_case_by_subroutine
+from .llm_analyze_all_cases_node import get_precomputed_case
 
 
 def llm_analyze_best_case_node(state: ScenarioState) -> ScenarioState:
@@ -41,20 +44,28 @@ def llm_analyze_best_case_node(state: ScenarioState) -> ScenarioState:
     print()
 
     try:
-        # Invocar LLM para análisis completo del mejor caso
-        analyzer = LLMAnalyzer(temperature=0.0)
-
-        print("[WAIT] Invocando LLM para análisis del MEJOR CASO...")
-        llm_result = analyzer.analyze_best_case(
-            pseudocode=state.pseudocode,
-            algorithm_name=state.algorithm_name,
-            is_iterative=state.is_iterative
-        )
-
-        print("[OK] LLM respondió exitosamente")
+        llm_result = get_precomputed_case(state, "best_case")
+        if llm_result is not None:
+            print("[OK] Usando MEJOR CASO del análisis combinado")
+        else:
+            # Invocar LLM para análisis completo del mejor caso
+            analyzer = LLMAnalyzer(temperature=0.0, category=state.algorithm_category)
+
+            print("[WAIT] Invocando LLM para análisis del MEJOR CASO...")
+            llm_result = analyze_case_by_subroutine(
+                analyzer,
+                "best_case",
+                pseudocode=state.pseudocode,
+                algorithm_name=state.algorithm_name,
+                is_iterative=state.is_iterative
+            )
+
+            print("[OK] LLM respondió exitosamente")
         print()
         print("RESULTADO DEL LLM:")
         print(f"  - Tipo: {llm_result.get('scenario_type')}")
+        for name, info in llm_result.get('subroutine_costs', {}).items():
+            print(f"  - Subrutina {name}: T = {info['T']}{' (cache)' if info['from_cache'] else ''}")
         
         # Detectar formato y mostrar campos apropiados
         if "input_condition" in llm_result:
@@ -150,7 +161,9 @@ def convert_llm_to_scenario(llm_result: Dict[str, Any], scenario_type: str, is_i
 
 def create_fallback_scenario(state: ScenarioState, scenario_type: str) -> Dict[str, Any]:
     """
-    Crea escenario de fallback si el LLM falla.
+    Crea escenario de fallback si el LLM falla (o su circuito está abierto).
+
+    El peor caso iterativo se estima con el conteo estático de ciclos anidados.
 
     Args:
         state: Estado actual del workflow
@@ -173,6 +186,9 @@ def create_fallback_scenario(state: ScenarioState, scenario_type: str) -> Dict[s
         "average_case": "n/2" if state.is_iterative else "T(n) = T(n/2) + 1"
     }
 
+    if scenario_type == "worst_case" and state.is_iterative:
+        costs["worst_case"] = LoopCounter().estimar_peor_caso(state.pseudocode or "") or costs["worst_case"]
+
     return {
         "id": f"S_{scenario_type}_fallback",
         "semantic_id": f"{scenario_type}_fallback",
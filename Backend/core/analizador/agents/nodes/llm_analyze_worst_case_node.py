@@ -12,6 +12,8 @@ del PEOR CASO, incluyendo:
 from typing import Dict, Any
 from core.analizador.models.scenario_state import ScenarioState
 from core.analizador.tools.llm_analyzer import LLMAnalyzer
+from core.analizador.tools.subroutine_costs import analyze_case_by_subroutine
+from .llm_analyze_all_cases_node import get_precomputed_case
 # Reutilizar funciones del nodo de mejor caso
 from .llm_analyze_best_case_node import convert_llm_to_scenario, create_fallback_scenario
 
@@ -43,20 +45,28 @@ def llm_analyze_worst_case_node(state: ScenarioState) -> ScenarioState:
     print()
 
     try:
-        # Invocar LLM para análisis completo del peor caso
-        analyzer = LLMAnalyzer(temperature=0.0)
-
-        print("[WAIT] Invocando LLM para análisis del PEOR CASO...")
-        llm_result = analyzer.analyze_worst_case(
-            pseudocode=state.pseudocode,
-            algorithm_name=state.algorithm_name,
-            is_iterative=state.is_iterative
-        )
-
-        print("[OK] LLM respondió exitosamente")
+        llm_result = get_precomputed_case(state, "worst_case")
+        if llm_result is not None:
+            print("[OK] Usando PEOR CASO del análisis combinado")
+        else:
+            # Invocar LLM para análisis completo del peor caso
+            analyzer = LLMAnalyzer(temperature=0.0, category=state.algorithm_category)
+
+            print("[WAIT] Invocando LLM para análisis del PEOR CASO...")
+            llm_result = analyze_case_by_subroutine(
+                analyzer,
+                "worst_case",
+                pseudocode=state.pseudocode,
+                algorithm_name=state.algorithm_name,
+                is_iterative=state.is_iterative
+            )
+
+            print("[OK] LLM respondió exitosamente")
         print()
         print("RESULTADO DEL LLM:")
         print(f"  - Tipo: {llm_result.get('scenario_type')}")
+        for name, info in llm_result.get('subroutine_costs', {}).items():
+            print(f"  - Subrutina {name}: T = {info['T']}{' (cache)' if info['from_cache'] else ''}")
         
         # Detectar formato y mostrar campos apropiados
         if "input_condition" in llm_result:
@@ -1,12 +1,15 @@
 """
 Workflow Simplificado - Análisis completo con LLM
 
-Workflow de 5 nodos que centraliza TODO el análisis de complejidad en el LLM:
+Workflow de 6 nodos que centraliza TODO el análisis de complejidad en el LLM:
 1. parse_lines: Extrae líneas del pseudocódigo
-2. llm_analyze_best_case: LLM analiza MEJOR CASO completo
-3. llm_analyze_worst_case: LLM analiza PEOR CASO completo
-4. llm_analyze_average_case: LLM analiza CASO PROMEDIO completo
-5. build_omega_table: Ensambla Tabla Omega final
+2. llm_analyze_all_cases: LLM analiza los tres casos en una sola llamada
+   (settings.llm_analisis_combinado); los nodos 3-5 solo llaman al LLM
+   para los casos que no pasaron la validación
+3. llm_analyze_best_case: LLM analiza MEJOR CASO completo
+4. llm_analyze_worst_case: LLM analiza PEOR CASO completo
+5. llm_analyze_average_case: LLM analiza CASO PROMEDIO completo
+6. build_omega_table: Ensambla Tabla Omega final
 
 El LLM es responsable de:
 - Identificar qué entrada causa cada caso
@@ -15,38 +18,64 @@ El LLM es responsable de:
 - Manejar loops anidados
 - Generar costos totales (iterativo: fórmula cerrada, recursivo: recurrencia)
 - Calcular probabilidades
+
+En programas con varias subrutinas, los nodos LLM analizan por separado las
+auxiliares no recursivas y componen su costo en los CALL del algoritmo
+principal (ver core.analizador.tools.subroutine_costs).
+
+get_workflow(reanudable=True) compila el mismo grafo con un checkpointer
+durable: invocado con thread_id = analisis_id, un análisis interrumpido se
+retoma desde el último nodo terminado (ver shared.services.puntos_control).
 """
 
 from core.analizador.agents.nodes.parse_lines_node import parse_lines_node
+from core.analizador.agents.nodes.llm_analyze_all_cases_node import llm_analyze_all_cases_node
 from core.analizador.agents.nodes.llm_analyze_best_case_node import llm_analyze_best_case_node
 from core.analizador.agents.nodes.llm_analyze_worst_case_node import llm_analyze_worst_case_node
 from core.analizador.agents.nodes.llm_analyze_average_case_node import llm_analyze_average_case_node
 from core.analizador.agents.nodes.build_omega_table_node import build_omega_table_node
-from core.analizador.models.scenario_state import ScenarioState
+from core.analizador.models.omega_table import CaseSummary, LineCost, OmegaTable, ScenarioEntry, SummaryEntry
+from core.analizador.models.recursion_info import RecursionInfo
+from core.analizador.models.scenario_state import ControlVariable, LoopInfo, ScenarioState
+from config.settings import settings
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
 from langgraph.graph import END, StateGraph
+from shared.services.puntos_control import PuntosControlGrafo
+from tools.metricas import medir_tiempo
+
 
+# Modelos del estado que el checkpointer puede deserializar
+MODELOS_ESTADO = (
+    ScenarioState, ControlVariable, LoopInfo, RecursionInfo,
+    OmegaTable, ScenarioEntry, LineCost, SummaryEntry, CaseSummary,
+)
 
-def create_mapeo_workflow():
+
+def create_mapeo_workflow(checkpointer=None):
     """
     Crea el workflow simplificado de LangGraph con análisis centralizado en LLM.
 
     Flujo ÚNICO para todos los algoritmos (iterativos y recursivos):
     1. parse_lines: Parsing simple de líneas
-    2. llm_analyze_best_case: LLM hace análisis completo de mejor caso
-    3. llm_analyze_worst_case: LLM hace análisis completo de peor caso
-    4. llm_analyze_average_case: LLM hace análisis completo de caso promedio
-    5. build_omega_table: Ensambla tabla final con resumen
+    2. llm_analyze_all_cases: LLM analiza los tres casos en una llamada
+    3. llm_analyze_best_case: LLM hace análisis completo de mejor caso
+    4. llm_analyze_worst_case: LLM hace análisis completo de peor caso
+    5. llm_analyze_average_case: LLM hace análisis completo de caso promedio
+    6. build_omega_table: Ensambla tabla final con resumen
 
     El LLM recibe el parámetro `is_iterative` del módulo de verificación y
     no necesita calcular si el algoritmo es iterativo o recursivo.
 
+    Args:
+        checkpointer: Checkpointer de LangGraph (None = sin puntos de control)
+
     Returns:
         Workflow compilado listo para ejecutar
     """
     print("\n" + "=" * 80)
     print("INICIALIZANDO WORKFLOW SIMPLIFICADO")
     print("=" * 80)
-    print("Arquitectura: 5 nodos (parse + 3 LLM + build)")
+    print("Arquitectura: 6 nodos (parse + combinado + 3 LLM + build)")
     print("Analisis: Centralizado en LLM")
     print("=" * 80)
     print()
@@ -54,16 +83,18 @@ def create_mapeo_workflow():
     # Crear grafo con estado tipado
     graph = StateGraph(ScenarioState)
 
-    # Agregar los 5 nodos
-    graph.add_node("parse_lines", parse_lines_node)
-    graph.add_node("llm_analyze_best_case", llm_analyze_best_case_node)
-    graph.add_node("llm_analyze_worst_case", llm_analyze_worst_case_node)
-    graph.add_node("llm_analyze_average_case", llm_analyze_average_case_node)
-    graph.add_node("build_omega_table", build_omega_table_node)
+    # Agregar los 6 nodos (cada uno registra su tiempo en tools.metricas)
+    graph.add_node("parse_lines", medir_tiempo("workflow.parse_lines")(parse_lines_node))
+    graph.add_node("llm_analyze_all_cases", medir_tiempo("workflow.llm_analyze_all_cases")(llm_analyze_all_cases_node))
+    graph.add_node("llm_analyze_best_case", medir_tiempo("workflow.llm_analyze_best_case")(llm_analyze_best_case_node))
+    graph.add_node("llm_analyze_worst_case", medir_tiempo("workflow.llm_analyze_worst_case")(llm_analyze_worst_case_node))
+    graph.add_node("llm_analyze_average_case", medir_tiempo("workflow.llm_analyze_average_case")(llm_analyze_average_case_node))
+    graph.add_node("build_omega_table", medir_tiempo("workflow.build_omega_table")(build_omega_table_node))
 
     # Definir flujo LINEAL (sin branches)
     graph.set_entry_point("parse_lines")
-    graph.add_edge("parse_lines", "llm_analyze_best_case")
+    graph.add_edge("parse_lines", "llm_analyze_all_cases")
+    graph.add_edge("llm_analyze_all_cases", "llm_analyze_best_case")
     graph.add_edge("llm_analyze_best_case", "llm_analyze_worst_case")
     graph.add_edge("llm_analyze_worst_case", "llm_analyze_average_case")
     graph.add_edge("llm_analyze_average_case", "build_omega_table")
@@ -73,21 +104,37 @@ def create_mapeo_workflow():
     print()
 
     # Compilar workflow
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer)
 
 
-# Singleton para reutilización
+# Singletons para reutilización
 _workflow_instance = None
+_workflow_reanudable_instance = None
 
 
-def get_workflow():
+def get_workflow(reanudable: bool = False):
     """
     Obtiene instancia singleton del workflow.
 
+    Args:
+        reanudable: Si True, el workflow guarda un punto de control por nodo
+                    y debe invocarse con config={"configurable": {"thread_id": ...}}
+
     Returns:
         Workflow compilado
     """
-    global _workflow_instance
+    global _workflow_instance, _workflow_reanudable_instance
+    if reanudable:
+        if _workflow_reanudable_instance is None:
+            serde = JsonPlusSerializer(
+                allowed_msgpack_modules=[(modelo.__module__, modelo.__name__) for modelo in MODELOS_ESTADO]
+            )
+            _workflow_reanudable_instance = create_mapeo_workflow(
+                PuntosControlGrafo(
+                    directorio=settings.puntos_control_dir, serde=serde, ttl_h=settings.puntos_control_ttl_h
+                )
+            )
+        return _workflow_reanudable_instance
     if _workflow_instance is None:
         _workflow_instance = create_mapeo_workflow()
     return _workflow_instance
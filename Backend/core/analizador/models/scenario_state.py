@@ -75,6 +75,7 @@ class ScenarioState(BaseModel):
     algorithm_name: str  # Nombre del algoritmo
     is_iterative: bool  # True si es iterativo, False si recursivo
     parameters: Dict[str, str] = Field(default_factory=dict)  # {"A[]": "array", "n": "int"}
+    algorithm_category: Optional[str] = None  # Categoría del ClasificadorAlgoritmos (elige los ejemplos few-shot)
 
     # ===== PROCESAMIENTO INTERNO =====
     # Paso 1: Parsing
@@ -95,6 +96,10 @@ class ScenarioState(BaseModel):
     raw_scenarios: List[Dict] = Field(default_factory=list)
     # Lista de diccionarios con {id, condition, state, iteration_value}
 
+    # Paso 4a: Análisis combinado de los tres casos (una sola llamada LLM)
+    combined_analysis: Optional[Dict] = None
+    # {results: {best_case, worst_case, average_case} validados, errors: {caso: motivo}}
+
     # Paso 4b: Análisis LLM de características de entrada
     llm_analysis: Optional[Dict] = None
     # Resultado del análisis LLM: {is_sensitive, sensitivity_type, best_case_input, worst_case_input, parameter_q_applicable, parameter_q_meaning}
@@ -1,13 +1,13 @@
 from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional, Literal
 import logging
+import sys
 import tempfile
 from pathlib import Path
 from datetime import datetime
 
 from pydantic import BaseModel, Field
-from flujo_analisis import FlujoAnalisis
-from agentes.agenteReportador import AgenteReportador
 
 class AnalisisConReporteResponse(BaseModel):
     """Response del análisis con reporte"""
@@ -27,6 +27,36 @@ router = APIRouter(prefix="/analisis", tags=["analisis"])
 logger = logging.getLogger(__name__)
 
 
+def _clase_flujo():
+    """
+    FlujoAnalisis, importado en la primera solicitud que lo necesita.
+
+    flujo_analisis arrastra LangChain, LangGraph, SymPy y todos los agentes;
+    importarlo al cargar el router haría pagar ese arranque también a los
+    procesos que solo validan.
+    """
+    from flujo_analisis import FlujoAnalisis
+    return FlujoAnalisis
+
+
+def precargar_analizador() -> None:
+    """Importa el flujo de análisis por adelantado (ver settings.analizador_precarga)."""
+    _clase_flujo()
+    logger.info("Analizador precargado")
+
+
+def _ejecutar_analisis(**kwargs) -> dict:
+    """Crea el flujo y analiza (bloqueante: se ejecuta en el threadpool)."""
+    flujo = _clase_flujo()(modo_verbose=False)
+    return flujo.analizar(**kwargs)
+
+
+def _reanudar_analisis(analisis_id: str) -> Optional[dict]:
+    """Crea el flujo y reanuda un análisis (bloqueante: se ejecuta en el threadpool)."""
+    flujo = _clase_flujo()(modo_verbose=False)
+    return flujo.reanudar(analisis_id)
+
+
 class AnalisisRequest(BaseModel):
     """Request para análisis de complejidad"""
     entrada: str = Field(..., description="Pseudocódigo o descripción en lenguaje natural")
@@ -38,11 +68,27 @@ class AnalisisRequest(BaseModel):
         default=True,
         description="Si True, corrige errores automáticamente"
     )
+    analisis_previo_id: Optional[str] = Field(
+        default=None,
+        description="ID de un análisis previo del mismo programa (re-análisis incremental)"
+    )
+    presupuesto_tokens: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="Tokens LLM máximos del análisis (por defecto settings.analisis_tokens_max)"
+    )
+    limite_segundos: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Plazo del análisis en segundos (por defecto settings.analisis_segundos_max)"
+    )
 
 
 class AnalisisResponse(BaseModel):
     """Response del análisis de complejidad"""
     exito: bool
+    analisis_id: Optional[str] = None
+    incremental: Optional[dict] = None
     fase_actual: Optional[str]
     pseudocodigo_original: Optional[str]
     pseudocodigo_validado: Optional[str]
@@ -56,6 +102,10 @@ class AnalisisResponse(BaseModel):
     clasificacion: Optional[dict] = None
     flowchart: Optional[str] = None
     validacion_complejidades: Optional[dict] = None
+    presupuesto: Optional[dict] = None
+    fases_restauradas: Optional[list] = None
+    fases_cache: Optional[list] = None
+    analisis_similar: Optional[dict] = None
 
 
 class AnalisisConReporteResponse(AnalisisResponse):
@@ -65,6 +115,76 @@ class AnalisisConReporteResponse(AnalisisResponse):
     validacion_complejidades: Optional[dict] = None
 
 
+def _respuesta_analisis(resultado: dict) -> AnalisisResponse:
+    """
+    Construye la respuesta de un análisis (nuevo o reanudado).
+
+    Si no hay complejidades las genera desde las ecuaciones o, en último
+    caso, desde el tipo de algoritmo.
+    """
+    # Workaround: Si no hay complejidades, generar desde ecuaciones o tabla omega
+    complejidades = resultado.get('complejidades')
+    validacion = resultado.get('validacion', {})
+    algorithm_name = validacion.get('algorithm_name', 'Algoritmo')
+
+    if not complejidades:
+        # Intentar desde ecuaciones
+        if resultado.get('ecuaciones'):
+            ecuaciones = resultado['ecuaciones']
+            complejidades = {
+                'algorithm_name': algorithm_name,
+                'mejor_caso': ecuaciones.get('mejor_caso', 'O(1)'),
+                'caso_promedio': ecuaciones.get('caso_promedio', 'O(n)'),
+                'peor_caso': ecuaciones.get('peor_caso', 'O(n)'),
+                'derivacion_caso_promedio': f"T_avg(n) = {ecuaciones.get('caso_promedio', 'n')}"
+            }
+        # Fallback: generar complejidades genéricas desde tipo de algoritmo
+        elif resultado.get('costos_por_linea'):
+            tipo_algo = validacion.get('tipo_algoritmo', 'Iterativo')
+            if tipo_algo == 'Recursivo':
+                complejidades = {
+                    'algorithm_name': algorithm_name,
+                    'mejor_caso': 'O(1)',
+                    'caso_promedio': 'O(n)',
+                    'peor_caso': 'O(2^n)',
+                    'derivacion_caso_promedio': 'T(n) = T(n-1) + O(1)'
+                }
+            else:
+                complejidades = {
+                    'algorithm_name': algorithm_name,
+                    'mejor_caso': 'O(1)',
+                    'caso_promedio': 'O(n)',
+                    'peor_caso': 'O(n)',
+                    'derivacion_caso_promedio': 'T(n) = Σ(i=1 to n) O(1)'
+                }
+
+    # Construir respuesta explícitamente para asegurar que se incluyan todos los campos
+    response = AnalisisResponse(
+        exito=resultado.get('exito', False),
+        analisis_id=resultado.get('analisis_id'),
+        incremental=resultado.get('incremental'),
+        fase_actual=resultado.get('fase_actual'),
+        pseudocodigo_original=resultado.get('pseudocodigo_original'),
+        pseudocodigo_validado=resultado.get('pseudocodigo_validado'),
+        validacion=resultado.get('validacion'),
+        validacion_inicial=resultado.get('validacion_inicial'),
+        correccion=resultado.get('correccion'),
+        costos_por_linea=resultado.get('costos_por_linea'),
+        ecuaciones=resultado.get('ecuaciones'),
+        complejidades=complejidades,
+        errores=resultado.get('errores', []),
+        clasificacion=resultado.get('clasificacion'),
+        flowchart=resultado.get('flowchart'),
+        validacion_complejidades=resultado.get('validacion_complejidades'),
+        presupuesto=resultado.get('presupuesto'),
+        fases_restauradas=resultado.get('fases_restauradas'),
+        fases_cache=resultado.get('fases_cache'),
+        analisis_similar=resultado.get('analisis_similar')
+    )
+
+    return response
+
+
 @router.post("/analizar", response_model=AnalisisResponse, status_code=status.HTTP_200_OK)
 async def analizar_complejidad(request: AnalisisRequest) -> AnalisisResponse:
     """
@@ -81,68 +201,21 @@ async def analizar_complejidad(request: AnalisisRequest) -> AnalisisResponse:
     try:
         logger.info(f"Análisis iniciado - tipo: {request.tipo_entrada}")
         
-        flujo = FlujoAnalisis(modo_verbose=False)
-        resultado = flujo.analizar(
+        # En el threadpool: no bloquea el event loop y permite coalescer
+        # solicitudes idénticas concurrentes en un solo análisis
+        resultado = await run_in_threadpool(
+            _ejecutar_analisis,
             entrada=request.entrada,
             tipo_entrada=request.tipo_entrada,
-            auto_corregir=request.auto_corregir
+            auto_corregir=request.auto_corregir,
+            analisis_previo_id=request.analisis_previo_id,
+            presupuesto_tokens=request.presupuesto_tokens,
+            limite_segundos=request.limite_segundos
         )
 
         logger.info(f"Análisis completado - éxito: {resultado['exito']}, fase: {resultado['fase_actual']}")
 
-        # Workaround: Si no hay complejidades, generar desde ecuaciones o tabla omega
-        complejidades = resultado.get('complejidades')
-        validacion = resultado.get('validacion', {})
-        algorithm_name = validacion.get('algorithm_name', 'Algoritmo')
-
-        if not complejidades:
-            # Intentar desde ecuaciones
-            if resultado.get('ecuaciones'):
-                ecuaciones = resultado['ecuaciones']
-                complejidades = {
-                    'algorithm_name': algorithm_name,
-                    'mejor_caso': ecuaciones.get('mejor_caso', 'O(1)'),
-                    'caso_promedio': ecuaciones.get('caso_promedio', 'O(n)'),
-                    'peor_caso': ecuaciones.get('peor_caso', 'O(n)'),
-                    'derivacion_caso_promedio': f"T_avg(n) = {ecuaciones.get('caso_promedio', 'n')}"
-                }
-            # Fallback: generar complejidades genéricas desde tipo de algoritmo
-            elif resultado.get('costos_por_linea'):
-                tipo_algo = validacion.get('tipo_algoritmo', 'Iterativo')
-                if tipo_algo == 'Recursivo':
-                    complejidades = {
-                        'algorithm_name': algorithm_name,
-                        'mejor_caso': 'O(1)',
-                        'caso_promedio': 'O(n)',
-                        'peor_caso': 'O(2^n)',
-                        'derivacion_caso_promedio': 'T(n) = T(n-1) + O(1)'
-                    }
-                else:
-                    complejidades = {
-                        'algorithm_name': algorithm_name,
-                        'mejor_caso': 'O(1)',
-                        'caso_promedio': 'O(n)',
-                        'peor_caso': 'O(n)',
-                        'derivacion_caso_promedio': 'T(n) = Σ(i=1 to n) O(1)'
-                    }
-
-        # Construir respuesta explícitamente para asegurar que se incluyan todos los campos
-        response = AnalisisResponse(
-            exito=resultado.get('exito', False),
-            fase_actual=resultado.get('fase_actual'),
-            pseudocodigo_original=resultado.get('pseudocodigo_original'),
-            pseudocodigo_validado=resultado.get('pseudocodigo_validado'),
-            validacion=resultado.get('validacion'),
-            validacion_inicial=resultado.get('validacion_inicial'),
-            correccion=resultado.get('correccion'),
-            costos_por_linea=resultado.get('costos_por_linea'),
-            ecuaciones=resultado.get('ecuaciones'),
-            complejidades=complejidades,
-            errores=resultado.get('errores', []),
-            validacion_complejidades=resultado.get('validacion_complejidades')
-        )
-
-        return response
+        return _respuesta_analisis(resultado)
         
     except ValueError as e:
         logger.warning(f"Input inválido: {str(e)}")
@@ -177,8 +250,8 @@ async def analizar_desde_archivo(
         contenido = await archivo.read()
         pseudocodigo = contenido.decode('utf-8')
         
-        flujo = FlujoAnalisis(modo_verbose=False)
-        resultado = flujo.analizar(
+        resultado = await run_in_threadpool(
+            _ejecutar_analisis,
             entrada=pseudocodigo,
             tipo_entrada="pseudocodigo",
             auto_corregir=auto_corregir
@@ -186,7 +259,7 @@ async def analizar_desde_archivo(
         
         logger.info(f"Análisis completado - éxito: {resultado['exito']}")
         
-        return AnalisisResponse(**resultado)
+        return _respuesta_analisis(resultado)
         
     except ValueError as e:
         logger.warning(f"Archivo inválido: {str(e)}")
@@ -216,16 +289,22 @@ async def analizar_con_reporte(request: AnalisisRequest) -> AnalisisConReporteRe
     try:
         logger.info(f"Análisis con reporte iniciado - tipo: {request.tipo_entrada}")
 
-        flujo = FlujoAnalisis(modo_verbose=False)
-        resultado = flujo.analizar(
+        # En el threadpool: no bloquea el event loop y permite coalescer
+        # solicitudes idénticas concurrentes en un solo análisis
+        resultado = await run_in_threadpool(
+            _ejecutar_analisis,
             entrada=request.entrada,
             tipo_entrada=request.tipo_entrada,
-            auto_corregir=request.auto_corregir
+            auto_corregir=request.auto_corregir,
+            analisis_previo_id=request.analisis_previo_id,
+            presupuesto_tokens=request.presupuesto_tokens,
+            limite_segundos=request.limite_segundos
         )
 
         # Generar reporte con AgenteReportador
+        from agentes.agenteReportador import AgenteReportador
         reportador = AgenteReportador()
-        reporte_completo = reportador.generar_reporte_completo(resultado)
+        reporte_completo = await run_in_threadpool(reportador.generar_reporte_completo, resultado)
 
         # Agregar reporte y diagramas al resultado
         resultado['reporte_markdown'] = reporte_completo.get('markdown')
@@ -249,7 +328,44 @@ async def analizar_con_reporte(request: AnalisisRequest) -> AnalisisConReporteRe
         )
 
 
+@router.post("/{analisis_id}/reanudar", response_model=AnalisisResponse, status_code=status.HTTP_200_OK)
+async def reanudar_analisis(analisis_id: str) -> AnalisisResponse:
+    """
+    Reanuda un análisis que no terminó (falló una fase o se interrumpió el
+    proceso) desde su última fase completada.
+    
+    Las fases restauradas se listan en fases_restauradas.
+    """
+    try:
+        resultado = await run_in_threadpool(_reanudar_analisis, analisis_id)
+    except Exception as e:
+        logger.error(f"Error interno reanudando análisis: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno en el servidor"
+        )
+    
+    if resultado is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No hay puntos de control del análisis {analisis_id} (terminó, venció o no existe)"
+        )
+    
+    logger.info(f"Análisis reanudado - éxito: {resultado['exito']}, fases restauradas: {resultado['fases_restauradas']}")
+    return _respuesta_analisis(resultado)
+
+
 @router.get("/health", status_code=status.HTTP_200_OK)
 async def health_check():
-    """Health check del servicio de análisis"""
-    return {"status": "ok", "service": "analisis"}
\ No newline at end of file
+    """
+    Health check del servicio de análisis, con el estado de carga (análisis en
+    curso y gobernador LLM). No importa el analizador: mientras no se cargó,
+    carga es None.
+    """
+    cargado = 'flujo_analisis' in sys.modules
+    return {
+        "status": "ok",
+        "service": "analisis",
+        "analizador_cargado": cargado,
+        "carga": _clase_flujo().estadisticas_carga() if cargado else None,
+    }
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Tests de la biblioteca de ejemplos few-shot
+
+Verifica la profundidad de loops sobre el corpus, la selección por categoría
+y estructura dentro del presupuesto, y que los ejemplos cumplan el mismo
+formato que se exige a las respuestas del LLM.
+"""
+
+import copy
+
+import pytest
+
+from core.analizador.tools import few_shot
+from core.analizador.tools.few_shot import (
+    FEW_SHOT_EXAMPLES,
+    build_examples_block,
+    estimate_tokens,
+    loop_depth,
+    render_example,
+    select_examples,
+)
+from core.analizador.tools.llm_analyzer import ANALYZE_RECURSIVE_WORST_CASE_PROMPT, LLMAnalyzer
+
+from .test_subroutine_costs import DATA_DIR, SUMA
+
+
+class TestLoopDepth:
+    """Tests de la profundidad de anidamiento"""
+
+    @pytest.mark.parametrize("filename, expected", [
+        ("01-busqueda-lineal.txt", 1),
+        ("03-bubble-sort.txt", 2),
+        ("07-factorial-recursivo.txt", 0),
+        ("10-matrix-multiplication.txt", 3),
+    ])
+    def test_corpus(self, filename, expected):
+        assert loop_depth((DATA_DIR / filename).read_text(encoding="utf-8")) == expected
+
+    def test_loop_without_begin(self):
+        assert loop_depth("for i 🡨 1 to n do\n    x 🡨 x + 1") == 1
+
+
+class TestSelection:
+    """Tests de la elección de ejemplos"""
+
+    def test_category_wins_over_structure(self):
+        examples = select_examples("worst_case", False, category="busqueda", depth=0, k=1, token_budget=1000)
+        assert [ex["id"] for ex in examples] == ["busqueda_binaria_rec_worst"]
+
+    def test_structure_decides_without_category(self):
+        examples = select_examples("best_case", True, depth=2, k=1, token_budget=1000)
+        assert [ex["id"] for ex in examples] == ["bubble_sort_best"]
+
+    def test_never_mixes_iterative_and_recursive(self):
+        examples = select_examples("best_case", False, category="iterativo", k=10, token_budget=10_000)
+        assert examples and all(not ex["is_iterative"] for ex in examples)
+
+    def test_respects_token_budget(self):
+        examples = select_examples("best_case", False, category="ordenamiento", k=3, token_budget=500)
+        assert sum(estimate_tokens(render_example(ex)) for ex in examples) <= 500
+        assert examples[0]["id"] == "quicksort_best"
+
+    def test_empty_budget_leaves_no_examples(self, monkeypatch):
+        monkeypatch.setattr(few_shot.settings, "llm_few_shot_k", 0)
+        assert build_examples_block("best_case", True, SUMA, "iterativo") == ""
+
+
+class TestPrompts:
+    """Tests de los prompts con ejemplos dinámicos"""
+
+    @pytest.mark.parametrize("example", FEW_SHOT_EXAMPLES, ids=lambda ex: ex["id"])
+    def test_examples_pass_response_validation(self, example):
+        analyzer = LLMAnalyzer.__new__(LLMAnalyzer)
+        # El validador del caso promedio normaliza campos: no tocar la biblioteca compartida
+        result = copy.deepcopy(example["result"])
+        if example["case_type"] == "average_case":
+            analyzer._validate_average_case_result(result, example["is_iterative"])
+        else:
+            analyzer._validate_case_result(result, example["case_type"], example["is_iterative"])
+
+    def test_unrelated_algorithm_gets_shorter_prompt(self):
+        code = (DATA_DIR / "07-factorial-recursivo.txt").read_text(encoding="utf-8")
+
+        def prompt(category):
+            return ANALYZE_RECURSIVE_WORST_CASE_PROMPT.format(
+                pseudocode=code, algorithm_name="factorial",
+                examples=build_examples_block("worst_case", False, code, category)
+            )
+
+        own = prompt("recursivo_divide_conquista")
+        assert "Factorial recursivo" in own and "QuickSort, peor caso" not in own
+        assert len(own) < len(prompt("ordenamiento"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
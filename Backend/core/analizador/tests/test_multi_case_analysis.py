@@ -0,0 +1,158 @@
+"""
+Tests del análisis combinado de los tres casos
+
+Verifica que LLMAnalyzer.analyze_all_cases valide cada parte de la respuesta
+por separado, que las auxiliares se analicen con una llamada combinada y que
+los nodos por caso usen los resultados ya validados sin volver a llamar al LLM.
+"""
+
+import pytest
+
+from core.analizador.agents.nodes import llm_analyze_worst_case_node as worst_node_module
+from core.analizador.models.scenario_state import ScenarioState
+from core.analizador.tools import llm_analyzer
+from core.analizador.tools.llm_analyzer import LLMAnalyzer
+from core.analizador.tools.subroutine_costs import SubroutineCostCache, analyze_all_cases_by_subroutine
+from shared.services.llm_servicio import LLMService
+
+from .test_subroutine_costs import DATA_DIR, SUMA, RecordingAnalyzer
+
+
+def _line(number, c_op):
+    return {"line_number": number, "code": "...", "C_op": c_op, "Freq": "1", "Total": str(c_op)}
+
+
+BEST = {"scenario_type": "best_case", "input_condition": "A[1] = x", "T_of_S": "c1 + c2",
+        "P_of_S": "1/n", "line_by_line_analysis": [_line(1, "c1"), _line(2, "c2")]}
+WORST = {"scenario_type": "worst_case", "input_condition": "x no está", "T_of_S": "c1 + c2*n",
+         "P_of_S": "1/(n+1)", "line_by_line_analysis": [_line(1, "c1"), _line(2, 0)]}
+AVERAGE = {"scenario_type": "average_case", "T_of_S": "c1 + c2*n/2", "P_of_S": "1"}
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    """LLMAnalyzer cuya salida estructurada es la fijada en analyzer.response."""
+    monkeypatch.setattr(LLMService, "get_llm", staticmethod(lambda **kwargs: kwargs))
+    instance = LLMAnalyzer()
+    instance.prompts = []
+    instance.calls = []
+
+    def invocar_estructurado(llm, messages, tool, prioridad=None, permitir_truncado=False, verificar=None):
+        instance.prompts.append("".join(block["text"] for block in messages[-1].content))
+        instance.calls.append({"tool": tool, "permitir_truncado": permitir_truncado})
+        return instance.response
+
+    monkeypatch.setattr(llm_analyzer.LLMService, "invocar_estructurado", staticmethod(invocar_estructurado))
+    return instance
+
+
+class TestAnalyzeAllCases:
+    """Tests de la llamada combinada y su validación por caso"""
+
+    def test_invalid_case_is_reported_for_fallback(self, analyzer):
+        analyzer.response = {"best_case": BEST, "worst_case": WORST, "average_case": AVERAGE}
+
+        combined = analyzer.analyze_all_cases(SUMA, "suma", is_iterative=True)
+
+        assert set(combined["results"]) == {"best_case", "average_case"}
+        assert "C_op" in combined["errors"]["worst_case"]
+        # El pseudocódigo viaja una sola vez aunque el prompt cubra los tres casos
+        assert analyzer.prompts[0].count("total 🡨 total + A[i]") == 1
+        assert "SECCIÓN average_case" in analyzer.prompts[0]
+
+    def test_truncated_response_keeps_complete_cases(self, analyzer):
+        valid_worst = dict(WORST, line_by_line_analysis=[_line(1, "c1")])
+        analyzer.response = {"best_case": BEST, "worst_case": valid_worst}
+
+        combined = analyzer.analyze_all_cases(SUMA, "suma", is_iterative=True)
+
+        assert set(combined["results"]) == {"best_case", "worst_case"}
+        assert set(combined["errors"]) == {"average_case"}
+        # Una salida cortada por max_tokens conserva los casos completos
+        assert analyzer.calls[0]["tool"]["name"] == "report_all_cases"
+        assert analyzer.calls[0]["permitir_truncado"] is True
+
+    def test_combined_call_uses_larger_output_limit(self, analyzer):
+        analyzer.response = {}
+        analyzer.analyze_all_cases(SUMA, "suma")
+
+        assert analyzer._multi_case_llm["max_tokens"] > analyzer.llm["max_tokens"]
+
+
+class CombinedRecordingAnalyzer(RecordingAnalyzer):
+    """Analizador de prueba con modo combinado; puede fallar casos a propósito."""
+
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+        self.combined_calls = []
+
+    def analyze_all_cases(self, pseudocode, algorithm_name, is_iterative, callee_costs=None):
+        self.combined_calls.append({"algorithm_name": algorithm_name, "callee_costs": callee_costs or {}})
+        per_case_calls = len(self.calls)
+        results, errors = {}, {}
+        for case_type in ("best_case", "worst_case", "average_case"):
+            if (algorithm_name, case_type) in self.failing:
+                errors[case_type] = "inválido"
+                continue
+            results[case_type] = self._respond(
+                case_type, pseudocode=pseudocode, algorithm_name=algorithm_name,
+                is_iterative=is_iterative, callee_costs=(callee_costs or {}).get(case_type, "")
+            )
+        # Solo las llamadas por caso quedan en self.calls
+        del self.calls[per_case_calls:]
+        return {"results": results, "errors": errors}
+
+
+class TestAllCasesBySubroutine:
+    """Tests del análisis combinado con subrutinas auxiliares"""
+
+    def test_one_combined_call_per_subroutine(self):
+        code = (DATA_DIR / "05-quick-sort.txt").read_text(encoding="utf-8")
+        cache = SubroutineCostCache()
+        analyzer = CombinedRecordingAnalyzer()
+
+        combined = analyze_all_cases_by_subroutine(analyzer, code, "quickSort", False, cache=cache)
+
+        assert [c["algorithm_name"] for c in analyzer.combined_calls] == ["particionar", "quickSort"]
+        assert analyzer.calls == []
+        assert set(combined["results"]) == {"best_case", "worst_case", "average_case"}
+        assert "(c2*n + c3)" in combined["results"]["worst_case"]["T_of_S"]
+        assert "T_particionar" in analyzer.combined_calls[1]["callee_costs"]["average_case"]
+
+        # Con la auxiliar en cache solo se analiza el llamador
+        analyzer.combined_calls.clear()
+        again = analyze_all_cases_by_subroutine(analyzer, code, "quickSort", False, cache=cache)
+        assert [c["algorithm_name"] for c in analyzer.combined_calls] == ["quickSort"]
+        assert again["results"]["best_case"]["subroutine_costs"]["particionar"]["from_cache"] is True
+
+    def test_failed_helper_case_is_analyzed_alone(self):
+        code = (DATA_DIR / "05-quick-sort.txt").read_text(encoding="utf-8")
+        analyzer = CombinedRecordingAnalyzer(failing={("particionar", "average_case"), ("quickSort", "worst_case")})
+
+        combined = analyze_all_cases_by_subroutine(analyzer, code, "quickSort", False, cache=SubroutineCostCache())
+
+        assert [(c["algorithm_name"], c["case"]) for c in analyzer.calls] == [("particionar", "average_case")]
+        assert set(combined["results"]) == {"best_case", "average_case"}
+        assert set(combined["errors"]) == {"worst_case"}
+
+
+def test_case_node_uses_precomputed_result(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("No debe llamar al LLM")
+
+    monkeypatch.setattr(worst_node_module, "analyze_case_by_subroutine", fail)
+    state = ScenarioState(
+        pseudocode=SUMA, algorithm_name="suma", is_iterative=True,
+        combined_analysis={"results": {"worst_case": WORST}, "errors": {}}
+    )
+
+    new_state = worst_node_module.llm_analyze_worst_case_node(state)
+
+    assert new_state.raw_scenarios[-1]["cost_T"] == "c1 + c2*n"
+    assert new_state.llm_analysis["worst_case"] is WORST
+    assert not new_state.errors
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
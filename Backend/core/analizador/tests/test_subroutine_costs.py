@@ -0,0 +1,211 @@
+"""
+Tests del análisis de costos por subrutina
+
+Verifica que las auxiliares se analicen por separado, que su resultado se
+reutilice desde la cache y que su costo se componga en los sitios de CALL.
+Se usa un analizador de prueba que registra los prompts en lugar del LLM.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from core.analizador.tools.subroutine_costs import (
+    SubroutineCostCache,
+    analyze_case_by_subroutine,
+    compose_call_costs,
+    plan_modular_analysis,
+    reuse_subroutine_results,
+)
+
+
+DATA_DIR = Path(__file__).resolve().parents[3] / "data" / "pseudocodigos" / "correctos"
+
+SUMA = """suma(int A[], int n)
+begin
+    int total, i
+    total 🡨 0
+    for i 🡨 1 to n do
+    begin
+        total 🡨 total + A[i]
+    end
+    return total
+end"""
+
+
+class RecordingAnalyzer:
+    """Analizador de prueba: responde según el algoritmo y registra las llamadas."""
+
+    def __init__(self):
+        self.calls = []
+
+    def _respond(self, case_type, pseudocode, algorithm_name, is_iterative, callee_costs, **_):
+        self.calls.append({
+            "case": case_type,
+            "algorithm_name": algorithm_name,
+            "pseudocode": pseudocode,
+            "callee_costs": callee_costs,
+            "is_iterative": is_iterative,
+        })
+        if algorithm_name in ("particionar", "merge"):
+            return {"scenario_type": case_type, "T_of_S": "c1*n + c2", "P_of_S": "1"}
+        return {
+            "scenario_type": case_type,
+            "T_of_S": "T(n) = 2*T(n/2) + T_particionar + T_merge + c1",
+            "P_of_S": "1",
+        }
+
+    def analyze_best_case(self, **kwargs):
+        return self._respond("best_case", **kwargs)
+
+    def analyze_worst_case(self, **kwargs):
+        return self._respond("worst_case", **kwargs)
+
+    def analyze_average_case(self, best_case_summary="", worst_case_summary="", **kwargs):
+        return self._respond("average_case", **kwargs)
+
+
+class TestPlanModular:
+    """Tests de la selección de subrutinas auxiliares"""
+
+    def test_single_subroutine_has_no_plan(self):
+        assert plan_modular_analysis(SUMA, "suma") is None
+
+    def test_quicksort_summarizes_partition(self):
+        code = (DATA_DIR / "05-quick-sort.txt").read_text(encoding="utf-8")
+        plan = plan_modular_analysis(code, "quickSort")
+
+        assert [h['nombre'] for h in plan['helpers']] == ["particionar"]
+        assert "pivote 🡨 A[der]" not in plan['caller_code']
+        assert "quickSort" in plan['caller_code']
+
+
+class TestComposition:
+    """Tests de la sustitución de costos en los CALL"""
+
+    def test_substitutes_and_renumbers_constants(self):
+        result = {"T_of_S": "T(n) = 2*T(n/2) + T_merge(n) + c1"}
+        composed = compose_call_costs(result, {"merge": "c1*n + c2"})
+
+        assert composed["T_of_S"] == "T(n) = 2*T(n/2) + (c2*n + c3) + c1"
+        assert result["T_of_S"].endswith("c1")
+
+    def test_composes_line_totals(self):
+        result = {
+            "T_of_S": "c1 + T_particionar",
+            "line_by_line_analysis": [{"line_number": 1, "code": "CALL particionar", "C_op": "c1", "Total": "T_particionar"}],
+        }
+        composed = compose_call_costs(result, {"particionar": "c1*n"})
+
+        assert composed["line_by_line_analysis"][0]["Total"] == "(c2*n)"
+
+    def test_uses_the_size_of_each_call(self):
+        result = {"T_of_S": "T(n) = T_merge(n/2) + T_merge(m) + c1"}
+        composed = compose_call_costs(result, {"merge": "c1*n*log(n)"})
+
+        assert composed["T_of_S"] == "T(n) = (c2*(n/2)*log((n/2))) + (c2*m*log(m)) + c1"
+
+    def test_leaves_calls_with_several_arguments(self):
+        result = {"T_of_S": "c1 + T_merge(A, izq, der)"}
+        composed = compose_call_costs(result, {"merge": "c1*n"})
+
+        assert composed["T_of_S"] == "c1 + T_merge(A, izq, der)"
+
+
+class TestAnalyzeCaseBySubroutine:
+    """Tests del flujo completo con cache"""
+
+    def test_helper_is_cached_across_programs(self):
+        code = (DATA_DIR / "05-quick-sort.txt").read_text(encoding="utf-8")
+        cache = SubroutineCostCache()
+        analyzer = RecordingAnalyzer()
+
+        first = analyze_case_by_subroutine(analyzer, "worst_case", code, "quickSort", False, cache=cache)
+        assert [c["algorithm_name"] for c in analyzer.calls] == ["particionar", "quickSort"]
+        # La auxiliar se analiza con su propio tipo, no con el del principal
+        assert [c["is_iterative"] for c in analyzer.calls] == [True, False]
+        assert "T_particionar" in analyzer.calls[1]["callee_costs"]
+        assert "(c2*n + c3)" in first["T_of_S"]
+        assert first["subroutine_costs"]["particionar"]["from_cache"] is False
+
+        # El mismo programa con otro comentario reutiliza el resumen de particionar
+        analyzer.calls.clear()
+        second = analyze_case_by_subroutine(
+            analyzer, "worst_case", code + "\n► reenvío", "quickSort", False, cache=cache
+        )
+        assert [c["algorithm_name"] for c in analyzer.calls] == ["quickSort"]
+        assert second["subroutine_costs"]["particionar"]["from_cache"] is True
+
+    def test_prompt_excludes_helper_body(self):
+        code = (DATA_DIR / "04-merge-sort.txt").read_text(encoding="utf-8")
+        analyzer = RecordingAnalyzer()
+
+        analyze_case_by_subroutine(analyzer, "best_case", code, "mergeSort", False, cache=SubroutineCostCache())
+
+        caller_prompt = analyzer.calls[-1]["pseudocode"]
+        assert "while (i ≤ n1 and j ≤ n2)" not in caller_prompt
+        assert len(caller_prompt) < len(code) / 2
+
+    def test_single_subroutine_uses_plain_call(self):
+        analyzer = RecordingAnalyzer()
+        result = analyze_case_by_subroutine(analyzer, "best_case", SUMA, "suma", True, cache=SubroutineCostCache())
+
+        assert len(analyzer.calls) == 1
+        assert analyzer.calls[0]["callee_costs"] == ""
+        assert "subroutine_costs" not in result
+
+
+
+class TestReusePreviousAnalysis:
+    """Tests del re-análisis incremental: solo las subrutinas que cambiaron pasan por el LLM"""
+
+    def _first_analysis(self, code):
+        with reuse_subroutine_results() as produced:
+            analyze_case_by_subroutine(
+                RecordingAnalyzer(), "worst_case", code, "mergeSort", False, cache=SubroutineCostCache()
+            )
+        return produced
+
+    def test_only_modified_helper_is_reanalyzed(self):
+        code = (DATA_DIR / "04-merge-sort.txt").read_text(encoding="utf-8")
+        previous = self._first_analysis(code)
+        analyzer = RecordingAnalyzer()
+
+        with reuse_subroutine_results(previous):
+            result = analyze_case_by_subroutine(
+                analyzer, "worst_case", code.replace("n2 🡨 der - medio", "n2 🡨 der - medio + 0"),
+                "mergeSort", False, cache=SubroutineCostCache()
+            )
+
+        # El llamador no cambió: se recompone con el nuevo costo de merge sin invocar el LLM
+        assert [c["algorithm_name"] for c in analyzer.calls] == ["merge"]
+        assert "(c2*n + c3)" in result["T_of_S"]
+
+    def test_only_modified_caller_is_reanalyzed(self):
+        code = (DATA_DIR / "04-merge-sort.txt").read_text(encoding="utf-8")
+        previous = self._first_analysis(code)
+        analyzer = RecordingAnalyzer()
+
+        with reuse_subroutine_results(previous) as produced:
+            result = analyze_case_by_subroutine(
+                analyzer, "worst_case", code.replace("int medio\n", "int medio, x\n"),
+                "mergeSort", False, cache=SubroutineCostCache()
+            )
+
+        assert [c["algorithm_name"] for c in analyzer.calls] == ["mergeSort"]
+        assert result["subroutine_costs"]["merge"]["from_cache"] is True
+        # Lo producido queda disponible para el próximo reenvío
+        assert len(produced) == 2 and set(produced) & set(previous)
+
+    def test_without_context_nothing_is_reused(self):
+        code = (DATA_DIR / "04-merge-sort.txt").read_text(encoding="utf-8")
+        self._first_analysis(code)
+        analyzer = RecordingAnalyzer()
+
+        analyze_case_by_subroutine(analyzer, "worst_case", code, "mergeSort", False, cache=SubroutineCostCache())
+
+        assert [c["algorithm_name"] for c in analyzer.calls] == ["merge", "mergeSort"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
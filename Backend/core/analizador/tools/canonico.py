@@ -0,0 +1,286 @@
+"""
+Forma Canónica Tool
+
+Reduce un programa a una forma canónica para usarla como clave de caché:
+dos entregas del mismo algoritmo que solo difieren en nombres de variables,
+espacios, comentarios (►), líneas en blanco o mayúsculas de las palabras
+reservadas producen el mismo texto canónico.
+
+Sobre la gramática del validador (GrammarPatterns):
+- Quita comentarios y líneas vacías, recorta y colapsa espacios internos
+  (como normalizar_linea)
+- Escribe las palabras reservadas con la grafía de la gramática
+  (BEGIN → begin, call → CALL)
+- Renombra los parámetros y las variables locales declaradas (tipadas, de
+  objeto o variables de un for) a v1, v2, ... por orden de aparición. Los
+  nombres de subrutinas, clases y atributos se conservan
+
+El mismo nombre en dos subrutinas recibe el mismo nombre canónico, así la
+correspondencia entre nombres es biyectiva dentro del programa y los
+resultados (que no distinguen subrutina) se traducen sin ambigüedad con
+a_canonico / a_original.
+"""
+
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Set
+
+from pydantic import BaseModel
+
+from core.validador.models.patterns import GrammarPatterns
+
+
+_PATTERNS = GrammarPatterns()
+
+_PALABRAS_RESERVADAS = re.findall(r'\w+', _PATTERNS.token_palabra_reservada.split('(', 1)[1])
+
+# Grafía de la gramática por palabra en minúsculas (T y F quedan fuera: chocarían con variables t/f)
+_GRAFIA_RESERVADA = {palabra.lower(): palabra for palabra in _PALABRAS_RESERVADAS if len(palabra) > 1}
+
+_TOKEN = re.compile(r'\w+|\s|[^\w\s]')
+
+# Palabras frecuentes en las explicaciones de los resultados: si el usuario
+# nombra así una variable no se puede distinguir la variable del texto
+_PALABRAS_AMBIGUAS = {
+    'a', 'e', 'o', 'u', 'y', 'al', 'de', 'del', 'el', 'en', 'es', 'la', 'las', 'le', 'lo', 'los',
+    'mas', 'no', 'se', 'si', 'su', 'un', 'una', 'caso', 'casos', 'costo', 'linea', 'orden', 'paso',
+    'pasos', 'tiempo', 'total', 'valor', 'an', 'as', 'at', 'be', 'by', 'in', 'is', 'it', 'of',
+    'on', 'the',
+}
+
+# Símbolos de la notación de los resultados (T(n), P(n), S(n), E[...], O(...), log, c1, c2, ...):
+# renombrar una variable que se llama así también renombraría las fórmulas
+# (un arreglo T convertiría T(n) = c1*n en B(m) = c1*m para otro usuario)
+_SIMBOLOS_NOTACION = re.compile(r'^(T|P|S|E|O|log|c\d+)$')
+
+
+def _choca_con_la_notacion(nombre: str, parametros: Set[str]) -> bool:
+    """
+    True si el nombre es un símbolo de la notación. 'n' solo se admite como
+    parámetro: es el tamaño de la entrada que las fórmulas llaman n.
+    """
+    return bool(_SIMBOLOS_NOTACION.match(nombre)) or (nombre == 'n' and nombre not in parametros)
+
+
+def _nombre_declarado(declaracion: str) -> Optional[str]:
+    """Nombre de un parámetro o variable: 'int A[]' → 'A', 'Nodo raiz' → 'raiz'."""
+    match = re.search(r'(\w+)\s*(\[[^\]]*\]\s*)*$', declaracion.strip())
+    return match.group(1) if match else None
+
+
+def _declaraciones(lineas: List[str]) -> Dict[str, Set[str]]:
+    """
+    Recorre el programa normalizado y separa los nombres que se renombran
+    (parámetros y locales) de los que se conservan (subrutinas, clases y
+    atributos).
+    """
+    clases: Set[str] = set()
+    conservados: Set[str] = set()
+    variables: Set[str] = set()
+    parametros: Set[str] = set()
+
+    for indice, linea in enumerate(lineas):
+        match_clase = re.match(_PATTERNS.patron_clase, linea)
+        if match_clase:
+            clases.add(match_clase.group(1))
+            conservados.update(match_clase.group(2).split())
+            continue
+
+        # Encabezado: nombre(parámetros) seguido de begin (una llamada suelta no lo es)
+        match_subrutina = re.match(_PATTERNS.patron_subrutina, linea)
+        siguiente = lineas[indice + 1] if indice + 1 < len(lineas) else ""
+        if match_subrutina and siguiente.lower() == 'begin':
+            conservados.add(match_subrutina.group(1))
+            for parametro in filter(None, (p.strip() for p in match_subrutina.group(2).split(','))):
+                variables.add(_nombre_declarado(parametro))
+                parametros.add(_nombre_declarado(parametro))
+            continue
+
+        match_tipo = re.match(r'^(int|real|bool)\s+(.+)$', linea)
+        if match_tipo and '🡨' not in linea:
+            variables.update(_nombre_declarado(nombre) for nombre in match_tipo.group(2).split(','))
+            continue
+
+        match_objeto = re.match(r'^([A-Z]\w*)\s+(\w+)$', linea)
+        if match_objeto and match_objeto.group(1) in clases:
+            variables.add(match_objeto.group(2))
+            continue
+
+        match_for = re.match(r'^for\s+(\w+)\s*🡨', linea, re.IGNORECASE)
+        if match_for:
+            variables.add(match_for.group(1))
+
+    conservados |= clases
+    variables = {
+        nombre for nombre in variables
+        if nombre and nombre not in conservados and nombre.lower() not in _GRAFIA_RESERVADA
+    }
+    return {'variables': variables, 'conservados': conservados, 'parametros': parametros & variables}
+
+
+def canonizar(pseudocodigo: str) -> Dict[str, Any]:
+    """
+    Calcula la forma canónica de un programa.
+
+    Args:
+        pseudocodigo: Programa tal como lo escribió el usuario
+
+    Returns:
+        dict con:
+            - texto: programa canónico (una línea de código por línea)
+            - clave: hash del texto canónico
+            - nombres: {nombre_canonico: nombre_original}
+            - exacta: False si hubo que corregir mayúsculas de palabras
+              reservadas (el validador las distingue)
+            - lineas: número de línea original (desde 1) de cada línea canónica
+            - codigo: cada línea original normalizada (sin comentario)
+            - parametros: nombres originales de los parámetros renombrados
+    """
+    lineas: List[str] = []
+    numeros: List[int] = []
+    for numero, linea in enumerate((pseudocodigo or "").split("\n"), 1):
+        if '►' in linea:
+            linea = linea.split('►')[0]
+        linea = re.sub(r'\s+', ' ', linea).strip()
+        if linea:
+            lineas.append(linea)
+            numeros.append(numero)
+
+    declaraciones = _declaraciones(lineas)
+    variables = declaraciones['variables']
+    tokens = [_TOKEN.findall(linea) for linea in lineas]
+    ocupados = {
+        token for linea in tokens for token in linea
+        if token[0].isalpha() and token not in variables
+    }
+
+    renombres: Dict[str, str] = {}
+    siguiente = 1
+    exacta = True
+    canonicas = []
+    for linea in tokens:
+        salida = []
+        for indice, token in enumerate(linea):
+            anterior = next((t for t in reversed(linea[:indice]) if t != ' '), None)
+            if anterior == '.' or not token[0].isalpha():
+                salida.append(token)
+            elif token in variables:
+                if token not in renombres:
+                    while f"v{siguiente}" in ocupados:
+                        siguiente += 1
+                    renombres[token] = f"v{siguiente}"
+                    siguiente += 1
+                salida.append(renombres[token])
+            elif token.lower() in _GRAFIA_RESERVADA and token not in declaraciones['conservados']:
+                grafia = _GRAFIA_RESERVADA[token.lower()]
+                exacta = exacta and grafia == token
+                salida.append(grafia)
+            else:
+                salida.append(token)
+        canonicas.append("".join(salida))
+
+    texto = "\n".join(canonicas)
+    return {
+        'texto': texto,
+        'clave': hashlib.sha256(texto.encode('utf-8')).hexdigest()[:32],
+        'nombres': {canonico: original for original, canonico in renombres.items()},
+        'exacta': exacta,
+        'lineas': numeros,
+        'codigo': lineas,
+        'parametros': sorted(declaraciones['parametros']),
+    }
+
+
+def tokens(texto_canonico: str) -> List[str]:
+    """Tokens de un texto canónico sin espacios (el salto de línea cuenta como token)."""
+    return [token for token in _TOKEN.findall(texto_canonico) if token != ' ']
+
+
+def _traducir(valor: Any, reemplazar, lineas: Dict[int, int], codigo: List[str]) -> Any:
+    """
+    Aplica `reemplazar` a cada texto del valor (también a las claves de los
+    dicts) y renumera los costos línea por línea ({'line_number', 'code'}).
+
+    Raises:
+        KeyError: Si un costo cita una línea sin equivalente
+    """
+    if isinstance(valor, BaseModel):
+        return type(valor).model_validate(_traducir(valor.model_dump(), reemplazar, lineas, codigo))
+    if isinstance(valor, dict):
+        traducido = {
+            _traducir(clave, reemplazar, lineas, codigo): _traducir(v, reemplazar, lineas, codigo)
+            for clave, v in valor.items()
+        }
+        if isinstance(traducido.get('line_number'), int) and 'code' in traducido:
+            numero = lineas[traducido['line_number']]
+            traducido['line_number'] = numero
+            traducido['code'] = codigo[numero - 1]
+        return traducido
+    if isinstance(valor, (list, tuple)):
+        return type(valor)(_traducir(v, reemplazar, lineas, codigo) for v in valor)
+    if isinstance(valor, str):
+        return reemplazar(valor)
+    return valor
+
+
+def _reemplazo(nombres: Dict[str, str]):
+    """Reemplazo de identificadores como palabra completa (no atributos tras '.')."""
+    if not nombres:
+        return lambda texto: texto
+    patron = re.compile(
+        r'(?<![\w.])(' + '|'.join(map(re.escape, sorted(nombres, key=len, reverse=True))) + r')(?!\w)'
+    )
+    return lambda texto: patron.sub(lambda match: nombres[match.group(1)], texto)
+
+
+def a_canonico(valor: Any, forma: Dict[str, Any]) -> Optional[Any]:
+    """
+    Expresa un resultado calculado sobre el programa del usuario con los
+    nombres y la numeración de líneas de la forma canónica.
+
+    Returns:
+        El valor traducido, o None si no se puede traducir sin ambigüedad
+        (una variable se llama como una palabra de las explicaciones o como
+        un símbolo de la notación, o un costo cita una línea que no es de código)
+    """
+    originales = {original: canonico for canonico, original in forma['nombres'].items()}
+    parametros = set(forma.get('parametros', ()))
+    if any(nombre in _PALABRAS_AMBIGUAS or _choca_con_la_notacion(nombre, parametros) for nombre in originales):
+        return None
+    lineas = {numero: indice for indice, numero in enumerate(forma['lineas'], 1)}
+    try:
+        return _traducir(valor, _reemplazo(originales), lineas, forma['texto'].split("\n"))
+    except KeyError:
+        return None
+
+
+def a_original(valor: Any, forma: Dict[str, Any]) -> Any:
+    """Expresa un resultado canónico con los nombres y las líneas del usuario de `forma`."""
+    lineas = {indice: numero for indice, numero in enumerate(forma['lineas'], 1)}
+    codigo = [""] * (forma['lineas'][-1] if forma['lineas'] else 0)
+    for numero, linea in zip(forma['lineas'], forma['codigo']):
+        codigo[numero - 1] = linea
+    return _traducir(valor, _reemplazo(forma['nombres']), lineas, codigo)
+
+
+def renumerar(valor: Any, anterior: str, nuevo: str) -> Optional[Any]:
+    """
+    Lleva los costos línea por línea de un resultado calculado sobre
+    `anterior` a la numeración de `nuevo`, que tiene el mismo código con
+    otro formato (comentarios, líneas en blanco o espacios).
+
+    Returns:
+        El valor renumerado, o None si los programas no tienen las mismas
+        líneas de código en el mismo orden o un costo cita una línea que no es de código
+    """
+    previa, actual = canonizar(anterior), canonizar(nuevo)
+    if previa['codigo'] != actual['codigo']:
+        return None
+    lineas = dict(zip(previa['lineas'], actual['lineas']))
+    codigo = [""] * (actual['lineas'][-1] if actual['lineas'] else 0)
+    for numero, linea in zip(actual['lineas'], actual['codigo']):
+        codigo[numero - 1] = linea
+    try:
+        return _traducir(valor, lambda texto: texto, lineas, codigo)
+    except KeyError:
+        return None
@@ -0,0 +1,495 @@
+"""
+Biblioteca de Ejemplos (few-shot) para los Prompts de Análisis
+
+Los prompts de LLMAnalyzer llevaban ejemplos resueltos fijos (búsqueda lineal,
+QuickSort) que se enviaban con cada análisis sin importar el algoritmo. Aquí
+los ejemplos se indexan por caso, tipo (iterativo/recursivo), categoría del
+ClasificadorAlgoritmos y profundidad de loops, y el constructor de prompts
+elige solo los k más parecidos al algoritmo dentro de un presupuesto de
+tokens (settings.llm_few_shot_k / settings.llm_few_shot_tokens).
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+
+
+def _line(number: int, code: str, c_op: str, freq: str, total: str, explanation: str = "") -> Dict[str, Any]:
+    line = {"line_number": number, "code": code, "C_op": c_op, "Freq": freq, "Total": total}
+    if explanation:
+        line["explanation"] = explanation
+    return line
+
+
+# ========================================
+# EJEMPLOS RESUELTOS
+# ========================================
+# Cada resultado sigue el formato JSON que validan
+# LLMAnalyzer._validate_case_result / _validate_average_case_result.
+
+FEW_SHOT_EXAMPLES: List[Dict[str, Any]] = [
+    # ----- Iterativos: mejor caso -----
+    {
+        "id": "busqueda_lineal_best",
+        "title": "Busqueda lineal, mejor caso",
+        "case_type": "best_case",
+        "is_iterative": True,
+        "category": "busqueda",
+        "loop_depth": 1,
+        "result": {
+            "scenario_id": "S_best_case",
+            "scenario_type": "best_case",
+            "input_condition": "Elemento x encontrado en la primera posicion del arreglo (A[1] = x)",
+            "line_by_line_analysis": [
+                _line(1, "int i", "c1", "1", "c1"),
+                _line(2, "bool encontrado", "c2", "1", "c2"),
+                _line(3, "encontrado <- F", "c3", "1", "c3"),
+                _line(4, "i <- 1", "c4", "1", "c4", "Inicializacion del indice"),
+                _line(5, "while (i <= n and not encontrado)", "c5", "2", "c5*2",
+                      "Encabezado: se evalua 2 veces por salida temprana"),
+                _line(6, "if (A[i] = x)", "c6", "1", "c6"),
+                _line(7, "encontrado <- T", "c7", "1", "c7", "Se ejecuta porque encuentra el elemento"),
+                _line(8, "i <- i + 1", "c8", "1", "c8"),
+                _line(9, "return encontrado", "c9", "1", "c9"),
+            ],
+            "T_of_S": "c1 + c2 + c3 + c4 + c5*2 + c6 + c7 + c8 + c9",
+            "T_of_S_explanation": "Suma de todos los costos individuales",
+            "P_of_S": "1/n",
+            "P_of_S_explanation": "Probabilidad de que el elemento este en la primera posicion",
+            "probability_model": "Se asume que el elemento existe y puede estar en cualquiera de las n posiciones con igual probabilidad 1/n",
+        },
+    },
+    {
+        "id": "suma_array_best",
+        "title": "Suma de un arreglo (no sensible a la entrada), mejor caso",
+        "case_type": "best_case",
+        "is_iterative": True,
+        "category": "iterativo",
+        "loop_depth": 1,
+        "result": {
+            "scenario_id": "S_best_case",
+            "scenario_type": "best_case",
+            "input_condition": "Cualquier arreglo de tamano n: el algoritmo siempre recorre todo",
+            "line_by_line_analysis": [
+                _line(1, "total <- 0", "c1", "1", "c1"),
+                _line(2, "for i <- 1 to n do", "c2", "n+1", "c2*(n+1)", "Encabezado: n iteraciones + salida"),
+                _line(3, "total <- total + A[i]", "c3", "n", "c3*n"),
+                _line(4, "return total", "c4", "1", "c4"),
+            ],
+            "T_of_S": "c1 + c2*(n+1) + c3*n + c4",
+            "T_of_S_explanation": "Suma de todos los costos Total",
+            "P_of_S": "1",
+            "P_of_S_explanation": "Unico escenario: el costo no depende de los valores",
+            "probability_model": "Algoritmo no sensible a la entrada",
+        },
+    },
+    {
+        "id": "bubble_sort_best",
+        "title": "Bubble sort con bandera de intercambio (loops anidados), mejor caso",
+        "case_type": "best_case",
+        "is_iterative": True,
+        "category": "ordenamiento",
+        "loop_depth": 2,
+        "result": {
+            "scenario_id": "S_best_case",
+            "scenario_type": "best_case",
+            "input_condition": "Arreglo ya ordenado: la primera pasada no intercambia y el algoritmo termina",
+            "line_by_line_analysis": [
+                _line(1, "for i <- 1 to n - 1 do", "c1", "1", "c1", "Sale en la primera iteracion por el return"),
+                _line(2, "intercambio <- F", "c2", "1", "c2"),
+                _line(3, "for j <- 1 to n - i do", "c3", "n", "c3*n", "Pasada completa: n-1 iteraciones + salida"),
+                _line(4, "if (A[j] > A[j + 1])", "c4", "n-1", "c4*(n-1)"),
+                _line(5, "temp <- A[j]", "c5", "0", "0"),
+                _line(6, "A[j] <- A[j + 1]", "c6", "0", "0"),
+                _line(7, "A[j + 1] <- temp", "c7", "0", "0"),
+                _line(8, "intercambio <- T", "c8", "0", "0"),
+                _line(9, "if (not intercambio)", "c9", "1", "c9"),
+                _line(10, "return", "c10", "1", "c10"),
+            ],
+            "T_of_S": "c1 + c2 + c3*n + c4*(n-1) + c9 + c10",
+            "T_of_S_explanation": "Una sola pasada del loop interno sin intercambios",
+            "P_of_S": "1/n!",
+            "P_of_S_explanation": "Solo una de las n! permutaciones esta ordenada",
+            "probability_model": "Todas las permutaciones de la entrada son equiprobables",
+        },
+    },
+
+    # ----- Recursivos: mejor caso -----
+    {
+        "id": "quicksort_best",
+        "title": "QuickSort, mejor caso (pivote perfecto)",
+        "case_type": "best_case",
+        "is_iterative": False,
+        "category": "ordenamiento",
+        "loop_depth": 0,
+        "result": {
+            "scenario_id": "S_best_case",
+            "scenario_type": "best_case",
+            "input_condition": "Pivote siempre divide el array en dos mitades exactamente iguales (caso ideal)",
+            "line_by_line_analysis": [
+                _line(1, "if inicio >= fin: return", "c1", "1", "c1", "Comparacion de caso base, una vez por llamada"),
+                _line(2, "pivote = particionar(arr, inicio, fin)", "c2", "n", "c2*n",
+                      "Particion recorre los n elementos del subarreglo"),
+                _line(3, "quicksort(arr, inicio, pivote-1)", "c3", "1 llamada", "T(n/2)", "Mitad izquierda"),
+                _line(4, "quicksort(arr, pivote+1, fin)", "c4", "1 llamada", "T(n/2)", "Mitad derecha"),
+            ],
+            "T_of_S": "T(n) = 2*T(n/2) + c2*n + c1",
+            "T_of_S_explanation": "Dos llamadas de tamano n/2 mas el costo local de particion (c2*n) y comparacion (c1)",
+            "P_of_S": "1/n!",
+            "P_of_S_explanation": "Solo una fraccion de las permutaciones produce pivotes perfectos en cada nivel",
+            "probability_model": "Seleccion aleatoria de pivote; particiones perfectas en cada nivel son muy poco probables",
+        },
+    },
+    {
+        "id": "busqueda_binaria_rec_best",
+        "title": "Busqueda binaria recursiva, mejor caso",
+        "case_type": "best_case",
+        "is_iterative": False,
+        "category": "busqueda",
+        "loop_depth": 0,
+        "result": {
+            "scenario_id": "S_best_case",
+            "scenario_type": "best_case",
+            "input_condition": "x esta en la posicion media del arreglo: se encuentra en la primera llamada",
+            "line_by_line_analysis": [
+                _line(1, "if (izq > der) then return F", "c1", "1", "c1"),
+                _line(2, "medio <- (izq + der) / 2", "c2", "1", "c2"),
+                _line(3, "if (A[medio] = x) then return T", "c3", "1", "c3", "Termina sin recursion"),
+                _line(4, "return CALL buscar(A, izq, medio - 1, x) o buscar(A, medio + 1, der, x)",
+                      "c4", "0 llamadas", "0"),
+            ],
+            "T_of_S": "T(n) = c1 + c2 + c3",
+            "T_of_S_explanation": "n > 1 pero el elemento se encuentra sin llamadas recursivas",
+            "P_of_S": "1/n",
+            "P_of_S_explanation": "Probabilidad de que x este justo en la posicion media",
+            "probability_model": "x existe y esta en cualquiera de las n posiciones con igual probabilidad",
+        },
+    },
+    {
+        "id": "factorial_best",
+        "title": "Factorial recursivo (no sensible a la entrada), mejor caso",
+        "case_type": "best_case",
+        "is_iterative": False,
+        "category": "recursivo_divide_conquista",
+        "loop_depth": 0,
+        "result": {
+            "scenario_id": "S_best_case",
+            "scenario_type": "best_case",
+            "input_condition": "Cualquier n > 1: el numero de llamadas solo depende de n",
+            "line_by_line_analysis": [
+                _line(1, "if (n <= 1) then", "c1", "1", "c1"),
+                _line(2, "return 1", "c2", "0", "0", "No se ejecuta para n > 1"),
+                _line(3, "return n * CALL factorial(n - 1)", "c3", "1 llamada", "T(n-1) + c3"),
+            ],
+            "T_of_S": "T(n) = T(n-1) + c1 + c3",
+            "T_of_S_explanation": "Una llamada de tamano n-1 mas la comparacion y la multiplicacion",
+            "P_of_S": "1",
+            "P_of_S_explanation": "Unico escenario para cada n",
+            "probability_model": "Algoritmo no sensible a la entrada",
+        },
+    },
+
+    # ----- Recursivos: peor caso -----
+    {
+        "id": "quicksort_worst",
+        "title": "QuickSort, peor caso (pivote pesimo)",
+        "case_type": "worst_case",
+        "is_iterative": False,
+        "category": "ordenamiento",
+        "loop_depth": 0,
+        "result": {
+            "scenario_id": "S_worst_case",
+            "scenario_type": "worst_case",
+            "input_condition": "Pivote siempre es el menor o mayor elemento (ej: array ya ordenado), particiones completamente desbalanceadas",
+            "line_by_line_analysis": [
+                _line(1, "if inicio >= fin: return", "c1", "1", "c1", "Comparacion de caso base"),
+                _line(2, "pivote = particionar(arr, inicio, fin)", "c2", "n", "c2*n", "Particion recorre n elementos"),
+                _line(3, "quicksort(arr, inicio, pivote-1)", "c3", "1 llamada", "T(n-1)", "Subarreglo de tamano n-1"),
+                _line(4, "quicksort(arr, pivote+1, fin)", "c4", "0", "0", "Subarreglo vacio"),
+            ],
+            "T_of_S": "T(n) = T(n-1) + c2*n + c1",
+            "T_of_S_explanation": "Una llamada con n-1 elementos mas el costo de particion; la otra rama es vacia",
+            "P_of_S": "2/n",
+            "P_of_S_explanation": "Probabilidad de elegir el menor o el mayor elemento como pivote",
+            "probability_model": "Pivote aleatorio: 2 de los n elementos son problematicos",
+        },
+    },
+    {
+        "id": "busqueda_binaria_rec_worst",
+        "title": "Busqueda binaria recursiva, peor caso",
+        "case_type": "worst_case",
+        "is_iterative": False,
+        "category": "busqueda",
+        "loop_depth": 0,
+        "result": {
+            "scenario_id": "S_worst_case",
+            "scenario_type": "worst_case",
+            "input_condition": "x no esta en el arreglo: se divide hasta el subarreglo vacio",
+            "line_by_line_analysis": [
+                _line(1, "if (izq > der) then return F", "c1", "1", "c1"),
+                _line(2, "medio <- (izq + der) / 2", "c2", "1", "c2"),
+                _line(3, "if (A[medio] = x) then return T", "c3", "1", "c3"),
+                _line(4, "return CALL buscar(A, izq, medio - 1, x) o buscar(A, medio + 1, der, x)",
+                      "c4", "1 llamada", "T(n/2) + c4", "Solo una de las dos mitades"),
+            ],
+            "T_of_S": "T(n) = T(n/2) + c1 + c2 + c3 + c4",
+            "T_of_S_explanation": "Una llamada sobre la mitad del arreglo en cada nivel",
+            "P_of_S": "1/(n+1)",
+            "P_of_S_explanation": "Escenario 'no encontrado' entre n+1 casos equiprobables",
+            "probability_model": "x en cualquiera de las n posiciones o ausente, con igual probabilidad",
+        },
+    },
+    {
+        "id": "factorial_worst",
+        "title": "Factorial recursivo (no sensible a la entrada), peor caso",
+        "case_type": "worst_case",
+        "is_iterative": False,
+        "category": "recursivo_divide_conquista",
+        "loop_depth": 0,
+        "result": {
+            "scenario_id": "S_worst_case",
+            "scenario_type": "worst_case",
+            "input_condition": "Cualquier n > 1: coincide con el mejor caso",
+            "line_by_line_analysis": [
+                _line(1, "if (n <= 1) then", "c1", "1", "c1"),
+                _line(2, "return 1", "c2", "0", "0"),
+                _line(3, "return n * CALL factorial(n - 1)", "c3", "1 llamada", "T(n-1) + c3"),
+            ],
+            "T_of_S": "T(n) = T(n-1) + c1 + c3",
+            "T_of_S_explanation": "Misma recurrencia que el mejor caso",
+            "P_of_S": "1",
+            "P_of_S_explanation": "Unico escenario para cada n",
+            "probability_model": "Algoritmo no sensible a la entrada",
+        },
+    },
+
+    # ----- Recursivos: caso promedio -----
+    {
+        "id": "quicksort_average",
+        "title": "QuickSort, caso promedio (pivote aleatorio)",
+        "case_type": "average_case",
+        "is_iterative": False,
+        "category": "ordenamiento",
+        "loop_depth": 0,
+        "result": {
+            "scenario_id": "S_avg_case",
+            "scenario_type": "average_case",
+            "input_condition": "Pivote aleatorio en cada particion, promediando sobre todas sus posiciones",
+            "probability_model": "El pivote cae en cualquiera de las n posiciones con probabilidad 1/n, generando particiones (0, n-1), (1, n-2), ..., (n-1, 0)",
+            "scenarios_breakdown": [
+                {"scenario_id": "S_pivot_k", "description": "Pivote en posicion k (1 <= k <= n)",
+                 "T": "T(k-1) + T(n-k) + c2*n + c1", "P": "1/n"},
+            ],
+            "line_by_line_analysis": [
+                _line(1, "if inicio >= fin: return", "c1", "1", "c1"),
+                _line(2, "pivote = particionar(arr, inicio, fin)", "c2", "n", "c2*n"),
+                _line(3, "quicksort(arr, inicio, pivote-1)", "c3", "1 llamada", "E[T(k-1)]"),
+                _line(4, "quicksort(arr, pivote+1, fin)", "c4", "1 llamada", "E[T(n-k)]"),
+            ],
+            "T_of_S": "E[T(n)] = (1/n)*Σ(k=1 to n)[T(k-1) + T(n-k)] + c2*n + c1",
+            "T_of_S_simplified": "E[T(n)] = (2/n)*Σ(k=0 to n-1)T(k) + c2*n + c1",
+            "T_of_S_explanation": "Promedio sobre las n posiciones del pivote, mas el costo local de particion",
+            "P_of_S": "1",
+            "P_of_S_explanation": "El caso promedio representa la esperanza sobre todas las entradas",
+            "average_cost_formula": "E[T(n)] = (1/n)*Σ(k=1 to n)[T(k-1) + T(n-k) + c2*n + c1]",
+        },
+    },
+    {
+        "id": "busqueda_binaria_rec_average",
+        "title": "Busqueda binaria recursiva, caso promedio",
+        "case_type": "average_case",
+        "is_iterative": False,
+        "category": "busqueda",
+        "loop_depth": 0,
+        "result": {
+            "scenario_id": "S_avg_case",
+            "scenario_type": "average_case",
+            "input_condition": "x en cualquier posicion o ausente, con igual probabilidad",
+            "probability_model": "n+1 escenarios equiprobables: x en la posicion k (1..n) o ausente",
+            "scenarios_breakdown": [
+                {"scenario_id": "S_k", "description": "x encontrado tras d(k) niveles", "T": "d(k)*(c1 + c2 + c3 + c4)", "P": "1/(n+1)"},
+                {"scenario_id": "S_empty", "description": "x no esta", "T": "T(n/2) + c1 + c2 + c3 + c4", "P": "1/(n+1)"},
+            ],
+            "T_of_S": "E[T(n)] = T(n/2) + c1 + c2 + c3 + c4",
+            "T_of_S_explanation": "La mayoria de posiciones estan en los ultimos niveles, asi que el promedio sigue la recurrencia del peor caso",
+            "P_of_S": "1",
+            "P_of_S_explanation": "El caso promedio engloba todos los escenarios",
+        },
+    },
+    {
+        "id": "factorial_average",
+        "title": "Factorial recursivo (no sensible a la entrada), caso promedio",
+        "case_type": "average_case",
+        "is_iterative": False,
+        "category": "recursivo_divide_conquista",
+        "loop_depth": 0,
+        "result": {
+            "scenario_id": "S_avg_case",
+            "scenario_type": "average_case",
+            "input_condition": "Unico escenario para cada n",
+            "probability_model": "Algoritmo no sensible a la entrada: E[T(n)] = T(n)",
+            "scenarios_breakdown": [
+                {"scenario_id": "S_1", "description": "Cualquier n > 1", "T": "T(n-1) + c1 + c3", "P": "1"},
+            ],
+            "T_of_S": "E[T(n)] = T(n-1) + c1 + c3",
+            "T_of_S_explanation": "Coincide con mejor y peor caso",
+            "P_of_S": "1",
+            "P_of_S_explanation": "El caso promedio engloba el unico escenario",
+        },
+    },
+]
+
+
+# ========================================
+# RASGOS DEL ALGORITMO
+# ========================================
+
+_LOOP_HEADER = re.compile(r'^(for|while)\b.*\bdo\s*$', re.IGNORECASE)
+
+
+def loop_depth(pseudocode: str) -> int:
+    """
+    Profundidad máxima de anidamiento de loops (for, while, repeat).
+
+    Sigue los bloques begin/end: un begin justo después de un encabezado de
+    loop abre un nivel de loop; cualquier otro begin abre un bloque normal.
+    """
+    stack: List[bool] = []   # True = bloque de loop
+    pending_loop = False
+    depth = 0
+
+    for raw in pseudocode.splitlines():
+        line = raw.strip().lower()
+        if not line or line.startswith("►"):
+            continue
+
+        if line == "begin":
+            stack.append(pending_loop)
+            pending_loop = False
+        elif line == "end" or line.startswith("until"):
+            if stack:
+                stack.pop()
+        elif line == "repeat":
+            stack.append(True)
+        elif _LOOP_HEADER.match(line):
+            pending_loop = True
+            depth = max(depth, sum(stack) + 1)
+            continue
+        else:
+            pending_loop = False
+        depth = max(depth, sum(stack))
+
+    return depth
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación de tokens (≈4 caracteres por token, como el gobernador)."""
+    return len(text) // 4
+
+
+# ========================================
+# SELECCIÓN Y FORMATO
+# ========================================
+
+def render_example(example: Dict[str, Any]) -> str:
+    """
+    Texto de un ejemplo: JSON compacto con una línea por campo y por
+    elemento de las listas (más corto que indent=2 y fácil de leer).
+    """
+    lines = ["{"]
+    items = list(example["result"].items())
+    for idx, (key, value) in enumerate(items):
+        comma = "," if idx < len(items) - 1 else ""
+        if isinstance(value, list):
+            entries = [json.dumps(item, ensure_ascii=False) for item in value]
+            lines.append(f'  "{key}": [')
+            lines.extend(f"    {entry}{',' if i < len(entries) - 1 else ''}" for i, entry in enumerate(entries))
+            lines.append(f"  ]{comma}")
+        else:
+            lines.append(f'  "{key}": {json.dumps(value, ensure_ascii=False)}{comma}')
+    lines.append("}")
+    return f"EJEMPLO - {example['title']}:\n" + "\n".join(lines)
+
+
+def _relevance(example: Dict[str, Any], category: Optional[str], depth: Optional[int]) -> float:
+    """Puntaje: la categoría pesa más que la profundidad de loops."""
+    score = 0.0
+    if category and example["category"] == category:
+        score += 2.0
+    if depth is not None:
+        score += 1.0 / (1 + abs(example["loop_depth"] - depth))
+    return score
+
+
+def select_examples(
+    case_type: str,
+    is_iterative: bool,
+    category: Optional[str] = None,
+    depth: Optional[int] = None,
+    k: Optional[int] = None,
+    token_budget: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Elige los k ejemplos más relevantes que caben en el presupuesto.
+
+    Solo se consideran ejemplos del mismo caso y tipo (iterativo/recursivo),
+    porque el formato de T_of_S cambia entre ambos. A igual relevancia se
+    prefiere el ejemplo más corto.
+
+    Args:
+        case_type: "best_case", "worst_case" o "average_case"
+        is_iterative: Tipo del algoritmo
+        category: Categoría del ClasificadorAlgoritmos (opcional)
+        depth: Profundidad de loops del algoritmo (opcional)
+        k: Máximo de ejemplos (por defecto settings.llm_few_shot_k)
+        token_budget: Tokens máximos de ejemplos (por defecto settings.llm_few_shot_tokens)
+
+    Returns:
+        Lista de ejemplos en orden de relevancia
+    """
+    k = settings.llm_few_shot_k if k is None else k
+    token_budget = settings.llm_few_shot_tokens if token_budget is None else token_budget
+
+    candidates = [
+        ex for ex in FEW_SHOT_EXAMPLES
+        if ex["case_type"] == case_type and ex["is_iterative"] == is_iterative
+    ]
+    candidates.sort(key=lambda ex: (-_relevance(ex, category, depth), estimate_tokens(render_example(ex))))
+
+    selected, used = [], 0
+    for example in candidates:
+        if len(selected) >= k:
+            break
+        cost = estimate_tokens(render_example(example))
+        if used + cost > token_budget:
+            continue
+        selected.append(example)
+        used += cost
+    return selected
+
+
+def build_examples_block(
+    case_type: str,
+    is_iterative: bool,
+    pseudocode: str = "",
+    category: Optional[str] = None
+) -> str:
+    """
+    Bloque de ejemplos listo para insertar en el prompt del caso.
+
+    Returns:
+        Texto con los ejemplos elegidos, o cadena vacía si no hay ninguno
+    """
+    depth = loop_depth(pseudocode) if pseudocode else None
+    examples = select_examples(case_type, is_iterative, category=category, depth=depth)
+    if not examples:
+        return ""
+    body = "\n\n".join(render_example(ex) for ex in examples)
+    return (
+        f"{'═' * 64}\n"
+        "EJEMPLO RESUELTO - APRENDE DE ESTE FORMATO (es otro algoritmo, no lo copies)\n"
+        f"{'═' * 64}\n\n"
+        f"{body}\n"
+    )
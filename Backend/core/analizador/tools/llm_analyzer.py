@@ -5,12 +5,19 @@ Este módulo proporciona funcionalidad para usar un LLM (Claude) para analizar
 pseudocódigo y determinar qué características de entrada afectan la complejidad.
 """
 
-import json
 import re
-from typing import Dict, Any, Optional
-from langchain_anthropic import ChatAnthropic
+from typing import Callable, Dict, Any, Optional
 from langchain_core.messages import HumanMessage, SystemMessage
 from config.settings import settings
+from shared.services.llm_servicio import LLMService
+from shared.services.indice_similitud import bloque_referencia
+from core.analizador.tools.few_shot import build_examples_block
+from core.analizador.tools.output_schemas import (
+    BEST_CASE_ONLY_TOOL,
+    INPUT_SCENARIOS_TOOL,
+    case_tool,
+    multi_case_tool,
+)
 
 
 # ========================================
@@ -96,9 +103,8 @@ REGLAS FUNDAMENTALES que debes seguir:
    - Si solo hay un caso (no sensible): P(S) = 1
 
 FORMATO DE SALIDA:
-- SIEMPRE responde en formato JSON válido
-- NO uses bloques markdown (```json)
-- NO agregues texto antes o después del JSON
+- Entrega SIEMPRE el resultado llamando a la herramienta de salida indicada
+- NO escribas el análisis como texto fuera de la herramienta
 - NO uses emojis ni caracteres especiales Unicode en ninguna parte de tu respuesta
 - Solo usa caracteres ASCII estándar (letras, números, símbolos básicos)
 - Sigue EXACTAMENTE la estructura JSON especificada en el prompt
@@ -129,7 +135,7 @@ Pseudocódigo:
 {pseudocode}
 ```
 
-Responde SOLO con este JSON (sin markdown, sin bloques de código):
+Entrega el resultado con la herramienta de salida, con esta estructura:
 {{
   "is_sensitive": true/false,
   "sensitivity_type": "position" | "organization" | "value_distribution" | "none",
@@ -148,36 +154,10 @@ ANALYZE_ITERATIVE_BEST_CASE_PROMPT = """Eres un experto en análisis de compleji
 
 El MEJOR CASO es la entrada de datos que MINIMIZA el número de operaciones ejecutadas.
 
-════════════════════════════════════════════════════════════════
-EJEMPLO COMPLETO - APRENDE DE ESTE FORMATO
-════════════════════════════════════════════════════════════════
-
-Si el pseudocodigo fuera busqueda lineal, tu respuesta para MEJOR CASO debe ser:
-{{
-  "scenario_id": "S_best_case",
-  "scenario_type": "best_case",
-  "input_condition": "Elemento x encontrado en la primera posicion del arreglo (A[1] = x)",
-  "line_by_line_analysis": [
-    {{"line_number": 1, "code": "int i", "C_op": "c1", "Freq": "1", "Total": "c1"}},
-    {{"line_number": 2, "code": "bool encontrado", "C_op": "c2", "Freq": "1", "Total": "c2"}},
-    {{"line_number": 3, "code": "encontrado <- F", "C_op": "c3", "Freq": "1", "Total": "c3"}},
-    {{"line_number": 4, "code": "i <- 1", "C_op": "c4", "Freq": "1", "Total": "c4", "explanation": "Inicializacion del indice"}},
-    {{"line_number": 5, "code": "while (i <= n and not encontrado)", "C_op": "c5", "Freq": "2", "Total": "c5*2", "explanation": "Encabezado: se evalua 2 veces por salida temprana"}},
-    {{"line_number": 6, "code": "if (A[i] = x)", "C_op": "c6", "Freq": "1", "Total": "c6"}},
-    {{"line_number": 7, "code": "encontrado <- T", "C_op": "c7", "Freq": "1", "Total": "c7", "explanation": "Se ejecuta porque encuentra el elemento"}},
-    {{"line_number": 8, "code": "i <- i + 1", "C_op": "c8", "Freq": "1", "Total": "c8"}},
-    {{"line_number": 9, "code": "return encontrado", "C_op": "c9", "Freq": "1", "Total": "c9"}}
-  ],
-  "T_of_S": "c1 + c2 + c3 + c4 + c5*2 + c6 + c7 + c8 + c9",
-  "T_of_S_explanation": "Suma de todos los costos individuales",
-  "P_of_S": "1/n",
-  "P_of_S_explanation": "Probabilidad de que el elemento este en la primera posicion",
-  "probability_model": "Se asume que el elemento existe y puede estar en cualquiera de las n posiciones con igual probabilidad 1/n"
-}}
-
+{examples}
 NOTAS IMPORTANTES:
 - El campo 'explanation' es OPCIONAL - incluirlo solo para lineas criticas
-- En el ejemplo: solo 3 de 9 lineas tienen 'explanation'
+- En los ejemplos: solo unas pocas lineas tienen 'explanation'
 - Si incluyes explanation, debe ser breve (maximo 12 palabras)
 - Los campos OBLIGATORIOS son: line_number, code, C_op, Freq, Total
 
@@ -190,14 +170,7 @@ NOTA CRITICA SOBRE C_op:
 
 ════════════════════════════════════════════════════════════════
 
-Ahora analiza ESTE pseudocodigo:
-
-Pseudocodigo:
-```
-{pseudocode}
-```
-
-Nombre del algoritmo: {algorithm_name}
+ESTE pseudocodigo y su nombre van al FINAL del mensaje, despues de estas instrucciones.
 
 ════════════════════════════════════════════════════════════════
 REGLAS PARA ALGORITMOS ITERATIVOS - MEJOR CASO
@@ -246,7 +219,7 @@ INSTRUCCIONES:
 4. Calcula T(S) como suma de todos los Total
 5. Asigna probabilidad P(S) RESUELTA (sin q)
 
-Responde SOLO con JSON (sin markdown, sin ```):
+Entrega el resultado con la herramienta de salida, con esta estructura:
 {{
   "scenario_id": "S_best_case",
   "scenario_type": "best_case",
@@ -269,6 +242,9 @@ Responde SOLO con JSON (sin markdown, sin ```):
 """
 
 ANALYZE_ITERATIVE_WORST_CASE_PROMPT = """Eres un experto en análisis de complejidad algorítmica. Analiza el siguiente pseudocódigo ITERATIVO para determinar el PEOR CASO.
+
+ESTE pseudocodigo y su nombre van al FINAL del mensaje, despues de estas instrucciones.
+
 ════════════════════════════════════════════════════════════════
 
 1. CONSTANTES SIMBÓLICAS (C_op):
@@ -303,7 +279,7 @@ INSTRUCCIONES:
 3. Calcula T(S) como suma de todos los Total
 4. Asigna P(S) resuelta según el modelo más razonable
 
-Responde SOLO con JSON (sin markdown, sin ```):
+Entrega el resultado con la herramienta de salida, con esta estructura:
 {{
   "scenario_id": "S_worst_case",
   "scenario_type": "worst_case",
@@ -332,18 +308,7 @@ El CASO PROMEDIO es el costo esperado E[T] = Σ T(S_i) · P(S_i) sobre todos los
 
 ════════════════════════════════════════════════════════════════
 
-Ahora analiza ESTE pseudocodigo:
-
-Pseudocodigo:
-```
-{pseudocode}
-```
-
-Nombre del algoritmo: {algorithm_name}
-
-CONTEXTO de casos ya analizados:
-- MEJOR CASO: {best_case_summary}
-- PEOR CASO: {worst_case_summary}
+ESTE pseudocodigo, su nombre y el CONTEXTO de los casos ya analizados van al FINAL del mensaje, despues de estas instrucciones.
 
 ════════════════════════════════════════════════════════════════
 REGLAS PARA ALGORITMOS ITERATIVOS - CASO PROMEDIO
@@ -389,7 +354,7 @@ INSTRUCCIONES:
 4. Simplifica la expresión si es posible
 5. Opcionalmente: análisis línea por línea del caso "promedio típico"
 
-Responde SOLO con JSON (sin markdown, sin ```):
+Entrega el resultado con la herramienta de salida, con esta estructura:
 {{
   "scenario_id": "S_avg_case",
   "scenario_type": "average_case",
@@ -448,12 +413,7 @@ CORRECTO: "Mejor caso elemento en raiz, T(n) = c1 + c2" (Encuentra sin recursion
 
 El MEJOR CASO es la entrada de datos que MINIMIZA el numero de operaciones y produce la recursion MAS CORTA, pero siempre con n > 1 (problema no trivial).
 
-Pseudocódigo:
-```
-{pseudocode}
-```
-
-Nombre del algoritmo: {algorithm_name}
+ESTE pseudocodigo y su nombre van al FINAL del mensaje, despues de estas instrucciones.
 
 ════════════════════════════════════════════════════════════════
 REGLAS PARA ALGORITMOS RECURSIVOS - MEJOR CASO
@@ -515,55 +475,7 @@ REGLAS PARA ALGORITMOS RECURSIVOS - MEJOR CASO
    - Ejemplo: "pivote perfecto" → P = "log(n)/n" o modelo razonable
    - Explica el modelo probabilístico usado
 
-════════════════════════════════════════════════════════════════
-
-EJEMPLO COMPLETO - QuickSort Mejor Caso (pivote perfecto):
-
-{{
-  "scenario_id": "S_best_case",
-  "scenario_type": "best_case",
-  "input_condition": "Pivote siempre divide el array en dos mitades exactamente iguales (caso ideal)",
-  "line_by_line_analysis": [
-    {{
-      "line_number": 1,
-      "code": "if inicio >= fin: return",
-      "C_op": "c1",
-      "Freq": "1",
-      "Total": "c1",
-      "explanation": "Comparación de caso base, se ejecuta una vez por llamada"
-    }},
-    {{
-      "line_number": 2,
-      "code": "pivote = particionar(arr, inicio, fin)",
-      "C_op": "c2",
-      "Freq": "n",
-      "Total": "c2*n",
-      "explanation": "Partición recorre los n elementos del subarreglo actual"
-    }},
-    {{
-      "line_number": 3,
-      "code": "quicksort(arr, inicio, pivote-1)",
-      "C_op": "c3",
-      "Freq": "1 llamada",
-      "Total": "T(n/2)",
-      "explanation": "Llamada recursiva a la mitad izquierda (tamaño n/2)"
-    }},
-    {{
-      "line_number": 4,
-      "code": "quicksort(arr, pivote+1, fin)",
-      "C_op": "c4",
-      "Freq": "1 llamada",
-      "Total": "T(n/2)",
-      "explanation": "Llamada recursiva a la mitad derecha (tamaño n/2)"
-    }}
-  ],
-  "T_of_S": "T(n) = 2*T(n/2) + c2*n + c1",
-  "T_of_S_explanation": "Dos llamadas recursivas con mitad del tamaño (T(n/2) cada una), más costo local de partición (c2*n) y comparación (c1)",
-  "P_of_S": "1/n!",
-  "P_of_S_explanation": "Entre todas las permutaciones posibles, solo una fracción produce pivotes perfectos consistentemente",
-  "probability_model": "Asumiendo selección aleatoria de pivote, la probabilidad de obtener particiones perfectas en cada nivel es muy baja"
-}}
-
+{examples}
 ════════════════════════════════════════════════════════════════
 
 INSTRUCCIONES:
@@ -574,7 +486,7 @@ INSTRUCCIONES:
 4. Construye T(n) en formato estándar (SIN constantes dentro de T())
 5. Asigna probabilidad P(S) resuelta y explica el modelo
 
-Responde SOLO con JSON (sin markdown, sin ```):
+Entrega el resultado con la herramienta de salida, con esta estructura:
 {{
   "scenario_id": "S_best_case",
   "scenario_type": "best_case",
@@ -592,12 +504,7 @@ ANALYZE_RECURSIVE_WORST_CASE_PROMPT = """Eres un experto en análisis de complej
 
 El PEOR CASO es la entrada de datos que MAXIMIZA el número de operaciones y produce la recursión MÁS LARGA o MÁS PROFUNDA.
 
-Pseudocódigo:
-```
-{pseudocode}
-```
-
-Nombre del algoritmo: {algorithm_name}
+ESTE pseudocodigo y su nombre van al FINAL del mensaje, despues de estas instrucciones.
 
 ════════════════════════════════════════════════════════════════
 REGLAS PARA ALGORITMOS RECURSIVOS - PEOR CASO
@@ -654,55 +561,7 @@ REGLAS PARA ALGORITMOS RECURSIVOS - PEOR CASO
    - Probabilidad RESUELTA
    - Ejemplo: "pivote pésimo" → P = "2/n" (extremos) o modelo razonable
 
-════════════════════════════════════════════════════════════════
-
-EJEMPLO COMPLETO - QuickSort Peor Caso (pivote pésimo):
-
-{{
-  "scenario_id": "S_worst_case",
-  "scenario_type": "worst_case",
-  "input_condition": "Pivote siempre es el menor o mayor elemento, generando particiones completamente desbalanceadas (ej: array ya ordenado con pivote como primer elemento)",
-  "line_by_line_analysis": [
-    {{
-      "line_number": 1,
-      "code": "if inicio >= fin: return",
-      "C_op": "c1",
-      "Freq": "1",
-      "Total": "c1",
-      "explanation": "Comparación de caso base"
-    }},
-    {{
-      "line_number": 2,
-      "code": "pivote = particionar(arr, inicio, fin)",
-      "C_op": "c2",
-      "Freq": "n",
-      "Total": "c2*n",
-      "explanation": "Partición recorre n elementos"
-    }},
-    {{
-      "line_number": 3,
-      "code": "quicksort(arr, inicio, pivote-1)",
-      "C_op": "c3",
-      "Freq": "1 llamada",
-      "Total": "T(n-1)",
-      "explanation": "Llamada recursiva al subarreglo de tamaño n-1 (partición degenerada)"
-    }},
-    {{
-      "line_number": 4,
-      "code": "quicksort(arr, pivote+1, fin)",
-      "C_op": "c4",
-      "Freq": "0",
-      "Total": "0",
-      "explanation": "Esta llamada procesa subarreglo vacío (tamaño 0)"
-    }}
-  ],
-  "T_of_S": "T(n) = T(n-1) + c2*n + c1",
-  "T_of_S_explanation": "Una llamada recursiva con casi todo el array (n-1), más costo de partición (c2*n). La otra rama es vacía.",
-  "P_of_S": "2/n",
-  "P_of_S_explanation": "Probabilidad de seleccionar el elemento más pequeño o más grande como pivote",
-  "probability_model": "Asumiendo pivote aleatorio, hay 2 elementos problemáticos de n posibles"
-}}
-
+{examples}
 ════════════════════════════════════════════════════════════════
 
 INSTRUCCIONES:
@@ -713,7 +572,7 @@ INSTRUCCIONES:
 4. Construye T(n) en formato estándar (SIN constantes dentro de T())
 5. Asigna probabilidad P(S) resuelta
 
-Responde SOLO con JSON (sin markdown, sin ```):
+Entrega el resultado con la herramienta de salida, con esta estructura:
 {{
   "scenario_id": "S_worst_case",
   "scenario_type": "worst_case",
@@ -731,16 +590,7 @@ ANALYZE_RECURSIVE_AVERAGE_CASE_PROMPT = """Eres un experto en análisis de compl
 
 El CASO PROMEDIO es la esperanza matemática E[T(n)] sobre una distribución razonable de entradas.
 
-Pseudocódigo:
-```
-{pseudocode}
-```
-
-Nombre del algoritmo: {algorithm_name}
-
-CONTEXTO de casos ya analizados:
-- MEJOR CASO: {best_case_summary}
-- PEOR CASO: {worst_case_summary}
+ESTE pseudocodigo, su nombre y el CONTEXTO de los casos ya analizados van al FINAL del mensaje, despues de estas instrucciones.
 
 ════════════════════════════════════════════════════════════════
 REGLAS PARA ALGORITMOS RECURSIVOS - CASO PROMEDIO
@@ -775,65 +625,7 @@ REGLAS PARA ALGORITMOS RECURSIVOS - CASO PROMEDIO
    - P = "1" (el caso promedio engloba todos los escenarios)
    - O especificar distribución explícita si hay múltiples escenarios
 
-════════════════════════════════════════════════════════════════
-
-EJEMPLO COMPLETO - QuickSort Caso Promedio (pivote aleatorio):
-
-{{
-  "scenario_id": "S_avg_case",
-  "scenario_type": "average_case",
-  "input_condition": "Pivote seleccionado aleatoriamente en cada partición, promediando sobre todas las posiciones posibles",
-  "probability_model": "En cada nivel, el pivote puede caer en cualquiera de las n posiciones con probabilidad uniforme 1/n. Esto genera particiones de tamaños variables: (0, n-1), (1, n-2), ..., (n-1, 0).",
-  "scenarios_breakdown": [
-    {{
-      "scenario_id": "S_pivot_k",
-      "description": "Pivote en posición k (1 ≤ k ≤ n)",
-      "T": "T(k-1) + T(n-k) + c2*n + c1",
-      "P": "1/n"
-    }}
-  ],
-  "line_by_line_analysis": [
-    {{
-      "line_number": 1,
-      "code": "if inicio >= fin: return",
-      "C_op": "c1",
-      "Freq": "1",
-      "Total": "c1",
-      "explanation": "Comparación ejecutada en cada llamada"
-    }},
-    {{
-      "line_number": 2,
-      "code": "pivote = particionar(arr, inicio, fin)",
-      "C_op": "c2",
-      "Freq": "n",
-      "Total": "c2*n",
-      "explanation": "Partición procesa n elementos"
-    }},
-    {{
-      "line_number": 3,
-      "code": "quicksort(arr, inicio, pivote-1)",
-      "C_op": "c3",
-      "Freq": "1 llamada",
-      "Total": "E[T(k-1)]",
-      "explanation": "Llamada recursiva a partición izquierda de tamaño esperado k-1"
-    }},
-    {{
-      "line_number": 4,
-      "code": "quicksort(arr, pivote+1, fin)",
-      "C_op": "c4",
-      "Freq": "1 llamada",
-      "Total": "E[T(n-k)]",
-      "explanation": "Llamada recursiva a partición derecha de tamaño esperado n-k"
-    }}
-  ],
-  "T_of_S": "E[T(n)] = (1/n)*Σ(k=1 to n)[T(k-1) + T(n-k)] + c2*n + c1",
-  "T_of_S_simplified": "E[T(n)] = (2/n)*Σ(k=0 to n-1)T(k) + c2*n + c1",
-  "T_of_S_explanation": "Promedio sobre todas las posibles posiciones del pivote. Cada posición k ocurre con probabilidad 1/n, generando dos subproblemas de tamaños k-1 y n-k. Más el costo local de partición.",
-  "P_of_S": "1",
-  "P_of_S_explanation": "El caso promedio representa la esperanza sobre todas las entradas posibles",
-  "average_cost_formula": "E[T(n)] = (1/n)*Σ(k=1 to n)[T(k-1) + T(n-k) + c2*n + c1]"
-}}
-
+{examples}
 ════════════════════════════════════════════════════════════════
 
 INSTRUCCIONES:
@@ -845,7 +637,7 @@ INSTRUCCIONES:
 5. SIN constantes dentro de T()
 6. P_of_S = "1" (o distribución explícita)
 
-Responde SOLO con JSON (sin markdown, sin ```):
+Entrega el resultado con la herramienta de salida, con esta estructura:
 {{
   "scenario_id": "S_avg_case",
   "scenario_type": "average_case",
@@ -861,6 +653,54 @@ Responde SOLO con JSON (sin markdown, sin ```):
 """
 
 
+# ========================================
+# PROMPT COMBINADO: LOS TRES CASOS EN UNA LLAMADA
+# ========================================
+
+MULTI_CASE_PROMPT = """Analiza el siguiente pseudocódigo {algorithm_kind} y determina en UNA SOLA respuesta el MEJOR CASO, el PEOR CASO y el CASO PROMEDIO.
+
+El pseudocódigo, su nombre y los costos de subrutinas auxiliares van al FINAL del mensaje.
+A continuación vienen las instrucciones de cada caso. Donde digan "ESTE pseudocodigo" se refieren al del final.
+El contexto de mejor y peor caso que pide el caso promedio es el que tú mismo determines en esta respuesta.
+
+{case_sections}
+
+════════════════════════════════════════════════════════════════
+FORMATO DE RESPUESTA (OBLIGATORIO)
+════════════════════════════════════════════════════════════════
+
+Entrega el resultado con la herramienta de salida, con exactamente estas tres claves.
+El valor de cada clave es el objeto completo pedido en su sección:
+{{
+  "best_case": {{"scenario_type": "best_case", ...}},
+  "worst_case": {{"scenario_type": "worst_case", ...}},
+  "average_case": {{"scenario_type": "average_case", ...}}
+}}
+
+Usa las MISMAS constantes simbólicas (c1, c2, ...) para la misma línea en los tres casos.
+"""
+
+# Prompt de cada caso por tipo de algoritmo (True = iterativo)
+CASE_PROMPTS = {
+    True: {
+        "best_case": ANALYZE_ITERATIVE_BEST_CASE_PROMPT,
+        "worst_case": ANALYZE_ITERATIVE_WORST_CASE_PROMPT,
+        "average_case": ANALYZE_ITERATIVE_AVERAGE_CASE_PROMPT,
+    },
+    False: {
+        "best_case": ANALYZE_RECURSIVE_BEST_CASE_PROMPT,
+        "worst_case": ANALYZE_RECURSIVE_WORST_CASE_PROMPT,
+        "average_case": ANALYZE_RECURSIVE_AVERAGE_CASE_PROMPT,
+    },
+}
+
+CASE_TITLES = {
+    "best_case": "MEJOR CASO",
+    "worst_case": "PEOR CASO",
+    "average_case": "CASO PROMEDIO",
+}
+
+
 class LLMAnalyzer:
     """
     Cliente LLM para análisis de características de entrada en algoritmos.
@@ -869,57 +709,110 @@ class LLMAnalyzer:
     afectan la complejidad de un algoritmo.
     """
 
-    def __init__(self, temperature: float = 0.0):
+    def __init__(self, temperature: float = 0.0, category: Optional[str] = None):
         """
         Inicializa el analizador LLM.
 
         Args:
             temperature: Controla aleatoriedad (0.0 = determinista, 1.0 = creativo)
+            category: Categoría del ClasificadorAlgoritmos, usada para elegir
+                      los ejemplos few-shot de los prompts
         """
-        if not settings.anthropic_api_key:
-            raise ValueError(
-                "ANTHROPIC_API_KEY no está configurada en el archivo .env"
-            )
-        
-        self.llm = ChatAnthropic(
-            model=settings.model_name,
-            anthropic_api_key=settings.anthropic_api_key,
-            max_tokens=settings.max_tokens,
-            temperature=temperature,
+        self.temperature = temperature
+        self.category = category
+        self.llm = LLMService.get_llm(
+            temperature=temperature, max_tokens=settings.llm_max_tokens_caso, etapa="caso"
         )
+        self._multi_case_llm = None
     
-    def _invoke_llm_with_retry(self, messages: list, max_retries: int = 3) -> Any:
+    def _examples(self, case_type: str, is_iterative: bool, pseudocode: str) -> str:
+        """Ejemplos few-shot más parecidos a este algoritmo (ver tools/few_shot.py)."""
+        return build_examples_block(case_type, is_iterative, pseudocode, self.category)
+
+    def _case_instructions(self, case_type: str, is_iterative: bool, pseudocode: str) -> str:
+        """Instrucciones fijas de un caso: no dependen del pseudocódigo salvo por los ejemplos."""
+        return CASE_PROMPTS[is_iterative][case_type].format(
+            examples=self._examples(case_type, is_iterative, pseudocode)
+        )
+
+    @staticmethod
+    def _analysis_data(
+        pseudocode: str,
+        algorithm_name: str,
+        context: str = "",
+        callee_costs: str = ""
+    ) -> str:
+        """Parte variable del mensaje: el algoritmo a analizar y su contexto."""
+        parts = [
+            f"Pseudocodigo:\n```\n{pseudocode}\n```",
+            f"Nombre del algoritmo: {algorithm_name}",
+        ]
+        if context:
+            parts.append(context)
+        if callee_costs:
+            parts.append(callee_costs)
+        # Análisis de un programa casi idéntico (ver shared/services/indice_similitud.py)
+        reference = bloque_referencia(algorithm_name)
+        if reference:
+            parts.append(reference)
+        return "\n\n".join(parts)
+
+    def _case_messages(
+        self,
+        case_type: str,
+        is_iterative: bool,
+        pseudocode: str,
+        algorithm_name: str,
+        callee_costs: str = "",
+        best_case_summary: str = "",
+        worst_case_summary: str = ""
+    ) -> list:
         """
-        Invoca el LLM con reintentos en caso de sobrecarga.
+        Mensajes de un análisis por caso.
+
+        El prompt de sistema y las instrucciones del caso forman un prefijo
+        estable que se marca para la caché de prompts del proveedor; el
+        pseudocódigo va al final (ver LLMService.mensajes_cacheables).
+        """
+        context = ""
+        if case_type == "average_case":
+            context = (
+                "CONTEXTO de casos ya analizados:\n"
+                f"- MEJOR CASO: {best_case_summary}\n"
+                f"- PEOR CASO: {worst_case_summary}"
+            )
+        return LLMService.mensajes_cacheables(
+            [self._case_instructions(case_type, is_iterative, pseudocode)],
+            self._analysis_data(pseudocode, algorithm_name, context, callee_costs),
+            sistema=BASE_SYSTEM_PROMPT
+        )
+
+    def _invoke_llm_with_retry(
+        self,
+        messages: list,
+        tool: Dict[str, Any],
+        llm: Any = None,
+        verify: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Invoca el LLM a través del gobernador compartido.
+        
+        El gobernador aplica límites de RPM/TPM, concurrencia adaptativa y
+        reintentos con jitter ante 429/529 y errores transitorios. El LLM
+        responde con la herramienta de salida `tool`, así que el resultado
+        ya llega como dict (ver core.analizador.tools.output_schemas).
         
         Args:
             messages: Lista de mensajes para enviar al LLM
-            max_retries: Número máximo de reintentos
+            tool: Herramienta de salida del análisis
+            llm: Instancia a usar (None = self.llm)
+            verify: Verificación que, si falla con el modelo rápido, escala
+                    la llamada al modelo fuerte
             
         Returns:
-            Respuesta del LLM
+            Dict con el resultado del análisis
         """
-        import time
-        
-        wait_time = 2  # segundos iniciales
-        
-        for attempt in range(max_retries):
-            try:
-                return self.llm.invoke(messages)
-            except Exception as e:
-                error_str = str(e)
-                # Detectar error de sobrecarga (529 o "overloaded")
-                if "529" in error_str or "overloaded" in error_str.lower():
-                    if attempt < max_retries - 1:
-                        print(f"⚠️  Servidor sobrecargado. Reintentando en {wait_time}s... (intento {attempt + 1}/{max_retries})")
-                        time.sleep(wait_time)
-                        wait_time *= 2  # Backoff exponencial
-                    else:
-                        print(f"❌ Servidor sobrecargado después de {max_retries} intentos.")
-                        raise
-                else:
-                    # Otro tipo de error, no reintentar
-                    raise
+        return LLMService.invocar_estructurado(llm or self.llm, messages, tool, verificar=verify)
 
     def analyze_input_scenarios(self, pseudocode: str, algorithm_name: str = "") -> Dict[str, Any]:
         """
@@ -939,7 +832,7 @@ class LLMAnalyzer:
                 - parameter_q_meaning: str
 
         Raises:
-            ValueError: Si el LLM no retorna un JSON válido
+            ValueError: Si el LLM no usa la herramienta de salida
             Exception: Si hay error en la comunicación con la API
         """
         try:
@@ -952,12 +845,11 @@ class LLMAnalyzer:
                 HumanMessage(content=prompt)
             ]
 
-            response = self.llm.invoke(messages)
-
-            # Parsear respuesta
-            result = self._parse_response(response.content)
-
-            # Validar estructura
+            llm = LLMService.get_llm(
+                temperature=self.temperature, max_tokens=settings.llm_max_tokens_escenarios, etapa="escenarios"
+            )
+            # Validar estructura (si el modelo rápido falla, se escala al fuerte)
+            result = self._invoke_llm_with_retry(messages, INPUT_SCENARIOS_TOOL, llm, verify=self._validate_result)
             self._validate_result(result)
 
             return result
@@ -970,7 +862,8 @@ class LLMAnalyzer:
         self,
         pseudocode: str,
         algorithm_name: str = "",
-        is_iterative: bool = True
+        is_iterative: bool = True,
+        callee_costs: str = ""
     ) -> Dict[str, Any]:
         """
         Analiza el MEJOR CASO del algoritmo con análisis línea por línea completo.
@@ -979,6 +872,8 @@ class LLMAnalyzer:
             pseudocode: Pseudocódigo del algoritmo
             algorithm_name: Nombre del algoritmo
             is_iterative: True si es iterativo, False si es recursivo
+            callee_costs: Costos de subrutinas auxiliares ya analizadas
+                          (ver core.analizador.tools.subroutine_costs)
 
         Returns:
             Dict con estructura completa: scenario_type, input_description,
@@ -986,31 +881,17 @@ class LLMAnalyzer:
             probability_P (o P_of_S para iterativos), etc.
         """
         try:
-            # Seleccionar prompt según tipo de algoritmo
-            if is_iterative:
-                prompt = ANALYZE_ITERATIVE_BEST_CASE_PROMPT.format(
-                    pseudocode=pseudocode,
-                    algorithm_name=algorithm_name
-                )
-            else:
-                # Algoritmo RECURSIVO: usar prompt especializado
-                prompt = ANALYZE_RECURSIVE_BEST_CASE_PROMPT.format(
-                    pseudocode=pseudocode,
-                    algorithm_name=algorithm_name
-                )
-
-            messages = [
-                SystemMessage(content=BASE_SYSTEM_PROMPT),
-                HumanMessage(content=prompt)
-            ]
-
-            response = self.llm.invoke(messages)
-            result = self._parse_response(response.content)
-
-            # Validar estructura
-            self._validate_case_result(result, "best_case", is_iterative)
+            # Instrucciones fijas (prefijo cacheable) y datos del algoritmo al final
+            messages = self._case_messages(
+                "best_case", is_iterative, pseudocode, algorithm_name,
+                callee_costs=callee_costs
+            )
 
-            return result
+            # Validar estructura (si el modelo rápido falla, se escala al fuerte)
+            return self._invoke_llm_with_retry(
+                messages, case_tool("best_case", is_iterative),
+                verify=lambda r: self._validate_case_result(r, "best_case", is_iterative)
+            )
 
         except Exception as e:
             raise Exception(f"Error en análisis LLM del mejor caso: {str(e)}")
@@ -1019,7 +900,8 @@ class LLMAnalyzer:
         self,
         pseudocode: str,
         algorithm_name: str = "",
-        is_iterative: bool = True
+        is_iterative: bool = True,
+        callee_costs: str = ""
     ) -> Dict[str, Any]:
         """
         Analiza el PEOR CASO del algoritmo con análisis línea por línea completo.
@@ -1028,36 +910,24 @@ class LLMAnalyzer:
             pseudocode: Pseudocódigo del algoritmo
             algorithm_name: Nombre del algoritmo
             is_iterative: True si es iterativo, False si es recursivo
+            callee_costs: Costos de subrutinas auxiliares ya analizadas
+                          (ver core.analizador.tools.subroutine_costs)
 
         Returns:
             Dict con estructura completa del peor caso
         """
         try:
-            # Seleccionar prompt según tipo de algoritmo
-            if is_iterative:
-                prompt = ANALYZE_ITERATIVE_WORST_CASE_PROMPT.format(
-                    pseudocode=pseudocode,
-                    algorithm_name=algorithm_name
-                )
-            else:
-                # Algoritmo RECURSIVO: usar prompt especializado
-                prompt = ANALYZE_RECURSIVE_WORST_CASE_PROMPT.format(
-                    pseudocode=pseudocode,
-                    algorithm_name=algorithm_name
-                )
-
-            messages = [
-                SystemMessage(content=BASE_SYSTEM_PROMPT),
-                HumanMessage(content=prompt)
-            ]
-
-            response = self.llm.invoke(messages)
-            result = self._parse_response(response.content)
-
-            # Validar estructura
-            self._validate_case_result(result, "worst_case", is_iterative)
+            # Instrucciones fijas (prefijo cacheable) y datos del algoritmo al final
+            messages = self._case_messages(
+                "worst_case", is_iterative, pseudocode, algorithm_name,
+                callee_costs=callee_costs
+            )
 
-            return result
+            # Validar estructura (si el modelo rápido falla, se escala al fuerte)
+            return self._invoke_llm_with_retry(
+                messages, case_tool("worst_case", is_iterative),
+                verify=lambda r: self._validate_case_result(r, "worst_case", is_iterative)
+            )
 
         except Exception as e:
             raise Exception(f"Error en análisis LLM del peor caso: {str(e)}")
@@ -1068,7 +938,8 @@ class LLMAnalyzer:
         algorithm_name: str = "",
         is_iterative: bool = True,
         best_case_summary: str = "",
-        worst_case_summary: str = ""
+        worst_case_summary: str = "",
+        callee_costs: str = ""
     ) -> Dict[str, Any]:
         """
         Analiza el CASO PROMEDIO del algoritmo.
@@ -1079,44 +950,112 @@ class LLMAnalyzer:
             is_iterative: True si es iterativo, False si es recursivo
             best_case_summary: Resumen del mejor caso ya analizado
             worst_case_summary: Resumen del peor caso ya analizado
+            callee_costs: Costos de subrutinas auxiliares ya analizadas
 
         Returns:
             Dict con estructura del caso promedio incluyendo scenarios_breakdown
         """
         try:
-            # Seleccionar prompt según tipo de algoritmo
-            if is_iterative:
-                prompt = ANALYZE_ITERATIVE_AVERAGE_CASE_PROMPT.format(
-                    pseudocode=pseudocode,
-                    algorithm_name=algorithm_name,
-                    best_case_summary=best_case_summary,
-                    worst_case_summary=worst_case_summary
-                )
-            else:
-                # Algoritmo RECURSIVO: usar prompt especializado
-                prompt = ANALYZE_RECURSIVE_AVERAGE_CASE_PROMPT.format(
-                    pseudocode=pseudocode,
-                    algorithm_name=algorithm_name,
-                    best_case_summary=best_case_summary,
-                    worst_case_summary=worst_case_summary
-                )
-
-            messages = [
-                SystemMessage(content=BASE_SYSTEM_PROMPT),
-                HumanMessage(content=prompt)
-            ]
-
-            response = self.llm.invoke(messages)
-            result = self._parse_response(response.content)
+            # Instrucciones fijas (prefijo cacheable) y datos del algoritmo al final
+            messages = self._case_messages(
+                "average_case", is_iterative, pseudocode, algorithm_name,
+                callee_costs=callee_costs,
+                best_case_summary=best_case_summary,
+                worst_case_summary=worst_case_summary
+            )
 
-            # Validar estructura del caso promedio
-            self._validate_average_case_result(result, is_iterative)
+            # Validar estructura del caso promedio (si el modelo rápido falla, se escala al fuerte)
+            result = self._invoke_llm_with_retry(
+                messages, case_tool("average_case", is_iterative),
+                verify=lambda r: self._validate_average_case_result(r, is_iterative)
+            )
+            self._normalize_average_case_result(result)
 
             return result
 
         except Exception as e:
             raise Exception(f"Error en análisis LLM del caso promedio: {str(e)}")
 
+    def analyze_all_cases(
+        self,
+        pseudocode: str,
+        algorithm_name: str = "",
+        is_iterative: bool = True,
+        callee_costs: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Analiza mejor, peor y caso promedio con UNA sola llamada al LLM.
+
+        El pseudocódigo y el prompt de sistema se envían una vez en lugar de
+        tres. Cada parte de la respuesta se valida con los mismos validadores
+        del análisis por caso; las que fallen se reportan en `errors` para que
+        el llamador las re-analice con analyze_<caso>.
+
+        Args:
+            pseudocode: Pseudocódigo del algoritmo
+            algorithm_name: Nombre del algoritmo
+            is_iterative: True si es iterativo, False si es recursivo
+            callee_costs: {caso: bloque de costos de subrutinas auxiliares}
+
+        Returns:
+            Dict con:
+                - results: {caso: resultado validado}
+                - errors: {caso: motivo por el que no se pudo usar}
+
+        Raises:
+            Exception: Si falla la comunicación con la API
+        """
+        callee_costs = callee_costs or {}
+        sections = [
+            f"{'═' * 64}\nSECCIÓN {case_type}: {CASE_TITLES[case_type]}\n{'═' * 64}\n\n"
+            f"{self._case_instructions(case_type, is_iterative, pseudocode)}"
+            for case_type in CASE_TITLES
+        ]
+        instructions = MULTI_CASE_PROMPT.format(
+            algorithm_kind="ITERATIVO" if is_iterative else "RECURSIVO",
+            case_sections="\n\n".join(sections)
+        )
+
+        context = "CONTEXTO para average_case: el MEJOR y el PEOR CASO que determines en esta misma respuesta."
+        callee_blocks = "\n\n".join(
+            f"Para la SECCIÓN {case_type}:\n{callee_costs[case_type]}"
+            for case_type in CASE_TITLES if callee_costs.get(case_type)
+        )
+        messages = LLMService.mensajes_cacheables(
+            [instructions],
+            self._analysis_data(pseudocode, algorithm_name, context, callee_blocks),
+            sistema=BASE_SYSTEM_PROMPT
+        )
+
+        # La respuesta trae tres análisis completos: se amplía el límite de salida
+        if self._multi_case_llm is None:
+            self._multi_case_llm = LLMService.get_llm(
+                temperature=self.temperature, max_tokens=settings.llm_max_tokens_combinado, etapa="combinado"
+            )
+        # Si la salida se corta se conservan los casos completos
+        parts = LLMService.invocar_estructurado(
+            self._multi_case_llm, messages, multi_case_tool(is_iterative), permitir_truncado=True
+        )
+
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        for case_type in CASE_TITLES:
+            part = parts.get(case_type)
+            if not isinstance(part, dict):
+                errors[case_type] = "Caso ausente en la respuesta combinada"
+                continue
+            part.setdefault("scenario_type", case_type)
+            try:
+                if case_type == "average_case":
+                    self._validate_average_case_result(part, is_iterative)
+                else:
+                    self._validate_case_result(part, case_type, is_iterative)
+                results[case_type] = part
+            except ValueError as e:
+                errors[case_type] = str(e)
+
+        return {"results": results, "errors": errors}
+
     def _validate_case_result(
         self,
         result: Dict[str, Any],
@@ -1219,7 +1158,12 @@ class LLMAnalyzer:
 
         if result["scenario_type"] != "average_case":
             raise ValueError("El scenario_type debe ser 'average_case'")
-        
+
+        self._normalize_average_case_result(result)
+
+    @staticmethod
+    def _normalize_average_case_result(result: Dict[str, Any]) -> None:
+        """Completa los nombres alternativos de los campos de costo del caso promedio."""
         # Normalizar campos: T_of_S_simplified puede venir como average_cost_simplified
         if "T_of_S_simplified" in result and "average_cost_simplified" not in result:
             result["average_cost_simplified"] = result["T_of_S_simplified"]
@@ -1246,7 +1190,7 @@ class LLMAnalyzer:
                     - input_characteristics: dict
 
         Raises:
-            ValueError: Si el LLM no retorna un JSON válido
+            ValueError: Si el LLM no usa la herramienta de salida
             Exception: Si hay error en la comunicación con la API
         """
         try:
@@ -1259,10 +1203,7 @@ class LLMAnalyzer:
                 HumanMessage(content=prompt)
             ]
 
-            response = self.llm.invoke(messages)
-
-            # Parsear respuesta
-            result = self._parse_response(response.content)
+            result = self._invoke_llm_with_retry(messages, BEST_CASE_ONLY_TOOL)
 
             # Validar estructura del mejor caso
             self._validate_best_case_result(result)
@@ -1298,44 +1239,6 @@ class LLMAnalyzer:
         if not isinstance(best_case["num_iterations"], (int, str)):
             raise ValueError("num_iterations debe ser int o str")
 
-    def _parse_response(self, response_content: str) -> Dict[str, Any]:
-        """
-        Parsea la respuesta JSON del LLM.
-
-        Args:
-            response_content: Contenido de texto de la respuesta
-
-        Returns:
-            Dict parseado
-
-        Raises:
-            ValueError: Si no se puede parsear el JSON
-        """
-        # Limpiar markdown si existe
-        content = response_content.strip()
-
-        # Eliminar bloques de código markdown
-        content = re.sub(r'```json\s*', '', content)
-        content = re.sub(r'```\s*', '', content)
-
-        # Eliminar emojis y caracteres Unicode especiales (> U+007F)
-        # Mantener solo ASCII estándar, saltos de línea y tabulaciones
-        content = ''.join(
-            ch for ch in content
-            if ord(ch) < 128 or ch in ['\n', '\r', '\t']
-        )
-
-        # Buscar JSON
-        json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-
-        if json_match:
-            try:
-                return json.loads(json_match.group())
-            except json.JSONDecodeError as e:
-                raise ValueError(f"JSON inválido: {str(e)}")
-
-        raise ValueError("No se encontró JSON en la respuesta del LLM")
-
     def _validate_result(self, result: Dict[str, Any]) -> None:
         """
         Valida que el resultado tenga la estructura esperada.
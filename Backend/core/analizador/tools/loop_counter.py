@@ -262,8 +262,93 @@ class LoopCounter:
             "ciclos_por_nivel": ciclos_por_nivel
         }
 
+    def estimar_peor_caso(self, pseudocodigo: str) -> Optional[str]:
+        """
+        Estima el costo del peor caso contando ciclos de forma estática.
+
+        Multiplica las iteraciones de la cadena de ciclos anidados más profunda
+        (FOR según sus límites; WHILE y REPEAT se asumen lineales). Un límite
+        que depende de otra cosa que n (variable de un ciclo externo, variable
+        local o parámetro como der) se acota por n, para que el resultado sea
+        función de n. Es el camino determinista cuando no se puede consultar
+        al LLM.
+
+        Args:
+            pseudocodigo: Pseudocódigo con bloques begin/end
+
+        Returns:
+            Expresión del costo (ej: "n*(n-1)") o None si no hay ciclos
+
+        Ejemplo:
+            for i <- 1 to n do / begin / for j <- 1 to n-1 do / begin ... end / end
+            → "n*(n-1)"
+        """
+        pendiente = None   # Iteraciones del ciclo cuyo begin aún no se abrió
+        abiertos = []      # (iteraciones, profundidad) de los ciclos abiertos
+        profundidad = 0
+        mejor: List[str] = []
+
+        for linea in pseudocodigo.split("\n"):
+            linea = linea.strip()
+            minuscula = linea.lower()
+            if minuscula == "begin":
+                profundidad += 1
+                if pendiente is not None:
+                    abiertos.append((pendiente, profundidad))
+                    pendiente = None
+                continue
+            if minuscula.startswith("end"):
+                if abiertos and abiertos[-1][1] == profundidad:
+                    abiertos.pop()
+                profundidad = max(profundidad - 1, 0)
+                continue
+            if re.match(r"until\b", minuscula):
+                if abiertos and abiertos[-1][1] is None:
+                    abiertos.pop()
+                continue
+
+            iteraciones = None
+            if minuscula.startswith("for"):
+                info = self.analizar_for(linea)
+                iteraciones = self._acotar_por_n(info["iteraciones"]) if info.get("valido") else "n"
+            elif minuscula.startswith("while"):
+                iteraciones = "n"
+            elif re.match(self.PATRON_REPEAT, minuscula):
+                cadena = [i for i, _ in abiertos] + ["n"]
+                if len(cadena) > len(mejor):
+                    mejor = cadena
+                abiertos.append(("n", None))
+                continue
+
+            if iteraciones is not None:
+                cadena = [i for i, _ in abiertos] + [iteraciones]
+                if len(cadena) > len(mejor):
+                    mejor = cadena
+                pendiente = iteraciones
+            elif linea:
+                pendiente = None  # Ciclo de una sola sentencia, sin bloque
+
+        if not mejor:
+            return None
+        return "*".join(f"({i})" if re.search(r"[-+ ]", i) else i for i in mejor)
+
     # ==================== MÉTODOS AUXILIARES PRIVADOS ====================
 
+    def _acotar_por_n(self, iteraciones: str) -> str:
+        """
+        Cota en función de n de las iteraciones de un ciclo.
+
+        Ejemplos:
+            "n-1" → "n-1"
+            "n - i" → "n"   (i de un ciclo externo)
+            "der - 1" → "n"
+            "n1" → "n"
+        """
+        nombres = re.findall(r'[A-Za-z_]\w*', iteraciones)
+        if all(nombre == "n" or re.fullmatch(r'log(_\d+)?', nombre) for nombre in nombres):
+            return iteraciones
+        return "n"
+
     def _calcular_iteraciones_for(self, inicio: str, fin: str) -> str:
         """
         Calcula el número de iteraciones de un FOR de forma simbólica.
@@ -0,0 +1,142 @@
+"""
+Esquemas de salida de LLMAnalyzer
+
+Cada análisis obliga al LLM a responder llamando a una herramienta cuyo
+input_schema describe exactamente el JSON esperado (ver
+LLMService.invocar_estructurado). Los campos obligatorios coinciden con los
+que exigen los validadores de LLMAnalyzer; las reglas semánticas (C_op
+simbólico, formato de la recurrencia) se siguen validando allí.
+"""
+
+from typing import Any, Dict
+
+from shared.services.llm_servicio import LLMService
+
+
+LINE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "line_number": {"type": "integer"},
+        "code": {"type": "string"},
+        "C_op": {"type": "string", "description": "Constante simbólica: c1, c2, c3, ..."},
+        "Freq": {"type": "string"},
+        "Total": {"type": "string"},
+        "explanation": {"type": "string", "description": "Opcional, máximo 12 palabras"},
+    },
+    "required": ["line_number", "code", "C_op", "Freq", "Total"],
+}
+
+BREAKDOWN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scenario_id": {"type": "string"},
+        "description": {"type": "string"},
+        "T": {"type": "string"},
+        "P": {"type": "string"},
+    },
+    "required": ["scenario_id", "T", "P"],
+}
+
+CASE_DESCRIPTIONS = {
+    "best_case": "Análisis del MEJOR CASO",
+    "worst_case": "Análisis del PEOR CASO",
+    "average_case": "Análisis del CASO PROMEDIO",
+}
+
+
+def case_schema(case_type: str, is_iterative: bool) -> Dict[str, Any]:
+    """
+    JSON Schema del resultado de un caso.
+
+    Args:
+        case_type: "best_case", "worst_case" o "average_case"
+        is_iterative: Los iterativos exigen line_by_line_analysis en mejor/peor caso
+
+    Returns:
+        Dict con type, properties y required
+    """
+    properties: Dict[str, Any] = {
+        "scenario_id": {"type": "string"},
+        "scenario_type": {"type": "string", "enum": [case_type]},
+        "input_condition": {"type": "string"},
+    }
+    if case_type == "average_case":
+        properties["probability_model"] = {"type": "string"}
+        properties["scenarios_breakdown"] = {"type": "array", "items": BREAKDOWN_SCHEMA}
+        properties["average_cost_formula"] = {"type": "string"}
+        properties["T_of_S_simplified"] = {"type": "string"}
+    properties.update({
+        "line_by_line_analysis": {"type": "array", "items": LINE_SCHEMA},
+        "T_of_S": {"type": "string"},
+        "T_of_S_explanation": {"type": "string"},
+        "P_of_S": {"type": "string"},
+        "P_of_S_explanation": {"type": "string"},
+    })
+    if case_type != "average_case":
+        properties["probability_model"] = {"type": "string"}
+
+    if case_type == "average_case":
+        required = ["scenario_type", "T_of_S", "P_of_S"]
+    else:
+        required = ["scenario_type", "input_condition", "T_of_S", "P_of_S"]
+        if is_iterative:
+            required.append("line_by_line_analysis")
+
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def case_tool(case_type: str, is_iterative: bool) -> Dict[str, Any]:
+    """Herramienta de salida del análisis de un caso."""
+    return {
+        "name": f"report_{case_type}",
+        "description": CASE_DESCRIPTIONS[case_type],
+        "input_schema": case_schema(case_type, is_iterative),
+    }
+
+
+def multi_case_tool(is_iterative: bool) -> Dict[str, Any]:
+    """
+    Herramienta de salida del análisis combinado de los tres casos.
+
+    Ningún caso es obligatorio a nivel de la herramienta: si uno falta, el
+    llamador lo re-analiza por separado en lugar de descartar los otros dos.
+    """
+    return LLMService.herramienta(
+        "report_all_cases",
+        "Análisis del MEJOR, PEOR y CASO PROMEDIO del mismo algoritmo",
+        {case_type: case_schema(case_type, is_iterative) for case_type in CASE_DESCRIPTIONS},
+        requeridas=[],
+    )
+
+
+INPUT_SCENARIOS_TOOL = LLMService.herramienta(
+    "report_input_scenarios",
+    "Sensibilidad del algoritmo a las características de la entrada",
+    {
+        "is_sensitive": {"type": "boolean"},
+        "sensitivity_type": {
+            "type": "string",
+            "enum": ["position", "organization", "value_distribution", "none"],
+        },
+        "best_case_input": {"type": "string"},
+        "worst_case_input": {"type": "string"},
+        "parameter_q_applicable": {"type": "boolean"},
+        "parameter_q_meaning": {"type": "string"},
+    },
+)
+
+BEST_CASE_ONLY_TOOL = LLMService.herramienta(
+    "report_best_case_input",
+    "Características de la entrada del MEJOR CASO",
+    {
+        "best_case": {
+            "type": "object",
+            "properties": {
+                "input_description": {"type": "string"},
+                "num_iterations": {"type": ["integer", "string"]},
+                "input_characteristics": {"type": "object"},
+            },
+            "required": ["input_description", "num_iterations", "input_characteristics"],
+        },
+    },
+)
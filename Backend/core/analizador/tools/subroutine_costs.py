@@ -0,0 +1,602 @@
+"""
+Análisis de Costos por Subrutina
+
+Analiza por separado las subrutinas auxiliares de un programa (swap,
+particionar, merge, ...) y compone su costo en los sitios de CALL del
+algoritmo principal.
+
+Flujo para cada caso (mejor/peor/promedio):
+1. Se separa el programa en subrutinas (core.analizador.tools.subrutinas)
+2. Cada auxiliar no recursiva alcanzable desde el algoritmo principal se
+   analiza sola con el LLM; su resultado se cachea por hash normalizado
+   del cuerpo (incluyendo el de las auxiliares que a su vez invoca)
+3. El algoritmo principal se analiza SIN el cuerpo de las auxiliares: el
+   prompt solo recibe su firma y su costo, y el LLM usa el símbolo
+   T_<nombre> en cada CALL
+4. Se sustituye T_<nombre>(m) por el costo de la auxiliar con n = m, el
+   tamaño que recibe en ese CALL
+
+Así dos programas que comparten una auxiliar reutilizan su resumen de costo
+y el prompt de programas grandes con muchas funciones se reduce.
+
+analyze_all_cases_by_subroutine hace lo mismo para los tres casos a la vez,
+con una llamada combinada por subrutina (LLMAnalyzer.analyze_all_cases).
+
+Dentro de reuse_subroutine_results(previos) también se reutilizan los
+resultados de un análisis anterior del mismo programa (modo incremental de
+FlujoAnalisis): las auxiliares cuyo hash de cierre no cambió y el resultado
+del llamador (con los símbolos T_<nombre> sin sustituir) si su código no
+cambió. Solo se invoca el LLM para las subrutinas modificadas o nuevas.
+"""
+
+import copy
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
+
+from core.analizador.tools.subrutinas import separar_subrutinas
+
+
+CASE_METHODS = {
+    "best_case": "analyze_best_case",
+    "worst_case": "analyze_worst_case",
+    "average_case": "analyze_average_case",
+}
+
+# Campos del resultado del LLM que contienen expresiones de costo
+COST_FIELDS = (
+    "T_of_S",
+    "T_of_S_simplified",
+    "average_cost_formula",
+    "average_cost_simplified",
+)
+
+
+class SubroutineCostCache:
+    """
+    Cache LRU de resultados del LLM por subrutina.
+
+    La clave es (hash de cierre de la subrutina, tipo de caso). El hash de
+    cierre combina el cuerpo normalizado de la subrutina con el de todas las
+    auxiliares que invoca, de modo que cambiar una auxiliar invalida a sus
+    llamadores.
+    """
+
+    def __init__(self, capacity: int = 512):
+        """
+        Args:
+            capacity: Número máximo de resultados retenidos
+        """
+        self.capacity = capacity
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, closure_hash: str, case_type: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el resultado cacheado o None."""
+        key = (closure_hash, case_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry)
+
+    def put(self, closure_hash: str, case_type: str, result: Dict[str, Any]) -> None:
+        """Guarda el resultado de una subrutina para un caso."""
+        key = (closure_hash, case_type)
+        with self._lock:
+            self._entries[key] = dict(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        """Vacía la cache y reinicia los contadores."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Resultados de un análisis previo del mismo programa y los producidos en el
+# análisis en curso: {'previous': {hash: {caso: resultado}}, 'produced': {...}}
+_reuse_context: ContextVar[Optional[Dict[str, Dict[str, Dict[str, Any]]]]] = ContextVar(
+    "subroutine_results", default=None
+)
+
+
+@contextmanager
+def reuse_subroutine_results(previous: Optional[Dict[str, Dict[str, Any]]] = None):
+    """
+    Reutiliza los resultados por subrutina de un análisis previo.
+
+    Args:
+        previous: {hash: {caso: resultado}} producido por un análisis anterior
+                  (None o vacío si no hay)
+
+    Yields:
+        Dict {hash: {caso: resultado}} que se completa con los resultados del
+        análisis en curso, para guardarlo y reutilizarlo en el próximo reenvío
+    """
+    produced: Dict[str, Dict[str, Any]] = {}
+    token = _reuse_context.set({'previous': previous or {}, 'produced': produced})
+    try:
+        yield produced
+    finally:
+        _reuse_context.reset(token)
+
+
+def _reused(subroutine_hash: str, case_type: str) -> Optional[Dict[str, Any]]:
+    """Resultado del análisis previo para la subrutina y el caso, o None."""
+    context = _reuse_context.get()
+    if context is None:
+        return None
+    result = context['previous'].get(subroutine_hash, {}).get(case_type)
+    return copy.deepcopy(result) if result is not None else None
+
+
+def _record(subroutine_hash: str, case_type: str, result: Dict[str, Any]) -> None:
+    """Registra el resultado de una subrutina en el análisis en curso."""
+    context = _reuse_context.get()
+    if context is not None:
+        context['produced'].setdefault(subroutine_hash, {})[case_type] = copy.deepcopy(result)
+
+
+# Singleton
+_cache_instance = None
+
+
+def get_subroutine_cost_cache() -> SubroutineCostCache:
+    """Obtiene la instancia singleton de la cache de costos por subrutina."""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = SubroutineCostCache()
+    return _cache_instance
+
+
+def plan_modular_analysis(pseudocode: str, algorithm_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Decide qué subrutinas se analizan por separado.
+
+    Una subrutina es auxiliar "resumible" si es alcanzable desde el algoritmo
+    principal, no es recursiva y no vuelve a invocar al principal. Las demás
+    (el principal y cualquier recursión mutua) se mantienen en el código del
+    llamador.
+
+    Args:
+        pseudocode: Programa completo
+        algorithm_name: Nombre de la subrutina principal
+
+    Returns:
+        Dict con helpers (en orden de dependencias, primero las hojas),
+        caller_code, caller_hash y closure_hashes; o None si no hay
+        auxiliares resumibles
+    """
+    sections = separar_subrutinas(pseudocode)
+    subs = {sub['nombre']: sub for sub in sections['subrutinas']}
+
+    if len(subs) < 2 or algorithm_name not in subs:
+        return None
+
+    def reachable(origin: str) -> set:
+        seen, pending = set(), [origin]
+        while pending:
+            name = pending.pop()
+            for callee in subs[name]['llamadas']:
+                if callee in subs and callee not in seen:
+                    seen.add(callee)
+                    pending.append(callee)
+        return seen
+
+    helpers = [
+        name for name in reachable(algorithm_name)
+        if name != algorithm_name
+        and not subs[name]['es_recursiva']
+        and name not in reachable(name)
+        and algorithm_name not in reachable(name)
+    ]
+    if not helpers:
+        return None
+
+    # Orden topológico: cada auxiliar después de las auxiliares que invoca
+    ordered: List[str] = []
+
+    def visit(name: str) -> None:
+        if name in ordered:
+            return
+        for callee in subs[name]['llamadas']:
+            if callee in helpers:
+                visit(callee)
+        ordered.append(name)
+
+    for name in sorted(helpers):
+        visit(name)
+
+    closure_hashes: Dict[str, str] = {}
+    for name in ordered:
+        parts = [subs[name]['hash']] + sorted(
+            closure_hashes[callee] for callee in subs[name]['llamadas'] if callee in closure_hashes
+        )
+        closure_hashes[name] = hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+    callers = [sub for sub in sections['subrutinas'] if sub['nombre'] not in helpers]
+    caller_parts = list(sections['clases']) + [sub['texto'] for sub in callers]
+    # El resultado del llamador usa T_<nombre>: no depende del cuerpo de las auxiliares
+    caller_hash = hashlib.sha256(
+        "|".join(["caller"] + [" ".join(clase.split()) for clase in sections['clases']] + [sub['hash'] for sub in callers])
+        .encode("utf-8")
+    ).hexdigest()
+
+    return {
+        'helpers': [subs[name] for name in ordered],
+        'caller_code': "\n\n".join(caller_parts),
+        'caller_hash': caller_hash,
+        'closure_hashes': closure_hashes,
+    }
+
+
+def summarize_cost(result: Dict[str, Any], case_type: str) -> str:
+    """
+    Extrae la expresión de costo de una subrutina para sustituirla en un CALL.
+
+    Para el caso promedio se prefiere la forma simplificada.
+    """
+    if case_type == "average_case":
+        for field in ("T_of_S_simplified", "average_cost_simplified", "T_of_S"):
+            if result.get(field):
+                return str(result[field])
+    return str(result.get("T_of_S", "1"))
+
+
+def build_callee_context(helpers: List[Dict[str, Any]], costs: Dict[str, str]) -> str:
+    """
+    Construye el bloque de prompt con la firma y el costo de cada auxiliar.
+
+    Args:
+        helpers: Subrutinas auxiliares invocadas (de separar_subrutinas)
+        costs: {nombre: expresión de costo}
+
+    Returns:
+        Texto a añadir al prompt (vacío si no hay auxiliares)
+    """
+    if not helpers:
+        return ""
+
+    lines = [
+        "COSTOS DE SUBRUTINAS YA ANALIZADAS (no incluidas en el código):",
+    ]
+    for helper in helpers:
+        lines.append(f"- {helper['encabezado']}: T_{helper['nombre']} = {costs[helper['nombre']]}")
+    lines.append(
+        "En cada línea con CALL a una de estas subrutinas NO analices su cuerpo: "
+        "usa T_<nombre>(m) como costo de la llamada en \"Total\" y en T_of_S, donde m "
+        "es el tamaño del rango que recibe en esa llamada (n en su costo es ese tamaño)."
+    )
+    return "\n".join(lines)
+
+
+def _max_constant_index(expressions: List[str]) -> int:
+    indices = [int(idx) for expr in expressions for idx in re.findall(r'\bc(\d+)\b', expr)]
+    return max(indices, default=0)
+
+
+def _shift_constants(expression: str, offset: int) -> str:
+    return re.sub(r'\bc(\d+)\b', lambda m: f"c{int(m.group(1)) + offset}", expression)
+
+
+def _apply_size(cost: str, argument: Optional[str]) -> Optional[str]:
+    """
+    Costo de la auxiliar para el tamaño de un CALL concreto.
+
+    T_<nombre>(m) reemplaza n por m; T_<nombre> sin argumento usa el costo tal
+    cual (tamaño n). Con varios argumentos no se sabe cuál es el tamaño y se
+    devuelve None para dejar el término sin sustituir.
+    """
+    if argument is None:
+        return cost
+    argument = argument.strip()
+    if not argument or ',' in argument:
+        return None
+    if not re.fullmatch(r'\w+', argument):
+        argument = f"({argument})"
+    return re.sub(r'\bn\b', argument, cost)
+
+
+def compose_call_costs(result: Dict[str, Any], costs: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Sustituye T_<nombre> y T_<nombre>(m) por el costo de cada auxiliar.
+
+    En T_<nombre>(m) el n del costo de la auxiliar se reemplaza por el tamaño
+    m de la llamada (T_merge(n/2) con costo c1*n queda c1*(n/2)). Si la
+    llamada trae varios argumentos el término se deja como está.
+
+    Las constantes c1, c2, ... de cada auxiliar se renumeran a continuación de
+    las del llamador para que no se confundan con ellas.
+
+    Args:
+        result: Resultado del LLM para el llamador
+        costs: {nombre: expresión de costo de la auxiliar}
+
+    Returns:
+        Nuevo dict con las expresiones compuestas
+    """
+    composed = dict(result)
+    lines = [dict(line) for line in result.get("line_by_line_analysis", []) or []]
+    breakdown = [dict(item) for item in result.get("scenarios_breakdown", []) or []]
+
+    caller_expressions = [str(result.get(field, "")) for field in COST_FIELDS]
+    caller_expressions += [str(line.get("C_op", "")) + " " + str(line.get("Total", "")) for line in lines]
+    offset = _max_constant_index(caller_expressions)
+
+    substitutions = {}
+    for name, cost in costs.items():
+        substitutions[name] = _shift_constants(cost, offset)
+        offset = max(offset, _max_constant_index([substitutions[name]]))
+
+    def substitute(expression: Any) -> Any:
+        if not isinstance(expression, str):
+            return expression
+        for name, cost in substitutions.items():
+            def replace(match: "re.Match", cost: str = cost) -> str:
+                sized = _apply_size(cost, match.group(1))
+                return match.group(0) if sized is None else f"({sized})"
+
+            expression = re.sub(rf'\bT_{re.escape(name)}\b(?:\(([^()]*)\))?', replace, expression)
+        return expression
+
+    for field in COST_FIELDS:
+        if field in composed:
+            composed[field] = substitute(composed[field])
+    for line in lines:
+        line["Total"] = substitute(line.get("Total"))
+    for item in breakdown:
+        item["T"] = substitute(item.get("T"))
+
+    if lines:
+        composed["line_by_line_analysis"] = lines
+    if breakdown:
+        composed["scenarios_breakdown"] = breakdown
+    return composed
+
+
+def _helper_is_iterative(helper: Dict[str, Any]) -> bool:
+    """Tipo de una auxiliar según su propio cuerpo (no el del algoritmo principal)."""
+    return not helper['es_recursiva']
+
+
+def _case_summary(result: Optional[Dict[str, Any]]) -> str:
+    if not result:
+        return "No disponible"
+    return f"T(S) = {result.get('T_of_S', 'n')}, P(S) = {result.get('P_of_S', '1')}"
+
+
+def _invoke_case(
+    analyzer,
+    case_type: str,
+    pseudocode: str,
+    algorithm_name: str,
+    is_iterative: bool,
+    callee_costs: str,
+    best_case_summary: str,
+    worst_case_summary: str
+) -> Dict[str, Any]:
+    method = getattr(analyzer, CASE_METHODS[case_type])
+    kwargs = {
+        "pseudocode": pseudocode,
+        "algorithm_name": algorithm_name,
+        "is_iterative": is_iterative,
+        "callee_costs": callee_costs,
+    }
+    if case_type == "average_case":
+        kwargs["best_case_summary"] = best_case_summary
+        kwargs["worst_case_summary"] = worst_case_summary
+    return method(**kwargs)
+
+
+def analyze_case_by_subroutine(
+    analyzer,
+    case_type: str,
+    pseudocode: str,
+    algorithm_name: str,
+    is_iterative: bool,
+    best_case_summary: str = "",
+    worst_case_summary: str = "",
+    cache: Optional[SubroutineCostCache] = None
+) -> Dict[str, Any]:
+    """
+    Analiza un caso componiendo los costos de las subrutinas auxiliares.
+
+    Si el programa no tiene auxiliares resumibles se comporta exactamente
+    como el método analyze_<caso> del analizador.
+
+    Args:
+        analyzer: Instancia de LLMAnalyzer
+        case_type: "best_case", "worst_case" o "average_case"
+        pseudocode: Programa completo
+        algorithm_name: Nombre de la subrutina principal
+        is_iterative: Tipo del algoritmo principal
+        best_case_summary: Resumen del mejor caso (solo caso promedio)
+        worst_case_summary: Resumen del peor caso (solo caso promedio)
+        cache: Cache a usar (por defecto, la global)
+
+    Returns:
+        Resultado del LLM para el algoritmo principal, con los costos de las
+        auxiliares ya sustituidos y el campo subroutine_costs
+    """
+    plan = plan_modular_analysis(pseudocode, algorithm_name)
+    if plan is None:
+        return _invoke_case(
+            analyzer, case_type, pseudocode, algorithm_name, is_iterative, "",
+            best_case_summary, worst_case_summary
+        )
+
+    cache = cache if cache is not None else get_subroutine_cost_cache()
+    costs: Dict[str, str] = {}
+    report: Dict[str, Dict[str, Any]] = {}
+
+    for helper in plan['helpers']:
+        name = helper['nombre']
+        closure_hash = plan['closure_hashes'][name]
+        callees = [h for h in plan['helpers'] if h['nombre'] in helper['llamadas']]
+
+        result = cache.get(closure_hash, case_type) or _reused(closure_hash, case_type)
+        from_cache = result is not None
+        if result is None:
+            helper_best, helper_worst = "", ""
+            if case_type == "average_case":
+                helper_best = _case_summary(cache.get(closure_hash, "best_case"))
+                helper_worst = _case_summary(cache.get(closure_hash, "worst_case"))
+            result = _invoke_case(
+                analyzer, case_type, helper['texto'], name, _helper_is_iterative(helper),
+                build_callee_context(callees, costs),
+                helper_best, helper_worst
+            )
+            result = compose_call_costs(result, {h['nombre']: costs[h['nombre']] for h in callees})
+        cache.put(closure_hash, case_type, result)
+        _record(closure_hash, case_type, result)
+
+        costs[name] = summarize_cost(result, case_type)
+        report[name] = {"T": costs[name], "from_cache": from_cache}
+
+    direct_callees = [h for h in plan['helpers'] if h['nombre'] in _calls_outside_helpers(plan)]
+    result = _reused(plan['caller_hash'], case_type)
+    if result is None:
+        result = _invoke_case(
+            analyzer, case_type, plan['caller_code'], algorithm_name, is_iterative,
+            build_callee_context(direct_callees, costs),
+            best_case_summary, worst_case_summary
+        )
+    _record(plan['caller_hash'], case_type, result)
+    result = compose_call_costs(result, {h['nombre']: costs[h['nombre']] for h in direct_callees})
+    result["subroutine_costs"] = report
+    return result
+
+
+def _analyze_helper_cases(
+    analyzer,
+    helper: Dict[str, Any],
+    callee_contexts: Dict[str, str],
+    cached: Dict[str, Optional[Dict[str, Any]]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Obtiene los casos que faltan de una auxiliar con una llamada combinada.
+
+    Los casos que la respuesta combinada no resuelve se piden por separado,
+    porque el llamador necesita el costo de la auxiliar en todos los casos.
+    """
+    missing = [case_type for case_type in CASE_METHODS if cached[case_type] is None]
+    combined = {}
+    if len(missing) > 1:
+        combined = analyzer.analyze_all_cases(
+            helper['texto'], helper['nombre'], _helper_is_iterative(helper),
+            {case_type: callee_contexts[case_type] for case_type in missing}
+        )['results']
+
+    results = {}
+    for case_type in missing:
+        result = combined.get(case_type)
+        if result is None:
+            known = {**cached, **results}
+            result = _invoke_case(
+                analyzer, case_type, helper['texto'], helper['nombre'], _helper_is_iterative(helper),
+                callee_contexts[case_type],
+                _case_summary(known.get("best_case")) if case_type == "average_case" else "",
+                _case_summary(known.get("worst_case")) if case_type == "average_case" else ""
+            )
+        results[case_type] = result
+    return results
+
+
+def analyze_all_cases_by_subroutine(
+    analyzer,
+    pseudocode: str,
+    algorithm_name: str,
+    is_iterative: bool,
+    cache: Optional[SubroutineCostCache] = None
+) -> Dict[str, Any]:
+    """
+    Analiza los tres casos con una llamada combinada por subrutina.
+
+    Equivale a analyze_case_by_subroutine para cada caso, pero cada auxiliar
+    y el algoritmo principal se analizan con LLMAnalyzer.analyze_all_cases.
+
+    Args:
+        analyzer: Instancia de LLMAnalyzer
+        pseudocode: Programa completo
+        algorithm_name: Nombre de la subrutina principal
+        is_iterative: Tipo del algoritmo principal
+        cache: Cache a usar (por defecto, la global)
+
+    Returns:
+        Dict con:
+            - results: {caso: resultado compuesto del algoritmo principal}
+            - errors: {caso: motivo} para los casos que no pasaron la
+              validación y deben re-analizarse por separado
+    """
+    plan = plan_modular_analysis(pseudocode, algorithm_name)
+    if plan is None:
+        return analyzer.analyze_all_cases(pseudocode, algorithm_name, is_iterative)
+
+    cache = cache if cache is not None else get_subroutine_cost_cache()
+    costs: Dict[str, Dict[str, str]] = {case_type: {} for case_type in CASE_METHODS}
+    report: Dict[str, Dict[str, Dict[str, Any]]] = {case_type: {} for case_type in CASE_METHODS}
+
+    for helper in plan['helpers']:
+        name = helper['nombre']
+        closure_hash = plan['closure_hashes'][name]
+        callees = [h for h in plan['helpers'] if h['nombre'] in helper['llamadas']]
+
+        cached = {
+            case_type: cache.get(closure_hash, case_type) or _reused(closure_hash, case_type)
+            for case_type in CASE_METHODS
+        }
+        contexts = {case_type: build_callee_context(callees, costs[case_type]) for case_type in CASE_METHODS}
+        fresh = _analyze_helper_cases(analyzer, helper, contexts, cached)
+
+        for case_type in CASE_METHODS:
+            result = cached[case_type]
+            if result is None:
+                result = compose_call_costs(
+                    fresh[case_type], {h['nombre']: costs[case_type][h['nombre']] for h in callees}
+                )
+            cache.put(closure_hash, case_type, result)
+            _record(closure_hash, case_type, result)
+            costs[case_type][name] = summarize_cost(result, case_type)
+            report[case_type][name] = {"T": costs[case_type][name], "from_cache": case_type not in fresh}
+
+    direct_callees = [h for h in plan['helpers'] if h['nombre'] in _calls_outside_helpers(plan)]
+    reused = {case_type: _reused(plan['caller_hash'], case_type) for case_type in CASE_METHODS}
+    if all(result is not None for result in reused.values()):
+        combined = {"results": reused, "errors": {}}
+    else:
+        combined = analyzer.analyze_all_cases(
+            plan['caller_code'], algorithm_name, is_iterative,
+            {case_type: build_callee_context(direct_callees, costs[case_type]) for case_type in CASE_METHODS}
+        )
+
+    results = {}
+    for case_type, result in combined['results'].items():
+        _record(plan['caller_hash'], case_type, result)
+        result = compose_call_costs(
+            result, {h['nombre']: costs[case_type][h['nombre']] for h in direct_callees}
+        )
+        result["subroutine_costs"] = report[case_type]
+        results[case_type] = result
+    return {"results": results, "errors": combined['errors']}
+
+
+def _calls_outside_helpers(plan: Dict[str, Any]) -> set:
+    """Nombres invocados desde el código del llamador (fuera de las auxiliares)."""
+    return set(re.findall(r'CALL\s+(\w+)', plan['caller_code']))
@@ -0,0 +1,189 @@
+"""
+Subrutinas Tool
+
+Herramienta que separa un programa en sus subrutinas, calcula un hash
+normalizado por bloque y compara dos versiones del mismo programa.
+
+Se usa para el re-análisis incremental: cuando el usuario edita una o dos
+líneas y reenvía, solo los bloques cuyo texto normalizado cambió necesitan
+volver a validarse y analizarse.
+"""
+
+import hashlib
+import re
+from typing import Dict, List
+
+from core.validador.models.patterns import GrammarPatterns
+
+
+_PATTERNS = GrammarPatterns()
+
+
+def normalizar_linea(linea: str) -> str:
+    """
+    Normaliza una línea de pseudocódigo para compararla estructuralmente.
+
+    Elimina comentarios (►), espacios al inicio/fin y colapsa espacios
+    internos. Dos líneas que solo difieren en formato producen el mismo
+    resultado.
+
+    Args:
+        linea: Línea original del pseudocódigo
+
+    Returns:
+        Línea normalizada (cadena vacía si no contiene código)
+    """
+    if '►' in linea:
+        linea = linea.split('►')[0]
+    return re.sub(r'\s+', ' ', linea).strip()
+
+
+def hash_lineas(lineas: List[str]) -> str:
+    """
+    Calcula el hash de un bloque de líneas ya normalizadas.
+
+    Args:
+        lineas: Líneas normalizadas (sin vacías)
+
+    Returns:
+        Hash SHA-256 en hexadecimal
+    """
+    return hashlib.sha256("\n".join(lineas).encode("utf-8")).hexdigest()
+
+
+def separar_subrutinas(pseudocodigo: str) -> Dict:
+    """
+    Separa el programa en clases y subrutinas siguiendo la gramática.
+
+    Replica la lógica de `_separar_secciones` del validador (encabezado,
+    BEGIN y END balanceados), pero conserva el texto original de cada bloque
+    para poder re-validarlo de forma aislada.
+
+    Args:
+        pseudocodigo: Programa completo
+
+    Returns:
+        Dict con:
+            - clases: List[str] líneas de declaración de clases
+            - subrutinas: List[Dict] con nombre, encabezado, texto,
+              lineas (normalizadas), hash, llamadas y es_recursiva
+    """
+    originales = pseudocodigo.split("\n")
+    codigo = [
+        (normalizar_linea(linea), linea)
+        for linea in originales
+        if normalizar_linea(linea)
+    ]
+
+    clases = []
+    subrutinas = []
+    idx = 0
+
+    # Extraer clases (siempre al inicio del programa)
+    while idx < len(codigo) and re.match(_PATTERNS.patron_clase, codigo[idx][0]):
+        clases.append(codigo[idx][0])
+        idx += 1
+
+    # Extraer subrutinas
+    while idx < len(codigo):
+        match = re.match(_PATTERNS.patron_subrutina, codigo[idx][0])
+        if not match:
+            idx += 1
+            continue
+
+        inicio = idx
+        idx += 1
+
+        if idx < len(codigo) and re.match(_PATTERNS.patron_begin, codigo[idx][0]):
+            nivel_begin = 1
+            idx += 1
+            while idx < len(codigo) and nivel_begin > 0:
+                if re.match(_PATTERNS.patron_begin, codigo[idx][0]):
+                    nivel_begin += 1
+                elif re.match(_PATTERNS.patron_end, codigo[idx][0]):
+                    nivel_begin -= 1
+                idx += 1
+
+        bloque = codigo[inicio:idx]
+        lineas = [normalizada for normalizada, _ in bloque]
+        nombre = match.group(1)
+        llamadas = sorted(set(re.findall(r'CALL\s+(\w+)', "\n".join(lineas))))
+
+        subrutinas.append({
+            'nombre': nombre,
+            'encabezado': lineas[0],
+            'texto': "\n".join(original for _, original in bloque),
+            'lineas': lineas,
+            'hash': hash_lineas(lineas),
+            'llamadas': llamadas,
+            'es_recursiva': nombre in llamadas,
+        })
+
+    return {'clases': clases, 'subrutinas': subrutinas}
+
+
+def comparar_subrutinas(previas: List[Dict], actuales: List[Dict]) -> Dict[str, List[str]]:
+    """
+    Compara dos versiones de un programa subrutina por subrutina.
+
+    Las subrutinas se emparejan por nombre; una subrutina cuyo hash
+    normalizado no cambió se considera sin cambios aunque se hayan
+    editado comentarios, espacios o líneas en blanco.
+
+    Args:
+        previas: Subrutinas de la versión anterior (de separar_subrutinas)
+        actuales: Subrutinas de la versión nueva
+
+    Returns:
+        Dict con listas de nombres: sin_cambios, modificadas, nuevas, eliminadas
+    """
+    hashes_previos = {sub['nombre']: sub['hash'] for sub in previas}
+    nombres_actuales = {sub['nombre'] for sub in actuales}
+
+    cambios = {'sin_cambios': [], 'modificadas': [], 'nuevas': [], 'eliminadas': []}
+
+    for sub in actuales:
+        if sub['nombre'] not in hashes_previos:
+            cambios['nuevas'].append(sub['nombre'])
+        elif hashes_previos[sub['nombre']] == sub['hash']:
+            cambios['sin_cambios'].append(sub['nombre'])
+        else:
+            cambios['modificadas'].append(sub['nombre'])
+
+    cambios['eliminadas'] = [
+        sub['nombre'] for sub in previas if sub['nombre'] not in nombres_actuales
+    ]
+
+    return cambios
+
+
+def hay_cambios_estructurales(cambios: Dict[str, List[str]]) -> bool:
+    """Indica si la comparación contiene algún bloque modificado, nuevo o eliminado."""
+    return bool(cambios['modificadas'] or cambios['nuevas'] or cambios['eliminadas'])
+
+
+def construir_programa_parcial(secciones: Dict, afectadas: List[str]) -> str:
+    """
+    Construye un programa donde solo las subrutinas afectadas conservan su cuerpo.
+
+    Las subrutinas no afectadas se reemplazan por un stub `encabezado / begin / end`
+    que conserva nombre y parámetros: así el validador sigue conociendo todas las
+    subrutinas definidas (necesario para detectar llamadas sin CALL) sin volver a
+    revisar cuerpos que ya fueron validados.
+
+    Args:
+        secciones: Resultado de separar_subrutinas
+        afectadas: Nombres de subrutinas que deben validarse completas
+
+    Returns:
+        Pseudocódigo parcial listo para el validador
+    """
+    partes = list(secciones['clases'])
+
+    for sub in secciones['subrutinas']:
+        if sub['nombre'] in afectadas:
+            partes.append(sub['texto'])
+        else:
+            partes.append(f"{sub['encabezado']}\nbegin\nend")
+
+    return "\n\n".join(partes)
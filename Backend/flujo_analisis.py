@@ -24,26 +24,57 @@ Uso:
     )
 """
 
+import uuid
 from typing import Dict, Any, Literal, Optional
 from pathlib import Path
 from datetime import datetime
 
+from config.settings import settings
 from shared.services.servicioTraductor import ServicioTraductor
 from shared.services.servicioValidador import servicioValidador
 from shared.services.servicioCorrector import ServicioCorrector
 from shared.services.lectorArchivos import LectorArchivos
 from shared.services.detectorTipoEntrada import DetectorTipoEntrada
+from shared.services.almacen_analisis import obtener_almacen
+from shared.services.vuelo_unico import VueloUnico, clave_de
+from shared.services.gobernador_llm import obtener_gobernador
+from shared.services.cobertura_llm import obtener_cobertura
+from shared.services.presupuesto_llm import (
+    PresupuestoAnalisis,
+    permite_opcional,
+    presupuesto_actual,
+    usar_presupuesto,
+)
+from shared.services.circuito_llm import llm_disponible, obtener_circuito
+from shared.services.puntos_control import obtener_puntos_control
+from shared.services.cache_canonico import obtener_cache_canonico
+from shared.services.indice_similitud import obtener_indice_similitud, referencia_de, usar_referencia
 from agentes.agenteResolver import AgenteResolver
 from agentes.agenteFlowchart import AgenteFlowchart
 from agentes.agenteValidadorComplejidades import AgenteValidadorComplejidades
 from agentes.agenteReportador import AgenteReportador
 from ml.clasificador import obtener_clasificador
+from tools.metricas import MedirTiempo
 from core.analizador.agents.workflow import get_workflow
 from core.analizador.models.scenario_state import ScenarioState
+from core.analizador.tools.canonico import canonizar, renumerar
+from core.analizador.tools.subroutine_costs import reuse_subroutine_results
+from core.analizador.tools.subrutinas import (
+    separar_subrutinas,
+    comparar_subrutinas,
+    hay_cambios_estructurales,
+    construir_programa_parcial,
+    normalizar_linea,
+)
+
 from representacion.agents.math_representation_agent import AgenteRepresentacionMatematica
 from representacion.models.math_request import MathRepresentationRequest
 
 
+# Análisis idénticos en curso (compartido entre instancias: el router crea una por request)
+_vuelos_analisis = VueloUnico()
+
+
 class FlujoAnalisis:
     """
     Clase principal que coordina todo el flujo de análisis de complejidad.
@@ -82,7 +113,10 @@ class FlujoAnalisis:
         entrada: Optional[str] = None,
         tipo_entrada: Literal["pseudocodigo", "lenguaje_natural", "archivo", "auto"] = "auto",
         archivo_path: Optional[str] = None,
-        auto_corregir: bool = True
+        auto_corregir: bool = True,
+        analisis_previo_id: Optional[str] = None,
+        presupuesto_tokens: Optional[int] = None,
+        limite_segundos: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Método principal que ejecuta todo el flujo de análisis.
@@ -93,9 +127,17 @@ class FlujoAnalisis:
                          Si es "auto", detecta automáticamente el tipo
             archivo_path: Ruta al archivo si tipo_entrada="archivo"
             auto_corregir: Si True, corrige errores automáticamente
+            analisis_previo_id: ID de un análisis anterior del mismo programa.
+                         Si se indica, solo se re-validan las subrutinas que
+                         cambiaron y, si ninguna cambió estructuralmente, se
+                         reutilizan costos, ecuaciones y complejidades previas
+            presupuesto_tokens: Tokens máximos del análisis (None = settings.analisis_tokens_max)
+            limite_segundos: Plazo del análisis (None = settings.analisis_segundos_max)
         
         Returns:
             dict con todos los resultados del análisis:
+                - analisis_id: str (para reenvíos incrementales)
+                - incremental: dict con subrutinas reutilizadas/re-analizadas
                 - pseudocodigo_original: str
                 - pseudocodigo_validado: str
                 - validacion: dict
@@ -104,8 +146,199 @@ class FlujoAnalisis:
                 - complejidades: dict
                 - exito: bool
                 - errores: list
+                - presupuesto: dict con tokens/tiempo consumidos y degradaciones
+                - fases_restauradas: list de fases tomadas de un punto de control
+                - fases_cache: list de fases tomadas de un programa equivalente
+                - analisis_similar: dict con analisis_id y similitud del análisis
+                  usado como referencia en los prompts (None si no hubo)
+        
+        Si el presupuesto no alcanza, las etapas opcionales (flowchart,
+        sugerencias de ecuaciones, validación 8.5) se omiten y las llamadas LLM
+        que no caben se reemplazan por su alternativa heurística.
+        
+        Solicitudes concurrentes con la misma entrada normalizada (sin
+        comentarios ni espacios sobrantes) y las mismas opciones comparten
+        un único análisis en curso.
+        
+        Un programa equivalente a uno ya analizado (misma forma canónica:
+        solo cambian nombres de variables, espacios o comentarios) reutiliza
+        su clasificación, validación y fases 6-8.5 con los nombres del usuario.
+        Si solo es parecido (similitud MinHash >= settings.similitud_umbral),
+        el análisis del vecino se pasa como referencia a los prompts de casos.
+        
+        Si la misma solicitud quedó a medias (falló una fase o el proceso se
+        interrumpió), continúa desde la última fase completada con el mismo
+        analisis_id (ver reanudar).
         """
+        return self._analizar_reanudable({
+            'entrada': entrada,
+            'tipo_entrada': tipo_entrada,
+            'archivo_path': archivo_path,
+            'auto_corregir': auto_corregir,
+            'analisis_previo_id': analisis_previo_id,
+            'presupuesto_tokens': presupuesto_tokens,
+            'limite_segundos': limite_segundos,
+        })
+    
+    def reanudar(self, analisis_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Continúa un análisis interrumpido desde su última fase completada.
+        
+        Args:
+            analisis_id: ID devuelto por el análisis que no terminó
+        
+        Returns:
+            dict con el mismo formato de analizar(), o None si no hay puntos
+            de control de ese análisis (terminó, venció o no existe)
+        """
+        registro = obtener_puntos_control().obtener(analisis_id) if settings.puntos_control else None
+        if registro is None:
+            return None
+        return self._analizar_reanudable(registro['parametros'], analisis_id)
+    
+    def _analizar_reanudable(self, parametros: Dict[str, Any], analisis_id: Optional[str] = None) -> Dict[str, Any]:
+        """Coalesce, asigna el analisis_id (nuevo o pendiente) y ejecuta con presupuesto."""
+        clave = clave_de(
+            self._normalizar_entrada(parametros['entrada']),
+            parametros['tipo_entrada'],
+            parametros['archivo_path'],
+            parametros['auto_corregir'],
+            parametros['analisis_previo_id'],
+            parametros['presupuesto_tokens'],
+            parametros['limite_segundos'],
+        )
+        resultado = _vuelos_analisis.ejecutar(
+            clave,
+            lambda: self._analizar_con_presupuesto(
+                PresupuestoAnalisis(
+                    tokens_max=parametros['presupuesto_tokens'] or settings.analisis_tokens_max,
+                    segundos_max=parametros['limite_segundos'] or settings.analisis_segundos_max
+                ),
+                parametros['entrada'],
+                parametros['tipo_entrada'],
+                parametros['archivo_path'],
+                parametros['auto_corregir'],
+                parametros['analisis_previo_id'],
+                analisis_id or self._iniciar_puntos_control(clave, parametros)
+            )
+        )
+        self._restaurar_entrada_propia(resultado, parametros)
+        return resultado
+    
+    @staticmethod
+    def _restaurar_entrada_propia(resultado: Dict[str, Any], parametros: Dict[str, Any]) -> None:
+        """
+        Devuelve a cada solicitud su propia entrada.
+        
+        Las solicitudes coalescidas pueden diferir en comentarios y espacios:
+        el seguidor recibe una copia del resultado del líder, con la entrada
+        del líder, que se reemplaza por la suya (también en el pseudocódigo
+        validado si es la entrada sin cambios).
+        """
+        if parametros['tipo_entrada'] == "archivo" or not parametros['entrada']:
+            return
+        original = resultado.get('pseudocodigo_original')
+        if original is None or original == parametros['entrada']:
+            return
+        if resultado.get('pseudocodigo_validado') == original:
+            resultado['pseudocodigo_validado'] = parametros['entrada']
+        resultado['pseudocodigo_original'] = parametros['entrada']
+    
+    def _iniciar_puntos_control(self, clave: str, parametros: Dict[str, Any]) -> str:
+        """Retoma el análisis pendiente de la misma solicitud o registra uno nuevo."""
+        if not settings.puntos_control:
+            return uuid.uuid4().hex
+        almacen = obtener_puntos_control()
+        analisis_id = almacen.buscar_por_clave(clave)
+        if analisis_id:
+            self._log(f"[INFO] Reanudando el análisis pendiente {analisis_id}")
+            return analisis_id
+        analisis_id = uuid.uuid4().hex
+        almacen.iniciar(analisis_id, clave, parametros)
+        return analisis_id
+    
+    def _restaurar_fase(self, resultado: Dict[str, Any], fase: str) -> Optional[Any]:
+        """Salida de una fase ya completada por este análisis (None = hay que ejecutarla)."""
+        if not settings.puntos_control:
+            return None
+        almacen = obtener_puntos_control()
+        datos = almacen.fase(resultado['analisis_id'], fase)
+        if datos is not None:
+            resultado['fases_restauradas'].append(fase)
+            self._log(f"[OK] Fase '{fase}' restaurada del punto de control")
+        else:
+            # La fase se vuelve a ejecutar: las posteriores guardadas dependían de su salida anterior
+            posteriores = self._FASES_REANUDABLES[self._FASES_REANUDABLES.index(fase) + 1:]
+            almacen.descartar_fases(resultado['analisis_id'], posteriores)
+        return datos
+    
+    def _guardar_fase(self, resultado: Dict[str, Any], fase: str, datos: Any) -> None:
+        """Registra la salida de una fase completada."""
+        if settings.puntos_control:
+            obtener_puntos_control().guardar_fase(resultado['analisis_id'], fase, datos)
+    
+    def _cerrar_puntos_control(self, resultado: Dict[str, Any]) -> None:
+        """Descarta los puntos de control de un análisis que terminó sin errores."""
+        if not settings.puntos_control:
+            return
+        if resultado['exito'] and not resultado['errores']:
+            obtener_puntos_control().eliminar(resultado['analisis_id'])
+            get_workflow(reanudable=True).checkpointer.delete_thread(resultado['analisis_id'])
+        else:
+            self._log(f"[INFO] Puntos de control conservados: reanudar con POST /analisis/{resultado['analisis_id']}/reanudar")
+    
+    def _analizar_con_presupuesto(self, presupuesto: PresupuestoAnalisis, *args) -> Dict[str, Any]:
+        """Ejecuta _analizar con el presupuesto activo y lo reporta en el resultado."""
+        with usar_presupuesto(presupuesto):
+            resultado = self._analizar(*args)
+        resultado['presupuesto'] = presupuesto.resumen()
+        if presupuesto.degradaciones:
+            self._log(f"[WARN] Degradaciones por presupuesto: {[d['etapa'] for d in presupuesto.degradaciones]}")
+        return resultado
+    
+    @staticmethod
+    def estadisticas_carga() -> Dict[str, Any]:
+        """
+        Estado de carga del proceso: análisis en curso y gobernador LLM.
+        
+        Returns:
+            dict con analisis_en_curso, analisis (ejecutados/compartidos), llm
+            cobertura (solicitudes de respaldo), circuito (estado del proveedor)
+            y cache_canonico (aciertos por forma canónica)
+        """
+        return {
+            'analisis_en_curso': _vuelos_analisis.en_curso(),
+            'analisis': _vuelos_analisis.estadisticas(),
+            'llm': obtener_gobernador().estadisticas(),
+            'cobertura': obtener_cobertura().estadisticas(),
+            'circuito': obtener_circuito().estadisticas(),
+            'cache_canonico': obtener_cache_canonico().estadisticas(),
+        }
+    
+    @staticmethod
+    def _normalizar_entrada(entrada: Optional[str]) -> str:
+        """Normaliza la entrada para la clave de coalescencia."""
+        if not entrada:
+            return ""
+        lineas = (normalizar_linea(linea) for linea in entrada.split("\n"))
+        return "\n".join(linea for linea in lineas if linea)
+    
+    def _analizar(
+        self,
+        entrada: Optional[str],
+        tipo_entrada: str,
+        archivo_path: Optional[str],
+        auto_corregir: bool,
+        analisis_previo_id: Optional[str],
+        analisis_id: str
+    ) -> Dict[str, Any]:
+        """Ejecuta el flujo completo (ver analizar)."""
         resultado = {
+            'analisis_id': analisis_id,
+            'fases_restauradas': [],
+            'fases_cache': [],
+            'analisis_similar': None,
+            'incremental': None,
             'exito': False,
             'fase_actual': None,
             'pseudocodigo_original': None,
@@ -142,13 +375,36 @@ class FlujoAnalisis:
                 self._log("FASE 2: TRADUCCIÓN DE LENGUAJE NATURAL")
                 self._log("="*80)
                 
-                resultado_traduccion = self.traductor.traducir(pseudocodigo)
+                resultado_traduccion = self._restaurar_fase(resultado, 'traduccion')
+                if resultado_traduccion is None:
+                    with MedirTiempo("traduccion"):
+                        resultado_traduccion = self.traductor.traducir(pseudocodigo)
+                    self._guardar_fase(resultado, 'traduccion', resultado_traduccion)
                 pseudocodigo = resultado_traduccion['pseudocodigo']
                 
                 self._log(f"[OK] Tipo detectado: {resultado_traduccion['tipo_detectado']}")
                 self._log(f"[OK] Ejemplos usados: {len(resultado_traduccion['ejemplos_usados'])}")
                 resultado['fase_actual'] = 'traduccion_completada'
             
+            # ==================== MODO INCREMENTAL ====================
+            previo = self._obtener_analisis_previo(analisis_previo_id)
+            secciones = separar_subrutinas(pseudocodigo)
+            
+            if previo:
+                cambios = comparar_subrutinas(previo['subrutinas'], secciones['subrutinas'])
+                resultado['incremental'] = {
+                    'analisis_previo_id': analisis_previo_id,
+                    **cambios,
+                    'fases_reutilizadas': []
+                }
+                self._log(f"\n[INFO] Modo incremental respecto a {analisis_previo_id}")
+                self._log(f"   • Sin cambios: {cambios['sin_cambios']}")
+                self._log(f"   • Modificadas: {cambios['modificadas']} | Nuevas: {cambios['nuevas']} | Eliminadas: {cambios['eliminadas']}")
+            elif analisis_previo_id:
+                self._log(f"[WARN] Análisis previo {analisis_previo_id} no disponible, se ejecuta análisis completo")
+            
+            forma = self._forma_canonica(pseudocodigo)
+            
             # ==================== FASE 3: CLASIFICACIÓN ML ====================
             if self.clasificador:
                 self._log("\n" + "="*80)
@@ -156,7 +412,11 @@ class FlujoAnalisis:
                 self._log("="*80)
                 
                 try:
-                    clasificacion = self.clasificador.clasificar(pseudocodigo, top_n=3)
+                    clasificacion = self._desde_cache(resultado, 'clasificacion', forma)
+                    if clasificacion is None:
+                        with MedirTiempo("clasificacion"):
+                            clasificacion = self.clasificador.clasificar(pseudocodigo, top_n=3)
+                        self._a_cache('clasificacion', forma, clasificacion)
                     resultado['clasificacion'] = clasificacion
                     resultado['fase_actual'] = 'clasificacion_completada'
                     
@@ -174,10 +434,12 @@ class FlujoAnalisis:
             self._log("="*80)
             
             try:
-                flowchart_mermaid = self.generador_flowchart.generar(pseudocodigo)
-                resultado['flowchart'] = flowchart_mermaid
-                resultado['fase_actual'] = 'flowchart_generado'
-                self._log("[OK] Flowchart generado exitosamente")
+                if permite_opcional("flowchart"):
+                    with MedirTiempo("flowchart"):
+                        flowchart_mermaid = self.generador_flowchart.generar(pseudocodigo)
+                    resultado['flowchart'] = flowchart_mermaid
+                    resultado['fase_actual'] = 'flowchart_generado'
+                    self._log("[OK] Flowchart generado exitosamente")
             except Exception as e:
                 self._log(f"[WARN] Error generando flowchart: {str(e)}")
                 resultado['errores'].append(f"Flowchart: {str(e)}")
@@ -188,7 +450,11 @@ class FlujoAnalisis:
             self._log("FASE 4: VALIDACIÓN DE PSEUDOCÓDIGO")
             self._log("="*80)
             
-            validacion = self.validador.validar(pseudocodigo)
+            with MedirTiempo("validacion"):
+                if previo:
+                    validacion = self._validar_incremental(pseudocodigo, secciones, previo, resultado['incremental'])
+                else:
+                    validacion = self._validar(resultado, pseudocodigo, forma)
             resultado['validacion'] = validacion
             resultado['validacion_inicial'] = validacion
             resultado['fase_actual'] = 'validacion_completada'
@@ -211,7 +477,12 @@ class FlujoAnalisis:
                 self._log("FASE 5: CORRECCIÓN AUTOMÁTICA")
                 self._log("="*80)
                 
-                resultado_correccion = self.corrector.corregir(pseudocodigo, validacion)
+                resultado_correccion = self._restaurar_fase(resultado, 'correccion')
+                if resultado_correccion is None:
+                    with MedirTiempo("correccion"):
+                        resultado_correccion = self.corrector.corregir(pseudocodigo, validacion)
+                    if resultado_correccion['corregido']:
+                        self._guardar_fase(resultado, 'correccion', resultado_correccion)
                 resultado['correccion'] = resultado_correccion
                 
                 if resultado_correccion['corregido']:
@@ -222,10 +493,19 @@ class FlujoAnalisis:
                         self._log(f"   {resultado_correccion['explicacion']}")
                     
                     # Re-validar
-                    validacion = self.validador.validar(pseudocodigo)
+                    forma = self._forma_canonica(pseudocodigo)
+                    with MedirTiempo("validacion"):
+                        validacion = self._validar(resultado, pseudocodigo, forma)
                     resultado['validacion'] = validacion
                     resultado['fase_actual'] = 'correccion_completada'
                     
+                    # El código corregido es el que se compara con el análisis previo
+                    secciones = separar_subrutinas(pseudocodigo)
+                    if previo:
+                        resultado['incremental'].update(
+                            comparar_subrutinas(previo['subrutinas'], secciones['subrutinas'])
+                        )
+                    
                     self._log(f"\n[OK] Re-validación: {'EXITOSA [OK]' if validacion['valido_general'] else 'AÚN CON ERRORES [WARN]'}")
                     self._log(f"[STATS] Errores restantes: {validacion['resumen']['errores_totales']}")
                 else:
@@ -241,193 +521,29 @@ class FlujoAnalisis:
                 resultado['errores'].append(f"Pseudocódigo inválido: {validacion['resumen']['errores_totales']} errores")
                 return resultado
             
-            # ==================== FASE 6: ANÁLISIS DE COSTOS ====================
-            self._log("\n" + "="*80)
-            self._log("FASE 6: ANÁLISIS DE COSTOS POR LÍNEA")
-            self._log("="*80)
-            
-            # Ejecutar workflow del analizador si el código es válido
-            try:
-                # Preparar estado inicial para el workflow
-                is_iterative = validacion['tipo_algoritmo'] == 'Iterativo'
-                algorithm_name = validacion.get('algorithm_name', 'algoritmo')
-                parameters = validacion.get('parameters', {})
-                
-                self._log(f"[INFO] Algoritmo: {algorithm_name}")
-                self._log(f"[INFO] Tipo: {validacion['tipo_algoritmo']}")
-                self._log(f"[INFO] Parámetros: {parameters}")
-                
-                # Crear estado inicial
-                initial_state = ScenarioState(
-                    pseudocode=pseudocodigo,
-                    algorithm_name=algorithm_name,
-                    is_iterative=is_iterative,
-                    parameters=parameters
-                )
-                
-                # Obtener y ejecutar workflow
-                self._log("[WAIT] Ejecutando workflow de análisis de costos...")
-                workflow = get_workflow()
-                workflow_result = workflow.invoke(initial_state)
-                
-                # Extraer tabla omega del resultado
-                if workflow_result.get('omega_table'):
-                    resultado['omega_table'] = workflow_result['omega_table']
-                    resultado['costos_por_linea'] = workflow_result['omega_table'].model_dump()
-                    self._log("[OK] Tabla Omega generada exitosamente")
-                    self._log(f"[STATS] Escenarios analizados: {len(workflow_result['omega_table'].scenarios)}")
+            # Resultados del LLM por subrutina, para el próximo reenvío incremental
+            resultados_subrutinas = previo.get('resultados_subrutinas', {}) if previo else {}
+            reutilizadas = (previo and not hay_cambios_estructurales(resultado['incremental'])
+                            and self._reutilizar_fases_costos(previo, pseudocodigo, resultado))
+            if not reutilizadas:
+                fases_costos = self._desde_cache(resultado, 'fases_costos', forma)
+                if fases_costos is not None:
+                    resultado.update(fases_costos)
+                    resultado['fase_actual'] = 'resolucion_completada'
                 else:
-                    self._log("[WARN] No se pudo generar tabla Omega")
-                    
-                resultado['fase_actual'] = 'analisis_costos_completado'
-                
-            except Exception as e:
-                self._log(f"[ERROR] Error en análisis de costos: {str(e)}")
-                resultado['errores'].append(f"Error en análisis de costos: {str(e)}")
-                resultado['fase_actual'] = 'analisis_costos_error'
-            
-            # ==================== FASE 7: REPRESENTACIÓN MATEMÁTICA ====================
-            self._log("\n" + "="*80)
-            self._log("FASE 7: REPRESENTACIÓN MATEMÁTICA")
-            self._log("="*80)
-            
-            # Generar ecuaciones matemáticas desde el análisis completo
-            if resultado.get('omega_table'):
-                try:
-                    # Extraer información completa del workflow_result
-                    workflow_data = {
-                        'pseudocode': pseudocodigo,
-                        'algorithm_name': algorithm_name,
-                        'is_iterative': is_iterative,
-                        'parameters': parameters,
-                        'lines': workflow_result.get('lines', []),
-                        'loops': workflow_result.get('loops', []),
-                        'recursive_calls': workflow_result.get('recursive_calls', []),
-                        'is_recursive': not is_iterative,
-                        'control_variables': workflow_result.get('control_variables', []),
-                        'raw_scenarios': workflow_result.get('raw_scenarios', []),
-                        'llm_analysis': workflow_result.get('llm_analysis', {}),
-                        'omega_table': resultado['omega_table']
-                    }
-                    
-                    # Crear request con toda la información del análisis
-                    math_request = MathRepresentationRequest(
-                        omega_table=resultado['omega_table'],
-                        algorithm_name=algorithm_name,
-                        is_iterative=is_iterative,
-                        workflow_data=workflow_data
-                    )
-                    
-                    self._log("[WAIT] Generando ecuaciones matemáticas desde Tabla Omega...")
-                    math_response = self.agente_matematicas.generar_ecuaciones(math_request)
-                    
-                    # Guardar ecuaciones para FASE 8
-                    ecuaciones = {
-                        'mejor_caso': math_response.mejor_caso,
-                        'caso_promedio': math_response.caso_promedio,
-                        'peor_caso': math_response.peor_caso
-                    }
-                    
-                    # Guardar también ecuaciones matemáticas originales sin resolver
-                    ecuaciones_matematicas = {
-                        'mejor_caso': math_response.mejor_caso,
-                        'caso_promedio': math_response.caso_promedio,
-                        'peor_caso': math_response.peor_caso,
-                        'ecuaciones_iguales': math_response.ecuaciones_iguales,
-                        'casos_base': math_response.casos_base
-                    }
-                    
-                    resultado['ecuaciones'] = ecuaciones
-                    resultado['ecuaciones_matematicas'] = ecuaciones_matematicas
-                    resultado['ecuaciones_detalle'] = math_response.model_dump()
-                    
-                    self._log("[OK] Ecuaciones generadas exitosamente")
-                    self._log(f"[OUTPUT] Mejor caso: {math_response.mejor_caso}")
-                    self._log(f"[OUTPUT] Caso promedio: {math_response.caso_promedio}")
-                    self._log(f"[OUTPUT] Peor caso: {math_response.peor_caso}")
-                    
-                    resultado['fase_actual'] = 'representacion_matematica_completada'
-                    
-                except Exception as e:
-                    self._log(f"[ERROR] Error en representación matemática: {str(e)}")
-                    resultado['errores'].append(f"Error en representación matemática: {str(e)}")
-                    ecuaciones = self._generar_ecuaciones_fallback(validacion['tipo_algoritmo'])
-                    resultado['fase_actual'] = 'representacion_matematica_error'
-            else:
-                self._log("[WARN] No hay tabla omega, usando ecuaciones de fallback")
-                ecuaciones = self._generar_ecuaciones_fallback(validacion['tipo_algoritmo'])
-                resultado['fase_actual'] = 'omega_no_disponible'
-            
-            # ==================== FASE 8: RESOLUCIÓN ====================
-            self._log("\n" + "="*80)
-            self._log("FASE 8: RESOLUCIÓN DE ECUACIONES")
-            self._log("="*80)
-            
-            # Resolver las ecuaciones generadas en FASE 7
-            self._log(f"[INFO] Resolviendo ecuaciones...")
-            complejidades = self.resolver.resolver_casos(ecuaciones)
-            
-            # Extraer pasos de resolución para el reporte
-            pasos_resolucion = {}
-            for caso in ['mejor_caso', 'caso_promedio', 'peor_caso']:
-                if complejidades[caso] and complejidades[caso]['exito']:
-                    pasos_resolucion[caso] = {
-                        'ecuacion': complejidades[caso]['ecuacion_original'],
-                        'metodo': complejidades[caso]['metodo_usado'],
-                        'pasos': complejidades[caso]['pasos'],
-                        'explicacion': complejidades[caso]['explicacion'],
-                        'solucion': complejidades[caso]['solucion'],
-                        'diagrama_mermaid': complejidades[caso].get('diagrama_mermaid')  # Extraer diagrama si existe
-                    }
-            
-            # Guardar ecuaciones y pasos en el resultado
-            complejidades['ecuaciones'] = ecuaciones
-            complejidades['pasos_resolucion'] = pasos_resolucion
-            complejidades['metodo_usado'] = complejidades.get('mejor_caso', {}).get('metodo_usado', 'No especificado')
-            complejidades['algorithm_name'] = algorithm_name
-            
-            # Agregar ecuaciones matemáticas originales (sin resolver) al resultado de complejidades
-            if 'ecuaciones_matematicas' in resultado:
-                complejidades['ecuaciones_matematicas'] = resultado['ecuaciones_matematicas']
-            
-            # Agregar derivación caso promedio si existe
-            if resultado.get('ecuaciones_detalle'):
-                complejidades['derivacion_caso_promedio'] = resultado['ecuaciones_detalle'].get('derivacion_caso_promedio', '')
-            
-            resultado['complejidades'] = complejidades
-            resultado['fase_actual'] = 'resolucion_completada'
-            
-            self._log("\n[STATS] COMPLEJIDADES CALCULADAS:")
-            self._log(f"   Mejor caso:    {complejidades['complejidades'].get('mejor_caso', 'N/A')}")
-            self._log(f"   Caso promedio: {complejidades['complejidades'].get('caso_promedio', 'N/A')}")
-            self._log(f"   Peor caso:     {complejidades['complejidades'].get('peor_caso', 'N/A')}")
-            
-            # ==================== FASE 8.5: VALIDACIÓN CON LLM ====================
-            self._log("\n" + "="*80)
-            self._log("FASE 8.5: VALIDACIÓN DE COMPLEJIDADES CON LLM")
-            self._log("="*80)
-            
-            try:
-                complejidades_para_validar = {
-                    'mejor_caso': complejidades['complejidades'].get('mejor_caso', 'N/A'),
-                    'caso_promedio': complejidades['complejidades'].get('caso_promedio', 'N/A'),
-                    'peor_caso': complejidades['complejidades'].get('peor_caso', 'N/A')
-                }
-                
-                self._log("[WAIT] Validando complejidades con LLM...")
-                validacion_resultado = self.validador_complejidades.validar_complejidades(
-                    pseudocodigo=pseudocodigo,
-                    complejidades_sistema=complejidades_para_validar,
-                    algorithm_name=algorithm_name
-                )
-                
-                resultado['validacion_complejidades'] = validacion_resultado
-                self._log(f"[OK] Validación completada - Concordancia: {validacion_resultado['concordancia']}")
-                self._log(f"[OK] Confianza: {validacion_resultado['confianza']:.0%}")
-                
-            except Exception as e:
-                self._log(f"[WARN] Error en validación con LLM: {str(e)}")
-                resultado['errores'].append(f"Validación LLM: {str(e)}")
+                    errores, degradaciones = len(resultado['errores']), self._degradaciones()
+                    firma = self._firma_similitud(pseudocodigo, forma)
+                    with usar_referencia(self._buscar_similar(resultado, firma), validacion.get('algorithm_name')), \
+                            reuse_subroutine_results(resultados_subrutinas) as resultados_subrutinas:
+                        self._ejecutar_fases_costos(pseudocodigo, validacion, resultado)
+                    if previo:
+                        self._registrar_subrutinas_reutilizadas(resultado, resultados_subrutinas)
+                    if self._fases_costos_completas(resultado, errores, degradaciones):
+                        self._a_cache('fases_costos', forma, {
+                            clave: resultado[clave] for clave in self._CLAVES_FASES_COSTOS if clave in resultado
+                        })
+                        if firma is not None:
+                            obtener_indice_similitud().agregar(resultado['analisis_id'], firma, referencia_de(resultado))
             
             # ==================== FASE 9: GENERACIÓN DE REPORTE ====================
             self._log("\n" + "="*80)
@@ -438,7 +554,8 @@ class FlujoAnalisis:
             
             try:
                 # Generar reporte completo con árboles y diagramas
-                reporte_completo = self.reportador.generar_reporte_completo(resultado)
+                with MedirTiempo("reporte"):
+                    reporte_completo = self.reportador.generar_reporte_completo(resultado)
                 resultado['reporte_markdown'] = reporte_completo.get('markdown', '')
                 
                 # Guardar el reporte en un archivo .md
@@ -462,14 +579,513 @@ class FlujoAnalisis:
             resultado['exito'] = True
             resultado['fase_actual'] = 'completado'
             
+            self._guardar_analisis(resultado, secciones, resultados_subrutinas)
+            self._cerrar_puntos_control(resultado)
+            
             return resultado
             
         except Exception as e:
             self._log(f"\n[ERROR] ERROR EN FASE: {resultado['fase_actual']}")
             self._log(f"   {type(e).__name__}: {str(e)}")
             resultado['errores'].append(f"{type(e).__name__}: {str(e)}")
+            self._cerrar_puntos_control(resultado)
             return resultado
     
+    def _ejecutar_fases_costos(
+        self,
+        pseudocodigo: str,
+        validacion: Dict[str, Any],
+        resultado: Dict[str, Any]
+    ) -> None:
+        """
+        Ejecuta las fases 6 a 8.5 (costos, representación, resolución y
+        validación de complejidades) y actualiza `resultado` en sitio.
+
+        Args:
+            pseudocodigo: Pseudocódigo ya validado
+            validacion: Resultado de la validación
+            resultado: Dict de resultados del flujo
+        """
+        # ==================== FASE 6: ANÁLISIS DE COSTOS ====================
+        self._log("\n" + "="*80)
+        self._log("FASE 6: ANÁLISIS DE COSTOS POR LÍNEA")
+        self._log("="*80)
+        
+        # Ejecutar workflow del analizador si el código es válido
+        try:
+            # Preparar estado inicial para el workflow
+            is_iterative = validacion['tipo_algoritmo'] == 'Iterativo'
+            algorithm_name = validacion.get('algorithm_name', 'algoritmo')
+            parameters = validacion.get('parameters', {})
+            
+            self._log(f"[INFO] Algoritmo: {algorithm_name}")
+            self._log(f"[INFO] Tipo: {validacion['tipo_algoritmo']}")
+            self._log(f"[INFO] Parámetros: {parameters}")
+            
+            # Crear estado inicial
+            initial_state = ScenarioState(
+                pseudocode=pseudocodigo,
+                algorithm_name=algorithm_name,
+                is_iterative=is_iterative,
+                parameters=parameters,
+                algorithm_category=(resultado.get('clasificacion') or {}).get('categoria_principal')
+            )
+            
+            workflow_result = self._restaurar_fase(resultado, 'analisis_costos')
+            if workflow_result is None:
+                self._log("[WAIT] Ejecutando workflow de análisis de costos...")
+                with MedirTiempo("workflow"):
+                    workflow_result = self._ejecutar_workflow(initial_state, resultado['analisis_id'])
+                if workflow_result.get('omega_table'):
+                    self._guardar_fase(resultado, 'analisis_costos', {
+                        clave: workflow_result.get(clave) for clave in self._CLAVES_WORKFLOW
+                    })
+                    if settings.puntos_control:
+                        # El hilo del workflow ya no hace falta: la fase quedó guardada completa
+                        get_workflow(reanudable=True).checkpointer.delete_thread(resultado['analisis_id'])
+            
+            # Extraer tabla omega del resultado
+            if workflow_result.get('omega_table'):
+                resultado['omega_table'] = workflow_result['omega_table']
+                resultado['costos_por_linea'] = workflow_result['omega_table'].model_dump()
+                self._log("[OK] Tabla Omega generada exitosamente")
+                self._log(f"[STATS] Escenarios analizados: {len(workflow_result['omega_table'].scenarios)}")
+            else:
+                self._log("[WARN] No se pudo generar tabla Omega")
+                
+            resultado['fase_actual'] = 'analisis_costos_completado'
+            
+        except Exception as e:
+            self._log(f"[ERROR] Error en análisis de costos: {str(e)}")
+            resultado['errores'].append(f"Error en análisis de costos: {str(e)}")
+            resultado['fase_actual'] = 'analisis_costos_error'
+        
+        # ==================== FASE 7: REPRESENTACIÓN MATEMÁTICA ====================
+        self._log("\n" + "="*80)
+        self._log("FASE 7: REPRESENTACIÓN MATEMÁTICA")
+        self._log("="*80)
+        
+        # Generar ecuaciones matemáticas desde el análisis completo
+        representacion = self._restaurar_fase(resultado, 'representacion')
+        if representacion is not None:
+            resultado.update(representacion)
+            ecuaciones = representacion['ecuaciones']
+            resultado['fase_actual'] = 'representacion_matematica_completada'
+        elif resultado.get('omega_table'):
+            try:
+                # Extraer información completa del workflow_result
+                workflow_data = {
+                    'pseudocode': pseudocodigo,
+                    'algorithm_name': algorithm_name,
+                    'is_iterative': is_iterative,
+                    'parameters': parameters,
+                    'lines': workflow_result.get('lines', []),
+                    'loops': workflow_result.get('loops', []),
+                    'recursive_calls': workflow_result.get('recursive_calls', []),
+                    'is_recursive': not is_iterative,
+                    'control_variables': workflow_result.get('control_variables', []),
+                    'raw_scenarios': workflow_result.get('raw_scenarios', []),
+                    'llm_analysis': workflow_result.get('llm_analysis', {}),
+                    'omega_table': resultado['omega_table']
+                }
+                
+                # Crear request con toda la información del análisis
+                math_request = MathRepresentationRequest(
+                    omega_table=resultado['omega_table'],
+                    algorithm_name=algorithm_name,
+                    is_iterative=is_iterative,
+                    workflow_data=workflow_data
+                )
+                
+                self._log("[WAIT] Generando ecuaciones matemáticas desde Tabla Omega...")
+                with MedirTiempo("representacion"):
+                    math_response = self.agente_matematicas.generar_ecuaciones(math_request)
+                
+                # Guardar ecuaciones para FASE 8
+                ecuaciones = {
+                    'mejor_caso': math_response.mejor_caso,
+                    'caso_promedio': math_response.caso_promedio,
+                    'peor_caso': math_response.peor_caso
+                }
+                
+                # Guardar también ecuaciones matemáticas originales sin resolver
+                ecuaciones_matematicas = {
+                    'mejor_caso': math_response.mejor_caso,
+                    'caso_promedio': math_response.caso_promedio,
+                    'peor_caso': math_response.peor_caso,
+                    'ecuaciones_iguales': math_response.ecuaciones_iguales,
+                    'casos_base': math_response.casos_base
+                }
+                
+                resultado['ecuaciones'] = ecuaciones
+                resultado['ecuaciones_matematicas'] = ecuaciones_matematicas
+                resultado['ecuaciones_detalle'] = math_response.model_dump()
+                self._guardar_fase(resultado, 'representacion', {
+                    clave: resultado[clave]
+                    for clave in ('ecuaciones', 'ecuaciones_matematicas', 'ecuaciones_detalle')
+                })
+                
+                self._log("[OK] Ecuaciones generadas exitosamente")
+                self._log(f"[OUTPUT] Mejor caso: {math_response.mejor_caso}")
+                self._log(f"[OUTPUT] Caso promedio: {math_response.caso_promedio}")
+                self._log(f"[OUTPUT] Peor caso: {math_response.peor_caso}")
+                
+                resultado['fase_actual'] = 'representacion_matematica_completada'
+                
+            except Exception as e:
+                self._log(f"[ERROR] Error en representación matemática: {str(e)}")
+                resultado['errores'].append(f"Error en representación matemática: {str(e)}")
+                ecuaciones = self._generar_ecuaciones_fallback(validacion['tipo_algoritmo'])
+                resultado['fase_actual'] = 'representacion_matematica_error'
+        else:
+            self._log("[WARN] No hay tabla omega, usando ecuaciones de fallback")
+            ecuaciones = self._generar_ecuaciones_fallback(validacion['tipo_algoritmo'])
+            resultado['fase_actual'] = 'omega_no_disponible'
+        
+        # ==================== FASE 8: RESOLUCIÓN ====================
+        self._log("\n" + "="*80)
+        self._log("FASE 8: RESOLUCIÓN DE ECUACIONES")
+        self._log("="*80)
+        
+        # Resolver las ecuaciones generadas en FASE 7
+        self._log(f"[INFO] Resolviendo ecuaciones...")
+        with MedirTiempo("resolucion"):
+            complejidades = self.resolver.resolver_casos(ecuaciones)
+        
+        # Extraer pasos de resolución para el reporte
+        pasos_resolucion = {}
+        for caso in ['mejor_caso', 'caso_promedio', 'peor_caso']:
+            if complejidades[caso] and complejidades[caso]['exito']:
+                pasos_resolucion[caso] = {
+                    'ecuacion': complejidades[caso]['ecuacion_original'],
+                    'metodo': complejidades[caso]['metodo_usado'],
+                    'pasos': complejidades[caso]['pasos'],
+                    'explicacion': complejidades[caso]['explicacion'],
+                    'solucion': complejidades[caso]['solucion'],
+                    'diagrama_mermaid': complejidades[caso].get('diagrama_mermaid')  # Extraer diagrama si existe
+                }
+        
+        # Guardar ecuaciones y pasos en el resultado
+        complejidades['ecuaciones'] = ecuaciones
+        complejidades['pasos_resolucion'] = pasos_resolucion
+        complejidades['metodo_usado'] = complejidades.get('mejor_caso', {}).get('metodo_usado', 'No especificado')
+        complejidades['algorithm_name'] = algorithm_name
+        
+        # Agregar ecuaciones matemáticas originales (sin resolver) al resultado de complejidades
+        if 'ecuaciones_matematicas' in resultado:
+            complejidades['ecuaciones_matematicas'] = resultado['ecuaciones_matematicas']
+        
+        # Agregar derivación caso promedio si existe
+        if resultado.get('ecuaciones_detalle'):
+            complejidades['derivacion_caso_promedio'] = resultado['ecuaciones_detalle'].get('derivacion_caso_promedio', '')
+        
+        resultado['complejidades'] = complejidades
+        resultado['fase_actual'] = 'resolucion_completada'
+        
+        self._log("\n[STATS] COMPLEJIDADES CALCULADAS:")
+        self._log(f"   Mejor caso:    {complejidades['complejidades'].get('mejor_caso', 'N/A')}")
+        self._log(f"   Caso promedio: {complejidades['complejidades'].get('caso_promedio', 'N/A')}")
+        self._log(f"   Peor caso:     {complejidades['complejidades'].get('peor_caso', 'N/A')}")
+        
+        # ==================== FASE 8.5: VALIDACIÓN CON LLM ====================
+        self._log("\n" + "="*80)
+        self._log("FASE 8.5: VALIDACIÓN DE COMPLEJIDADES CON LLM")
+        self._log("="*80)
+        
+        validacion_resultado = self._restaurar_fase(resultado, 'validacion_complejidades')
+        if validacion_resultado is not None:
+            resultado['validacion_complejidades'] = validacion_resultado
+            return
+        
+        if not (permite_opcional("validacion_complejidades") and llm_disponible("validacion_complejidades")):
+            return
+        
+        try:
+            complejidades_para_validar = {
+                'mejor_caso': complejidades['complejidades'].get('mejor_caso', 'N/A'),
+                'caso_promedio': complejidades['complejidades'].get('caso_promedio', 'N/A'),
+                'peor_caso': complejidades['complejidades'].get('peor_caso', 'N/A')
+            }
+            
+            self._log("[WAIT] Validando complejidades con LLM...")
+            with MedirTiempo("validacion_complejidades"):
+                validacion_resultado = self.validador_complejidades.validar_complejidades(
+                    pseudocodigo=pseudocodigo,
+                    complejidades_sistema=complejidades_para_validar,
+                    algorithm_name=algorithm_name
+                )
+            
+            resultado['validacion_complejidades'] = validacion_resultado
+            self._guardar_fase(resultado, 'validacion_complejidades', validacion_resultado)
+            self._log(f"[OK] Validación completada - Concordancia: {validacion_resultado['concordancia']}")
+            self._log(f"[OK] Confianza: {validacion_resultado['confianza']:.0%}")
+            
+        except Exception as e:
+            self._log(f"[WARN] Error en validación con LLM: {str(e)}")
+            resultado['errores'].append(f"Validación LLM: {str(e)}")
+
+    # Fases con punto de control, en orden de ejecución
+    _FASES_REANUDABLES = (
+        'traduccion',
+        'correccion',
+        'analisis_costos',
+        'representacion',
+        'validacion_complejidades',
+    )
+    
+    # Claves del estado del workflow que usan las fases 6 y 7
+    _CLAVES_WORKFLOW = (
+        'omega_table',
+        'lines',
+        'loops',
+        'recursive_calls',
+        'control_variables',
+        'raw_scenarios',
+        'llm_analysis',
+    )
+    
+    def _ejecutar_workflow(self, initial_state: ScenarioState, analisis_id: str) -> Dict[str, Any]:
+        """
+        Ejecuta el workflow del analizador.
+        
+        Con puntos de control activos usa un hilo de LangGraph por análisis:
+        si un intento anterior se interrumpió entre nodos, continúa desde el
+        último nodo terminado en lugar de repetir los análisis LLM de casos.
+        """
+        if not settings.puntos_control:
+            return get_workflow().invoke(initial_state)
+        
+        workflow = get_workflow(reanudable=True)
+        config = {"configurable": {"thread_id": analisis_id}}
+        estado = workflow.get_state(config)
+        if estado.next:
+            self._log(f"[OK] Workflow retomado desde el nodo {estado.next[0]}")
+            return workflow.invoke(None, config, durability="sync")
+        if estado.values:
+            return estado.values
+        return workflow.invoke(initial_state, config, durability="sync")
+
+    def _obtener_analisis_previo(self, analisis_previo_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Recupera el registro de un análisis previo exitoso.
+        
+        Returns:
+            Registro del almacén o None si no hay ID, no existe o no terminó
+        """
+        if not analisis_previo_id:
+            return None
+        return obtener_almacen().obtener(analisis_previo_id)
+    
+    def _validar_incremental(
+        self,
+        pseudocodigo: str,
+        secciones: Dict[str, Any],
+        previo: Dict[str, Any],
+        incremental: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Valida solo las subrutinas que cambiaron respecto al análisis previo.
+        
+        Las subrutinas sin cambios ya fueron validadas; se reemplazan por un
+        stub con su encabezado para que el validador siga conociendo sus
+        nombres. Si se eliminó alguna subrutina se valida el programa completo,
+        porque puede cambiar el algoritmo principal o la recursión.
+        
+        Returns:
+            Resultado de validación con el mismo formato de servicioValidador
+        """
+        if not hay_cambios_estructurales(incremental):
+            self._log("[OK] Ninguna subrutina cambió: se reutiliza la validación previa")
+            incremental['fases_reutilizadas'].append('validacion')
+            return previo['validacion']
+        
+        if incremental['eliminadas']:
+            return self.validador.validar(pseudocodigo)
+        
+        afectadas = incremental['modificadas'] + incremental['nuevas']
+        self._log(f"[INFO] Re-validando solo: {afectadas}")
+        validacion = self.validador.validar(construir_programa_parcial(secciones, afectadas))
+        
+        # Los stubs no contienen CALLs: restaurar la recursión de bloques sin cambios
+        if any(sub['es_recursiva'] for sub in secciones['subrutinas'] if sub['nombre'] not in afectadas):
+            validacion['tipo_algoritmo'] = 'Recursivo'
+        validacion['resumen']['total_lineas'] = len(secciones['clases']) + sum(
+            len(sub['lineas']) for sub in secciones['subrutinas']
+        )
+        incremental['fases_reutilizadas'].append('validacion_parcial')
+        
+        return validacion
+    
+    def _reutilizar_fases_costos(
+        self,
+        previo: Dict[str, Any],
+        pseudocodigo: str,
+        resultado: Dict[str, Any]
+    ) -> bool:
+        """
+        Copia al resultado las fases 6 a 8.5 del análisis previo.
+        
+        Solo se usa cuando ninguna subrutina cambió estructuralmente, por lo que
+        la Tabla Omega, las ecuaciones y las complejidades siguen siendo válidas.
+        Si el texto cambió solo en comentarios, líneas en blanco o espacios, los
+        costos línea por línea se renumeran al programa nuevo.
+        
+        Returns:
+            False si no se pudo renumerar (las fases deben recalcularse)
+        """
+        fases = {
+            clave: previo['resultado'][clave] for clave in self._CLAVES_FASES_COSTOS if clave in previo['resultado']
+        }
+        if pseudocodigo != previo['pseudocodigo']:
+            lineales = renumerar(
+                {clave: fases[clave] for clave in ('omega_table', 'costos_por_linea') if clave in fases},
+                previo['pseudocodigo'],
+                pseudocodigo,
+            )
+            if lineales is None:
+                self._log("[WARN] No se pudo renumerar la Tabla Omega previa: se recalculan las fases 6-8.5")
+                return False
+            fases.update(lineales)
+        
+        self._log("\n" + "="*80)
+        self._log("FASES 6-8.5: REUTILIZADAS DEL ANÁLISIS PREVIO")
+        self._log("="*80)
+        
+        resultado.update(fases)
+        resultado['incremental']['fases_reutilizadas'].extend(
+            ['analisis_costos', 'representacion_matematica', 'resolucion', 'validacion_complejidades']
+        )
+        resultado['fase_actual'] = 'resolucion_completada'
+        self._log("[OK] Sin cambios estructurales: no se invoca el LLM")
+        return True
+    
+    def _registrar_subrutinas_reutilizadas(
+        self,
+        resultado: Dict[str, Any],
+        resultados_subrutinas: Dict[str, Dict[str, Any]]
+    ) -> None:
+        """
+        Anota qué subrutinas sin cambios no volvieron a pasar por el LLM.
+
+        El análisis de costos reutiliza los resultados por subrutina del
+        análisis previo (reuse_subroutine_results); las fases 7 a 8.5 se
+        recalculan porque el costo compuesto del programa cambió.
+        """
+        omega = resultado.get('omega_table')
+        reutilizadas = set()
+        for analisis in ((omega.metadata.get('llm_analysis') if omega else None) or {}).values():
+            reutilizadas.update(
+                nombre for nombre, costo in (analisis or {}).get('subroutine_costs', {}).items()
+                if costo['from_cache']
+            )
+        resultado['incremental']['subrutinas_reutilizadas'] = sorted(reutilizadas)
+        if reutilizadas:
+            resultado['incremental']['fases_reutilizadas'].append('analisis_costos_parcial')
+            self._log(f"[OK] Costos reutilizados del análisis previo: {sorted(reutilizadas)}")
+        self._log(f"[INFO] Re-analizadas con el LLM: {resultado['incremental']['modificadas'] + resultado['incremental']['nuevas']}")
+    
+    # Claves del resultado producidas por las fases 6 a 8.5
+    _CLAVES_FASES_COSTOS = (
+        'omega_table',
+        'costos_por_linea',
+        'ecuaciones',
+        'ecuaciones_matematicas',
+        'ecuaciones_detalle',
+        'complejidades',
+        'validacion_complejidades',
+    )
+    
+    @staticmethod
+    def _forma_canonica(pseudocodigo: str) -> Optional[Dict[str, Any]]:
+        """Forma canónica del programa (None si el caché canónico está desactivado)."""
+        return canonizar(pseudocodigo) if settings.cache_canonico else None
+    
+    def _desde_cache(self, resultado: Dict[str, Any], etapa: str, forma: Optional[Dict[str, Any]]) -> Optional[Any]:
+        """Resultado de la etapa para un programa equivalente, con los nombres del usuario."""
+        if forma is None:
+            return None
+        valor = obtener_cache_canonico().obtener(etapa, forma)
+        if valor is not None:
+            resultado['fases_cache'].append(etapa)
+            self._log(f"[OK] Fase '{etapa}' reutilizada de un programa equivalente")
+        return valor
+    
+    @staticmethod
+    def _a_cache(etapa: str, forma: Optional[Dict[str, Any]], valor: Any) -> None:
+        """Registra el resultado de una etapa para los programas equivalentes."""
+        if forma is not None:
+            obtener_cache_canonico().guardar(etapa, forma, valor)
+    
+    def _validar(self, resultado: Dict[str, Any], pseudocodigo: str, forma: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Valida el programa reutilizando la validación de uno equivalente.
+        
+        Solo se reutilizan validaciones exitosas (los errores citan líneas y
+        la grafía original) y si las palabras reservadas ya venían con la
+        grafía de la gramática, que el validador distingue.
+        """
+        if forma is not None and not forma['exacta']:
+            forma = None
+        validacion = self._desde_cache(resultado, 'validacion', forma)
+        if validacion is None:
+            validacion = self.validador.validar(pseudocodigo)
+            if validacion['valido_general']:
+                self._a_cache('validacion', forma, validacion)
+        return validacion
+    
+    @staticmethod
+    def _firma_similitud(pseudocodigo: str, forma: Optional[Dict[str, Any]]) -> Optional[Any]:
+        """Firma MinHash de la forma canónica (None si el índice de similares está desactivado)."""
+        if not settings.similitud:
+            return None
+        return obtener_indice_similitud().firma((forma or canonizar(pseudocodigo))['texto'])
+    
+    def _buscar_similar(self, resultado: Dict[str, Any], firma: Optional[Any]) -> Optional[Dict[str, Any]]:
+        """Análisis ya completado más parecido a este programa (por encima del umbral)."""
+        if firma is None:
+            return None
+        vecino = obtener_indice_similitud().buscar(
+            firma, umbral=settings.similitud_umbral, excluir=resultado['analisis_id']
+        )
+        if vecino is not None:
+            resultado['analisis_similar'] = {'analisis_id': vecino['analisis_id'], 'similitud': vecino['similitud']}
+            self._log(f"[INFO] Referencia: análisis {vecino['analisis_id']} (similitud {vecino['similitud']:.0%})")
+        return vecino
+    
+    @staticmethod
+    def _degradaciones() -> int:
+        presupuesto = presupuesto_actual()
+        return len(presupuesto.degradaciones) if presupuesto else 0
+    
+    def _fases_costos_completas(self, resultado: Dict[str, Any], errores: int, degradaciones: int) -> bool:
+        """True si las fases 6-8.5 terminaron sin errores, degradaciones ni escenarios heurísticos."""
+        omega = resultado.get('omega_table')
+        return (
+            omega is not None
+            and len(resultado['errores']) == errores
+            and self._degradaciones() == degradaciones
+            and not any(escenario.id.endswith('_fallback') for escenario in omega.scenarios)
+        )
+    
+    def _guardar_analisis(
+        self,
+        resultado: Dict[str, Any],
+        secciones: Dict[str, Any],
+        resultados_subrutinas: Dict[str, Dict[str, Any]]
+    ) -> None:
+        """Registra un análisis exitoso para futuros reenvíos incrementales."""
+        obtener_almacen().guardar(resultado['analisis_id'], {
+            'pseudocodigo': resultado['pseudocodigo_validado'],
+            'subrutinas': secciones['subrutinas'],
+            'validacion': resultado['validacion'],
+            'resultados_subrutinas': resultados_subrutinas,
+            'resultado': {
+                clave: resultado[clave]
+                for clave in self._CLAVES_FASES_COSTOS
+                if clave in resultado
+            }
+        })
+    
     def analizar_desde_archivo(self, archivo_path: str, auto_corregir: bool = True) -> Dict[str, Any]:
         """
         Args:
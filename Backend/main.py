@@ -14,8 +14,6 @@ import sys
 import logging
 from pathlib import Path
 
-from flujo_analisis import FlujoAnalisis
-
 
 def configurar_logging_completo():
     """Configura logging para mostrar TODO sin filtros"""
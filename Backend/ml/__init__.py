@@ -2,6 +2,7 @@
 Módulo de Machine Learning para clasificación de algoritmos
 """
 
+from .bundle import BundleClasificador, exportar_bundle
 from .clasificador import ClasificadorAlgoritmos, obtener_clasificador
 
-__all__ = ['ClasificadorAlgoritmos', 'obtener_clasificador']
+__all__ = ['BundleClasificador', 'ClasificadorAlgoritmos', 'exportar_bundle', 'obtener_clasificador']
@@ -0,0 +1,386 @@
+"""
+Bundle del Clasificador
+=======================
+
+Un único archivo con todo lo que el clasificador necesita en producción
+(vocabulario e IDF del TF-IDF, vectores de soporte, coeficientes e
+interceptos del SVM y la calibración de probabilidades, o los coeficientes
+de un modelo lineal), en lugar de tres pickles de scikit-learn.
+
+- Se carga con mmap de solo lectura: los arreglos son vistas sobre las
+  páginas del archivo, no copias. Todos los workers (forkeados antes o
+  después de cargar) comparten esas páginas del page cache, así el modelo
+  ocupa memoria física una sola vez
+- La inferencia es numpy puro: no importa scikit-learn ni scipy y no
+  depende de la versión de scikit-learn con la que se entrenó
+- El vocabulario se guarda como hashes de 64 bits ordenados (búsqueda con
+  np.searchsorted sobre el mapeo, sin construir un dict por proceso)
+
+Formato (versión 2, little-endian; la 1 es la misma sin el campo 'modelo'
+y siempre con SVM):
+    8 bytes  firma b"ACBUNDLE"
+    4 bytes  versión del formato (uint32)
+    4 bytes  largo del encabezado (uint32)
+    N bytes  encabezado JSON: categorías, tipo de modelo, parámetros del
+             TF-IDF y del modelo y tabla de arreglos {nombre: {dtype, forma, offset}}
+    ...      arreglos, cada uno alineado a 64 bytes
+
+Reproduce SVC(kernel='rbf', probability=True) de libsvm: votación uno contra
+uno para la predicción y acoplamiento por pares (Wu, Lin y Weng) para las
+probabilidades. Los modelos lineales (LogisticRegression, SGDClassifier con
+log_loss y MultinomialNB) se guardan como coeficientes e interceptos: la
+decisión es un producto matriz-vector y las probabilidades, softmax o
+sigmoides uno contra el resto normalizadas, como en scikit-learn.
+"""
+
+import functools
+import hashlib
+import json
+import mmap
+import re
+import struct
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+
+FIRMA = b"ACBUNDLE"
+VERSION = 2
+VERSIONES_SOPORTADAS = (1, 2)
+
+_ENCABEZADO = struct.Struct("<8sII")
+_ALINEACION = 64
+
+# Probabilidad mínima por par, como libsvm (svm.cpp)
+_MIN_PROB = 1e-7
+
+
+# Los n-gramas se repiten mucho entre solicitudes (palabras reservadas, el mismo
+# programa validado mientras se escribe): se memoiza el hash
+@functools.lru_cache(maxsize=1 << 16)
+def _hash_termino(termino: str) -> int:
+    return int.from_bytes(hashlib.blake2b(termino.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _ngramas(tokens: List[str], minimo: int, maximo: int) -> List[str]:
+    """N-gramas de palabras como TfidfVectorizer(analyzer='word')."""
+    return [
+        " ".join(tokens[i:i + n])
+        for n in range(minimo, maximo + 1)
+        for i in range(len(tokens) - n + 1)
+    ]
+
+
+def _arreglos_svc(modelo, n_terminos: int) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Vectores de soporte, coeficientes duales y calibración de un SVC con kernel rbf."""
+    # Vectores de soporte en CSR (son TF-IDF dispersos)
+    soporte = modelo.support_vectors_
+    if hasattr(soporte, 'tocsr'):
+        soporte = soporte.tocsr()
+        inicios, columnas, valores = soporte.indptr, soporte.indices, soporte.data
+    else:
+        densos = np.asarray(soporte, dtype='<f8')
+        filas, columnas = np.nonzero(densos)
+        valores = densos[filas, columnas]
+        inicios = np.concatenate(([0], np.cumsum(np.bincount(filas, minlength=len(densos)))))
+    valores = np.asarray(valores, dtype='<f8')
+    norma2 = np.add.reduceat(np.concatenate((valores ** 2, [0])), inicios[:-1]) * (np.diff(inicios) > 0)
+    dual = modelo.dual_coef_
+    dual = dual.toarray() if hasattr(dual, 'toarray') else dual
+
+    arreglos = {
+        'sv_inicios': np.asarray(inicios, dtype='<i4'),
+        'sv_columnas': np.asarray(columnas, dtype='<u2' if n_terminos <= 2**16 else '<i4'),
+        'sv_valores': valores,
+        'sv_norma2': np.asarray(norma2, dtype='<f8'),
+        'n_soporte': np.asarray(modelo.n_support_, dtype='<i4'),
+        'coef_dual': np.asarray(dual, dtype='<f8'),
+        'intercepto': np.asarray(modelo._intercept_, dtype='<f8'),
+        'prob_a': np.asarray(modelo.probA_, dtype='<f8'),
+        'prob_b': np.asarray(modelo.probB_, dtype='<f8'),
+    }
+    return arreglos, {'gamma': float(modelo._gamma)}
+
+
+def _arreglos_lineal(modelo) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Coeficientes e interceptos de un modelo lineal y cómo se calculan sus probabilidades."""
+    tipo = type(modelo).__name__
+    if tipo == 'MultinomialNB':
+        coef, intercepto, probabilidad = modelo.feature_log_prob_, modelo.class_log_prior_, 'softmax'
+    elif tipo == 'LogisticRegression':
+        coef, intercepto, probabilidad = modelo.coef_, modelo.intercept_, 'softmax'
+    elif tipo == 'SGDClassifier' and modelo.loss in ('log_loss', 'log'):
+        coef, intercepto, probabilidad = modelo.coef_, modelo.intercept_, 'ovr'
+    else:
+        raise ValueError(
+            "El bundle solo soporta SVC(kernel='rbf', probability=True), LogisticRegression, "
+            "SGDClassifier(loss='log_loss') y MultinomialNB"
+        )
+    coef = coef.toarray() if hasattr(coef, 'toarray') else coef
+    arreglos = {
+        'coef': np.asarray(coef, dtype='<f8'),
+        'intercepto': np.asarray(intercepto, dtype='<f8').reshape(-1),
+    }
+    return arreglos, {'probabilidad': probabilidad}
+
+
+def exportar_bundle(vectorizer, label_encoder, modelo, destino: Path) -> Path:
+    """
+    Escribe el bundle a partir de los objetos entrenados de scikit-learn.
+
+    Args:
+        vectorizer: TfidfVectorizer(analyzer='word') ajustado
+        label_encoder: LabelEncoder ajustado
+        modelo: SVC(kernel='rbf', probability=True), LogisticRegression,
+            SGDClassifier(loss='log_loss') o MultinomialNB ajustado
+        destino: Archivo a escribir
+
+    Raises:
+        ValueError: Si el modelo o el vectorizador no tienen la forma soportada
+    """
+    if type(modelo).__name__ == 'SVC':
+        if modelo.kernel != 'rbf' or not getattr(modelo, 'probability', False):
+            raise ValueError("El bundle solo soporta SVC(kernel='rbf', probability=True)")
+        tipo_modelo = 'svc'
+    else:
+        tipo_modelo = 'lineal'
+    if vectorizer.analyzer != 'word' or vectorizer.tokenizer or vectorizer.preprocessor or vectorizer.strip_accents:
+        raise ValueError("El bundle solo soporta TfidfVectorizer(analyzer='word') con el tokenizador por defecto")
+    if vectorizer.binary or not vectorizer.use_idf or vectorizer.norm not in ('l2', None):
+        raise ValueError("El bundle solo soporta TF-IDF con conteos, idf y norma l2")
+
+    terminos = sorted(vectorizer.vocabulary_.items(), key=lambda item: _hash_termino(item[0]))
+    hashes = np.array([_hash_termino(termino) for termino, _ in terminos], dtype='<u8')
+    if len(np.unique(hashes)) != len(hashes):
+        raise ValueError("Colisión de hashes en el vocabulario")
+
+    n_terminos = len(vectorizer.idf_)
+    if tipo_modelo == 'svc':
+        arreglos_modelo, parametros_modelo = _arreglos_svc(modelo, n_terminos)
+    else:
+        arreglos_modelo, parametros_modelo = _arreglos_lineal(modelo)
+
+    arreglos = {
+        'vocabulario_hash': hashes,
+        'vocabulario_columna': np.array([columna for _, columna in terminos], dtype='<i4'),
+        'idf': np.asarray(vectorizer.idf_, dtype='<f8'),
+        **arreglos_modelo,
+    }
+
+    tabla: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for nombre, arreglo in arreglos.items():
+        offset = -(-offset // _ALINEACION) * _ALINEACION
+        tabla[nombre] = {'dtype': arreglo.dtype.str, 'forma': list(arreglo.shape), 'offset': offset}
+        offset += arreglo.nbytes
+
+    encabezado = json.dumps({
+        'categorias': [str(clase) for clase in label_encoder.classes_],
+        'clases_modelo': [int(clase) for clase in modelo.classes_],
+        'modelo': tipo_modelo,
+        'tfidf': {
+            'token_pattern': vectorizer.token_pattern,
+            'ngram_range': list(vectorizer.ngram_range),
+            'lowercase': bool(vectorizer.lowercase),
+            'sublinear_tf': bool(vectorizer.sublinear_tf),
+            'norm': vectorizer.norm,
+            'n_terminos': n_terminos,
+        },
+        ('svm' if tipo_modelo == 'svc' else 'lineal'): parametros_modelo,
+        'arreglos': tabla,
+    }, ensure_ascii=False).encode('utf-8')
+    inicio = -(-(_ENCABEZADO.size + len(encabezado)) // _ALINEACION) * _ALINEACION
+    encabezado += b" " * (inicio - _ENCABEZADO.size - len(encabezado))
+
+    destino = Path(destino)
+    temporal = destino.with_suffix(destino.suffix + ".tmp")
+    with open(temporal, 'wb') as f:
+        f.write(_ENCABEZADO.pack(FIRMA, VERSION, len(encabezado)))
+        f.write(encabezado)
+        for nombre, arreglo in arreglos.items():
+            f.write(b"\0" * (inicio + tabla[nombre]['offset'] - f.tell()))
+            f.write(np.ascontiguousarray(arreglo).tobytes())
+    temporal.replace(destino)
+    return destino
+
+
+class BundleClasificador:
+    """
+    Clasificador TF-IDF + SVM (o modelo lineal) cargado desde un bundle con mmap.
+
+    Args:
+        path: Archivo escrito por exportar_bundle
+
+    Raises:
+        ValueError: Si el archivo no es un bundle o su versión no es soportada
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < _ENCABEZADO.size:
+            raise ValueError(f"Bundle truncado: {self.path}")
+        firma, version, largo = _ENCABEZADO.unpack_from(self._mmap, 0)
+        if firma != FIRMA:
+            raise ValueError(f"No es un bundle del clasificador: {self.path}")
+        if version not in VERSIONES_SOPORTADAS:
+            raise ValueError(f"Versión de bundle no soportada: {version} (se esperaba {VERSION})")
+
+        self.encabezado = json.loads(bytes(self._mmap[_ENCABEZADO.size:_ENCABEZADO.size + largo]))
+        inicio = _ENCABEZADO.size + largo
+        arreglos = {}
+        for nombre, meta in self.encabezado['arreglos'].items():
+            dtype = np.dtype(meta['dtype'])
+            cantidad = int(np.prod(meta['forma']))
+            arreglos[nombre] = np.frombuffer(
+                self._mmap, dtype=dtype, count=cantidad, offset=inicio + meta['offset']
+            ).reshape(meta['forma'])
+
+        self.categorias: List[str] = self.encabezado['categorias']
+        tfidf = self.encabezado['tfidf']
+        self._token = re.compile(tfidf['token_pattern'])
+        self._ngramas = tuple(tfidf['ngram_range'])
+        self._clases_modelo = np.asarray(self.encabezado['clases_modelo'])
+        self.modelo = self.encabezado.get('modelo', 'svc')
+
+        self._hashes = arreglos['vocabulario_hash']
+        self._columnas = arreglos['vocabulario_columna']
+        self._idf = arreglos['idf']
+        self._intercepto = arreglos['intercepto']
+        if self.modelo == 'lineal':
+            self._coef = arreglos['coef']
+            self._probabilidad = self.encabezado['lineal']['probabilidad']
+            return
+
+        self._gamma = self.encabezado['svm']['gamma']
+        self._sv_inicios = arreglos['sv_inicios']
+        self._sv_columnas = arreglos['sv_columnas']
+        self._sv_valores = arreglos['sv_valores']
+        self._sv_norma2 = arreglos['sv_norma2']
+        self._coef_dual = arreglos['coef_dual']
+        self._prob_a = arreglos['prob_a']
+        self._prob_b = arreglos['prob_b']
+
+        n_soporte = arreglos['n_soporte']
+        self._limites = np.concatenate(([0], np.cumsum(n_soporte)))
+        k = len(n_soporte)
+        self._pares = np.array([(i, j) for i in range(k) for j in range(i + 1, k)], dtype=np.intp).reshape(-1, 2)
+
+    def vectorizar(self, texto: str) -> np.ndarray:
+        """Vector TF-IDF denso de un texto (como TfidfVectorizer.transform)."""
+        tfidf = self.encabezado['tfidf']
+        if tfidf['lowercase']:
+            texto = texto.lower()
+        terminos = _ngramas(self._token.findall(texto), *self._ngramas)
+        vector = np.zeros(tfidf['n_terminos'])
+        if not terminos:
+            return vector
+
+        hashes = np.fromiter((_hash_termino(t) for t in terminos), dtype=np.uint64, count=len(terminos))
+        posiciones = np.searchsorted(self._hashes, hashes).clip(max=len(self._hashes) - 1)
+        encontrados = self._hashes[posiciones] == hashes
+        vector += np.bincount(self._columnas[posiciones[encontrados]], minlength=len(vector))
+
+        if tfidf['sublinear_tf']:
+            np.log(vector, where=vector > 0, out=vector)
+            vector[vector > 0] += 1
+        vector *= self._idf
+        if tfidf['norm'] == 'l2':
+            norma = np.sqrt(vector @ vector)
+            if norma > 0:
+                vector /= norma
+        return vector
+
+    def decision(self, vector: np.ndarray) -> np.ndarray:
+        """Valores de decisión uno contra uno (como SVC.decision_function con 'ovo')."""
+        parciales = np.concatenate(([0], np.cumsum(self._sv_valores * vector[self._sv_columnas])))
+        productos = parciales[self._sv_inicios[1:]] - parciales[self._sv_inicios[:-1]]
+        distancias = np.maximum(self._sv_norma2 - 2 * productos + vector @ vector, 0)
+        kernel = np.exp(-self._gamma * distancias)
+
+        # Suma de coef_dual * kernel por clase: acumulado[r, c] = Σ sobre los vectores de la clase c
+        acumulado = np.concatenate(
+            (np.zeros((len(self._coef_dual), 1)), np.cumsum(self._coef_dual * kernel, axis=1)), axis=1
+        )
+        por_clase = acumulado[:, self._limites[1:]] - acumulado[:, self._limites[:-1]]
+        i, j = self._pares[:, 0], self._pares[:, 1]
+        return por_clase[j - 1, i] + por_clase[i, j] + self._intercepto
+
+    def _probabilidades(self, decision: np.ndarray) -> np.ndarray:
+        """Platt por par y acoplamiento por pares de libsvm (multiclass_probability)."""
+        k = len(self._limites) - 1
+        f = decision * self._prob_a + self._prob_b
+        e = np.exp(-np.abs(f))
+        r_par = np.clip(np.where(f >= 0, e / (1 + e), 1 / (1 + e)), _MIN_PROB, 1 - _MIN_PROB)
+        r = np.zeros((k, k))
+        i, j = self._pares[:, 0], self._pares[:, 1]
+        r[i, j] = r_par
+        r[j, i] = 1 - r_par
+
+        q = -r.T * r
+        np.fill_diagonal(q, (r ** 2).sum(axis=0))
+        p = np.full(k, 1 / k)
+        for _ in range(max(100, k)):
+            qp = q @ p
+            pqp = p @ qp
+            if np.max(np.abs(qp - pqp)) < 0.005 / k:
+                break
+            for t in range(k):
+                diff = (-qp[t] + pqp) / q[t, t]
+                p[t] += diff
+                pqp = (pqp + diff * (diff * q[t, t] + 2 * qp[t])) / (1 + diff) / (1 + diff)
+                qp = (qp + diff * q[t]) / (1 + diff)
+                p /= 1 + diff
+        return p
+
+    def _predecir_lineal(self, vector: np.ndarray) -> Tuple[int, np.ndarray]:
+        """Decisión lineal y probabilidades como predict_proba de scikit-learn."""
+        decision = self._coef @ vector + self._intercepto
+        if len(decision) == 1:
+            # Binario: una sola columna de coeficientes para la clase positiva
+            positiva = 1 / (1 + np.exp(-decision[0]))
+            return int(self._clases_modelo[int(decision[0] > 0)]), np.array([1 - positiva, positiva])
+        if self._probabilidad == 'softmax':
+            probabilidades = np.exp(decision - decision.max())
+        else:
+            probabilidades = 1 / (1 + np.exp(-decision))
+        return int(self._clases_modelo[np.argmax(decision)]), probabilidades / probabilidades.sum()
+
+    def predecir(self, texto: str) -> Tuple[int, np.ndarray]:
+        """
+        Args:
+            texto: Texto ya preprocesado
+
+        Returns:
+            (índice de la categoría predicha, probabilidades por categoría)
+        """
+        if self.modelo == 'lineal':
+            return self._predecir_lineal(self.vectorizar(texto))
+        decision = self.decision(self.vectorizar(texto))
+        k = len(self._limites) - 1
+        votos = np.bincount(
+            np.where(decision > 0, self._pares[:, 0], self._pares[:, 1]), minlength=k
+        )
+        return int(self._clases_modelo[np.argmax(votos)]), self._probabilidades(decision)
+
+    def cerrar(self) -> None:
+        """Libera el mapeo (los arreglos dejan de ser válidos)."""
+        self._mmap.close()
+
+
+if __name__ == "__main__":
+    # Convierte los pickles entrenados al bundle: python -m ml.bundle [nombre]
+    import pickle
+
+    nombre = sys.argv[1] if len(sys.argv) > 1 else "clasificador"
+    carpeta = Path(__file__).parent / "modelos"
+    componentes = []
+    for sufijo in ("vectorizer", "encoder", "modelo"):
+        with open(carpeta / f"{nombre}_{sufijo}.pkl", 'rb') as f:
+            componentes.append(pickle.load(f))
+    destino = exportar_bundle(*componentes, carpeta / f"{nombre}.bundle")
+    print(f"[OK] Bundle escrito: {destino} ({destino.stat().st_size / 1024:.1f} KB)")
@@ -4,25 +4,49 @@ Servicio de Clasificación de Algoritmos
 
 Carga el modelo entrenado y clasifica pseudocódigos en tiempo real.
 NO usa LLM en producción - es rápido e instantáneo.
+
+Si existe modelos/<nombre>.bundle (ver ml/bundle.py) se carga con mmap y se
+clasifica con numpy, sin importar scikit-learn; si no, se usan los tres
+pickles del entrenamiento.
 """
 
+import logging
 import pickle
+import threading
 from pathlib import Path
 from typing import Dict, List, Tuple
 
+import numpy as np
+
+from ml.bundle import BundleClasificador
+
+logger = logging.getLogger(__name__)
+
 class ClasificadorAlgoritmos:
     """Clasifica algoritmos usando el modelo entrenado"""
     
-    def __init__(self, modelo_nombre: str = "clasificador"):
+    def __init__(self, modelo_nombre: str = "clasificador", usar_bundle: bool = True):
         self.model_dir = Path(__file__).parent / "modelos"
+        self.bundle = None
+        
+        bundle_path = self.model_dir / f"{modelo_nombre}.bundle"
+        if usar_bundle and bundle_path.exists():
+            try:
+                self.bundle = BundleClasificador(bundle_path)
+            except (OSError, ValueError) as e:
+                print(f"[WARN] Bundle no utilizable, se cargan los pickles: {e}")
         
-        # Cargar componentes
-        self.vectorizer = self._cargar_pickle(f"{modelo_nombre}_vectorizer.pkl")
-        self.label_encoder = self._cargar_pickle(f"{modelo_nombre}_encoder.pkl")
-        self.modelo = self._cargar_pickle(f"{modelo_nombre}_modelo.pkl")
+        if self.bundle is not None:
+            self.categorias = list(self.bundle.categorias)
+        else:
+            # Cargar componentes
+            self.vectorizer = self._cargar_pickle(f"{modelo_nombre}_vectorizer.pkl")
+            self.label_encoder = self._cargar_pickle(f"{modelo_nombre}_encoder.pkl")
+            self.modelo = self._cargar_pickle(f"{modelo_nombre}_modelo.pkl")
+            self.categorias = [str(clase) for clase in self.label_encoder.classes_]
         
-        print(f"[OK] Clasificador cargado: {modelo_nombre}")
-        print(f"  Categorias: {list(self.label_encoder.classes_)}")
+        origen = "bundle" if self.bundle is not None else "pickles"
+        print(f"[OK] Clasificador cargado: {modelo_nombre} ({origen}, {len(self.categorias)} categorias)")
     
     def _cargar_pickle(self, filename: str):
         """Carga un archivo pickle"""
@@ -53,6 +77,13 @@ class ClasificadorAlgoritmos:
         
         return texto
     
+    def _predecir(self, texto: str) -> Tuple[int, np.ndarray]:
+        """Índice de la categoría predicha y probabilidades por categoría"""
+        if self.bundle is not None:
+            return self.bundle.predecir(texto)
+        X = self.vectorizer.transform([texto])
+        return int(self.modelo.predict(X)[0]), self.modelo.predict_proba(X)[0]
+    
     def clasificar(self, pseudocodigo: str, top_n: int = 3) -> Dict:
         """
         Clasifica un pseudocódigo.
@@ -70,18 +101,14 @@ class ClasificadorAlgoritmos:
         try:
             # Preprocesar
             texto_limpio = self._preprocesar_texto(pseudocodigo)
-            # Vectorizar
-            X = self.vectorizer.transform([texto_limpio])
-            # Predecir
-            prediccion = self.modelo.predict(X)[0]
-            categoria_principal = str(self.label_encoder.inverse_transform([prediccion])[0])
-            # Obtener probabilidades
-            probabilidades = self.modelo.predict_proba(X)[0]
+            # Vectorizar y predecir
+            prediccion, probabilidades = self._predecir(texto_limpio)
+            categoria_principal = self.categorias[prediccion]
             # Ordenar por probabilidad
             indices_ordenados = probabilidades.argsort()[::-1][:top_n]
             top_predicciones = [
                 {
-                    'categoria': str(self.label_encoder.inverse_transform([idx])[0]),
+                    'categoria': self.categorias[idx],
                     'probabilidad': float(probabilidades[idx])
                 }
                 for idx in indices_ordenados
@@ -91,7 +118,8 @@ class ClasificadorAlgoritmos:
                 'confianza': float(probabilidades[prediccion]),
                 'top_predicciones': top_predicciones
             }
-            print(f"[CLASIFICADOR] Resultado: {resultado}")
+            # Una línea por solicitud en el servicio de validación: solo en debug
+            logger.debug(f"[CLASIFICADOR] Resultado: {resultado}")
             return resultado
         except Exception as e:
             print(f"[CLASIFICADOR][ERROR] No se pudo clasificar: {e}")
@@ -107,13 +135,15 @@ class ClasificadorAlgoritmos:
 
 # Instancia global (singleton)
 _clasificador_instance = None
+_clasificador_lock = threading.Lock()
 
 def obtener_clasificador() -> ClasificadorAlgoritmos:
     """Obtiene la instancia singleton del clasificador"""
     global _clasificador_instance
     
-    if _clasificador_instance is None:
-        _clasificador_instance = ClasificadorAlgoritmos()
+    with _clasificador_lock:
+        if _clasificador_instance is None:
+            _clasificador_instance = ClasificadorAlgoritmos()
     
     return _clasificador_instance
 
@@ -7,32 +7,187 @@ Toma el dataset generado y entrena un clasificador usando:
 - SVM (Support Vector Machine) para clasificación
 
 No requiere GPU, es rápido y tiene buen rendimiento.
+
+Además:
+- La matriz TF-IDF ajustada se guarda en modelos/cache/ y se reutiliza mientras
+  no cambien los textos ni los parámetros del vectorizador.
+- buscar_modelos() entrena en paralelo (un proceso por núcleo) una grilla de
+  modelos e hiperparámetros y reporta, por candidato, tiempo de entrenamiento,
+  latencia de inferencia por muestra y accuracy; elige el más rápido que
+  alcanza la precisión objetivo.
+- actualizar_incremental() incorpora ejemplos nuevos etiquetados con
+  partial_fit (SGD o Naive Bayes), sin reentrenar desde cero.
 """
 
+import argparse
+import hashlib
 import json
 import pickle
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Any, List, Dict, Optional, Tuple
 import numpy as np
 
+import sklearn
+from joblib import Parallel, delayed
 from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.svm import SVC
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 from sklearn.preprocessing import LabelEncoder
 
+# Agregar el directorio Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml.bundle import BundleClasificador, exportar_bundle
+
+# Parámetros del TF-IDF (también forman parte de la clave de la caché)
+PARAMETROS_TFIDF = {
+    'max_features': 500,  # Top 500 palabras más importantes
+    'ngram_range': (1, 3),  # Unigramas, bigramas y trigramas
+    'min_df': 2,  # Ignorar términos que aparecen menos de 2 veces
+    'stop_words': None,  # No usar stop words (las palabras clave son importantes)
+    'analyzer': 'word',
+    'token_pattern': r'\b\w+\b',
+}
+
+MODELOS = ('svm', 'random_forest', 'logistica', 'sgd', 'nb')
+
+# Modelos que admiten partial_fit (actualización incremental)
+INCREMENTALES = ('sgd', 'nb')
+
+# Grilla de la búsqueda: hiperparámetros por candidato. Random forest usa un solo
+# núcleo por candidato porque el paralelismo ya está entre candidatos
+GRILLA = {
+    'svm': [{'C': 1.0}, {'C': 10.0}, {'C': 100.0}],
+    'random_forest': [
+        {'n_estimators': 100, 'max_depth': 20, 'n_jobs': 1},
+        {'n_estimators': 300, 'max_depth': None, 'n_jobs': 1},
+    ],
+    'logistica': [{'C': 1.0}, {'C': 10.0}, {'C': 100.0}],
+    'sgd': [{'alpha': 1e-5}, {'alpha': 1e-4}, {'alpha': 1e-3}],
+    'nb': [{'alpha': 0.01}, {'alpha': 0.1}, {'alpha': 1.0}],
+}
+
+
+def crear_modelo(modelo_tipo: str, **params):
+    """Modelo sin entrenar; params reemplaza los hiperparámetros por defecto"""
+    if modelo_tipo == 'svm':
+        return SVC(**{
+            'kernel': 'rbf',  # Radial Basis Function
+            'C': 10.0,  # Parámetro de regularización
+            'gamma': 'scale',
+            'probability': True,  # Necesario para obtener probabilidades
+            'random_state': 42,
+            **params,
+        })
+    if modelo_tipo == 'random_forest':
+        return RandomForestClassifier(**{
+            'n_estimators': 100,
+            'max_depth': 20,
+            'random_state': 42,
+            'n_jobs': -1,  # Usar todos los cores
+            **params,
+        })
+    if modelo_tipo == 'logistica':
+        return LogisticRegression(**{'C': 10.0, 'max_iter': 2000, **params})
+    if modelo_tipo == 'sgd':
+        # log_loss: probabilidades calibradas y partial_fit
+        return SGDClassifier(**{'loss': 'log_loss', 'alpha': 1e-4, 'random_state': 42, **params})
+    if modelo_tipo == 'nb':
+        return MultinomialNB(**{'alpha': 0.1, **params})
+    raise ValueError(f"Modelo desconocido: {modelo_tipo}")
+
+
+def _entrenar_candidato(modelo_tipo: str, params: Dict[str, Any], X_train, y_train, X_test, y_test) -> Dict[str, Any]:
+    """Entrena y evalúa un candidato (se ejecuta en un proceso de la búsqueda)"""
+    modelo = crear_modelo(modelo_tipo, **params)
+    inicio = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        modelo.fit(X_train, y_train)
+    entrenamiento_s = time.perf_counter() - inicio
+    return {
+        'modelo': modelo_tipo,
+        'params': params,
+        'accuracy': float(accuracy_score(y_test, modelo.predict(X_test))),
+        'entrenamiento_s': entrenamiento_s,
+        'incremental': modelo_tipo in INCREMENTALES,
+        'estimador': modelo,
+    }
+
+
+def _latencia_ms(predecir, textos: List[str]) -> float:
+    """Latencia media por muestra (ms) clasificando de a un texto"""
+    predecir(textos[0])  # calentamiento
+    inicio = time.perf_counter()
+    for texto in textos:
+        predecir(texto)
+    return (time.perf_counter() - inicio) / len(textos) * 1000
+
+
+def medir_latencias(vectorizer, label_encoder, modelo, textos: List[str]) -> Dict[str, Optional[float]]:
+    """
+    Latencia por muestra con los pickles (transform + predict_proba de
+    scikit-learn) y con el bundle (None si el modelo no se puede exportar).
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        pickles = _latencia_ms(lambda texto: modelo.predict_proba(vectorizer.transform([texto])), textos)
+
+        bundle = None
+        with tempfile.TemporaryDirectory() as directorio:
+            try:
+                ruta = exportar_bundle(vectorizer, label_encoder, modelo, Path(directorio) / "candidato.bundle")
+            except ValueError:
+                ruta = None
+            if ruta is not None:
+                bundle = _latencia_ms(BundleClasificador(ruta).predecir, textos)
+
+    return {'latencia_pickles_ms': pickles, 'latencia_bundle_ms': bundle}
+
+
+def seleccionar_modelo(resultados: List[Dict[str, Any]], precision_objetivo: float) -> Dict[str, Any]:
+    """
+    El candidato más rápido en producción (latencia_ms) con accuracy >=
+    precision_objetivo; si ninguno la alcanza, el de mayor accuracy.
+    """
+    aptos = [r for r in resultados if r['accuracy'] >= precision_objetivo]
+    if aptos:
+        return min(aptos, key=lambda r: (r['latencia_ms'], -r['accuracy']))
+    return max(resultados, key=lambda r: (r['accuracy'], -r['latencia_ms']))
+
+
+def cargar_ejemplos(ruta: Path) -> List[Dict[str, Any]]:
+    """Ejemplos etiquetados ({pseudocodigo, label}) desde un JSON (lista) o un JSONL"""
+    ruta = Path(ruta)
+    with open(ruta, 'r', encoding='utf-8') as f:
+        if ruta.suffix == '.jsonl':
+            return [json.loads(linea) for linea in f if linea.strip()]
+        return json.load(f)
+
+
 class EntrenadorClasificador:
     """Entrena un clasificador de algoritmos"""
     
-    def __init__(self, dataset_path: str):
+    def __init__(self, dataset_path: str, model_dir: Optional[Path] = None, usar_cache: bool = True):
         self.dataset_path = Path(dataset_path)
-        self.model_dir = Path(__file__).parent / "modelos"
-        self.model_dir.mkdir(exist_ok=True)
+        self.model_dir = Path(model_dir) if model_dir else Path(__file__).parent / "modelos"
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_path = self.model_dir / "cache" / "tfidf.pkl"
+        self.usar_cache = usar_cache
         
         self.vectorizer = None
         self.label_encoder = None
         self.modelo = None
+        self.tfidf_desde_cache = False
         
     def cargar_dataset(self) -> Tuple[List[str], List[str]]:
         """Carga el dataset desde JSON"""
@@ -72,25 +227,53 @@ class EntrenadorClasificador:
         
         return texto
     
+    def _clave_cache(self, textos_limpios: List[str]) -> str:
+        """Hash de los textos, los parámetros del TF-IDF y la versión de scikit-learn"""
+        contenido = json.dumps([sklearn.__version__, PARAMETROS_TFIDF, textos_limpios], ensure_ascii=False)
+        return hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+    
+    def _leer_cache(self, clave: str):
+        """(vectorizer, X) guardados con esa clave, o None"""
+        if not self.usar_cache or not self.cache_path.exists():
+            return None
+        try:
+            with open(self.cache_path, 'rb') as f:
+                cache = pickle.load(f)
+        except Exception as e:
+            print(f"  [WARN] Caché TF-IDF ilegible, se recalcula: {e}")
+            return None
+        if cache.get('clave') != clave:
+            return None
+        return cache['vectorizer'], cache['X']
+    
+    def _escribir_cache(self, clave: str, X):
+        if not self.usar_cache:
+            return
+        self.cache_path.parent.mkdir(exist_ok=True)
+        temporal = self.cache_path.with_suffix('.tmp')
+        with open(temporal, 'wb') as f:
+            pickle.dump({'clave': clave, 'vectorizer': self.vectorizer, 'X': X}, f)
+        temporal.replace(self.cache_path)
+    
     def vectorizar(self, textos: List[str], entrenar: bool = True):
-        """Convierte textos a vectores TF-IDF"""
+        """Convierte textos a vectores TF-IDF (al entrenar, reutiliza la caché si coincide)"""
         print("\nVectorizando textos...")
         
         # Preprocesar
         textos_limpios = [self.preprocesar_texto(t) for t in textos]
         
         if entrenar:
-            # Crear y entrenar vectorizador
-            self.vectorizer = TfidfVectorizer(
-                max_features=500,  # Top 500 palabras más importantes
-                ngram_range=(1, 3),  # Unigramas, bigramas y trigramas
-                min_df=2,  # Ignorar términos que aparecen menos de 2 veces
-                stop_words=None,  # No usar stop words (las palabras clave son importantes)
-                analyzer='word',
-                token_pattern=r'\b\w+\b'
-            )
-            
-            X = self.vectorizer.fit_transform(textos_limpios)
+            clave = self._clave_cache(textos_limpios)
+            cacheado = self._leer_cache(clave)
+            self.tfidf_desde_cache = cacheado is not None
+            if cacheado is not None:
+                self.vectorizer, X = cacheado
+                print(f"  ✓ Matriz TF-IDF desde caché: {self.cache_path}")
+            else:
+                # Crear y entrenar vectorizador
+                self.vectorizer = TfidfVectorizer(**PARAMETROS_TFIDF)
+                X = self.vectorizer.fit_transform(textos_limpios)
+                self._escribir_cache(clave, X)
         else:
             X = self.vectorizer.transform(textos_limpios)
         
@@ -113,24 +296,7 @@ class EntrenadorClasificador:
         """Entrena el modelo"""
         print(f"\nEntrenando modelo {modelo_tipo.upper()}...")
         
-        if modelo_tipo == 'svm':
-            self.modelo = SVC(
-                kernel='rbf',  # Radial Basis Function
-                C=10.0,  # Parámetro de regularización
-                gamma='scale',
-                probability=True,  # Necesario para obtener probabilidades
-                random_state=42
-            )
-        elif modelo_tipo == 'random_forest':
-            self.modelo = RandomForestClassifier(
-                n_estimators=100,
-                max_depth=20,
-                random_state=42,
-                n_jobs=-1  # Usar todos los cores
-            )
-        else:
-            raise ValueError(f"Modelo desconocido: {modelo_tipo}")
-        
+        self.modelo = crear_modelo(modelo_tipo)
         self.modelo.fit(X_train, y_train)
         print("  ✓ Modelo entrenado")
     
@@ -158,6 +324,17 @@ class EntrenadorClasificador:
         
         return accuracy
     
+    def cargar_modelo(self, nombre: str = "clasificador"):
+        """Carga vectorizador, encoder y modelo guardados por guardar_modelo()"""
+        partes = {}
+        for parte in ('vectorizer', 'encoder', 'modelo'):
+            ruta = self.model_dir / f"{nombre}_{parte}.pkl"
+            if not ruta.exists():
+                raise FileNotFoundError(f"No existe {ruta}; entrenar primero el clasificador")
+            with open(ruta, 'rb') as f:
+                partes[parte] = pickle.load(f)
+        self.vectorizer, self.label_encoder, self.modelo = partes['vectorizer'], partes['encoder'], partes['modelo']
+    
     def guardar_modelo(self, nombre: str = "clasificador"):
         """Guarda el modelo entrenado"""
         print(f"\nGuardando modelo...")
@@ -179,6 +356,15 @@ class EntrenadorClasificador:
         with open(modelo_path, 'wb') as f:
             pickle.dump(self.modelo, f)
         print(f"  ✓ Modelo: {modelo_path}")
+        
+        # Guardar bundle de producción (un archivo, carga con mmap)
+        try:
+            bundle_path = exportar_bundle(
+                self.vectorizer, self.label_encoder, self.modelo, self.model_dir / f"{nombre}.bundle"
+            )
+            print(f"  ✓ Bundle: {bundle_path}")
+        except ValueError as e:
+            print(f"  [WARN] Sin bundle, producción usará los pickles: {e}")
     
     def entrenar_completo(self, test_size: float = 0.2, modelo_tipo: str = 'svm'):
         """Pipeline completo de entrenamiento"""
@@ -217,11 +403,170 @@ class EntrenadorClasificador:
         print("="*70)
         
         return accuracy
+    
+    def buscar_modelos(
+        self,
+        test_size: float = 0.2,
+        modelos: Optional[List[str]] = None,
+        grilla: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        n_jobs: int = -1,
+        precision_objetivo: float = 0.9,
+        muestras_latencia: int = 200,
+        nombre: str = "clasificador",
+    ) -> Dict[str, Any]:
+        """
+        Búsqueda de modelo e hiperparámetros en paralelo.
+        
+        Los candidatos se entrenan en procesos separados (n_jobs, -1 = un
+        proceso por núcleo) sobre la misma partición train/test que
+        entrenar_completo(). Las latencias se miden después, de a un candidato,
+        para que no compitan por CPU. El elegido (ver seleccionar_modelo) se
+        guarda con guardar_modelo() y el reporte en modelos/<nombre>_busqueda.json.
+        
+        Returns:
+            Reporte con 'candidatos' (ordenados por latencia) y 'seleccionado'
+        """
+        print("="*70)
+        print("BÚSQUEDA DE MODELO PARA EL CLASIFICADOR DE ALGORITMOS")
+        print("="*70)
+        inicio = time.perf_counter()
+        grilla = grilla or GRILLA
+        modelos = modelos or list(MODELOS)
+        desconocidos = [m for m in modelos if m not in MODELOS]
+        if desconocidos:
+            raise ValueError(f"Modelo desconocido: {', '.join(desconocidos)}")
+        
+        textos, labels = self.cargar_dataset()
+        X = self.vectorizar(textos, entrenar=True)
+        y = self.codificar_labels(labels, entrenar=True)
+        indices = np.arange(len(textos))
+        X_train, X_test, y_train, y_test, _, indices_test = train_test_split(
+            X, y, indices, test_size=test_size, random_state=42, stratify=y
+        )
+        textos_test = [self.preprocesar_texto(textos[i]) for i in indices_test[:muestras_latencia]]
+        
+        candidatos = [(modelo, params) for modelo in modelos for params in grilla.get(modelo, [{}])]
+        print(f"\nEntrenando {len(candidatos)} candidatos (n_jobs={n_jobs})...")
+        resultados = Parallel(n_jobs=n_jobs)(
+            delayed(_entrenar_candidato)(modelo, params, X_train, y_train, X_test, y_test)
+            for modelo, params in candidatos
+        )
+        
+        print("\nMidiendo latencia por muestra...")
+        for resultado in resultados:
+            latencias = medir_latencias(self.vectorizer, self.label_encoder, resultado['estimador'], textos_test)
+            resultado.update(latencias)
+            # Producción usa el bundle si el modelo se puede exportar
+            bundle = latencias['latencia_bundle_ms']
+            resultado['latencia_ms'] = bundle if bundle is not None else latencias['latencia_pickles_ms']
+        resultados.sort(key=lambda r: r['latencia_ms'])
+        
+        elegido = seleccionar_modelo(resultados, precision_objetivo)
+        self.modelo = elegido['estimador']
+        self._imprimir_candidatos(resultados, elegido, precision_objetivo)
+        
+        publicos = [{k: v for k, v in r.items() if k != 'estimador'} for r in resultados]
+        reporte = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'dataset': str(self.dataset_path),
+            'ejemplos': len(textos),
+            'test': len(y_test),
+            'precision_objetivo': precision_objetivo,
+            'n_jobs': n_jobs,
+            'tfidf_desde_cache': self.tfidf_desde_cache,
+            'candidatos': publicos,
+            'seleccionado': publicos[resultados.index(elegido)],
+        }
+        self.guardar_modelo(nombre)
+        reporte['segundos'] = time.perf_counter() - inicio
+        ruta_reporte = self.model_dir / f"{nombre}_busqueda.json"
+        with open(ruta_reporte, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+        print(f"  ✓ Reporte: {ruta_reporte}")
+        
+        return reporte
+    
+    def _imprimir_candidatos(self, resultados: List[Dict[str, Any]], elegido: Dict[str, Any], precision_objetivo: float):
+        print("\n" + "="*70)
+        print(f"{'modelo':<15}{'params':<32}{'acc':>7}{'entr. s':>9}{'ms/muestra':>12}")
+        print("-"*75)
+        for r in resultados:
+            params = ", ".join(f"{k}={v}" for k, v in r['params'].items() if k != 'n_jobs')
+            marca = "  ←" if r is elegido else ""
+            print(f"{r['modelo']:<15}{params:<32}{r['accuracy']:>7.3f}{r['entrenamiento_s']:>9.2f}"
+                  f"{r['latencia_ms']:>12.3f}{marca}")
+        if elegido['accuracy'] < precision_objetivo:
+            print(f"\n  [WARN] Ningún candidato alcanza accuracy {precision_objetivo}; se elige el más preciso")
+        print(f"\n  ✓ Seleccionado: {elegido['modelo']} {elegido['params']} "
+              f"(accuracy {elegido['accuracy']:.3f}, {elegido['latencia_ms']:.3f} ms/muestra)")
+    
+    def actualizar_incremental(self, ejemplos: List[Dict[str, Any]], nombre: str = "clasificador") -> Dict[str, Any]:
+        """
+        Incorpora ejemplos etiquetados ({pseudocodigo, label}) al modelo guardado
+        con partial_fit, sin reentrenar desde cero.
+        
+        El vocabulario y el IDF del TF-IDF quedan fijos: los términos nuevos se
+        ignoran hasta el próximo entrenamiento completo.
+        
+        Raises:
+            ValueError: Si el modelo guardado no admite partial_fit o hay
+                etiquetas que el encoder no conoce
+        """
+        inicio = time.perf_counter()
+        self.cargar_modelo(nombre)
+        if not hasattr(self.modelo, 'partial_fit'):
+            raise ValueError(
+                f"El modelo {type(self.modelo).__name__} no admite actualización incremental; "
+                f"entrenar con --modelo {' o '.join(INCREMENTALES)}"
+            )
+        labels = [ejemplo['label'] for ejemplo in ejemplos]
+        desconocidas = sorted(set(labels) - set(self.label_encoder.classes_))
+        if desconocidas:
+            raise ValueError(f"Etiquetas desconocidas (requieren entrenamiento completo): {', '.join(desconocidas)}")
+        
+        X = self.vectorizar([ejemplo['pseudocodigo'] for ejemplo in ejemplos], entrenar=False)
+        y = self.codificar_labels(labels, entrenar=False)
+        self.modelo.partial_fit(X, y, classes=np.arange(len(self.label_encoder.classes_)))
+        self.guardar_modelo(nombre)
+        
+        return {
+            'ejemplos': len(ejemplos),
+            'sin_vocabulario': int((X.getnnz(axis=1) == 0).sum()),
+            'modelo': type(self.modelo).__name__,
+            'segundos': time.perf_counter() - inicio,
+        }
 
-if __name__ == "__main__":
-    # Path al dataset completo
-    dataset_path = Path(__file__).parent / "dataset" / "dataset_completo.json"
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Entrenamiento del clasificador de algoritmos")
+    parser.add_argument("--dataset", type=Path, default=Path(__file__).parent / "dataset" / "dataset_completo.json")
+    parser.add_argument("--modelo", choices=MODELOS, default='svm', help="Modelo a entrenar (sin --buscar)")
+    parser.add_argument("--buscar", action="store_true", help="Búsqueda paralela de modelo e hiperparámetros")
+    parser.add_argument("--modelos", nargs="+", choices=MODELOS, help="Modelos a considerar en la búsqueda")
+    parser.add_argument("--jobs", type=int, default=-1, help="Procesos de la búsqueda (-1 = uno por núcleo)")
+    parser.add_argument("--precision-objetivo", type=float, default=0.9)
+    parser.add_argument("--incremental", type=Path, metavar="EJEMPLOS",
+                        help="JSON o JSONL con ejemplos etiquetados para partial_fit")
+    parser.add_argument("--sin-cache", action="store_true", help="Recalcular la matriz TF-IDF")
+    args = parser.parse_args(argv)
     
-    # Entrenar
-    entrenador = EntrenadorClasificador(dataset_path)
-    entrenador.entrenar_completo(test_size=0.2, modelo_tipo='svm')
+    entrenador = EntrenadorClasificador(args.dataset, usar_cache=not args.sin_cache)
+    if args.incremental:
+        try:
+            resultado = entrenador.actualizar_incremental(cargar_ejemplos(args.incremental))
+        except (ValueError, FileNotFoundError) as e:
+            print(f"[ERROR] {e}")
+            return 1
+        print(f"\n[OK] {resultado['ejemplos']} ejemplos incorporados a {resultado['modelo']} "
+              f"en {resultado['segundos']:.2f}s ({resultado['sin_vocabulario']} sin términos del vocabulario)")
+    elif args.buscar:
+        entrenador.buscar_modelos(
+            modelos=args.modelos, n_jobs=args.jobs, precision_objetivo=args.precision_objetivo
+        )
+    else:
+        entrenador.entrenar_completo(test_size=0.2, modelo_tipo=args.modelo)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
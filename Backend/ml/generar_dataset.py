@@ -12,18 +12,46 @@ Categorías:
 4. Iterativo (loops simples)
 5. Programación Dinámica
 6. Greedy
+
+La generación es concurrente por subcategoría (las llamadas pasan por el
+gobernador LLM con prioridad batch, que aplica los límites RPM/TPM) y
+reanudable:
+
+- Cada ejemplo nuevo se agrega a dataset/generado.jsonl (solo se agregan
+  líneas; una línea cortada por una interrupción se ignora al releer)
+- Cada subcategoría guarda su punto de control en dataset/progreso/ (lotes
+  pedidos y ejemplos descartados); al volver a correr, las subcategorías
+  completas se saltan y las demás siguen desde su último lote
+- Los ejemplos se deduplican por hash del pseudocódigo normalizado, también
+  contra los que ya están en dataset_completo.json
+- Al terminar, dataset_completo.json y dataset_<categoria>.json se rearman
+  con los ejemplos existentes más los generados
+
+Uso:
+    python ml/generar_dataset.py --factor 10 -y      # 10x ejemplos por subcategoría
+    python ml/generar_dataset.py --solo-exportar     # rearma los JSON desde el JSONL
 """
 
+import argparse
+import hashlib
+import json
+import math
 import os
+import re
 import sys
-import json
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
 # Agregar el directorio Backend al path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from config.settings import settings
 from shared.services.llm_servicio import LLMService
+from shared.services.gobernador_llm import PRIORIDAD_BATCH
 
 # Definir categorías y subcategorías
 CATEGORIAS = {
@@ -64,16 +92,138 @@ CATEGORIAS = {
     }
 }
 
+# Lotes pedidos por subcategoría como máximo, en múltiplos de los necesarios
+# (corta subcategorías en las que el modelo solo repite ejemplos)
+LOTES_MAX_FACTOR = 3
+# Errores seguidos tras los que una subcategoría se deja para la próxima corrida
+ERRORES_MAX = 3
+
+
+def normalizar_pseudocodigo(codigo: str) -> str:
+    """Minúsculas, sin comentarios // ni líneas vacías y con los espacios colapsados."""
+    lineas = []
+    for linea in codigo.lower().splitlines():
+        linea = re.sub(r'\s+', ' ', re.sub(r'//.*$', '', linea)).strip()
+        if linea:
+            lineas.append(linea)
+    return "\n".join(lineas)
+
+
+def hash_pseudocodigo(codigo: str) -> str:
+    """Hash del pseudocódigo normalizado (clave de deduplicación)."""
+    return hashlib.sha1(normalizar_pseudocodigo(codigo).encode("utf-8")).hexdigest()[:16]
+
+
+def _escribir_json(ruta: Path, datos: Any, indent: Optional[int] = None) -> None:
+    """Escritura atómica: un proceso que muere no deja archivos a medias."""
+    temporal = ruta.with_suffix(".tmp")
+    temporal.write_text(json.dumps(datos, indent=indent, ensure_ascii=False), encoding="utf-8")
+    temporal.replace(ruta)
+
+
 class GeneradorDataset:
     """Genera dataset usando Claude"""
     
-    def __init__(self):
-        self.llm = LLMService.get_llm(temperature=0.7)
-        self.output_dir = Path(__file__).parent / "dataset"
+    def __init__(self, output_dir: Optional[Path] = None, llm=None):
+        self._llm = llm
+        self.output_dir = Path(output_dir) if output_dir else Path(__file__).parent / "dataset"
         self.output_dir.mkdir(exist_ok=True)
+        self.ruta_jsonl = self.output_dir / "generado.jsonl"
+        self.dir_progreso = self.output_dir / "progreso"
+        
+        self._lock = threading.Lock()
+        self._hashes = set()
+        self._conteo: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._cargar_existentes()
+    
+    @property
+    def llm(self):
+        """LLM de generación (se crea al primer uso: exportar no lo necesita)"""
+        if self._llm is None:
+            self._llm = LLMService.get_llm(temperature=0.7)
+        return self._llm
+    
+    # ==================== ESTADO ====================
+    
+    def _leer_base(self) -> List[Dict]:
+        """Ejemplos de dataset_completo.json (los de corridas anteriores)"""
+        ruta = self.output_dir / "dataset_completo.json"
+        if not ruta.exists():
+            return []
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    
+    def leer_generados(self) -> List[Dict]:
+        """Ejemplos de generado.jsonl (una línea incompleta al final se ignora)"""
+        if not self.ruta_jsonl.exists():
+            return []
+        ejemplos = []
+        with open(self.ruta_jsonl, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    ejemplos.append(json.loads(linea))
+                except ValueError:
+                    print(f"     ✗ Línea inválida en {self.ruta_jsonl.name} (ignorada)")
+        return ejemplos
+    
+    def _cargar_existentes(self) -> None:
+        """Hashes y ejemplos por subcategoría ya guardados (para deduplicar y reanudar)"""
+        for ejemplo in self._leer_base() + self.leer_generados():
+            clave = ejemplo.get('hash') or hash_pseudocodigo(ejemplo['pseudocodigo'])
+            if clave not in self._hashes:
+                self._hashes.add(clave)
+                self._conteo[(ejemplo['categoria'], ejemplo['subcategoria'])] += 1
+    
+    def _ruta_progreso(self, categoria: str, subcategoria: str) -> Path:
+        return self.dir_progreso / f"{categoria}__{subcategoria}.json"
+    
+    def leer_progreso(self, categoria: str, subcategoria: str) -> Dict:
+        """Punto de control de la subcategoría (lotes pedidos, ejemplos descartados)"""
+        try:
+            with open(self._ruta_progreso(categoria, subcategoria), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'categoria': categoria, 'subcategoria': subcategoria, 'lotes': 0, 'duplicados': 0}
+    
+    def _agregar(self, categoria: str, subcategoria: str, codigos: List[str]) -> Tuple[int, int]:
+        """
+        Agrega al JSONL los ejemplos que no estén repetidos.
+        
+        Returns:
+            (agregados, duplicados)
+        """
+        with self._lock:
+            nuevos = []
+            for codigo in codigos:
+                clave = hash_pseudocodigo(codigo)
+                if clave in self._hashes:
+                    continue
+                self._hashes.add(clave)
+                self._conteo[(categoria, subcategoria)] += 1
+                nuevos.append({
+                    "id": f"{categoria}_{subcategoria}_{self._conteo[(categoria, subcategoria)]}",
+                    "categoria": categoria,
+                    "subcategoria": subcategoria,
+                    "pseudocodigo": codigo,
+                    "label": categoria,  # Etiqueta para el clasificador
+                    "hash": clave
+                })
+            if nuevos:
+                with open(self.ruta_jsonl, 'a', encoding='utf-8') as f:
+                    f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in nuevos))
+                    f.flush()
+                    os.fsync(f.fileno())
+        return len(nuevos), len(codigos) - len(nuevos)
+    
+    # ==================== GENERACIÓN ====================
     
-    def generar_prompt(self, categoria: str, subcategoria: str, num_ejemplos: int) -> str:
+    def generar_prompt(self, categoria: str, subcategoria: str, num_ejemplos: int, lote: int = 0) -> str:
         """Genera el prompt para Claude"""
+        # Cada lote pide variantes distintas: el mismo prompt repetiría ejemplos (y el casete)
+        variacion = (
+            f"\n- Este es el lote {lote + 1}: usa enfoques, nombres y estructuras distintos de los lotes anteriores"
+            if lote else ""
+        )
         return f"""Genera {num_ejemplos} pseudocódigos DIFERENTES de {subcategoria.upper()} ({categoria}).
 
 IMPORTANTE:
@@ -81,7 +231,7 @@ IMPORTANTE:
 - Usar sintaxis clara con palabras clave: funcion, si, entonces, mientras, para, retornar
 - Incluir variaciones realistas (algunos con comentarios, otros sin ellos)
 - Variar la complejidad (algunos simples, otros más elaborados)
-- NO uses sintaxis de ningún lenguaje específico (Python, Java, etc.)
+- NO uses sintaxis de ningún lenguaje específico (Python, Java, etc.){variacion}
 
 FORMATO DE SALIDA:
 Para cada ejemplo, usa este formato exacto:
@@ -105,91 +255,157 @@ Genera los {num_ejemplos} ejemplos ahora:"""
         
         return ejemplos
     
-    def generar_categoria(self, categoria: str, config: Dict) -> List[Dict]:
-        """Genera ejemplos para una categoría completa"""
-        print(f"\n{'='*70}")
-        print(f"Generando categoría: {categoria}")
-        print(f"Descripción: {config['descripcion']}")
-        print(f"{'='*70}")
+    def generar_subcategoria(self, categoria: str, subcategoria: str, objetivo: int, por_lote: int) -> Dict:
+        """
+        Pide lotes de ejemplos hasta tener `objetivo` ejemplos únicos de la
+        subcategoría, guardando el punto de control después de cada lote.
         
-        dataset = []
+        Returns:
+            dict con categoria, subcategoria, ejemplos, agregados, lotes y completa
+        """
+        progreso = self.leer_progreso(categoria, subcategoria)
+        lotes_max = LOTES_MAX_FACTOR * math.ceil(objetivo / por_lote)
+        agregados = 0
+        errores = 0
         
-        for subcategoria in config['subcategorias']:
-            print(f"\n  → Subcategoría: {subcategoria}")
-            print(f"     Generando {config['ejemplos_por_sub']} ejemplos...")
+        while self._conteo[(categoria, subcategoria)] < objetivo and progreso['lotes'] < lotes_max:
+            faltan = objetivo - self._conteo[(categoria, subcategoria)]
+            prompt = self.generar_prompt(categoria, subcategoria, min(por_lote, faltan), progreso['lotes'])
             
-            # Generar prompt
-            prompt = self.generar_prompt(categoria, subcategoria, config['ejemplos_por_sub'])
-            
-            # Llamar a Claude
             try:
-                respuesta = self.llm.invoke(prompt)
-                respuesta_texto = respuesta.content
-                
-                # Parsear ejemplos
-                ejemplos = self.parsear_respuesta(respuesta_texto)
-                
-                print(f"     ✓ Generados: {len(ejemplos)} ejemplos")
-                
-                # Agregar al dataset
-                for i, codigo in enumerate(ejemplos):
-                    dataset.append({
-                        "id": f"{categoria}_{subcategoria}_{i+1}",
-                        "categoria": categoria,
-                        "subcategoria": subcategoria,
-                        "pseudocodigo": codigo,
-                        "label": categoria  # Etiqueta para el clasificador
-                    })
-                
+                respuesta = LLMService.invocar(self.llm, prompt, prioridad=PRIORIDAD_BATCH)
             except Exception as e:
-                print(f"     ✗ Error: {e}")
+                errores += 1
+                print(f"  ✗ {categoria}/{subcategoria}: {e}")
+                if errores >= ERRORES_MAX:
+                    break
+                continue
+            errores = 0
+            
+            nuevos, duplicados = self._agregar(categoria, subcategoria, self.parsear_respuesta(respuesta.content))
+            agregados += nuevos
+            progreso['lotes'] += 1
+            progreso['duplicados'] += duplicados
+            progreso['ejemplos'] = self._conteo[(categoria, subcategoria)]
+            progreso['actualizado'] = time.time()
+            self.dir_progreso.mkdir(exist_ok=True)
+            _escribir_json(self._ruta_progreso(categoria, subcategoria), progreso)
+            
+            print(f"  ✓ {categoria}/{subcategoria} lote {progreso['lotes']}: +{nuevos} "
+                  f"({duplicados} repetidos, {self._conteo[(categoria, subcategoria)]}/{objetivo})")
         
-        return dataset
+        return {
+            'categoria': categoria,
+            'subcategoria': subcategoria,
+            'ejemplos': self._conteo[(categoria, subcategoria)],
+            'agregados': agregados,
+            'lotes': progreso['lotes'],
+            'completa': self._conteo[(categoria, subcategoria)] >= objetivo
+        }
+    
+    # ==================== SALIDA ====================
     
     def guardar_dataset(self, dataset: List[Dict], nombre: str):
         """Guarda el dataset en JSON"""
         output_file = self.output_dir / f"{nombre}.json"
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(dataset, f, indent=2, ensure_ascii=False)
+        _escribir_json(output_file, dataset, indent=2)
         
         print(f"\n✓ Dataset guardado en: {output_file}")
         print(f"  Total de ejemplos: {len(dataset)}")
     
-    def generar_todo(self):
-        """Genera el dataset completo"""
+    def exportar(self) -> List[Dict]:
+        """
+        Rearma dataset_completo.json y dataset_<categoria>.json: los ejemplos
+        existentes más los del JSONL que no estén repetidos.
+        """
+        dataset_completo = []
+        vistos = set()
+        for ejemplo in self._leer_base() + self.leer_generados():
+            clave = ejemplo.get('hash') or hash_pseudocodigo(ejemplo['pseudocodigo'])
+            if clave not in vistos:
+                vistos.add(clave)
+                dataset_completo.append({k: v for k, v in ejemplo.items() if k != 'hash'})
+        
+        self.guardar_dataset(dataset_completo, "dataset_completo")
+        for categoria in CATEGORIAS.keys():
+            ejemplos_categoria = [e for e in dataset_completo if e['categoria'] == categoria]
+            if ejemplos_categoria:
+                self.guardar_dataset(ejemplos_categoria, f"dataset_{categoria}")
+        return dataset_completo
+    
+    def generar_todo(
+        self,
+        factor: int = 1,
+        concurrencia: Optional[int] = None,
+        categorias: Optional[List[str]] = None,
+        confirmar: bool = True
+    ) -> List[Dict]:
+        """
+        Genera el dataset completo (o lo que falte de una corrida anterior).
+        
+        Args:
+            factor: Multiplica ejemplos_por_sub (10 = dataset 10 veces mayor)
+            concurrencia: Subcategorías generadas a la vez (None = settings.llm_concurrencia_max)
+            categorias: Categorías a generar (None = todas)
+            confirmar: Pedir ENTER antes de empezar
+        
+        Returns:
+            Resumen por subcategoría (ver generar_subcategoria)
+        """
+        seleccion = {c: CATEGORIAS[c] for c in (categorias or CATEGORIAS)}
+        tareas = [
+            (categoria, subcategoria, config['ejemplos_por_sub'] * factor, config['ejemplos_por_sub'])
+            for categoria, config in seleccion.items()
+            for subcategoria in config['subcategorias']
+        ]
+        pendientes = [t for t in tareas if self._conteo[(t[0], t[1])] < t[2]]
+        
         print("="*70)
         print("GENERADOR DE DATASET PARA CLASIFICADOR")
         print("="*70)
-        print(f"\nCategorías a generar: {len(CATEGORIAS)}")
-        print(f"Total estimado de ejemplos: {sum(c['ejemplos_por_sub'] * len(c['subcategorias']) for c in CATEGORIAS.values())}")
-        
-        input("\nPresiona ENTER para comenzar la generación...")
+        print(f"\nCategorías a generar: {len(seleccion)}")
+        print(f"Total objetivo de ejemplos: {sum(t[2] for t in tareas)}")
+        print(f"Subcategorías pendientes: {len(pendientes)}/{len(tareas)}")
         
-        dataset_completo = []
+        if confirmar:
+            input("\nPresiona ENTER para comenzar la generación...")
         
-        for categoria, config in CATEGORIAS.items():
-            ejemplos = self.generar_categoria(categoria, config)
-            dataset_completo.extend(ejemplos)
+        with ThreadPoolExecutor(max_workers=concurrencia or settings.llm_concurrencia_max) as executor:
+            resumen = list(executor.map(lambda tarea: self.generar_subcategoria(*tarea), pendientes))
         
-        # Guardar dataset completo
-        self.guardar_dataset(dataset_completo, "dataset_completo")
-        
-        # Guardar por categoría también
-        for categoria in CATEGORIAS.keys():
-            ejemplos_categoria = [e for e in dataset_completo if e['categoria'] == categoria]
-            self.guardar_dataset(ejemplos_categoria, f"dataset_{categoria}")
+        dataset_completo = self.exportar()
         
         # Resumen
         print("\n" + "="*70)
         print("RESUMEN DE GENERACIÓN")
         print("="*70)
-        for categoria in CATEGORIAS.keys():
+        for categoria in seleccion.keys():
             count = len([e for e in dataset_completo if e['categoria'] == categoria])
             print(f"  {categoria:30} {count:4} ejemplos")
         print(f"\n  {'TOTAL':30} {len(dataset_completo):4} ejemplos")
+        incompletas = [f"{r['categoria']}/{r['subcategoria']}" for r in resumen if not r['completa']]
+        if incompletas:
+            print(f"\n  Incompletas (volver a correr para reanudar): {', '.join(incompletas)}")
         print("="*70)
+        return resumen
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Genera el dataset del clasificador con el LLM")
+    parser.add_argument("--factor", type=int, default=1, help="Multiplicador de ejemplos por subcategoría")
+    parser.add_argument("--concurrencia", type=int, help="Subcategorías a la vez (por defecto settings.llm_concurrencia_max)")
+    parser.add_argument("--categorias", nargs="*", choices=list(CATEGORIAS), help="Categorías a generar (por defecto todas)")
+    parser.add_argument("-y", "--si", action="store_true", help="No pedir confirmación")
+    parser.add_argument("--solo-exportar", action="store_true", help="Solo rearmar los JSON desde generado.jsonl")
+    args = parser.parse_args(argv)
+    
+    if args.solo_exportar:
+        GeneradorDataset().exportar()
+        return 0
+    
+    resumen = GeneradorDataset().generar_todo(args.factor, args.concurrencia, args.categorias, not args.si)
+    return 0 if all(r['completa'] for r in resumen) else 1
+
 
 if __name__ == "__main__":
-    generador = GeneradorDataset()
-    generador.generar_todo()
+    sys.exit(main())
@@ -13,6 +13,8 @@ from representacion.processors.iterative_processor import process_iterative
 from representacion.processors.recursive_processor import process_recursive
 from representacion.processors.llm_equation_generator import LLMAnalysisAssistant
 from representacion.utils.logger import get_logger
+from shared.services.presupuesto_llm import permite_opcional
+from shared.services.circuito_llm import llm_disponible
 
 
 class AgenteRepresentacionMatematica:
@@ -92,11 +94,12 @@ class AgenteRepresentacionMatematica:
         
         try:
             # Paso 2: Invocar procesador (LLM o tradicional)
-            if self.use_llm and self.llm_assistant:
+            if (self.use_llm and self.llm_assistant and permite_opcional("sugerencias_ecuaciones")
+                    and llm_disponible("sugerencias_ecuaciones")):
                 self.logger.log_decision("Usar LLM", "use_llm=True en configuración")
                 resultado = self._generar_con_llm(request)
             else:
-                self.logger.log_decision("Usar tradicional", "use_llm=False en configuración")
+                self.logger.log_decision("Usar tradicional", "use_llm=False, presupuesto insuficiente o proveedor LLM no disponible")
                 resultado = self._generar_tradicional(request)
             
             # Paso 3: Combinar pasos de generación
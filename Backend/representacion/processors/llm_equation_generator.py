@@ -5,14 +5,36 @@ El LLM ayuda al agente matemático sugiriendo cómo simplificar
 las ecuaciones basándose en la Tabla Omega de entrada.
 """
 
-from typing import Dict
+from typing import Dict, Optional
+from config.settings import settings
 from core.analizador.models.omega_table import OmegaTable
 from shared.services.llm_servicio import LLMService
-from langchain_core.messages import SystemMessage, HumanMessage
-import json
 import hashlib
 
 
+SISTEMA_ASISTENTE = "Eres experto en complejidad algoritmica. Sugieres como simplificar ecuaciones correctamente."
+
+# Sugerencia para un caso de la Tabla Omega
+ESQUEMA_SUGERENCIA = {
+    "type": "object",
+    "properties": {
+        "terminos_identificados": {"type": "array", "items": {"type": "string"}},
+        "termino_dominante": {"type": "string"},
+        "ecuacion_sugerida": {"type": "string"},
+        "explicacion": {"type": "string"},
+    },
+    "required": ["termino_dominante", "ecuacion_sugerida"],
+}
+
+# Salida estructurada: solo los casos presentes en la tabla (ver LLMService.invocar_estructurado)
+HERRAMIENTA_SUGERENCIAS = LLMService.herramienta(
+    "sugerir_ecuaciones",
+    "Ecuación simplificada sugerida para cada caso de la Tabla Omega",
+    {caso: ESQUEMA_SUGERENCIA for caso in ("mejor_caso", "caso_promedio", "peor_caso")},
+    requeridas=[],
+)
+
+
 class LLMAnalysisAssistant:
     """
     Asistente LLM que analiza ecuaciones y sugiere simplificaciones.
@@ -22,7 +44,9 @@ class LLMAnalysisAssistant:
     
     def __init__(self):
         """Inicializa el asistente con configuración del LLM y caché."""
-        self.llm = LLMService.get_llm(temperature=0.1)
+        self.llm = LLMService.get_llm(
+            temperature=0.1, max_tokens=settings.llm_max_tokens_ecuaciones, etapa="ecuaciones"
+        )
         self._cache = {}  # Cache de resultados {hash: resultado}
         self._cache_hits = 0
         self._cache_misses = 0
@@ -94,14 +118,17 @@ class LLMAnalysisAssistant:
         # Extraer ecuaciones por caso
         escenarios = self._organizar_por_caso(omega_table)
         
-        # Crear prompt para análisis Y SUGERENCIAS
-        prompt = self._crear_prompt_analisis_con_sugerencias(omega_table, escenarios, is_iterative)
+        # Crear mensajes para análisis Y SUGERENCIAS
+        mensajes = self._crear_prompt_analisis_con_sugerencias(omega_table, escenarios, is_iterative)
         
-        # Invocar LLM
-        respuesta = self._invocar_llm(prompt)
+        # Invocar LLM (la salida llega estructurada según HERRAMIENTA_SUGERENCIAS)
+        try:
+            analisis_llm, error = self._invocar_llm(mensajes, escenarios), None
+        except ValueError as e:
+            analisis_llm, error = {}, str(e)
         
-        # Parsear respuesta con sugerencias
-        analisis = self._parsear_analisis_con_sugerencias(respuesta, escenarios)
+        # Construir resultado con sugerencias
+        analisis = self._construir_analisis_con_sugerencias(analisis_llm, escenarios, error)
         
         # Guardar en caché
         self._cache[cache_key] = analisis
@@ -170,8 +197,8 @@ class LLMAnalysisAssistant:
         
         return casos
     
-    def _crear_prompt_analisis_con_sugerencias(self, omega_table: OmegaTable, escenarios: Dict, is_iterative: bool) -> str:
-        """Crea prompt optimizado para que el LLM analice Y SUGIERA ecuaciones simplificadas."""
+    def _crear_prompt_analisis_con_sugerencias(self, omega_table: OmegaTable, escenarios: Dict, is_iterative: bool) -> list:
+        """Crea los mensajes para que el LLM analice Y SUGIERA ecuaciones simplificadas."""
         tipo = "ITERATIVO" if is_iterative else "RECURSIVO"
         
         escenarios_str = ""
@@ -282,13 +309,8 @@ EJEMPLOS INCORRECTOS (NO HACER):
 ❌ "sum(k, 1, n)" → "n*k" (no usó SUM - MAL)
 """
         
-        prompt = f"""Eres un asistente experto en análisis de complejidad algorítmica.
-
-ALGORITMO: {omega_table.algorithm_name}
-TIPO: {tipo}
-
-ECUACIONES DE LA TABLA OMEGA:
-{escenarios_str}
+        instrucciones = f"""Eres un asistente experto en análisis de complejidad algorítmica.
+El algoritmo y las ECUACIONES DE LA TABLA OMEGA a simplificar van al FINAL del mensaje.
 
 {ejemplo_estructura}
 
@@ -308,7 +330,7 @@ ANÁLISIS REQUERIDO:
 - Construye la ecuación simplificada
 - Explica tu razonamiento
 
-RESPONDE EN JSON (sin markdown, solo JSON puro):
+ENTREGA EL RESULTADO CON LA HERRAMIENTA sugerir_ecuaciones, con esta estructura:
 {{
   "mejor_caso": {{
     "terminos_identificados": ["lista", "de", "terminos"],
@@ -330,90 +352,62 @@ RESPONDE EN JSON (sin markdown, solo JSON puro):
   }}
 }}
 """
-        return prompt
+        datos = f"""ALGORITMO: {omega_table.algorithm_name}
+TIPO: {tipo}
+
+ECUACIONES DE LA TABLA OMEGA:
+{escenarios_str}"""
+
+        # Instrucciones fijas por tipo de algoritmo (prefijo cacheable) y ecuaciones al final
+        return LLMService.mensajes_cacheables([instrucciones], datos, sistema=SISTEMA_ASISTENTE)
     
-    def _invocar_llm(self, prompt: str) -> str:
-        """Invoca el LLM con el prompt dado, con reintentos en caso de sobrecarga."""
-        import time
-        
-        messages = [
-            SystemMessage(content="Eres experto en complejidad algoritmica. Sugieres como simplificar ecuaciones correctamente."),
-            HumanMessage(content=prompt)
-        ]
-        
-        max_reintentos = 3
-        tiempo_espera = 2  # segundos iniciales
-        
-        for intento in range(max_reintentos):
-            try:
-                respuesta = self.llm.invoke(messages)
-                return respuesta.content
-            except Exception as e:
-                error_str = str(e)
-                # Detectar error de sobrecarga (529 o "overloaded" en el mensaje)
-                if "529" in error_str or "overloaded" in error_str.lower():
-                    if intento < max_reintentos - 1:
-                        print(f"⚠️  Servidor sobrecargado. Reintentando en {tiempo_espera}s... (intento {intento + 1}/{max_reintentos})")
-                        time.sleep(tiempo_espera)
-                        tiempo_espera *= 2  # Backoff exponencial
-                    else:
-                        print(f"❌ Servidor sobrecargado después de {max_reintentos} intentos.")
-                        raise
-                else:
-                    # Otro tipo de error, no reintentar
-                    raise
+    def _invocar_llm(self, mensajes: list, escenarios: Optional[Dict] = None) -> Dict:
+        """
+        Invoca el LLM con los mensajes dados (reintentos y límites en el gobernador).
+        
+        Si el modelo rápido omite la sugerencia de algún caso presente en la
+        tabla, la llamada se escala al modelo fuerte.
+        """
+        def verificar(salida: Dict) -> None:
+            faltantes = [caso for caso, escenario in (escenarios or {}).items() if escenario and caso not in salida]
+            if faltantes:
+                raise ValueError(f"Sin sugerencia para {faltantes}")
+        
+        return LLMService.invocar_estructurado(self.llm, mensajes, HERRAMIENTA_SUGERENCIAS, verificar=verificar)
     
-    def _parsear_analisis_con_sugerencias(self, respuesta: str, escenarios: Dict) -> Dict:
-        """Parsea la respuesta del LLM que incluye SUGERENCIAS de ecuaciones."""
-        try:
-            # Extraer JSON de la respuesta
-            json_match = respuesta
-            if "```json" in respuesta:
-                json_match = respuesta.split("```json")[1].split("```")[0].strip()
-            elif "```" in respuesta:
-                json_match = respuesta.split("```")[1].split("```")[0].strip()
-            
-            analisis_llm = json.loads(json_match)
-            
-            # Construir resultado estructurado con SUGERENCIAS
-            resultado = {}
-            
-            for caso, scenario in escenarios.items():
-                if scenario and caso in analisis_llm:
-                    resultado[caso] = {
-                        'ecuacion_cruda': scenario.cost_T,
-                        'ecuacion_sugerida': analisis_llm[caso].get('ecuacion_sugerida', None),
-                        'terminos_identificados': analisis_llm[caso].get('terminos_identificados', []),
-                        'termino_dominante': analisis_llm[caso].get('termino_dominante', 'desconocido'),
-                        'explicacion': analisis_llm[caso].get('explicacion', ''),
-                        'analisis_llm': True
-                    }
-                elif scenario:
-                    resultado[caso] = {
-                        'ecuacion_cruda': scenario.cost_T,
-                        'ecuacion_sugerida': None,
-                        'terminos_identificados': [],
-                        'termino_dominante': 'desconocido',
-                        'explicacion': 'Analisis LLM no disponible',
-                        'analisis_llm': False
-                    }
-            
-            return resultado
-            
-        except json.JSONDecodeError as e:
-            # Error al parsear: retornar estructura básica
-            resultado = {}
-            for caso, scenario in escenarios.items():
-                if scenario:
-                    resultado[caso] = {
-                        'ecuacion_cruda': scenario.cost_T,
-                        'ecuacion_sugerida': None,
-                        'terminos_identificados': [],
-                        'termino_dominante': 'error_parsing',
-                        'explicacion': f'Error al parsear respuesta LLM: {str(e)}',
-                        'analisis_llm': False
-                    }
-            return resultado
+    def _construir_analisis_con_sugerencias(
+        self,
+        analisis_llm: Dict,
+        escenarios: Dict,
+        error: Optional[str] = None
+    ) -> Dict:
+        """Arma el análisis por caso a partir de la salida estructurada del LLM."""
+        resultado = {}
+        
+        for caso, scenario in escenarios.items():
+            if not scenario:
+                continue
+            if caso in analisis_llm:
+                sugerencia = analisis_llm[caso]
+                resultado[caso] = {
+                    'ecuacion_cruda': scenario.cost_T,
+                    'ecuacion_sugerida': sugerencia.get('ecuacion_sugerida', None),
+                    'terminos_identificados': sugerencia.get('terminos_identificados', []),
+                    'termino_dominante': sugerencia.get('termino_dominante', 'desconocido'),
+                    'explicacion': sugerencia.get('explicacion', ''),
+                    'analisis_llm': True
+                }
+            else:
+                resultado[caso] = {
+                    'ecuacion_cruda': scenario.cost_T,
+                    'ecuacion_sugerida': None,
+                    'terminos_identificados': [],
+                    'termino_dominante': 'error_salida' if error else 'desconocido',
+                    'explicacion': f'Error en la salida del LLM: {error}' if error else 'Analisis LLM no disponible',
+                    'analisis_llm': False
+                }
+        
+        return resultado
     
     def validar_ecuaciones_generadas(
         self,
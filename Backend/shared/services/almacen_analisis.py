@@ -0,0 +1,82 @@
+"""
+Almacén de Análisis
+===================
+
+Guarda en memoria los resultados de análisis completados, indexados por
+`analisis_id`, para que un reenvío del mismo programa editado pueda
+reutilizar el trabajo previo (modo incremental de FlujoAnalisis).
+
+Es un LRU acotado y seguro entre hilos: el router crea un FlujoAnalisis
+por request, así que el almacén vive a nivel de módulo.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+class AlmacenAnalisis:
+    """
+    Almacén LRU de análisis previos.
+
+    Cada registro contiene lo necesario para reconstruir un resultado sin
+    repetir fases costosas: pseudocódigo, subrutinas con su hash, validación,
+    tabla Omega, ecuaciones y complejidades.
+    """
+
+    def __init__(self, capacidad: int = 256):
+        """
+        Args:
+            capacidad: Número máximo de análisis retenidos
+        """
+        self.capacidad = capacidad
+        self._registros: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def guardar(self, analisis_id: str, registro: Dict[str, Any]) -> None:
+        """Guarda (o reemplaza) el registro de un análisis."""
+        with self._lock:
+            self._registros[analisis_id] = registro
+            self._registros.move_to_end(analisis_id)
+            while len(self._registros) > self.capacidad:
+                self._registros.popitem(last=False)
+
+    def obtener(self, analisis_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene una copia del registro de un análisis.
+
+        Returns:
+            Copia profunda del registro, o None si no existe (o fue desalojado)
+        """
+        with self._lock:
+            registro = self._registros.get(analisis_id)
+            if registro is None:
+                return None
+            self._registros.move_to_end(analisis_id)
+        return copy.deepcopy(registro)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._registros)
+
+    def limpiar(self) -> None:
+        """Elimina todos los registros."""
+        with self._lock:
+            self._registros.clear()
+
+
+# Instancia global (singleton)
+_almacen_instance = None
+_almacen_lock = threading.Lock()
+
+
+def obtener_almacen() -> AlmacenAnalisis:
+    """Obtiene la instancia singleton del almacén de análisis"""
+    global _almacen_instance
+
+    with _almacen_lock:
+        if _almacen_instance is None:
+            _almacen_instance = AlmacenAnalisis()
+
+    return _almacen_instance
@@ -0,0 +1,103 @@
+"""
+Caché por Forma Canónica
+========================
+
+Resultados de fases del análisis indexados por la forma canónica del
+programa (ver core/analizador/tools/canonico.py): una entrega que solo
+difiere de otra ya analizada en nombres de variables, espacios, comentarios
+o líneas en blanco reutiliza su clasificación, validación y fases 6-8.5.
+
+Los valores se guardan con los nombres y la numeración canónicos y se
+devuelven traducidos a los del usuario que consulta. Es un LRU acotado y
+seguro entre hilos, compartido por todas las instancias de FlujoAnalisis.
+"""
+
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+from config.settings import settings
+from core.analizador.tools.canonico import a_canonico, a_original
+
+
+class CacheCanonico:
+    """
+    LRU de resultados por (etapa, clave canónica).
+
+    Args:
+        capacidad: Número máximo de entradas retenidas
+    """
+
+    def __init__(self, capacidad: int = 1024):
+        self.capacidad = capacidad
+        self._entradas: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {'aciertos': 0, 'fallos': 0})
+
+    def obtener(self, etapa: str, forma: Dict[str, Any]) -> Optional[Any]:
+        """
+        Args:
+            etapa: Fase del análisis (clasificacion, validacion, fases_costos)
+            forma: Forma canónica del programa del usuario (canonizar)
+
+        Returns:
+            El resultado de un programa equivalente con los nombres y líneas
+            del usuario, o None si no hay
+        """
+        clave = (etapa, forma['clave'])
+        with self._lock:
+            valor = self._entradas.get(clave)
+            self._stats[etapa]['aciertos' if valor is not None else 'fallos'] += 1
+            if valor is None:
+                return None
+            self._entradas.move_to_end(clave)
+        return a_original(valor, forma)
+
+    def guardar(self, etapa: str, forma: Dict[str, Any], valor: Any) -> bool:
+        """
+        Guarda un resultado calculado sobre el programa de `forma`.
+
+        Returns:
+            False si el resultado no se puede expresar en forma canónica sin
+            ambigüedad (no se guarda)
+        """
+        canonico = a_canonico(valor, forma)
+        if canonico is None:
+            return False
+        clave = (etapa, forma['clave'])
+        with self._lock:
+            self._entradas[clave] = canonico
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+        return True
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Entradas retenidas y aciertos/fallos por etapa."""
+        with self._lock:
+            return {
+                'entradas': len(self._entradas),
+                'por_etapa': {etapa: dict(stats) for etapa, stats in self._stats.items()},
+            }
+
+    def limpiar(self) -> None:
+        """Elimina todas las entradas y contadores."""
+        with self._lock:
+            self._entradas.clear()
+            self._stats.clear()
+
+
+# Instancia global (singleton)
+_cache_canonico_instance = None
+_cache_canonico_lock = threading.Lock()
+
+
+def obtener_cache_canonico() -> CacheCanonico:
+    """Obtiene la instancia singleton del caché, configurada desde settings"""
+    global _cache_canonico_instance
+
+    with _cache_canonico_lock:
+        if _cache_canonico_instance is None:
+            _cache_canonico_instance = CacheCanonico(capacidad=settings.cache_canonico_max)
+
+    return _cache_canonico_instance
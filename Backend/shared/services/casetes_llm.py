@@ -0,0 +1,182 @@
+"""
+Casetes LLM (grabación / reproducción)
+======================================
+
+Backend intercambiable para LLMService.invocar (y por lo tanto LLMAnalyzer)
+que permite correr el pipeline completo sin acceso a la API:
+
+- live:   llamada real (por defecto)
+- record: llamada real y se graba la respuesta en un casete
+- replay: responde desde el casete; si no existe, llama y lo graba. Solo
+          para llamadas con temperatura 0: con temperatura mayor cada
+          respuesta es una muestra y se llama siempre a la API
+- fail:   responde desde el casete; si no existe, lanza CaseteNoEncontradoError
+
+Cada casete es un JSON nombrado por el hash del prompt (modelo, temperatura,
+max_tokens y mensajes). En replay/fail se puede simular la latencia de la API.
+
+Uso:
+    LLM_MODO=record python tests/ejecutar_todos_casos.py   # con API key
+    LLM_MODO=fail   python tests/ejecutar_todos_casos.py   # offline, determinista
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from config.settings import settings
+
+if TYPE_CHECKING:
+    from langchain_core.messages import AIMessage
+
+
+MODOS = ("live", "record", "replay", "fail")
+
+DIRECTORIO_DEFECTO = Path(__file__).resolve().parent.parent.parent / "data" / "casetes_llm"
+
+
+class CaseteNoEncontradoError(Exception):
+    """El modo fail recibió un prompt que no fue grabado."""
+
+
+class CaseteraLLM:
+    """
+    Graba y reproduce respuestas del LLM indexadas por hash del prompt.
+    """
+
+    def __init__(self, modo: str = "live", directorio: Optional[Path] = None, latencia_ms: int = 0):
+        """
+        Args:
+            modo: "live", "record", "replay" o "fail"
+            directorio: Carpeta de casetes
+            latencia_ms: Latencia simulada al reproducir (0 = sin espera)
+        """
+        if modo not in MODOS:
+            raise ValueError(f"Modo LLM inválido: {modo}. Opciones: {MODOS}")
+
+        self.modo = modo
+        self.directorio = Path(directorio) if directorio else DIRECTORIO_DEFECTO
+        self.latencia_ms = latencia_ms
+        self._lock = threading.Lock()
+        self._stats = {'reproducidas': 0, 'grabadas': 0, 'faltantes': 0}
+
+    @property
+    def requiere_api(self) -> bool:
+        """False si el modo nunca llama a la API real."""
+        return self.modo != "fail"
+
+    def _ruta(self, clave: str) -> Path:
+        return self.directorio / clave[:2] / f"{clave}.json"
+
+    def cargar(self, clave: str) -> Optional["AIMessage"]:
+        """Respuesta grabada para la clave, o None si no existe."""
+        ruta = self._ruta(clave)
+        if not ruta.exists():
+            return None
+        from langchain_core.messages import AIMessage
+
+        datos = json.loads(ruta.read_text(encoding="utf-8"))
+        respuesta = datos['respuesta']
+        return AIMessage(
+            content=respuesta['content'],
+            tool_calls=respuesta.get('tool_calls', []),
+            response_metadata=respuesta.get('response_metadata', {})
+        )
+
+    def grabar(self, clave: str, prompt: str, respuesta: Any) -> None:
+        """Guarda la respuesta en su casete (escritura atómica)."""
+        ruta = self._ruta(clave)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        datos = {
+            'clave': clave,
+            'grabado': datetime.now().isoformat(),
+            'prompt': prompt,
+            'respuesta': {
+                'content': getattr(respuesta, 'content', str(respuesta)),
+                'tool_calls': _serializable(getattr(respuesta, 'tool_calls', [])),
+                'response_metadata': _serializable(getattr(respuesta, 'response_metadata', {})),
+            },
+        }
+        temporal = ruta.with_suffix(".tmp")
+        temporal.write_text(json.dumps(datos, ensure_ascii=False, indent=2), encoding="utf-8")
+        temporal.replace(ruta)
+
+    def invocar(
+        self,
+        clave: str,
+        prompt: str,
+        llamada_real: Callable[[], Any],
+        determinista: bool = True
+    ) -> Any:
+        """
+        Resuelve una llamada según el modo.
+
+        Args:
+            clave: Hash del prompt
+            prompt: Prompt serializado (se guarda para depuración)
+            llamada_real: Callable que hace la llamada a la API
+            determinista: False si la llamada tiene temperatura mayor que 0
+                          (en replay no se reproduce ni se graba; fail sigue
+                          respondiendo desde el casete porque no hay API)
+
+        Returns:
+            Respuesta real o reproducida (AIMessage)
+
+        Raises:
+            CaseteNoEncontradoError: En modo fail si no hay casete
+        """
+        if self.modo == "live" or (self.modo == "replay" and not determinista):
+            return llamada_real()
+
+        if self.modo in ("replay", "fail"):
+            grabada = self.cargar(clave)
+            if grabada is not None:
+                if self.latencia_ms:
+                    time.sleep(self.latencia_ms / 1000)
+                self._contar('reproducidas')
+                return grabada
+            if self.modo == "fail":
+                self._contar('faltantes')
+                raise CaseteNoEncontradoError(
+                    f"No hay casete para el prompt {clave[:12]}... en {self.directorio}"
+                )
+
+        respuesta = llamada_real()
+        self.grabar(clave, prompt, respuesta)
+        self._contar('grabadas')
+        return respuesta
+
+    def _contar(self, campo: str) -> None:
+        with self._lock:
+            self._stats[campo] += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Modo actual y conteo de respuestas reproducidas, grabadas y faltantes."""
+        with self._lock:
+            return {'modo': self.modo, **self._stats}
+
+
+def _serializable(valor: Any) -> Any:
+    """Convierte metadata de la respuesta a tipos JSON."""
+    return json.loads(json.dumps(valor, default=str))
+
+
+# Instancia global (singleton)
+_casetera_instance = None
+
+
+def obtener_casetera() -> CaseteraLLM:
+    """Obtiene la instancia singleton de la casetera, configurada desde settings"""
+    global _casetera_instance
+
+    if _casetera_instance is None:
+        _casetera_instance = CaseteraLLM(
+            modo=settings.llm_modo,
+            directorio=settings.llm_casetes_dir,
+            latencia_ms=settings.llm_replay_latencia_ms,
+        )
+
+    return _casetera_instance
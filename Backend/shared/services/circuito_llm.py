@@ -0,0 +1,200 @@
+"""
+Interruptor de Circuito del Proveedor LLM
+=========================================
+
+Compartido por todas las llamadas a la API (lo consulta el gobernador en
+cada intento). Cuando el proveedor está degradado evita que cada análisis
+espere todos los backoffs de los reintentos:
+
+- CERRADO: las llamadas pasan; se registra el resultado de cada intento en
+  una ventana deslizante de settings.llm_circuito_ventana intentos
+- ABIERTO: si la tasa de fallos de la ventana supera
+  settings.llm_circuito_tasa_fallos (con al menos llm_circuito_min_intentos),
+  las llamadas fallan al instante con CircuitoAbiertoError
+- SEMIABIERTO: pasados settings.llm_circuito_espera_s se deja pasar una sola
+  llamada de prueba; si responde el circuito se cierra, si falla se reabre
+
+Con el circuito abierto las etapas van directo a sus caminos deterministas
+(escenarios heurísticos, procesadores de ecuaciones sin LLM, resolvers) en
+lugar de acumular un error por fase; llm_disponible() deja registrada la
+degradación en el presupuesto del análisis.
+
+Solo cuentan como fallos los errores del proveedor (429/5xx/529, timeouts y
+errores de conexión); una salida que no cumple el esquema no abre el circuito.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+from shared.services.presupuesto_llm import presupuesto_actual
+
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class CircuitoAbiertoError(RuntimeError):
+    """El proveedor LLM se considera caído: la llamada no se intenta."""
+
+
+class CircuitoLLM:
+    """
+    Interruptor de circuito con ventana deslizante de intentos.
+
+    Args:
+        tasa_fallos: Fracción de fallos de la ventana que abre el circuito
+        min_intentos: Intentos mínimos en la ventana antes de evaluar la tasa
+        ventana: Intentos recientes considerados
+        espera_s: Segundos abierto antes de permitir una llamada de prueba
+    """
+
+    def __init__(
+        self,
+        tasa_fallos: float = 0.5,
+        min_intentos: int = 10,
+        ventana: int = 20,
+        espera_s: float = 30.0
+    ):
+        self.tasa_fallos = tasa_fallos
+        self.min_intentos = min_intentos
+        self.espera_s = espera_s
+
+        self._intentos: deque = deque(maxlen=ventana)
+        self._estado = CERRADO
+        self._abierto_desde = 0.0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+        self._stats = {'aperturas': 0, 'rechazadas': 0, 'pruebas': 0}
+
+    def estado(self) -> str:
+        """Estado actual (un circuito abierto pasa a semiabierto al vencer la espera)."""
+        with self._lock:
+            return self._estado_actual()
+
+    def _estado_actual(self) -> str:
+        if self._estado == ABIERTO and time.monotonic() - self._abierto_desde >= self.espera_s:
+            self._estado = SEMIABIERTO
+        return self._estado
+
+    def permitir(self) -> None:
+        """
+        Admite un intento o falla al instante.
+
+        En SEMIABIERTO solo se admite una llamada de prueba a la vez.
+
+        Raises:
+            CircuitoAbiertoError: Si el circuito está abierto o ya hay una prueba en curso
+        """
+        with self._lock:
+            estado = self._estado_actual()
+            if estado == CERRADO:
+                return
+            if estado == SEMIABIERTO and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                self._stats['pruebas'] += 1
+                return
+            self._stats['rechazadas'] += 1
+            restante = max(self.espera_s - (time.monotonic() - self._abierto_desde), 0.0)
+        raise CircuitoAbiertoError(
+            f"Proveedor LLM no disponible (circuito {estado}, próxima prueba en {restante:.0f}s)"
+        )
+
+    def disponible(self) -> bool:
+        """True si una llamada nueva se intentaría (no reserva la llamada de prueba)."""
+        with self._lock:
+            estado = self._estado_actual()
+            return estado == CERRADO or (estado == SEMIABIERTO and not self._prueba_en_curso)
+
+    def registrar_exito(self) -> None:
+        with self._lock:
+            if self._estado != CERRADO:
+                # Los fallos que abrieron el circuito no cuentan para la próxima apertura
+                self._intentos.clear()
+                print("[OK] Circuito LLM cerrado: el proveedor volvió a responder")
+            self._intentos.append(True)
+            self._estado = CERRADO
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self) -> None:
+        with self._lock:
+            self._intentos.append(False)
+            if self._estado == SEMIABIERTO:
+                self._abrir()
+                return
+            fallos = self._intentos.count(False)
+            if (self._estado == CERRADO and len(self._intentos) >= self.min_intentos
+                    and fallos / len(self._intentos) >= self.tasa_fallos):
+                self._abrir()
+
+    def registrar_neutro(self) -> None:
+        """Libera la llamada de prueba cuando terminó con un error ajeno al proveedor."""
+        with self._lock:
+            self._prueba_en_curso = False
+
+    def _abrir(self) -> None:
+        self._estado = ABIERTO
+        self._abierto_desde = time.monotonic()
+        self._prueba_en_curso = False
+        self._stats['aperturas'] += 1
+        print(f"[WARN] Circuito LLM abierto: se usan los caminos deterministas durante {self.espera_s:.0f}s")
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado y contadores del circuito (para métricas y depuración)."""
+        with self._lock:
+            return {
+                'estado': self._estado_actual(),
+                'intentos_ventana': len(self._intentos),
+                'fallos_ventana': self._intentos.count(False),
+                **self._stats,
+            }
+
+
+def verificar_circuito(etapa: Optional[str]) -> None:
+    """
+    Rechaza una llamada LLM mientras el circuito está abierto.
+
+    Raises:
+        CircuitoAbiertoError: Si el proveedor se considera caído
+    """
+    if not llm_disponible(etapa or "llm"):
+        raise CircuitoAbiertoError("Proveedor LLM no disponible (circuito abierto)")
+
+
+def llm_disponible(etapa: str) -> bool:
+    """
+    Indica si vale la pena intentar una etapa LLM.
+
+    Con el circuito abierto registra la degradación en el presupuesto activo
+    para que la respuesta del análisis informe qué etapa usó su alternativa.
+    """
+    if obtener_circuito().disponible():
+        return True
+    presupuesto = presupuesto_actual()
+    if presupuesto is not None:
+        presupuesto.degradar(etapa, "proveedor LLM no disponible (circuito abierto)")
+    return False
+
+
+# Instancia global (singleton)
+_circuito_instance = None
+_circuito_lock = threading.Lock()
+
+
+def obtener_circuito() -> CircuitoLLM:
+    """Obtiene la instancia singleton del circuito, configurada desde settings"""
+    global _circuito_instance
+
+    with _circuito_lock:
+        if _circuito_instance is None:
+            _circuito_instance = CircuitoLLM(
+                tasa_fallos=settings.llm_circuito_tasa_fallos,
+                min_intentos=settings.llm_circuito_min_intentos,
+                ventana=settings.llm_circuito_ventana,
+                espera_s=settings.llm_circuito_espera_s,
+            )
+
+    return _circuito_instance
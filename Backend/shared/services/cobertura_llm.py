@@ -0,0 +1,209 @@
+"""
+Solicitudes de Cobertura (hedging)
+==================================
+
+Recorta la cola larga de latencia del camino interactivo: si una llamada con
+temperatura 0 no terminó cuando ya superó el percentil
+settings.llm_cobertura_percentil de las latencias recientes de su etapa, se
+lanza un duplicado. La primera respuesta gana y la otra se cancela: si aún
+espera turno en el gobernador sale de la cola sin consumir cupo; si ya está
+en vuelo su respuesta se descarta (sus tokens igual se registran).
+
+Solo se cubren llamadas interactivas y deterministas, y solo si:
+- la etapa tiene al menos settings.llm_cobertura_min_muestras latencias
+- el gobernador no tiene solicitudes en cola (cubrir bajo saturación empeora la cola)
+- el presupuesto del análisis alcanza para ambas llamadas
+
+Las latencias se registran por etapa (la fase activa de tools.metricas).
+"""
+
+import threading
+import time
+from collections import deque
+from contextvars import copy_context
+from typing import Any, Callable, Deque, Dict, Optional
+
+from config.settings import settings
+from shared.services.gobernador_llm import obtener_gobernador
+from shared.services.presupuesto_llm import presupuesto_actual
+from tools.metricas import fase_actual, registrar_cobertura
+
+
+class _Carrera:
+    """Resultado compartido entre la llamada original y su respaldo."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.ganador: Optional[str] = None
+        self.resultado: Any = None
+        self.errores: Dict[str, BaseException] = {}
+        self.cancelada = {'original': threading.Event(), 'respaldo': threading.Event()}
+
+
+class CoberturaLLM:
+    """
+    Lanza solicitudes de respaldo para las llamadas lentas.
+
+    Args:
+        percentil: Percentil de latencia (por etapa) a partir del cual se cubre
+        min_muestras: Latencias necesarias antes de cubrir una etapa
+        ventana: Latencias recientes que se conservan por etapa
+    """
+
+    def __init__(self, percentil: float = 95.0, min_muestras: int = 20, ventana: int = 200):
+        self.percentil = percentil
+        self.min_muestras = min_muestras
+        self.ventana = ventana
+        self._latencias: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._stats = {'llamadas': 0, 'respaldos': 0, 'ganados_por_respaldo': 0}
+
+    # ==================== LATENCIAS ====================
+
+    def registrar_latencia(self, etapa: str, segundos: float) -> None:
+        with self._lock:
+            self._latencias.setdefault(etapa, deque(maxlen=self.ventana)).append(segundos)
+
+    def umbral(self, etapa: str) -> Optional[float]:
+        """Latencia a partir de la cual se cubre la etapa (None = pocas muestras)."""
+        with self._lock:
+            muestras = sorted(self._latencias.get(etapa, ()))
+        if len(muestras) < self.min_muestras:
+            return None
+        indice = min(len(muestras) - 1, int(len(muestras) * self.percentil / 100))
+        return muestras[indice]
+
+    # ==================== EJECUCIÓN ====================
+
+    def ejecutar(
+        self,
+        funcion: Callable[[threading.Event], Any],
+        cubrir: bool = True,
+        tokens_estimados: int = 0,
+        al_descartar: Optional[Callable[[Any], None]] = None
+    ) -> Any:
+        """
+        Ejecuta `funcion` y, si tarda más que el umbral de su etapa, también un respaldo.
+
+        Args:
+            funcion: Hace la llamada; recibe el Event que indica que perdió la carrera
+                     (se pasa al gobernador para dejar la cola sin consumir cupo)
+            cubrir: False para llamadas que no admiten respaldo (batch, temperatura > 0)
+            tokens_estimados: Tokens de una llamada (el respaldo debe caber en el presupuesto)
+            al_descartar: Recibe la respuesta perdedora si llega a completarse
+
+        Returns:
+            La primera respuesta exitosa
+
+        Raises:
+            La excepción de la llamada original si ambas fallan
+        """
+        etapa = fase_actual() or "llm"
+        umbral = self.umbral(etapa) if cubrir else None
+        with self._lock:
+            self._stats['llamadas'] += 1
+
+        if umbral is None:
+            inicio = time.monotonic()
+            resultado = funcion(threading.Event())
+            self.registrar_latencia(etapa, time.monotonic() - inicio)
+            return resultado
+
+        carrera = _Carrera()
+        self._lanzar(carrera, 'original', funcion, etapa, al_descartar)
+        with carrera.cond:
+            carrera.cond.wait_for(lambda: carrera.ganador or carrera.errores, timeout=umbral)
+            pendiente = not (carrera.ganador or carrera.errores)
+
+        if pendiente and self._admite_respaldo(tokens_estimados):
+            with self._lock:
+                self._stats['respaldos'] += 1
+            self._lanzar(carrera, 'respaldo', funcion, etapa, al_descartar)
+            lanzadas = 2
+        else:
+            lanzadas = 1
+
+        with carrera.cond:
+            carrera.cond.wait_for(lambda: carrera.ganador or len(carrera.errores) == lanzadas)
+            if carrera.ganador is None:
+                raise carrera.errores.get('original') or carrera.errores['respaldo']
+            if lanzadas == 2:
+                registrar_cobertura(etapa, carrera.ganador == 'respaldo')
+                if carrera.ganador == 'respaldo':
+                    with self._lock:
+                        self._stats['ganados_por_respaldo'] += 1
+            return carrera.resultado
+
+    def _admite_respaldo(self, tokens_estimados: int) -> bool:
+        """El respaldo no debe saturar el gobernador ni exceder el presupuesto."""
+        if obtener_gobernador().estadisticas()['en_cola'] > 0:
+            return False
+        presupuesto = presupuesto_actual()
+        return presupuesto is None or presupuesto.alcanza(2 * tokens_estimados)
+
+    def _lanzar(
+        self,
+        carrera: _Carrera,
+        nombre: str,
+        funcion: Callable[[threading.Event], Any],
+        etapa: str,
+        al_descartar: Optional[Callable[[Any], None]]
+    ) -> None:
+        """Corre una de las llamadas en su hilo, con el contexto del llamador."""
+        def correr():
+            inicio = time.monotonic()
+            try:
+                resultado = funcion(carrera.cancelada[nombre])
+            except BaseException as e:
+                with carrera.cond:
+                    carrera.errores[nombre] = e
+                    carrera.cond.notify_all()
+                return
+
+            with carrera.cond:
+                gano = carrera.ganador is None
+                if gano:
+                    carrera.ganador, carrera.resultado = nombre, resultado
+                    for otra, evento in carrera.cancelada.items():
+                        if otra != nombre:
+                            evento.set()
+                carrera.cond.notify_all()
+            if gano:
+                self.registrar_latencia(etapa, time.monotonic() - inicio)
+            elif al_descartar:
+                al_descartar(resultado)
+
+        contexto = copy_context()
+        threading.Thread(
+            target=contexto.run, args=(correr,), name=f"llm-{nombre}", daemon=True
+        ).start()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Tasa de respaldo (respaldos / llamadas) y de victoria (ganados / respaldos)."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['tasa_respaldo'] = round(stats['respaldos'] / stats['llamadas'], 4) if stats['llamadas'] else 0.0
+        stats['tasa_victoria'] = (
+            round(stats['ganados_por_respaldo'] / stats['respaldos'], 4) if stats['respaldos'] else 0.0
+        )
+        return stats
+
+
+# Instancia global (singleton)
+_cobertura_instance = None
+_cobertura_lock = threading.Lock()
+
+
+def obtener_cobertura() -> CoberturaLLM:
+    """Obtiene la instancia singleton de la cobertura, configurada desde settings"""
+    global _cobertura_instance
+
+    with _cobertura_lock:
+        if _cobertura_instance is None:
+            _cobertura_instance = CoberturaLLM(
+                percentil=settings.llm_cobertura_percentil,
+                min_muestras=settings.llm_cobertura_min_muestras,
+                ventana=settings.llm_cobertura_ventana,
+            )
+
+    return _cobertura_instance
@@ -0,0 +1,435 @@
+"""
+Corrección local de errores de sintaxis
+=======================================
+Reparaciones deterministas, guiadas por la gramática v2.0 (data/gramatica/),
+de los errores mecánicos que reporta servicioValidador:
+
+- Flechas de asignación '<-', '←' y ':=' (y 'for i = ...') por '🡨'; '!=',
+  '&&' y '||' por '≠', 'and' y 'or'; ';' final
+- 'then'/'do' y paréntesis faltantes en if, while y for ('hasta' por 'to')
+- CALL faltante en llamadas a subrutinas del programa
+- Parámetros y variables locales sin tipo (bool si se les asigna T/F o se
+  niegan, real si se les asigna un decimal, int si no) y declaraciones sin comas
+- Bloques begin/end desbalanceados, reconstruidos por indentación (solo si el
+  validador reporta errores de estructura)
+
+Las reglas se aplican en pasadas sucesivas con re-validación entre ellas (una
+corrección puede destapar otra). ServicioCorrector solo llama al LLM si el
+programa sigue inválido, y entonces parte de la versión parcialmente corregida.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from shared.services.servicioValidador import servicioValidador
+
+TIPOS = ('int', 'real', 'bool')
+
+_RESERVADAS = {
+    'begin', 'end', 'if', 'then', 'else', 'while', 'do', 'for', 'to', 'repeat', 'until',
+    'return', 'CALL', 'NULL', 'T', 'F', 'int', 'real', 'bool', 'and', 'or', 'not', 'mod', 'div',
+}
+
+# Asignación con flecha alternativa: destino (variable, A[i], obj.campo) o variable del for
+_FLECHA = re.compile(r'^((?:for\s+)?[A-Za-z_][\w\.]*(?:\[[^\]]*\])*)\s*(?:<-|←|:=)\s*')
+_FOR_IGUAL = re.compile(r'^(for\s+\w+)\s*=\s*(?!=)')
+_SIMBOLOS = (
+    (re.compile(r'\s*!=\s*'), ' ≠ ', "'!=' por '≠'"),
+    (re.compile(r'\s*&&\s*'), ' and ', "'&&' por 'and'"),
+    (re.compile(r'\s*\|\|\s*'), ' or ', "'||' por 'or'"),
+    (re.compile(r'⌊'), '└', "'⌊' por '└'"),
+    (re.compile(r'⌋'), '┘', "'⌋' por '┘'"),
+    (re.compile(r'⌈'), '┌', "'⌈' por '┌'"),
+    (re.compile(r'⌉'), '┐', "'⌉' por '┐'"),
+    (re.compile(r'\s*;\s*$'), '', "';' final eliminado"),
+)
+
+# Encabezados de control con la palabra final opcional (se agrega si falta)
+_IF = re.compile(r'^if\b\s*(.*?)\s*(?:\bthen|\bentonces)?$', re.IGNORECASE)
+_WHILE = re.compile(r'^while\b\s*(.*?)\s*(?:\bdo|\bhacer)?$', re.IGNORECASE)
+_FOR = re.compile(r'^for\b\s*(.*?)\s*(?:\bdo|\bhacer)?$', re.IGNORECASE)
+_PALABRA_SOLA = re.compile(r'^(begin|end|else|repeat)$', re.IGNORECASE)
+_CONTROL = re.compile(r'^(if\s*\(.*\)\s*then|else|while\s*\(.*\)\s*do|for\s+.+\s+do)$')
+
+_DECLARADO = re.compile(r'^[A-Za-z_]\w*(\[\w*\])*$')
+
+
+def _partir(linea: str) -> Tuple[str, str, str]:
+    """(indentación, código, comentario '►...') de una línea."""
+    codigo, marca, comentario = linea.partition('►')
+    indentacion = linea[:len(linea) - len(linea.lstrip())]
+    return indentacion, codigo.strip(), marca + comentario
+
+
+def _unir(indentacion: str, codigo: str, comentario: str) -> str:
+    if comentario:
+        return f"{indentacion}{codigo} {comentario}" if codigo else f"{indentacion}{comentario}"
+    return f"{indentacion}{codigo}"
+
+
+def _ancho(indentacion: str) -> int:
+    return len(indentacion.expandtabs(4))
+
+
+def _envuelto(condicion: str) -> bool:
+    """True si toda la condición está entre un par de paréntesis."""
+    if not (condicion.startswith('(') and condicion.endswith(')')):
+        return False
+    nivel = 0
+    for posicion, caracter in enumerate(condicion):
+        nivel += {'(': 1, ')': -1}.get(caracter, 0)
+        if nivel == 0 and posicion < len(condicion) - 1:
+            return False
+    return nivel == 0
+
+
+def _entre_parentesis(condicion: str) -> str:
+    return condicion if _envuelto(condicion) else f"({condicion})"
+
+
+def _condicion_simple(condicion: str) -> bool:
+    """False si la 'condición' trae el cuerpo en la misma línea (if x then y 🡨 1)."""
+    return bool(condicion) and '🡨' not in condicion and not re.search(r'\b(then|do|begin)\b', condicion)
+
+
+class _Programa:
+    """Líneas del programa con las subrutinas ubicadas (encabezado seguido de begin)."""
+
+    def __init__(self, lineas: List[str], validador: servicioValidador):
+        self.lineas = lineas
+        self.v = validador
+        self.subrutinas: List[Tuple[int, int, str]] = []  # (inicio, fin exclusivo, nombre)
+        codigo = [(i, _partir(linea)[1]) for i, linea in enumerate(lineas)]
+        codigo = [(i, c) for i, c in codigo if c]
+        inicios = []
+        for posicion, (i, c) in enumerate(codigo):
+            siguiente = codigo[posicion + 1][1] if posicion + 1 < len(codigo) else ''
+            match = re.match(validador.patron_subrutina, c)
+            if match and siguiente.lower() == 'begin':
+                inicios.append((i, match.group(1)))
+        for posicion, (inicio, nombre) in enumerate(inicios):
+            fin = inicios[posicion + 1][0] if posicion + 1 < len(inicios) else len(lineas)
+            self.subrutinas.append((inicio, fin, nombre))
+        self.clases = [
+            re.match(validador.patron_clase, c).group(1) for _, c in codigo if re.match(validador.patron_clase, c)
+        ]
+
+    @property
+    def nombres(self) -> List[str]:
+        return [nombre for _, _, nombre in self.subrutinas]
+
+    def es_encabezado(self, indice: int) -> bool:
+        return any(inicio == indice for inicio, _, _ in self.subrutinas)
+
+
+# ==================== REGLAS ====================
+
+def _regla_simbolos(programa: _Programa, cambios: List[str]) -> None:
+    """Flechas de asignación y operadores de otros lenguajes."""
+    for i, linea in enumerate(programa.lineas):
+        indentacion, codigo, comentario = _partir(linea)
+        if not codigo:
+            continue
+        nuevo = codigo
+        if _FLECHA.match(nuevo):
+            nuevo = _FLECHA.sub(r'\1 🡨 ', nuevo)
+            cambios.append(f"Línea {i + 1}: flecha de asignación reemplazada por '🡨'")
+        elif _FOR_IGUAL.match(nuevo):
+            nuevo = _FOR_IGUAL.sub(r'\1 🡨 ', nuevo)
+            cambios.append(f"Línea {i + 1}: '=' del for reemplazado por '🡨'")
+        for patron, reemplazo, descripcion in _SIMBOLOS:
+            if patron.search(nuevo):
+                nuevo = patron.sub(reemplazo, nuevo).strip()
+                cambios.append(f"Línea {i + 1}: {descripcion}")
+        if nuevo != codigo:
+            programa.lineas[i] = _unir(indentacion, nuevo, comentario)
+
+
+def _regla_encabezados(programa: _Programa, cambios: List[str]) -> None:
+    """then/do y paréntesis en if, while y for; palabras clave en minúsculas."""
+    v = programa.v
+    for i, linea in enumerate(programa.lineas):
+        indentacion, codigo, comentario = _partir(linea)
+        if not codigo:
+            continue
+        nuevo = codigo
+        if _PALABRA_SOLA.match(codigo):
+            nuevo = codigo.lower()
+        elif _IF.match(codigo) and not re.match(v.patron_if, codigo):
+            condicion = _IF.match(codigo).group(1)
+            if _condicion_simple(condicion):
+                nuevo = f"if {_entre_parentesis(condicion)} then"
+        elif _WHILE.match(codigo) and not re.match(v.patron_while, codigo):
+            condicion = _WHILE.match(codigo).group(1)
+            if _condicion_simple(condicion):
+                nuevo = f"while {_entre_parentesis(condicion)} do"
+        elif _FOR.match(codigo) and not re.match(v.patron_for, codigo):
+            rango = re.sub(r'\s+hasta\s+', ' to ', _FOR.match(codigo).group(1), flags=re.IGNORECASE)
+            candidato = f"for {rango} do"
+            if re.match(v.patron_for, candidato):
+                nuevo = candidato
+        if nuevo != codigo:
+            programa.lineas[i] = _unir(indentacion, nuevo, comentario)
+            cambios.append(f"Línea {i + 1}: '{codigo}' → '{nuevo}'")
+
+
+def _regla_call(programa: _Programa, cambios: List[str]) -> None:
+    """CALL delante de las llamadas a subrutinas definidas en el programa."""
+    if not programa.nombres:
+        return
+    nombres = '|'.join(re.escape(nombre) for nombre in programa.nombres)
+    sentencia = re.compile(rf'^({nombres})\s*\(.*\)$')
+    en_expresion = re.compile(rf'(?<![\w.])(?<!CALL )({nombres})\s*\(')
+    for i, linea in enumerate(programa.lineas):
+        indentacion, codigo, comentario = _partir(linea)
+        if not codigo or programa.es_encabezado(i):
+            continue
+        if sentencia.match(codigo):
+            nuevo = f"CALL {codigo}"
+        elif '🡨' in codigo:
+            destino, _, valor = codigo.partition('🡨')
+            nuevo = destino + '🡨' + en_expresion.sub(r'CALL \1(', valor)
+        elif re.match(r'^return\s', codigo):
+            nuevo = 'return' + en_expresion.sub(r'CALL \1(', codigo[len('return'):])
+        else:
+            continue
+        if nuevo != codigo:
+            programa.lineas[i] = _unir(indentacion, nuevo, comentario)
+            cambios.append(f"Línea {i + 1}: llamada con CALL: '{nuevo}'")
+
+
+def _inferir_tipos(lineas: List[str]) -> Dict[str, str]:
+    """bool si se asigna T/F, se compara con T/F o se niega; real si se asigna un decimal."""
+    tipos = {}
+    for linea in lineas:
+        codigo = _partir(linea)[1]
+        for nombre in re.findall(r'\b(\w+)\s*(?:🡨|=|≠)\s*(?:T|F)\b', codigo) + re.findall(r'\bnot\s+(\w+)', codigo):
+            tipos[nombre] = 'bool'
+        for nombre in re.findall(r'\b(\w+)\s*🡨\s*-?\d+\.\d+\s*$', codigo):
+            tipos.setdefault(nombre, 'real')
+    return tipos
+
+
+def _tipo_de(nombre: str, tipos: Dict[str, str]) -> str:
+    return tipos.get(re.sub(r'\[.*$', '', nombre), 'int')
+
+
+def _regla_parametros(programa: _Programa, cambios: List[str]) -> None:
+    """Tipo en parámetros sin tipo y comas entre parámetros."""
+    v = programa.v
+    for inicio, fin, nombre in programa.subrutinas:
+        indentacion, codigo, comentario = _partir(programa.lineas[inicio])
+        match = re.match(v.patron_subrutina, codigo)
+        if not match or not match.group(2).strip():
+            continue
+        cuerpo = programa.lineas[inicio + 1:fin]
+        tipos = _inferir_tipos(cuerpo)
+        texto_cuerpo = '\n'.join(_partir(linea)[1] for linea in cuerpo)
+        parametros = []
+        for parametro in (p.strip() for p in match.group(2).split(',')):
+            palabras = parametro.split()
+            if re.match(v.patron_param_con_tipo, parametro) or re.match(v.patron_param_objeto, parametro):
+                parametros.append(parametro)
+            elif palabras and palabras[0] in TIPOS and all(_DECLARADO.match(p) for p in palabras[1:]):
+                # int a b → int a, int b
+                parametros.extend(f"{palabras[0]} {p}" for p in palabras[1:])
+            elif palabras and all(_DECLARADO.match(p) and p not in _RESERVADAS for p in palabras):
+                for p in palabras:
+                    base = re.sub(r'\[.*$', '', p)
+                    objeto = re.search(rf'\b{re.escape(base)}\.\w', texto_cuerpo)
+                    if objeto and len(programa.clases) == 1 and '[' not in p:
+                        parametros.append(f"{programa.clases[0]} {p}")
+                    elif objeto:
+                        parametros.append(p)  # objeto de clase ambigua: queda para el LLM
+                    else:
+                        parametros.append(f"{_tipo_de(p, tipos)} {p}")
+            else:
+                parametros.append(parametro)
+        nuevo = f"{match.group(1)}({', '.join(parametros)})"
+        if nuevo != codigo:
+            programa.lineas[inicio] = _unir(indentacion, nuevo, comentario)
+            cambios.append(f"Línea {inicio + 1}: parámetros de {nombre} con tipo: '{nuevo}'")
+
+
+def _es_sentencia(codigo: str, v: servicioValidador) -> bool:
+    """Mismo criterio que el validador para el fin de las declaraciones locales."""
+    return any(re.match(patron, codigo) for patron in (
+        v.patron_if, v.patron_while, v.patron_for, v.patron_asignacion,
+        v.patron_call, v.patron_return, v.patron_end,
+    ))
+
+
+def _regla_declaraciones(programa: _Programa, cambios: List[str]) -> None:
+    """Tipo y comas en las declaraciones locales (al inicio de cada subrutina)."""
+    v = programa.v
+    for inicio, fin, nombre in reversed(programa.subrutinas):
+        tipos = _inferir_tipos(programa.lineas[inicio + 1:fin])
+        i = inicio + 1
+        while i < fin and _partir(programa.lineas[i])[1] != 'begin':
+            i += 1
+        i += 1
+        reemplazos = []
+        while i < fin:
+            indentacion, codigo, comentario = _partir(programa.lineas[i])
+            if codigo and _es_sentencia(codigo, v):
+                break
+            if codigo and not (
+                re.match(v.patron_var_con_tipo, codigo)
+                or re.match(v.patron_var_multiple, codigo)
+                or (re.match(v.patron_param_objeto, codigo) and '🡨' not in codigo)
+            ):
+                nuevas = _reescribir_declaracion(codigo, tipos)
+                if nuevas:
+                    reemplazos.append((i, [_unir(indentacion, nuevas[0], comentario)]
+                                       + [f"{indentacion}{d}" for d in nuevas[1:]]))
+                    cambios.append(f"Línea {i + 1}: declaración en {nombre}: '{codigo}' → '{'; '.join(nuevas)}'")
+            i += 1
+        for indice, nuevas_lineas in reversed(reemplazos):
+            programa.lineas[indice:indice + 1] = nuevas_lineas
+
+
+def _reescribir_declaracion(codigo: str, tipos: Dict[str, str]) -> Optional[List[str]]:
+    """
+    'i j', 'i, j', 'int i j' o 'L[100], R[100]' como declaraciones válidas:
+    escalares agrupados por tipo ('int i, j') y cada vector en su línea.
+    None si la línea no parece una declaración.
+    """
+    explicito = None
+    palabras = codigo.split(None, 1)
+    if palabras[0] in TIPOS and len(palabras) == 2:
+        explicito, codigo = palabras[0], palabras[1]
+    nombres = [n for n in re.split(r'[\s,]+', codigo) if n]
+    if not nombres or not all(_DECLARADO.match(n) and n not in _RESERVADAS for n in nombres):
+        return None
+    escalares: Dict[str, List[str]] = {}
+    vectores = []
+    for n in nombres:
+        tipo = explicito or _tipo_de(n, tipos)
+        if '[' in n:
+            vectores.append(f"{tipo} {n}")
+        else:
+            escalares.setdefault(tipo, []).append(n)
+    return [f"{tipo} {', '.join(grupo)}" for tipo, grupo in escalares.items()] + vectores
+
+
+def _regla_bloques(programa: _Programa, cambios: List[str]) -> None:
+    """
+    begin después de un encabezado de control seguido de un cuerpo más
+    indentado, y end donde la indentación muestra que el bloque terminó.
+    Si la indentación no permite decidir, no toca nada.
+    """
+    salida: List[str] = []
+    pila: List[List[int]] = []  # [indentación del begin, ¿cuerpo más indentado?]
+    nuevos: List[str] = []
+    anterior: Optional[Tuple[str, int]] = None
+
+    def cerrar():
+        ancho = pila.pop()[0]
+        posicion = len(salida)
+        while posicion > 0 and not _partir(salida[posicion - 1])[1]:
+            posicion -= 1
+        salida.insert(posicion, ' ' * ancho + 'end')
+        nuevos.append(f"'end' agregado para el begin con indentación {ancho}")
+
+    for linea in programa.lineas:
+        indentacion, codigo, _ = _partir(linea)
+        if not codigo:
+            salida.append(linea)
+            continue
+        ancho = _ancho(indentacion)
+        while pila and (ancho < pila[-1][0] or (ancho == pila[-1][0] and codigo != 'end')):
+            if not pila[-1][1]:
+                return  # cuerpo sin indentar: no se puede inferir el bloque
+            cerrar()
+        if pila and ancho > pila[-1][0]:
+            pila[-1][1] = True
+        if anterior and _CONTROL.match(anterior[0]) and ancho > anterior[1] and codigo != 'begin':
+            salida.append(' ' * anterior[1] + 'begin')
+            pila.append([anterior[1], True])
+            nuevos.append(f"'begin' agregado después de '{anterior[0]}'")
+        if codigo == 'begin':
+            pila.append([ancho, False])
+        elif codigo == 'end':
+            if not pila or pila[-1][0] != ancho:
+                return  # end sin begin a su nivel
+            pila.pop()
+        salida.append(linea)
+        anterior = (codigo, ancho)
+    while pila:
+        if not pila[-1][1]:
+            return
+        cerrar()
+
+    if nuevos:
+        programa.lineas[:] = salida
+        cambios.extend(nuevos)
+
+
+def _aplicar_reglas(pseudocodigo: str, validacion: Dict[str, Any], validador: servicioValidador) -> Tuple[str, List[str]]:
+    """Una pasada de todas las reglas; devuelve el programa y los cambios hechos."""
+    lineas = pseudocodigo.split('\n')
+    cambios: List[str] = []
+    _regla_simbolos(_Programa(lineas, validador), cambios)
+    _regla_encabezados(_Programa(lineas, validador), cambios)
+    if validacion['capas']['3_ESTRUCTURA']['errores']:
+        _regla_bloques(_Programa(lineas, validador), cambios)
+    _regla_call(_Programa(lineas, validador), cambios)
+    _regla_parametros(_Programa(lineas, validador), cambios)
+    _regla_declaraciones(_Programa(lineas, validador), cambios)
+    return '\n'.join(lineas), cambios
+
+
+def _errores(validacion: Dict[str, Any]) -> int:
+    return validacion['resumen']['errores_totales']
+
+
+def corregir_localmente(
+    pseudocodigo: str,
+    validacion: Optional[Dict[str, Any]] = None,
+    max_pasadas: int = 3,
+) -> Dict[str, Any]:
+    """
+    Aplica las reglas y re-valida hasta que el programa es válido, no hay
+    más cambios o se agotan las pasadas.
+
+    Args:
+        pseudocodigo: Programa con errores
+        validacion: Resultado de servicioValidador para ese programa (se valida si falta)
+        max_pasadas: Máximo de pasadas de reglas
+
+    Returns:
+        dict con:
+            - 'valido': bool - Si el programa corregido pasa el validador
+            - 'pseudocodigo': str - Programa corregido; el original si las
+              reglas no redujeron los errores
+            - 'correcciones': List[str] - Cambios aplicados
+            - 'validacion': Dict - Validación de 'pseudocodigo'
+            - 'errores_iniciales' / 'errores_restantes': int
+    """
+    validador = servicioValidador()
+    if validacion is None:
+        validacion = validador.validar(pseudocodigo)
+    inicial = {'pseudocodigo': pseudocodigo, 'validacion': validacion}
+    actual, correcciones = pseudocodigo, []
+
+    for _ in range(max_pasadas):
+        if validacion['valido_general']:
+            break
+        nuevo, cambios = _aplicar_reglas(actual, validacion, validador)
+        if nuevo == actual:
+            break
+        actual, validacion = nuevo, validador.validar(nuevo)
+        correcciones.extend(cambios)
+
+    if not validacion['valido_general'] and _errores(validacion) >= _errores(inicial['validacion']):
+        # Las reglas no ayudaron: el LLM parte del original
+        actual, validacion, correcciones = inicial['pseudocodigo'], inicial['validacion'], []
+
+    return {
+        'valido': validacion['valido_general'],
+        'pseudocodigo': actual,
+        'correcciones': correcciones,
+        'validacion': validacion,
+        'errores_iniciales': _errores(inicial['validacion']),
+        'errores_restantes': _errores(validacion),
+    }
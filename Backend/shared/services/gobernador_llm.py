@@ -0,0 +1,417 @@
+"""
+Gobernador de Llamadas LLM
+==========================
+
+Punto único por el que pasan todas las llamadas a la API de Anthropic.
+
+- Cubetas de tokens para solicitudes por minuto (RPM) y tokens por minuto (TPM)
+- Concurrencia adaptativa (AIMD): se reduce a la mitad ante 429/529 y crece
+  de a poco con cada respuesta exitosa
+- Reintentos con backoff exponencial y jitter completo (respeta retry-after)
+- Prioridades: las solicitudes interactivas (API) pasan antes que los
+  trabajos batch (generación de dataset)
+- Interruptor de circuito (opcional): cada intento se consulta y se
+  registra en él; con el circuito abierto la llamada falla al instante
+  y no se reintenta
+- Plazo del análisis: la espera de turno y los backoffs se acotan a los
+  segundos que le quedan al presupuesto activo; vencido el plazo la
+  llamada deja de reintentarse y falla con PresupuestoAgotadoError
+
+Ante un pico de tráfico las solicitudes esperan turno en lugar de fallar
+todas a la vez contra el proveedor.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from config.settings import settings
+from shared.services.circuito_llm import CircuitoLLM, obtener_circuito
+from shared.services.presupuesto_llm import (
+    PresupuestoAgotadoError,
+    PresupuestoAnalisis,
+    presupuesto_actual,
+)
+
+
+T = TypeVar("T")
+
+PRIORIDAD_INTERACTIVA = 0
+PRIORIDAD_BATCH = 10
+
+_prioridad_actual: ContextVar[int] = ContextVar("prioridad_llm", default=PRIORIDAD_INTERACTIVA)
+
+
+def prioridad_en_contexto() -> int:
+    """Prioridad de las llamadas LLM en el contexto actual."""
+    return _prioridad_actual.get()
+
+
+class SolicitudCancelada(Exception):
+    """La solicitud se retiró antes de llegar al proveedor (perdió la carrera de cobertura)."""
+
+
+@contextmanager
+def prioridad_llm(prioridad: int):
+    """
+    Fija la prioridad de las llamadas LLM hechas dentro del bloque.
+
+    Example:
+        >>> with prioridad_llm(PRIORIDAD_BATCH):
+        ...     generador.generar_todo()
+    """
+    token = _prioridad_actual.set(prioridad)
+    try:
+        yield
+    finally:
+        _prioridad_actual.reset(token)
+
+
+class _CuboTokens:
+    """Cubeta de tokens con recarga continua. El nivel puede quedar negativo al conciliar."""
+
+    def __init__(self, capacidad_por_minuto: int):
+        self.capacidad = float(capacidad_por_minuto)
+        self.tasa = capacidad_por_minuto / 60.0
+        self.nivel = self.capacidad
+        self._ultimo = time.monotonic()
+
+    def _recargar(self) -> None:
+        ahora = time.monotonic()
+        self.nivel = min(self.capacidad, self.nivel + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    def espera(self, cantidad: float) -> float:
+        """Segundos hasta que haya `cantidad` disponible (0 si ya la hay)."""
+        self._recargar()
+        cantidad = min(cantidad, self.capacidad)
+        if self.nivel >= cantidad:
+            return 0.0
+        return (cantidad - self.nivel) / self.tasa
+
+    def consumir(self, cantidad: float) -> None:
+        self._recargar()
+        self.nivel -= cantidad
+
+
+class GobernadorLLM:
+    """
+    Limitador de tasa y concurrencia compartido por todas las llamadas LLM.
+    """
+
+    def __init__(
+        self,
+        rpm: int = 50,
+        tpm: int = 80000,
+        concurrencia_max: int = 8,
+        concurrencia_min: int = 1,
+        max_reintentos: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        circuito: Optional[CircuitoLLM] = None
+    ):
+        """
+        Args:
+            rpm: Solicitudes por minuto permitidas
+            tpm: Tokens (entrada + salida) por minuto permitidos
+            concurrencia_max: Límite superior de llamadas simultáneas
+            concurrencia_min: Límite inferior al que puede bajar la concurrencia
+            max_reintentos: Reintentos ante errores transitorios
+            backoff_base: Espera base del backoff exponencial (segundos)
+            backoff_max: Espera máxima entre reintentos (segundos)
+            circuito: Interruptor de circuito del proveedor (None = sin circuito)
+        """
+        self.concurrencia_max = concurrencia_max
+        self.concurrencia_min = concurrencia_min
+        self.max_reintentos = max_reintentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.circuito = circuito
+
+        self._cubo_rpm = _CuboTokens(rpm)
+        self._cubo_tpm = _CuboTokens(tpm)
+        self._limite = float(concurrencia_max)
+        self._en_vuelo = 0
+        self._pausa_hasta = 0.0
+        self._cola: list = []
+        self._secuencia = itertools.count()
+        self._cond = threading.Condition()
+
+        self._stats = {
+            'llamadas': 0,
+            'reintentos': 0,
+            'limitadas': 0,
+            'fallidas': 0,
+        }
+
+    # ==================== ADMISIÓN ====================
+
+    def _adquirir(
+        self,
+        tokens: int,
+        prioridad: int,
+        cancelada: Optional[threading.Event] = None,
+        presupuesto: Optional[PresupuestoAnalisis] = None
+    ) -> None:
+        """
+        Bloquea hasta que la solicitud sea la primera de la cola y haya cupo.
+
+        Raises:
+            SolicitudCancelada: Si `cancelada` se activa mientras espera turno
+            PresupuestoAgotadoError: Si el plazo del presupuesto vence mientras espera turno
+        """
+        ticket = (prioridad, next(self._secuencia))
+
+        with self._cond:
+            heapq.heappush(self._cola, ticket)
+            try:
+                while True:
+                    if cancelada is not None and cancelada.is_set():
+                        raise SolicitudCancelada("La solicitud se canceló mientras esperaba turno")
+                    restante = presupuesto.segundos_restantes() if presupuesto is not None else None
+                    if restante is not None and restante <= 0:
+                        raise _plazo_vencido(presupuesto, "esperando turno")
+                    if self._cola[0] == ticket and self._en_vuelo < max(1, int(self._limite)):
+                        espera = max(
+                            self._cubo_rpm.espera(1),
+                            self._cubo_tpm.espera(tokens),
+                            self._pausa_hasta - time.monotonic(),
+                        )
+                        if espera <= 0:
+                            self._cubo_rpm.consumir(1)
+                            self._cubo_tpm.consumir(tokens)
+                            self._en_vuelo += 1
+                            return
+                        espera = min(espera, 1.0) if cancelada else espera
+                    else:
+                        espera = 1.0
+                    self._cond.wait(timeout=espera if restante is None else min(espera, restante))
+            finally:
+                self._cola.remove(ticket)
+                heapq.heapify(self._cola)
+                self._cond.notify_all()
+
+    def _liberar(self, tokens_reservados: int, tokens_reales: Optional[int]) -> None:
+        """Libera el cupo y concilia la reserva de tokens con el uso real."""
+        with self._cond:
+            self._en_vuelo -= 1
+            if tokens_reales is not None:
+                self._cubo_tpm.consumir(tokens_reales - tokens_reservados)
+            self._cond.notify_all()
+
+    # ==================== CONCURRENCIA ADAPTATIVA ====================
+
+    def _registrar_exito(self) -> None:
+        with self._cond:
+            self._limite = min(self.concurrencia_max, self._limite + 1.0 / self._limite)
+
+    def _registrar_limitacion(self, pausa: float) -> None:
+        with self._cond:
+            self._stats['limitadas'] += 1
+            self._limite = max(self.concurrencia_min, self._limite / 2)
+            self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + pausa)
+
+    # ==================== EJECUCIÓN ====================
+
+    def ejecutar(
+        self,
+        funcion: Callable[[], T],
+        tokens_estimados: int = 0,
+        prioridad: Optional[int] = None,
+        cancelada: Optional[threading.Event] = None
+    ) -> T:
+        """
+        Ejecuta una llamada LLM respetando límites, prioridad y reintentos.
+
+        Args:
+            funcion: Callable sin argumentos que hace la llamada (p. ej. lambda: llm.invoke(x))
+            tokens_estimados: Tokens reservados en la cubeta TPM antes de llamar
+            prioridad: PRIORIDAD_INTERACTIVA, PRIORIDAD_BATCH o None (prioridad del contexto)
+            cancelada: Si se activa, la solicitud deja la cola o no reintenta
+                       (la usa la cobertura para retirar la llamada perdedora)
+
+        Returns:
+            Resultado de `funcion`
+
+        Raises:
+            SolicitudCancelada: Si se canceló antes de llegar al proveedor
+            CircuitoAbiertoError: Si el circuito del proveedor está abierto
+            PresupuestoAgotadoError: Si el plazo del presupuesto activo vence
+                                     esperando turno o entre reintentos
+            La última excepción si se agotan los reintentos o el error no es transitorio
+        """
+        if prioridad is None:
+            prioridad = _prioridad_actual.get()
+        presupuesto = presupuesto_actual()
+
+        for intento in range(self.max_reintentos + 1):
+            if self.circuito is not None:
+                self.circuito.permitir()
+            try:
+                self._adquirir(tokens_estimados, prioridad, cancelada, presupuesto)
+            except (SolicitudCancelada, PresupuestoAgotadoError):
+                self._registrar_circuito(None)
+                raise
+            try:
+                resultado = funcion()
+            except Exception as e:
+                self._liberar(tokens_estimados, None)
+                transitorio = es_error_transitorio(e)
+                self._registrar_circuito(False if transitorio else None)
+                circuito_abierto = self.circuito is not None and not self.circuito.disponible()
+                if (not transitorio or intento == self.max_reintentos or circuito_abierto
+                        or (cancelada is not None and cancelada.is_set())):
+                    with self._cond:
+                        self._stats['fallidas'] += 1
+                    raise
+
+                espera = self._calcular_espera(intento, e)
+                if es_limitacion(e):
+                    self._registrar_limitacion(espera)
+                restante = presupuesto.segundos_restantes() if presupuesto is not None else None
+                if restante is not None and restante <= 0:
+                    with self._cond:
+                        self._stats['fallidas'] += 1
+                    raise _plazo_vencido(presupuesto, f"tras {_describir_error(e)}") from e
+                with self._cond:
+                    self._stats['reintentos'] += 1
+                if restante is not None:
+                    espera = min(espera, restante)
+                print(f"[WARN] LLM: {_describir_error(e)}. Reintentando en {espera:.1f}s "
+                      f"(intento {intento + 1}/{self.max_reintentos})")
+                time.sleep(espera)
+                continue
+
+            self._liberar(tokens_estimados, _tokens_reales(resultado))
+            self._registrar_exito()
+            self._registrar_circuito(True)
+            with self._cond:
+                self._stats['llamadas'] += 1
+            return resultado
+
+    def _registrar_circuito(self, exito: Optional[bool]) -> None:
+        """Informa al circuito el resultado del intento (None = no dice nada del proveedor)."""
+        if self.circuito is None:
+            return
+        if exito is None:
+            self.circuito.registrar_neutro()
+        elif exito:
+            self.circuito.registrar_exito()
+        else:
+            self.circuito.registrar_fallo()
+
+    def _calcular_espera(self, intento: int, error: Exception) -> float:
+        """Backoff exponencial con jitter completo, sin bajar de retry-after."""
+        tope = min(self.backoff_max, self.backoff_base * (2 ** intento))
+        espera = random.uniform(0, tope)
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            espera = max(espera, min(retry_after, self.backoff_max))
+        return espera
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado actual del gobernador (para métricas y depuración)."""
+        with self._cond:
+            return {
+                'en_vuelo': self._en_vuelo,
+                'en_cola': len(self._cola),
+                'limite_concurrencia': round(self._limite, 2),
+                **self._stats,
+            }
+
+
+# ==================== CLASIFICACIÓN DE ERRORES ====================
+
+def _codigo_estado(error: Exception) -> Optional[int]:
+    codigo = getattr(error, 'status_code', None)
+    if codigo is None and getattr(error, 'response', None) is not None:
+        codigo = getattr(error.response, 'status_code', None)
+    return codigo if isinstance(codigo, int) else None
+
+
+def es_limitacion(error: Exception) -> bool:
+    """True si el proveedor pidió bajar el ritmo (429 rate limit o 529 overloaded)."""
+    codigo = _codigo_estado(error)
+    if codigo in (429, 529):
+        return True
+    texto = str(error).lower()
+    return "429" in texto or "529" in texto or "overloaded" in texto or "rate limit" in texto or "rate_limit" in texto
+
+
+def es_error_transitorio(error: Exception) -> bool:
+    """True si vale la pena reintentar: limitación, 5xx, timeout o error de conexión."""
+    if es_limitacion(error):
+        return True
+    codigo = _codigo_estado(error)
+    if codigo is not None:
+        return codigo >= 500
+    texto = str(error).lower()
+    return "timeout" in texto or "timed out" in texto or "connection" in texto
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    respuesta = getattr(error, 'response', None)
+    headers = getattr(respuesta, 'headers', None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _tokens_reales(resultado: Any) -> Optional[int]:
+    """
+    Tokens de la respuesta que cuentan para el límite TPM.
+
+    `input_tokens` de Anthropic excluye la caché de prompts: los tokens
+    escritos en ella se suman siempre y los leídos solo si
+    settings.llm_tpm_cuenta_cache_leida (ver LLMService._registrar_uso).
+    """
+    metadata = getattr(resultado, 'response_metadata', None)
+    if not isinstance(metadata, dict) or 'usage' not in metadata:
+        return None
+    usage = metadata['usage']
+    campos = ['input_tokens', 'output_tokens', 'cache_creation_input_tokens']
+    if settings.llm_tpm_cuenta_cache_leida:
+        campos.append('cache_read_input_tokens')
+    return sum(usage.get(campo) or 0 for campo in campos)
+
+
+def _plazo_vencido(presupuesto: PresupuestoAnalisis, donde: str) -> PresupuestoAgotadoError:
+    """Registra la degradación y arma el error de una llamada cortada por el plazo."""
+    motivo = presupuesto.motivo_agotado()
+    presupuesto.degradar("llm", f"llamada LLM cortada {donde}: {motivo}")
+    return PresupuestoAgotadoError(f"Presupuesto del análisis agotado: {motivo}")
+
+
+def _describir_error(error: Exception) -> str:
+    codigo = _codigo_estado(error)
+    return f"HTTP {codigo}" if codigo else type(error).__name__
+
+
+# Instancia global (singleton)
+_gobernador_instance = None
+_gobernador_lock = threading.Lock()
+
+
+def obtener_gobernador() -> GobernadorLLM:
+    """Obtiene la instancia singleton del gobernador, configurada desde settings"""
+    global _gobernador_instance
+
+    with _gobernador_lock:
+        if _gobernador_instance is None:
+            _gobernador_instance = GobernadorLLM(
+                rpm=settings.llm_rpm,
+                tpm=settings.llm_tpm,
+                concurrencia_max=settings.llm_concurrencia_max,
+                max_reintentos=settings.llm_max_reintentos,
+                circuito=obtener_circuito(),
+            )
+
+    return _gobernador_instance
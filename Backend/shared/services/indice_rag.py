@@ -0,0 +1,373 @@
+"""
+Índice de Recuperación de Ejemplos (BM25)
+=========================================
+
+Traductor y corrector eligen sus ejemplos de referencia con este índice en
+lugar de puntuar uno por uno todos los ejemplos de la base de conocimiento:
+
+- Índice invertido BM25 sobre el contenido de cada ejemplo y sus metadatos
+  (nombre, categoría, subcategoría, tipo y estructuras de control). Los
+  metadatos pesan más que el contenido.
+- Términos normalizados: sin tildes, camelCase y snake_case separados, sin
+  palabras vacías ni palabras reservadas de la gramática, con un glosario
+  inglés/español (bubble -> burbuja) y truncados a 6 caracteres (ordenar,
+  ordenado y ordenamiento comparten término)
+- Postings ordenados por impacto (la contribución BM25 del término en el
+  documento, fija al construir): una consulta recorre a lo sumo
+  settings.rag_postings_max entradas por término, así el costo no crece con
+  el tamaño de la base
+
+Colecciones:
+- "corrector": data/pseudocodigos/correctos (gramática v2.0, referencia de
+  sintaxis; las entregas calificadas se agregan ahí)
+- "traductor": lo anterior más los ejemplos etiquetados de ml/dataset/*.json,
+  en notación libre: sirven como referencia de lógica, no de sintaxis
+  (sintaxis=False)
+
+Cada colección se construye una vez por proceso, o se carga del artefacto
+prearmado en settings.rag_indices_dir si sus fuentes no cambiaron:
+
+    python -m shared.services.indice_rag     # reconstruye los artefactos
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import settings
+from shared.services.lectorArchivos import LectorArchivos
+
+
+VERSION_FORMATO = 1
+
+_BACKEND = Path(__file__).resolve().parent.parent.parent
+RUTA_CORRECTOS = _BACKEND / "data" / "pseudocodigos" / "correctos"
+RUTA_DATASET = _BACKEND / "ml" / "dataset"
+
+COLECCIONES = {
+    'corrector': ("correctos",),
+    'traductor': ("correctos", "dataset"),
+}
+
+# Parámetros BM25 y peso de los términos de metadatos respecto del contenido
+_K1 = 1.2
+_B = 0.75
+_PESO_METADATOS = 3
+
+_LARGO_RAIZ = 6
+
+_VACIAS = {
+    # Español
+    "una", "uno", "unos", "unas", "del", "las", "los", "que", "por", "con", "sin", "como", "cada",
+    "este", "esta", "esto", "estos", "estas", "ese", "esa", "sus", "entre", "sobre", "cual", "cuando",
+    "donde", "tiene", "tener", "debe", "puede", "forma", "usando", "usar", "mediante", "luego", "todo",
+    "todos", "toda", "todas", "otro", "otra", "mismo", "misma", "algoritmo", "metodo", "dado", "dada",
+    "paso", "caso", "valor", "resultado", "retorna", "retornar", "devolver", "devuelve", "calcular",
+    "crear", "entonces", "hacer", "mientras", "para", "desde", "hasta", "fin", "funcion",
+    "procedimiento", "sino", "hacia", "mas", "partir",
+    # Inglés
+    "the", "and", "with", "from", "into", "that", "this", "using",
+    # Palabras reservadas de la gramática (aparecen en todos los ejemplos)
+    "begin", "end", "then", "else", "while", "for", "repeat", "until", "return", "call", "int",
+    "bool", "real", "not", "length", "null",
+}
+
+# Variantes e inglés -> término en español usado por los ejemplos
+_GLOSARIO = {
+    "bubble": "burbuja", "sort": "ordenar", "sorting": "ordenar", "search": "busqueda",
+    "buscar": "busqueda", "busca": "busqueda", "binary": "binaria", "linear": "lineal",
+    "merge": "mezcla", "mezclar": "mezcla", "quick": "rapido", "quicksort": "rapido",
+    "insert": "insertar", "insertion": "insertar", "insercion": "insertar",
+    "selection": "seleccion", "seleccionar": "seleccion", "matrix": "matriz", "matrices": "matriz",
+    "multiplication": "multiplicar", "multiplicacion": "multiplicar", "tree": "arbol",
+    "bst": "arbol", "node": "nodo", "power": "potencia", "sum": "suma", "sumar": "suma",
+    "max": "maximo", "maximum": "maximo", "min": "minimo", "minimum": "minimo",
+    "array": "arreglo", "vector": "arreglo", "towers": "torres",
+    "recursive": "recursivo", "recursion": "recursivo", "recursividad": "recursivo",
+    "iterative": "iterativo", "monticulo": "heap", "graph": "grafo", "knapsack": "mochila",
+    "coins": "monedas", "anchura": "bfs", "amplitud": "bfs", "profundidad": "dfs",
+}
+
+
+# ==================== TÉRMINOS ====================
+def _palabras(texto: str) -> List[Tuple[str, str]]:
+    """Pares (palabra sin tildes, término normalizado) de un texto."""
+    texto = re.sub(r'([a-z])([A-Z])', r'\1 \2', texto)
+    texto = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii').lower()
+    resultado = []
+    for palabra in re.findall(r'[a-z]+', texto):
+        if len(palabra) < 3 or palabra in _VACIAS:
+            continue
+        termino = _GLOSARIO.get(palabra, palabra)
+        if len(termino) > 4 and termino.endswith('s'):
+            termino = termino[:-1]
+        resultado.append((palabra, termino[:_LARGO_RAIZ]))
+    return resultado
+
+
+def terminos(texto: str) -> List[str]:
+    """Términos normalizados de un texto (descripción, pseudocódigo o metadatos)."""
+    return [termino for _, termino in _palabras(texto)]
+
+
+def detectar_tipo(pseudocodigo: str) -> str:
+    """'recursivo' si alguna subrutina se llama a sí misma con CALL, si no 'iterativo'."""
+    if "CALL" in pseudocodigo:
+        for linea in pseudocodigo.split('\n'):
+            encabezado = re.match(r'^(\w+)\s*\(', linea.strip())
+            if encabezado and f"CALL {encabezado.group(1)}" in pseudocodigo:
+                return "recursivo"
+    return "iterativo"
+
+
+def extraer_estructuras(pseudocodigo: str) -> Dict[str, int]:
+    """Estructuras de control que usa el pseudocódigo y cuántas veces."""
+    estructuras = {
+        'if': len(re.findall(r'\bif\s+\(', pseudocodigo, re.IGNORECASE)),
+        'while': len(re.findall(r'\bwhile\s+\(', pseudocodigo, re.IGNORECASE)),
+        'for': len(re.findall(r'\bfor\s+\w+\s*🡨', pseudocodigo)),
+        'repeat': len(re.findall(r'\brepeat\b', pseudocodigo, re.IGNORECASE)),
+        'arrays': len(re.findall(r'\w+\[\w*\]', pseudocodigo)),
+        'call': len(re.findall(r'\bCALL\s+\w+', pseudocodigo))
+    }
+    return {k: v for k, v in estructuras.items() if v > 0}
+
+
+def termino_tipo(tipo: str) -> str:
+    """Término de metadatos del tipo de algoritmo (no lo produce el texto libre)."""
+    return f"tipo:{tipo}"
+
+
+def termino_estructura(estructura: str) -> str:
+    """Término de metadatos de una estructura de control (no lo produce el texto libre)."""
+    return f"estructura:{estructura}"
+
+
+# ==================== FUENTES ====================
+def _ejemplo(nombre: str, contenido: str, origen: str, sintaxis: bool, **metadatos) -> Dict[str, Any]:
+    return {
+        'nombre': nombre,
+        'contenido': contenido,
+        'tipo': detectar_tipo(contenido),
+        'estructuras': extraer_estructuras(contenido),
+        'origen': origen,
+        'sintaxis': sintaxis,
+        **metadatos,
+    }
+
+
+def _cargar_correctos(ruta: Path = RUTA_CORRECTOS) -> List[Dict[str, Any]]:
+    """Pseudocódigos en la gramática v2.0 (un .txt por ejemplo)."""
+    if not ruta.exists():
+        print(f"[WARN] Advertencia: No se encontró la carpeta {ruta}")
+        return []
+    ejemplos = []
+    for archivo in sorted(ruta.glob("*.txt")):
+        try:
+            lector = LectorArchivos(str(archivo))
+            if lector.leer_archivo():
+                ejemplos.append(_ejemplo(
+                    archivo.stem, lector.obtener_contenido_completo(), "correctos", True, ruta=str(archivo)
+                ))
+        except Exception as e:
+            print(f"[WARN] Error cargando {archivo}: {e}")
+    return ejemplos
+
+
+def _cargar_dataset(carpeta: Path = RUTA_DATASET) -> List[Dict[str, Any]]:
+    """Ejemplos etiquetados del dataset del clasificador (sin repetir ids entre archivos)."""
+    ejemplos, vistos = [], set()
+    for archivo in sorted(carpeta.glob("*.json")):
+        try:
+            with open(archivo, encoding="utf-8") as f:
+                registros = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Error cargando {archivo}: {e}")
+            continue
+        for registro in registros:
+            if registro['id'] in vistos:
+                continue
+            vistos.add(registro['id'])
+            ejemplos.append(_ejemplo(
+                registro['id'], registro['pseudocodigo'], "dataset", False,
+                categoria=registro.get('categoria'), subcategoria=registro.get('subcategoria'),
+                ruta=str(archivo)
+            ))
+    return ejemplos
+
+
+_CARGADORES = {
+    'correctos': (_cargar_correctos, lambda: sorted(RUTA_CORRECTOS.glob("*.txt"))),
+    'dataset': (_cargar_dataset, lambda: sorted(RUTA_DATASET.glob("*.json"))),
+}
+
+
+def huella_fuentes(fuentes: Iterable[str]) -> str:
+    """Hash del contenido de los archivos de las fuentes (invalida artefactos viejos)."""
+    digest = hashlib.sha1(f"v{VERSION_FORMATO}".encode())
+    for fuente in fuentes:
+        for archivo in _CARGADORES[fuente][1]():
+            digest.update(f"{fuente}/{archivo.name}\0".encode("utf-8"))
+            digest.update(archivo.read_bytes())
+    return digest.hexdigest()
+
+
+# ==================== ÍNDICE ====================
+class IndiceRAG:
+    """
+    Índice invertido BM25 de ejemplos con postings ordenados por impacto.
+
+    Args:
+        ejemplos: Dicts con nombre, contenido, tipo, estructuras y metadatos
+            opcionales (categoria, subcategoria)
+        postings_max: Entradas recorridas por término en cada consulta
+    """
+
+    def __init__(self, ejemplos: List[Dict[str, Any]], postings_max: int = 256):
+        self.documentos = ejemplos
+        self.postings_max = postings_max
+        self._postings = self._construir(ejemplos)
+
+    @staticmethod
+    def _terminos_documento(ejemplo: Dict[str, Any]) -> Counter:
+        metadatos = " ".join(filter(None, (
+            ejemplo['nombre'], ejemplo.get('categoria'), ejemplo.get('subcategoria')
+        ))).replace("_", " ").replace("-", " ")
+        conteo = Counter(terminos(ejemplo['contenido']))
+        for termino in terminos(metadatos) + [termino_tipo(ejemplo['tipo'])]:
+            conteo[termino] += _PESO_METADATOS
+        for estructura in ejemplo['estructuras']:
+            conteo[termino_estructura(estructura)] += 1
+        return conteo
+
+    @classmethod
+    def _construir(cls, ejemplos: List[Dict[str, Any]]) -> Dict[str, List[Tuple[int, float]]]:
+        conteos = [cls._terminos_documento(ejemplo) for ejemplo in ejemplos]
+        largo_medio = sum(sum(c.values()) for c in conteos) / max(len(conteos), 1)
+        frecuencia_doc = Counter(termino for conteo in conteos for termino in conteo)
+        total = len(conteos)
+
+        postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for doc, conteo in enumerate(conteos):
+            normalizacion = _K1 * (1 - _B + _B * sum(conteo.values()) / largo_medio)
+            for termino, tf in conteo.items():
+                idf = math.log(1 + (total - frecuencia_doc[termino] + 0.5) / (frecuencia_doc[termino] + 0.5))
+                postings[termino].append((doc, idf * tf * (_K1 + 1) / (tf + normalizacion)))
+        for lista in postings.values():
+            lista.sort(key=lambda entrada: (-entrada[1], entrada[0]))
+        return dict(postings)
+
+    def buscar(self, consulta: str, k: int = 3, extras: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """
+        Los k ejemplos con mayor puntaje BM25 para la consulta.
+
+        Args:
+            consulta: Texto libre (descripción, pseudocódigo, errores)
+            k: Cantidad de ejemplos
+            extras: Términos de metadatos agregados tal cual (termino_tipo,
+                termino_estructura)
+
+        Returns:
+            Copias de los ejemplos con 'score' y 'palabras_coincidentes'
+            (palabras de la consulta presentes en el ejemplo), de mayor a menor
+        """
+        # Término -> primera palabra de la consulta que lo produjo
+        consultados: Dict[str, Optional[str]] = {}
+        for palabra, termino in _palabras(consulta):
+            consultados.setdefault(termino, palabra)
+        consultados.update((termino, None) for termino in extras)
+
+        puntajes: Dict[int, float] = defaultdict(float)
+        coincidencias: Dict[int, List[str]] = defaultdict(list)
+        for termino, palabra in consultados.items():
+            for doc, impacto in islice(self._postings.get(termino, ()), self.postings_max):
+                puntajes[doc] += impacto
+                if palabra is not None:
+                    coincidencias[doc].append(palabra)
+
+        mejores = heapq.nlargest(k, puntajes, key=lambda doc: (puntajes[doc], -doc))
+        return [
+            {**self.documentos[doc], 'score': round(puntajes[doc], 3), 'palabras_coincidentes': coincidencias[doc]}
+            for doc in mejores
+        ]
+
+    # ==================== ARTEFACTO ====================
+    def guardar(self, ruta: Path, huella: str) -> None:
+        """Guarda documentos y postings como JSON."""
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        documento = {
+            'version_formato': VERSION_FORMATO,
+            'huella': huella,
+            'documentos': self.documentos,
+            'postings': {t: [[doc, round(i, 6)] for doc, i in lista] for t, lista in self._postings.items()},
+        }
+        ruta.write_text(json.dumps(documento, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def cargar(cls, ruta: Path, huella: str, postings_max: int = 256) -> Optional["IndiceRAG"]:
+        """Índice guardado con guardar(), o None si falta, es de otra versión o sus fuentes cambiaron."""
+        try:
+            documento = json.loads(ruta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if documento.get('version_formato') != VERSION_FORMATO or documento.get('huella') != huella:
+            return None
+        indice = cls.__new__(cls)
+        indice.documentos = documento['documentos']
+        indice.postings_max = postings_max
+        indice._postings = {t: [(doc, impacto) for doc, impacto in lista] for t, lista in documento['postings'].items()}
+        return indice
+
+
+def _ruta_artefacto(nombre: str) -> Path:
+    carpeta = Path(settings.rag_indices_dir) if settings.rag_indices_dir else _BACKEND / "data" / "indices_rag"
+    return carpeta / f"{nombre}.json"
+
+
+def _fuentes(nombre: str) -> Tuple[str, ...]:
+    return tuple(f for f in COLECCIONES[nombre] if f != "dataset" or settings.rag_dataset)
+
+
+def construir_indice(nombre: str) -> IndiceRAG:
+    """Construye el índice de una colección desde sus fuentes."""
+    ejemplos = [ejemplo for fuente in _fuentes(nombre) for ejemplo in _CARGADORES[fuente][0]()]
+    return IndiceRAG(ejemplos, settings.rag_postings_max)
+
+
+# ==================== SINGLETON ====================
+_indices_instance: Dict[str, IndiceRAG] = {}
+_indices_lock = threading.Lock()
+
+
+def obtener_indice_rag(nombre: str) -> IndiceRAG:
+    """Índice de la colección (artefacto vigente o construido desde las fuentes)."""
+    indice = _indices_instance.get(nombre)
+    if indice is None:
+        with _indices_lock:
+            indice = _indices_instance.get(nombre)
+            if indice is None:
+                indice = IndiceRAG.cargar(
+                    _ruta_artefacto(nombre), huella_fuentes(_fuentes(nombre)), settings.rag_postings_max
+                )
+                origen = "artefacto"
+                if indice is None:
+                    indice, origen = construir_indice(nombre), "fuentes"
+                print(f"[OK] Índice RAG '{nombre}': {len(indice.documentos)} ejemplos ({origen})")
+                _indices_instance[nombre] = indice
+    return indice
+
+
+if __name__ == "__main__":
+    for coleccion in COLECCIONES:
+        destino = _ruta_artefacto(coleccion)
+        indice = construir_indice(coleccion)
+        indice.guardar(destino, huella_fuentes(_fuentes(coleccion)))
+        print(f"[OK] {coleccion}: {len(indice.documentos)} ejemplos -> {destino}")
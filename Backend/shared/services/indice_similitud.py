@@ -0,0 +1,257 @@
+"""
+Índice de Análisis Similares (MinHash/LSH)
+==========================================
+
+Muchas entregas difieren en una o dos líneas de un programa ya analizado.
+El caché canónico solo acierta con programas equivalentes; este índice
+encuentra el vecino más parecido para usar su análisis como punto de
+partida:
+
+- Firma MinHash de settings.similitud_permutaciones valores sobre los
+  shingles de 3 tokens de la forma canónica (los nombres de variables,
+  espacios y comentarios no cuentan)
+- LSH por bandas (settings.similitud_bandas): una consulta solo compara
+  contra los análisis que comparten al menos una banda, así el costo no
+  crece con la cantidad de análisis guardados
+- Cada entrada guarda una referencia compacta del análisis (pseudocódigo,
+  costos por caso, ecuaciones, complejidades y costos por subrutina)
+
+Un programa con similitud estimada >= settings.similitud_umbral recibe la
+referencia de su vecino en los prompts de análisis de casos (ver
+bloque_referencia y LLMAnalyzer._analysis_data).
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from core.analizador.tools.canonico import tokens
+
+
+_PRIMO = 4294967311  # primo > 2^32
+_SEMILLA = 20240611
+
+# Candidatos comparados como máximo por consulta (acota la latencia con buckets muy poblados)
+_MAX_CANDIDATOS = 64
+
+_referencia_actual: ContextVar[Optional[Dict[str, Any]]] = ContextVar("referencia_similar", default=None)
+
+
+def _shingles(texto_canonico: str) -> Set[str]:
+    """Grupos de 3 tokens consecutivos (el salto de línea cuenta como token)."""
+    programa = tokens(texto_canonico)
+    if len(programa) < 3:
+        return {"\x1f".join(programa)}
+    return {"\x1f".join(programa[i:i + 3]) for i in range(len(programa) - 2)}
+
+
+class IndiceSimilitud:
+    """
+    Índice MinHash/LSH de análisis completados.
+
+    Args:
+        permutaciones: Valores por firma
+        bandas: Bandas LSH (permutaciones debe ser múltiplo)
+        capacidad: Análisis retenidos (se descartan los más antiguos)
+    """
+
+    def __init__(self, permutaciones: int = 64, bandas: int = 16, capacidad: int = 100000):
+        if permutaciones % bandas:
+            raise ValueError("permutaciones debe ser múltiplo de bandas")
+        self.bandas = bandas
+        self.filas = permutaciones // bandas
+        self.capacidad = capacidad
+
+        generador = np.random.default_rng(_SEMILLA)
+        self._a = generador.integers(1, 2**31, size=permutaciones, dtype=np.uint64)
+        self._b = generador.integers(0, 2**31, size=permutaciones, dtype=np.uint64)
+
+        self._entradas: "OrderedDict[str, Tuple[np.ndarray, Dict[str, Any]]]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def firma(self, texto_canonico: str) -> np.ndarray:
+        """Firma MinHash de un programa en forma canónica."""
+        valores = np.fromiter(
+            (
+                int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+                for shingle in _shingles(texto_canonico)
+            ),
+            dtype=np.uint64
+        )
+        return ((valores[:, None] * self._a + self._b) % _PRIMO).min(axis=0)
+
+    def _bandas(self, firma: np.ndarray) -> Iterator[Tuple[int, bytes]]:
+        for banda in range(self.bandas):
+            yield banda, firma[banda * self.filas:(banda + 1) * self.filas].tobytes()
+
+    def agregar(self, analisis_id: str, firma: np.ndarray, referencia: Dict[str, Any]) -> None:
+        """Indexa (o reemplaza) un análisis completado."""
+        with self._lock:
+            self._quitar(analisis_id)
+            self._entradas[analisis_id] = (firma, referencia)
+            for banda in self._bandas(firma):
+                self._buckets[banda].add(analisis_id)
+            while len(self._entradas) > self.capacidad:
+                self._quitar(next(iter(self._entradas)))
+
+    def _quitar(self, analisis_id: str) -> None:
+        entrada = self._entradas.pop(analisis_id, None)
+        if entrada is None:
+            return
+        for banda in self._bandas(entrada[0]):
+            self._buckets[banda].discard(analisis_id)
+            if not self._buckets[banda]:
+                del self._buckets[banda]
+
+    def buscar(
+        self,
+        firma: np.ndarray,
+        umbral: float = 0.8,
+        excluir: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Vecino más parecido con similitud estimada >= umbral.
+
+        Returns:
+            dict con analisis_id, similitud y referencia, o None
+        """
+        with self._lock:
+            candidatos = set()
+            for banda in self._bandas(firma):
+                candidatos.update(islice(self._buckets.get(banda, ()), _MAX_CANDIDATOS))
+                if len(candidatos) >= _MAX_CANDIDATOS:
+                    break
+            candidatos.discard(excluir)
+
+            mejor, mejor_similitud = None, umbral
+            for analisis_id in candidatos:
+                firma_vecino, _ = self._entradas[analisis_id]
+                similitud = float(np.count_nonzero(firma_vecino == firma)) / len(firma)
+                if similitud >= mejor_similitud:
+                    mejor, mejor_similitud = analisis_id, similitud
+
+            if mejor is None:
+                return None
+            return {
+                'analisis_id': mejor,
+                'similitud': round(mejor_similitud, 3),
+                'referencia': self._entradas[mejor][1],
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entradas)
+
+    def limpiar(self) -> None:
+        """Elimina todas las entradas."""
+        with self._lock:
+            self._entradas.clear()
+            self._buckets.clear()
+
+
+def referencia_de(resultado: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Resumen compacto de un análisis completado para usarlo como referencia.
+
+    Args:
+        resultado: Resultado de FlujoAnalisis con las fases 6-8 completas
+    """
+    omega = resultado['omega_table']
+    casos = {
+        caso: omega.metadata.get(caso) or {}
+        for caso in ('best_case', 'worst_case', 'average_case')
+    }
+    subrutinas: Dict[str, Dict[str, str]] = {}
+    for caso, analisis in (omega.metadata.get('llm_analysis') or {}).items():
+        for nombre, costo in (analisis or {}).get('subroutine_costs', {}).items():
+            subrutinas.setdefault(nombre, {})[caso] = costo['T']
+    complejidades = resultado.get('complejidades') or {}
+    return {
+        'algorithm_name': omega.algorithm_name,
+        'pseudocodigo': resultado['pseudocodigo_validado'],
+        'casos': {
+            caso: {'T': datos.get('T') or datos.get('T_avg'), 'P': datos.get('P')}
+            for caso, datos in casos.items() if datos
+        },
+        'ecuaciones': resultado.get('ecuaciones') or {},
+        'complejidades': complejidades.get('complejidades') or {},
+        'subrutinas': subrutinas,
+    }
+
+
+@contextmanager
+def usar_referencia(vecino: Optional[Dict[str, Any]], algorithm_name: str):
+    """Activa la referencia de un análisis similar para los prompts del algoritmo en curso."""
+    token = _referencia_actual.set({**vecino, 'algorithm_name': algorithm_name} if vecino else None)
+    try:
+        yield
+    finally:
+        _referencia_actual.reset(token)
+
+
+def bloque_referencia(algorithm_name: str) -> str:
+    """
+    Bloque de prompt con el análisis del vecino similar activo.
+
+    Solo se agrega al análisis del algoritmo principal (no a las subrutinas
+    auxiliares analizadas por separado) y dentro de settings.similitud_tokens.
+
+    Returns:
+        Texto a añadir al prompt (vacío si no hay referencia)
+    """
+    vecino = _referencia_actual.get()
+    if vecino is None or vecino['algorithm_name'] != algorithm_name:
+        return ""
+    referencia = vecino['referencia']
+
+    resultados: List[str] = []
+    for caso, datos in referencia['casos'].items():
+        resultados.append(f"- {caso}: T = {datos['T']}" + (f", P = {datos['P']}" if datos.get('P') else ""))
+    for caso, ecuacion in referencia['ecuaciones'].items():
+        complejidad = referencia['complejidades'].get(caso)
+        resultados.append(f"- Ecuación {caso}: {ecuacion}" + (f" → {complejidad}" if complejidad else ""))
+    for nombre, costos in referencia['subrutinas'].items():
+        resultados.append(f"- Subrutina {nombre}: " + ", ".join(f"{caso}: T = {t}" for caso, t in costos.items()))
+
+    encabezado = (
+        f"ANÁLISIS DE REFERENCIA: un programa casi idéntico (similitud {vecino['similitud']:.0%}) "
+        "ya fue analizado. Úsalo como punto de partida, revisa las líneas que difieren y "
+        "no copies sus costos donde el código cambia."
+    )
+    codigo = f"Pseudocodigo de referencia:\n```\n{referencia['pseudocodigo']}\n```"
+    bloque = "\n\n".join([encabezado, codigo, "Resultados de referencia:\n" + "\n".join(resultados)])
+
+    # ≈4 caracteres por token, como el gobernador
+    if len(bloque) // 4 > settings.similitud_tokens:
+        bloque = "\n\n".join([encabezado, "Resultados de referencia:\n" + "\n".join(resultados)])
+        if len(bloque) // 4 > settings.similitud_tokens:
+            return ""
+    return bloque
+
+
+# Instancia global (singleton)
+_indice_instance = None
+_indice_lock = threading.Lock()
+
+
+def obtener_indice_similitud() -> IndiceSimilitud:
+    """Obtiene la instancia singleton del índice, configurada desde settings"""
+    global _indice_instance
+
+    with _indice_lock:
+        if _indice_instance is None:
+            _indice_instance = IndiceSimilitud(
+                permutaciones=settings.similitud_permutaciones,
+                bandas=settings.similitud_bandas,
+                capacidad=settings.similitud_max,
+            )
+
+    return _indice_instance
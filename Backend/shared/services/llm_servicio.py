@@ -1,6 +1,26 @@
-from langchain_anthropic import ChatAnthropic
+import json
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
 from config.settings import settings
-from tools.metricas import registrar_tokens
+from tools.metricas import fase_actual, registrar_escalado, registrar_tokens
+from shared.services.gobernador_llm import PRIORIDAD_INTERACTIVA, obtener_gobernador, prioridad_en_contexto
+from shared.services.cobertura_llm import obtener_cobertura
+from shared.services.vuelo_unico import VueloUnico, clave_de
+from shared.services.casetes_llm import obtener_casetera
+from shared.services.presupuesto_llm import presupuesto_actual, verificar_llamada
+from shared.services.circuito_llm import verificar_circuito
+
+# LangChain se importa en el primer uso (get_llm, mensajes_cacheables): el
+# validador y las herramientas que no llaman al LLM arrancan sin cargarlo
+if TYPE_CHECKING:
+    from langchain_anthropic import ChatAnthropic
+
+
+# Llamadas LLM idénticas en curso (mismo modelo, parámetros y prompt)
+_vuelos_llm = VueloUnico(copiar_resultado=False)
+
+# Marca de prompt caching de Anthropic (caché efímera de ~5 minutos)
+CACHE_EFIMERO = {"type": "ephemeral"}
 
 
 class LLMService:
@@ -10,7 +30,7 @@ class LLMService:
     """
 
     @staticmethod
-    def get_llm(temperature: float = None, max_tokens: int = None) -> ChatAnthropic:
+    def get_llm(temperature: float = None, max_tokens: int = None, etapa: Optional[str] = None) -> "ChatAnthropic":
         """
         Inicializa y retorna una instancia de Claude configurada.
 
@@ -19,25 +39,355 @@ class LLMService:
                         Si no se especifica, usa el valor de settings.temperature
             max_tokens: Máximo de tokens en la respuesta
                        Si no se especifica, usa el valor de settings.max_tokens
+            etapa: Etapa del análisis; elige el modelo según settings.llm_ruteo_etapas
+                   (None = modelo fuerte, settings.model_name)
 
         Returns:
             ChatAnthropic: Instancia configurada del LLM Claude
 
         Raises:
-            ValueError: Si la API key no está configurada
+            ValueError: Si la API key no está configurada (salvo en modo LLM fail,
+                        que solo reproduce casetes y nunca llama a la API)
         """
-        if not settings.anthropic_api_key or settings.anthropic_api_key == "tu_api_key_aqui":
-            raise ValueError(
-                "ANTHROPIC_API_KEY no está configurada correctamente en el archivo .env"
-            )
+        api_key = settings.anthropic_api_key
+        if not api_key or api_key == "tu_api_key_aqui":
+            if obtener_casetera().requiere_api:
+                raise ValueError(
+                    "ANTHROPIC_API_KEY no está configurada correctamente en el archivo .env"
+                )
+            api_key = "sin-api-key-modo-fail"
+
+        from langchain_anthropic import ChatAnthropic
+
+        opciones = {}
+        if settings.anthropic_base_url:
+            opciones['base_url'] = settings.anthropic_base_url
 
         return ChatAnthropic(
-            model=settings.model_name,
-            anthropic_api_key=settings.anthropic_api_key,
+            model=LLMService.modelo_de_etapa(etapa),
+            anthropic_api_key=api_key,
             max_tokens=max_tokens or settings.max_tokens,
             temperature=temperature if temperature is not None else settings.temperature,
+            # Los reintentos los maneja el gobernador para no multiplicarlos
+            max_retries=0,
+            **opciones,
         )
 
+    @staticmethod
+    def invocar(
+        llm: "ChatAnthropic",
+        entrada: Any,
+        prioridad: Optional[int] = None,
+        herramienta: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        Invoca el LLM a través del gobernador compartido.
+
+        Todas las llamadas a la API deben pasar por aquí para respetar los
+        límites de RPM/TPM, la concurrencia adaptativa y los reintentos.
+        Los tokens consumidos se registran en tools.metricas (atribuidos a la
+        fase activa). Llamadas idénticas simultáneas con temperatura 0 se
+        coalescen en una sola (con temperatura mayor cada una es una muestra
+        distinta); las interactivas con temperatura 0 que tardan más que lo habitual en su etapa
+        se cubren con un duplicado (ver shared.services.cobertura_llm). Según
+        settings.llm_modo la respuesta puede grabarse o reproducirse desde
+        un casete (ver shared.services.casetes_llm). Si hay un presupuesto de
+        análisis activo, la llamada que no cabe en él se rechaza y los tokens
+        reales se descuentan (ver shared.services.presupuesto_llm); cada intento
+        HTTP se corta a más tardar al vencer su plazo. Con el
+        circuito del proveedor abierto la llamada falla al instante (ver
+        shared.services.circuito_llm).
+
+        Args:
+            llm: Instancia obtenida con get_llm
+            entrada: Prompt (str) o lista de mensajes
+            prioridad: PRIORIDAD_INTERACTIVA / PRIORIDAD_BATCH (None = la del contexto)
+            herramienta: Herramienta de salida que el modelo debe usar
+                         (ver invocar_estructurado)
+
+        Returns:
+            Respuesta del LLM (AIMessage)
+
+        Raises:
+            PresupuestoAgotadoError: Si la llamada no cabe en el presupuesto del análisis
+            CircuitoAbiertoError: Si el proveedor LLM se considera caído
+        """
+        prompt = LLMService._serializar(entrada)
+        ejecutable = llm
+        if herramienta:
+            # El esquema forma parte del prompt: entra en la clave y en la estimación de tokens
+            ejecutable = llm.bind_tools([herramienta], tool_choice=herramienta['name'])
+            prompt += f"\ntool:{json.dumps(herramienta, sort_keys=True, ensure_ascii=False)}"
+        tokens_estimados = LLMService.estimar_tokens(prompt, getattr(llm, 'max_tokens', None))
+        verificar_llamada(fase_actual(), tokens_estimados)
+        verificar_circuito(fase_actual())
+        clave = clave_de(
+            getattr(llm, 'model', None),
+            getattr(llm, 'temperature', None),
+            getattr(llm, 'max_tokens', None),
+            prompt,
+        )
+        determinista = getattr(llm, 'temperature', None) == 0
+
+        def llamar():
+            respuesta = obtener_casetera().invocar(
+                clave,
+                prompt,
+                lambda: obtener_cobertura().ejecutar(
+                    lambda cancelada: obtener_gobernador().ejecutar(
+                        lambda: ejecutable.invoke(entrada, timeout=LLMService._timeout_llamada()),
+                        tokens_estimados=tokens_estimados,
+                        prioridad=prioridad,
+                        cancelada=cancelada
+                    ),
+                    cubrir=LLMService._admite_cobertura(llm, prioridad),
+                    tokens_estimados=tokens_estimados,
+                    al_descartar=lambda descartada: LLMService._registrar_uso(descartada, getattr(llm, 'model', None))
+                ),
+                determinista=determinista
+            )
+            LLMService._registrar_uso(respuesta, getattr(llm, 'model', None))
+            return respuesta
+
+        return _vuelos_llm.ejecutar(clave, llamar) if determinista else llamar()
+
+    @staticmethod
+    def _timeout_llamada() -> float:
+        """Timeout del intento: settings.llm_timeout_s acotado a lo que queda del plazo del análisis."""
+        presupuesto = presupuesto_actual()
+        restante = presupuesto.segundos_restantes() if presupuesto is not None else None
+        if restante is None:
+            return settings.llm_timeout_s
+        return max(min(settings.llm_timeout_s, restante), 0.001)
+
+    @staticmethod
+    def _admite_cobertura(llm: "ChatAnthropic", prioridad: Optional[int]) -> bool:
+        """Solo se duplican llamadas deterministas del camino interactivo."""
+        if prioridad is None:
+            prioridad = prioridad_en_contexto()
+        return (settings.llm_cobertura
+                and getattr(llm, 'temperature', None) == 0
+                and prioridad == PRIORIDAD_INTERACTIVA)
+
+    @staticmethod
+    def modelo_de_etapa(etapa: Optional[str]) -> str:
+        """
+        Modelo que usa una etapa según settings.llm_ruteo_etapas.
+
+        Las etapas sin entrada en la tabla usan el modelo fuerte.
+        """
+        if settings.llm_ruteo_etapas.get(etapa) == "rapido":
+            return settings.llm_modelo_rapido
+        return settings.model_name
+
+    @staticmethod
+    def invocar_estructurado(
+        llm: "ChatAnthropic",
+        entrada: Any,
+        herramienta: Dict[str, Any],
+        prioridad: Optional[int] = None,
+        permitir_truncado: bool = False,
+        verificar: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Invoca el LLM obligándolo a responder con una herramienta de salida.
+
+        El modelo entrega el resultado como argumentos de la herramienta, que
+        ya llegan decodificados según su input_schema: no hay texto libre que
+        recortar ni JSON que buscar con expresiones regulares.
+
+        Si `llm` es el modelo rápido y su salida no cumple el esquema (sin
+        herramienta, truncada o sin campos obligatorios) o `verificar` la
+        rechaza, la llamada se repite una vez con el modelo fuerte. La salida
+        del modelo fuerte se devuelve sin volver a verificarla.
+
+        Args:
+            llm: Instancia obtenida con get_llm (su max_tokens debe alcanzar para el esquema)
+            entrada: Prompt (str) o lista de mensajes
+            herramienta: Definición creada con LLMService.herramienta
+            prioridad: PRIORIDAD_INTERACTIVA / PRIORIDAD_BATCH (None = la del contexto)
+            permitir_truncado: Si True, devuelve los argumentos aunque la salida
+                               se haya cortado por max_tokens (el llamador valida
+                               cada parte por separado)
+            verificar: Verificación de confianza de la etapa; lanza ValueError
+                       si la salida del modelo rápido no es confiable
+
+        Returns:
+            Dict con los argumentos de la herramienta
+
+        Raises:
+            ValueError: Si el modelo no usó la herramienta o la salida se truncó
+        """
+        try:
+            salida = LLMService._salida_estructurada(llm, entrada, herramienta, prioridad, permitir_truncado)
+            if verificar:
+                verificar(salida)
+            return salida
+        except ValueError as e:
+            fuerte = LLMService._modelo_de_escalado(llm)
+            if fuerte is None:
+                raise
+            print(f"[WARN] {herramienta['name']}: se escala a {fuerte.model} ({e})")
+            registrar_escalado(herramienta['name'], getattr(llm, 'model', ''), str(e))
+            return LLMService._salida_estructurada(fuerte, entrada, herramienta, prioridad, permitir_truncado)
+
+    @staticmethod
+    def _salida_estructurada(
+        llm: "ChatAnthropic",
+        entrada: Any,
+        herramienta: Dict[str, Any],
+        prioridad: Optional[int],
+        permitir_truncado: bool
+    ) -> Dict[str, Any]:
+        """Una llamada con herramienta forzada y la validación de su esquema (ver invocar_estructurado)."""
+        respuesta = LLMService.invocar(llm, entrada, prioridad=prioridad, herramienta=herramienta)
+
+        llamadas = [
+            llamada for llamada in getattr(respuesta, 'tool_calls', None) or []
+            if llamada.get('name') == herramienta['name']
+        ]
+        if not llamadas:
+            raise ValueError(f"El LLM no devolvió la salida estructurada '{herramienta['name']}'")
+
+        metadata = getattr(respuesta, 'response_metadata', None) or {}
+        if metadata.get('stop_reason') == 'max_tokens' and not permitir_truncado:
+            raise ValueError(
+                f"Salida '{herramienta['name']}' truncada por max_tokens "
+                f"({getattr(llm, 'max_tokens', None)})"
+            )
+
+        argumentos = llamadas[0]['args']
+        faltantes = [
+            campo for campo in herramienta['input_schema'].get('required', [])
+            if campo not in argumentos
+        ]
+        if faltantes:
+            raise ValueError(f"Salida '{herramienta['name']}' sin campos obligatorios: {faltantes}")
+        return argumentos
+
+    @staticmethod
+    def _modelo_de_escalado(llm: "ChatAnthropic") -> Optional["ChatAnthropic"]:
+        """Instancia equivalente con el modelo fuerte, o None si `llm` no es el modelo rápido."""
+        modelo = getattr(llm, 'model', None)
+        if (not settings.llm_escalado
+                or modelo != settings.llm_modelo_rapido
+                or modelo == settings.model_name):
+            return None
+        return LLMService.get_llm(temperature=llm.temperature, max_tokens=llm.max_tokens)
+
+    @staticmethod
+    def herramienta(
+        nombre: str,
+        descripcion: str,
+        propiedades: Dict[str, Any],
+        requeridas: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Definición de una herramienta de salida en el formato de Anthropic.
+
+        Args:
+            nombre: Nombre de la herramienta (a-z, 0-9, _)
+            descripcion: Qué debe entregar el modelo
+            propiedades: JSON Schema de cada campo
+            requeridas: Campos obligatorios (None = todos)
+
+        Returns:
+            Dict con name, description e input_schema
+        """
+        return {
+            "name": nombre,
+            "description": descripcion,
+            "input_schema": {
+                "type": "object",
+                "properties": propiedades,
+                "required": list(propiedades) if requeridas is None else requeridas,
+            },
+        }
+
+    @staticmethod
+    def mensajes_cacheables(prefijos: List[str], variable: str, sistema: Optional[str] = None) -> list:
+        """
+        Arma los mensajes de una llamada con prefijo estable y sufijo variable.
+
+        Cada bloque de `prefijos` (y el prompt de sistema) lleva cache_control,
+        de modo que el proveedor reutiliza el procesamiento del prefijo entre
+        llamadas; solo `variable` (el pseudocódigo, la descripción, ...) se
+        procesa cada vez. Los prefijos deben ir de más estable a menos estable
+        (Anthropic admite hasta 4 marcas y solo cachea prefijos de más de
+        ~1024 tokens; los más cortos se procesan normalmente).
+
+        Con settings.llm_cache_prompts = False se envía el mismo texto sin marcas.
+
+        Args:
+            prefijos: Bloques fijos (instrucciones, reglas, ejemplos)
+            variable: Parte que cambia en cada llamada
+            sistema: Prompt de sistema (opcional)
+
+        Returns:
+            Lista de mensajes para invocar()
+        """
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        def bloque(texto: str, cachear: bool) -> dict:
+            contenido = {"type": "text", "text": texto}
+            if cachear and settings.llm_cache_prompts:
+                contenido["cache_control"] = CACHE_EFIMERO
+            return contenido
+
+        mensajes = []
+        if sistema:
+            mensajes.append(SystemMessage(content=[bloque(sistema, True)]))
+        contenido = [bloque(prefijo, True) for prefijo in prefijos if prefijo]
+        contenido.append(bloque(variable, False))
+        mensajes.append(HumanMessage(content=contenido))
+        return mensajes
+
+    @staticmethod
+    def _registrar_uso(respuesta: Any, modelo: Optional[str]) -> None:
+        """
+        Registra los tokens de la respuesta si vienen en response_metadata.
+
+        `input_tokens` de Anthropic excluye los tokens leídos o escritos en la
+        caché de prompts, que se registran aparte. El total se descuenta del
+        presupuesto de análisis activo.
+        """
+        metadata = getattr(respuesta, 'response_metadata', None)
+        if isinstance(metadata, dict) and 'usage' in metadata:
+            usage = metadata['usage']
+            presupuesto = presupuesto_actual()
+            if presupuesto is not None:
+                presupuesto.consumir(sum(
+                    usage.get(campo) or 0
+                    for campo in ('input_tokens', 'output_tokens',
+                                  'cache_read_input_tokens', 'cache_creation_input_tokens')
+                ))
+            registrar_tokens(
+                input_tokens=usage.get('input_tokens') or 0,
+                output_tokens=usage.get('output_tokens') or 0,
+                modelo=modelo or settings.model_name,
+                cache_read_tokens=usage.get('cache_read_input_tokens') or 0,
+                cache_write_tokens=usage.get('cache_creation_input_tokens') or 0
+            )
+
+    @staticmethod
+    def _serializar(entrada: Any) -> str:
+        """Texto de un prompt o lista de mensajes, incluyendo el rol de cada mensaje."""
+        if isinstance(entrada, str):
+            return entrada
+        return "\n".join(f"{getattr(m, 'type', '')}:{getattr(m, 'content', m)}" for m in entrada)
+
+    @staticmethod
+    def estimar_tokens(entrada: Any, max_tokens: Optional[int] = None) -> int:
+        """
+        Estimación rápida de tokens de una llamada (≈4 caracteres por token).
+
+        La salida se reserva con un tope para no bloquear la cubeta TPM con
+        max_tokens completos; el gobernador concilia con el uso real.
+        """
+        texto = LLMService._serializar(entrada)
+        salida = min(max_tokens or settings.max_tokens, 1024)
+        return len(texto) // 4 + salida
+
     @staticmethod
     def test_connection() -> dict:
         """
@@ -53,16 +403,7 @@ class LLMService:
         """
         try:
             llm = LLMService.get_llm()
-            response = llm.invoke("Responde solo con: 'Conexión exitosa'")
-            
-            # Registrar tokens si están disponibles
-            if hasattr(response, 'response_metadata') and 'usage' in response.response_metadata:
-                usage = response.response_metadata['usage']
-                registrar_tokens(
-                    input_tokens=usage.get('input_tokens', 0),
-                    output_tokens=usage.get('output_tokens', 0),
-                    modelo=settings.model_name
-                )
+            response = LLMService.invocar(llm, "Responde solo con: 'Conexión exitosa'")
             
             return {
                 "status": "success",
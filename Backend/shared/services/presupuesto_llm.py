@@ -0,0 +1,169 @@
+"""
+Presupuesto por Análisis
+========================
+
+Cada análisis lleva un presupuesto de tokens y un plazo (deadline) que acota
+su costo y su latencia en el peor caso:
+
+- LLMService.invocar descuenta los tokens reales de cada respuesta y rechaza
+  con PresupuestoAgotadoError la llamada que no alcanza o que llega con el
+  plazo vencido. Cada etapa ya tiene su degradación ante un error del LLM
+  (escenario heurístico en los nodos del workflow, análisis heurístico de la
+  entrada, ecuaciones sin sugerencias), así que el análisis sigue adelante.
+- Las etapas opcionales (flowchart, sugerencias de ecuaciones, validación
+  cruzada de complejidades) preguntan antes con permite_opcional y se omiten
+  si queda menos de settings.analisis_reserva_opcional del presupuesto.
+
+El presupuesto activo viaja en un ContextVar, igual que la prioridad del
+gobernador y la fase de tools.metricas, por lo que llega a los nodos de
+LangGraph sin cambiar sus firmas. Cada omisión queda registrada y el flujo la
+devuelve en resultado['presupuesto']['degradaciones'].
+
+Uso:
+    presupuesto = PresupuestoAnalisis(tokens_max=40000, segundos_max=60)
+    with usar_presupuesto(presupuesto):
+        ...
+    presupuesto.resumen()
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+
+
+class PresupuestoAgotadoError(RuntimeError):
+    """La llamada LLM no cabe en el presupuesto restante del análisis."""
+
+
+class PresupuestoAnalisis:
+    """
+    Presupuesto de tokens y tiempo de un análisis (seguro entre hilos).
+
+    Args:
+        tokens_max: Tokens totales (entrada + salida + caché); None = sin límite
+        segundos_max: Plazo desde la creación; None = sin límite
+    """
+
+    def __init__(self, tokens_max: Optional[int] = None, segundos_max: Optional[float] = None):
+        self.tokens_max = tokens_max
+        self.segundos_max = segundos_max
+        self.inicio = time.monotonic()
+        self.tokens_consumidos = 0
+        self.degradaciones: List[Dict[str, str]] = []
+        self._lock = threading.Lock()
+
+    def consumir(self, tokens: int) -> None:
+        """Descuenta los tokens reales de una respuesta."""
+        with self._lock:
+            self.tokens_consumidos += tokens
+
+    def tokens_restantes(self) -> Optional[int]:
+        if self.tokens_max is None:
+            return None
+        with self._lock:
+            return max(self.tokens_max - self.tokens_consumidos, 0)
+
+    def segundos_restantes(self) -> Optional[float]:
+        if self.segundos_max is None:
+            return None
+        return max(self.segundos_max - (time.monotonic() - self.inicio), 0.0)
+
+    def alcanza(self, tokens: int = 0) -> bool:
+        """True si quedan `tokens` y el plazo no venció."""
+        restantes = self.tokens_restantes()
+        segundos = self.segundos_restantes()
+        return (restantes is None or restantes >= tokens) and (segundos is None or segundos > 0)
+
+    def fraccion_restante(self) -> float:
+        """Menor fracción restante entre tokens y tiempo (1.0 si no hay límites)."""
+        fracciones = [1.0]
+        if self.tokens_max:
+            fracciones.append(self.tokens_restantes() / self.tokens_max)
+        if self.segundos_max:
+            fracciones.append(self.segundos_restantes() / self.segundos_max)
+        return min(fracciones)
+
+    def degradar(self, etapa: str, motivo: str) -> None:
+        """Registra una etapa omitida o reemplazada por su alternativa heurística."""
+        with self._lock:
+            self.degradaciones.append({'etapa': etapa, 'motivo': motivo})
+        print(f"[WARN] Presupuesto: {etapa} degradada ({motivo})")
+
+    def resumen(self) -> Dict[str, Any]:
+        """Estado del presupuesto para la respuesta del análisis."""
+        with self._lock:
+            degradaciones = list(self.degradaciones)
+        return {
+            'tokens_max': self.tokens_max,
+            'tokens_consumidos': self.tokens_consumidos,
+            'segundos_max': self.segundos_max,
+            'segundos_transcurridos': round(time.monotonic() - self.inicio, 3),
+            'degradaciones': degradaciones,
+        }
+
+    def motivo_agotado(self) -> str:
+        """Describe por qué no alcanza el presupuesto (plazo o tokens)."""
+        segundos = self.segundos_restantes()
+        if segundos is not None and segundos <= 0:
+            return f"plazo de {self.segundos_max:g} s vencido"
+        return f"quedan {self.tokens_restantes()} de {self.tokens_max} tokens"
+
+
+_presupuesto_actual: ContextVar[Optional[PresupuestoAnalisis]] = ContextVar("presupuesto_analisis", default=None)
+
+
+def presupuesto_actual() -> Optional[PresupuestoAnalisis]:
+    """Presupuesto del análisis en curso en este contexto (None fuera de un análisis)."""
+    return _presupuesto_actual.get()
+
+
+@contextmanager
+def usar_presupuesto(presupuesto: PresupuestoAnalisis):
+    """
+    Activa el presupuesto para las llamadas hechas dentro del bloque.
+
+    Example:
+        >>> with usar_presupuesto(PresupuestoAnalisis(tokens_max=20000)):
+        ...     flujo._analizar(...)
+    """
+    token = _presupuesto_actual.set(presupuesto)
+    try:
+        yield presupuesto
+    finally:
+        _presupuesto_actual.reset(token)
+
+
+def verificar_llamada(etapa: Optional[str], tokens_estimados: int) -> None:
+    """
+    Rechaza una llamada LLM que no cabe en el presupuesto activo.
+
+    Raises:
+        PresupuestoAgotadoError: Si no alcanzan los tokens o venció el plazo
+    """
+    presupuesto = presupuesto_actual()
+    if presupuesto is None or presupuesto.alcanza(tokens_estimados):
+        return
+    motivo = presupuesto.motivo_agotado()
+    presupuesto.degradar(etapa or "llm", f"llamada LLM omitida: {motivo}")
+    raise PresupuestoAgotadoError(f"Presupuesto del análisis agotado: {motivo}")
+
+
+def permite_opcional(etapa: str) -> bool:
+    """
+    Indica si una etapa opcional puede ejecutarse.
+
+    Se omite (y se registra la degradación) cuando queda menos de
+    settings.analisis_reserva_opcional del presupuesto de tokens o de tiempo.
+    """
+    presupuesto = presupuesto_actual()
+    if presupuesto is None:
+        return True
+    fraccion = presupuesto.fraccion_restante()
+    if fraccion >= settings.analisis_reserva_opcional and presupuesto.alcanza():
+        return True
+    presupuesto.degradar(etapa, f"omitida: queda {fraccion:.0%} del presupuesto")
+    return False
@@ -0,0 +1,302 @@
+"""
+Puntos de Control de Análisis
+=============================
+
+Persiste en disco el avance de cada análisis (por `analisis_id`) para que un
+reintento de la misma solicitud, o POST /analisis/{id}/reanudar, continúe
+desde la última fase completada en lugar de volver a pagar la traducción, la
+corrección y los análisis LLM de casos:
+
+- AlmacenPuntosControl: fases externas de FlujoAnalisis. Un archivo por
+  análisis con los parámetros de la solicitud y la salida de cada fase
+  completada, más un índice por clave de solicitud para los reintentos
+- PuntosControlGrafo: checkpointer de LangGraph para el workflow del
+  analizador (un hilo por análisis). Si el proceso muere entre nodos, el
+  workflow se retoma desde el último nodo terminado. Los hilos de análisis
+  fallidos o abandonados se desalojan (memoria y disco) tras ttl_h horas
+  sin actividad
+
+Solo se guardan fases exitosas: la que falló (o usó su alternativa) se vuelve
+a ejecutar al reanudar. Al terminar sin errores los puntos de control se
+borran; los abandonados vencen tras settings.puntos_control_ttl_h horas.
+"""
+
+import pickle
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from config.settings import settings
+
+
+DIRECTORIO_DEFECTO = Path(__file__).resolve().parent.parent.parent / "data" / "puntos_control"
+
+
+def _escribir(ruta: Path, datos: Any) -> None:
+    """Escritura atómica: un proceso que muere no deja archivos a medias."""
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(".tmp")
+    temporal.write_bytes(pickle.dumps(datos))
+    temporal.replace(ruta)
+
+
+def _leer(ruta: Path) -> Optional[Any]:
+    try:
+        return pickle.loads(ruta.read_bytes())
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+class AlmacenPuntosControl:
+    """
+    Puntos de control de las fases externas de FlujoAnalisis.
+
+    Cada registro contiene:
+        - analisis_id, clave (de la solicitud) y parametros (para reanudar)
+        - fases: {nombre_fase: salida de la fase}
+        - actualizado: marca de tiempo de la última escritura
+    """
+
+    def __init__(self, directorio: Optional[Path] = None, ttl_h: float = 24.0):
+        """
+        Args:
+            directorio: Carpeta de los puntos de control
+            ttl_h: Horas tras las que un análisis abandonado se descarta
+        """
+        self.directorio = Path(directorio) if directorio else DIRECTORIO_DEFECTO
+        self.ttl_s = ttl_h * 3600
+        self._lock = threading.Lock()
+
+    def _ruta(self, analisis_id: str) -> Path:
+        return self.directorio / f"{analisis_id}.ckpt"
+
+    def _ruta_clave(self, clave: str) -> Path:
+        return self.directorio / "claves" / clave
+
+    def iniciar(self, analisis_id: str, clave: str, parametros: Dict[str, Any]) -> None:
+        """Registra un análisis nuevo (aún sin fases) y lo indexa por su clave."""
+        with self._lock:
+            _escribir(self._ruta(analisis_id), {
+                'analisis_id': analisis_id,
+                'clave': clave,
+                'parametros': parametros,
+                'fases': {},
+                'actualizado': time.time(),
+            })
+            _escribir(self._ruta_clave(clave), analisis_id)
+
+    def obtener(self, analisis_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            El registro del análisis, o None si no existe o venció
+        """
+        registro = _leer(self._ruta(analisis_id))
+        if registro is None or time.time() - registro['actualizado'] > self.ttl_s:
+            return None
+        return registro
+
+    def buscar_por_clave(self, clave: str) -> Optional[str]:
+        """ID del análisis pendiente de la misma solicitud (None si no hay)."""
+        analisis_id = _leer(self._ruta_clave(clave))
+        if analisis_id is None or self.obtener(analisis_id) is None:
+            return None
+        return analisis_id
+
+    def fase(self, analisis_id: str, fase: str) -> Optional[Any]:
+        """Salida guardada de una fase, o None si no se completó."""
+        registro = self.obtener(analisis_id)
+        return registro['fases'].get(fase) if registro else None
+
+    def guardar_fase(self, analisis_id: str, fase: str, datos: Any) -> None:
+        """Registra la salida de una fase completada."""
+        with self._lock:
+            registro = _leer(self._ruta(analisis_id))
+            if registro is None:
+                return
+            registro['fases'][fase] = datos
+            registro['actualizado'] = time.time()
+            _escribir(self._ruta(analisis_id), registro)
+
+    def descartar_fases(self, analisis_id: str, fases: Iterable[str]) -> None:
+        """Invalida fases guardadas (dependen de una fase anterior que se vuelve a ejecutar)."""
+        with self._lock:
+            registro = _leer(self._ruta(analisis_id))
+            if registro is None or not any(fase in registro['fases'] for fase in fases):
+                return
+            for fase in fases:
+                registro['fases'].pop(fase, None)
+            _escribir(self._ruta(analisis_id), registro)
+
+    def eliminar(self, analisis_id: str) -> None:
+        """Borra el registro de un análisis terminado y su entrada en el índice."""
+        with self._lock:
+            registro = _leer(self._ruta(analisis_id))
+            self._ruta(analisis_id).unlink(missing_ok=True)
+            if registro is not None and _leer(self._ruta_clave(registro['clave'])) == analisis_id:
+                self._ruta_clave(registro['clave']).unlink(missing_ok=True)
+
+    def limpiar_vencidos(self) -> int:
+        """
+        Elimina los análisis abandonados hace más de ttl_h horas.
+
+        Returns:
+            Cantidad de registros eliminados
+        """
+        if not self.directorio.exists():
+            return 0
+        limite = time.time() - self.ttl_s
+        eliminados = 0
+        for ruta in self.directorio.glob("*.ckpt"):
+            if ruta.stat().st_mtime < limite:
+                self.eliminar(ruta.stem)
+                (self.directorio / "grafo" / ruta.name).unlink(missing_ok=True)
+                eliminados += 1
+        return eliminados
+
+
+class PuntosControlGrafo(InMemorySaver):
+    """
+    Checkpointer de LangGraph durable: cada hilo (un análisis) se persiste en
+    su propio archivo después de cada escritura y se recarga al consultarlo
+    desde otro proceso.
+
+    El contenido de los checkpoints ya viene serializado por el `serde` de
+    LangGraph; el archivo solo guarda los contenedores del hilo.
+
+    Cada hilo lleva el índice de sus claves en `writes` y `blobs`, de modo
+    que persistirlo solo recorre sus propias entradas.
+
+    Un hilo sin actividad durante ttl_h horas (análisis que falló y no se
+    reanudó, o abandonado) se desaloja de memoria y de disco; la limpieza
+    corre al crear el checkpointer y con cada hilo nuevo.
+
+    Args:
+        directorio: Carpeta de los puntos de control (se usa su subcarpeta grafo/)
+        serde: Serializador de LangGraph (con los modelos del estado permitidos)
+        ttl_h: Horas sin actividad tras las que se descarta un hilo
+    """
+
+    def __init__(self, directorio: Optional[Path] = None, serde: Any = None, ttl_h: float = 24.0):
+        super().__init__(serde=serde)
+        self.directorio = (Path(directorio) if directorio else DIRECTORIO_DEFECTO) / "grafo"
+        self.ttl_s = ttl_h * 3600
+        self._lock_archivos = threading.Lock()
+        self._actividad: Dict[str, float] = {}
+        self._claves_writes: Dict[str, Set[tuple]] = defaultdict(set)
+        self._claves_blobs: Dict[str, Set[tuple]] = defaultdict(set)
+        self.limpiar_vencidos()
+
+    def _ruta(self, thread_id: str) -> Path:
+        return self.directorio / f"{thread_id}.ckpt"
+
+    def _persistir(self, thread_id: str) -> None:
+        with self._lock_archivos:
+            _escribir(self._ruta(thread_id), {
+                'storage': {ns: dict(puntos) for ns, puntos in self.storage[thread_id].items()},
+                'writes': {k: self.writes[k] for k in self._claves_writes[thread_id] if k in self.writes},
+                'blobs': {k: self.blobs[k] for k in self._claves_blobs[thread_id] if k in self.blobs},
+            })
+
+    def _cargar(self, thread_id: str) -> None:
+        if thread_id in self.storage:
+            return
+        ruta = self._ruta(thread_id)
+        if ruta.exists() and time.time() - ruta.stat().st_mtime > self.ttl_s:
+            ruta.unlink(missing_ok=True)
+            return
+        datos = _leer(ruta)
+        if datos is None:
+            return
+        self.storage[thread_id] = defaultdict(dict, datos['storage'])
+        self.writes.update(datos['writes'])
+        self.blobs.update(datos['blobs'])
+        self._claves_writes[thread_id].update(datos['writes'])
+        self._claves_blobs[thread_id].update(datos['blobs'])
+        self._actividad[thread_id] = time.time()
+
+    def _tocar(self, thread_id: str) -> None:
+        """Registra actividad del hilo; un hilo nuevo dispara la limpieza de los vencidos."""
+        if thread_id not in self._actividad:
+            self.limpiar_vencidos()
+        self._actividad[thread_id] = time.time()
+
+    def limpiar_vencidos(self) -> int:
+        """
+        Desaloja los hilos sin actividad hace más de ttl_h horas.
+
+        Returns:
+            Cantidad de hilos eliminados (en memoria o en disco)
+        """
+        limite = time.time() - self.ttl_s
+        vencidos = {thread_id for thread_id, instante in list(self._actividad.items()) if instante < limite}
+        if self.directorio.exists():
+            vencidos.update(
+                ruta.stem for ruta in self.directorio.glob("*.ckpt")
+                if ruta.stem not in self._actividad and ruta.stat().st_mtime < limite
+            )
+        for thread_id in vencidos:
+            self.delete_thread(thread_id)
+        return len(vencidos)
+
+    def get_tuple(self, config):
+        self._cargar(config["configurable"]["thread_id"])
+        return super().get_tuple(config)
+
+    def list(self, config, **kwargs):
+        if config:
+            self._cargar(config["configurable"]["thread_id"])
+        return super().list(config, **kwargs)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        resultado = super().put(config, checkpoint, metadata, new_versions)
+        thread_id, checkpoint_ns = config["configurable"]["thread_id"], config["configurable"]["checkpoint_ns"]
+        # Mismas claves que InMemorySaver.put usa en blobs
+        self._claves_blobs[thread_id].update(
+            (thread_id, checkpoint_ns, canal, version) for canal, version in new_versions.items()
+        )
+        self._persistir(thread_id)
+        self._tocar(thread_id)
+        return resultado
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        super().put_writes(config, writes, task_id, task_path)
+        thread_id = config["configurable"]["thread_id"]
+        # Misma clave que InMemorySaver.put_writes usa en writes
+        self._claves_writes[thread_id].add(
+            (thread_id, config["configurable"].get("checkpoint_ns", ""), config["configurable"]["checkpoint_id"])
+        )
+        self._persistir(thread_id)
+        self._tocar(thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        self._actividad.pop(thread_id, None)
+        self._claves_writes.pop(thread_id, None)
+        self._claves_blobs.pop(thread_id, None)
+        with self._lock_archivos:
+            self._ruta(thread_id).unlink(missing_ok=True)
+
+
+# Instancia global (singleton)
+_puntos_control_instance = None
+_puntos_control_lock = threading.Lock()
+
+
+def obtener_puntos_control() -> AlmacenPuntosControl:
+    """Obtiene la instancia singleton del almacén (descarta los vencidos al crearla)"""
+    global _puntos_control_instance
+
+    with _puntos_control_lock:
+        if _puntos_control_instance is None:
+            _puntos_control_instance = AlmacenPuntosControl(
+                directorio=settings.puntos_control_dir,
+                ttl_h=settings.puntos_control_ttl_h,
+            )
+            _puntos_control_instance.limpiar_vencidos()
+
+    return _puntos_control_instance
+
@@ -1,16 +1,52 @@
 """
 Servicio Corrector con RAG (Retrieval-Augmented Generation)
 Corrige errores en pseudocódigo usando ejemplos correctos como referencia.
+Antes del LLM intenta las reparaciones deterministas de
+shared/services/correccion_local.py.
 """
 
-import os
-import re
-from pathlib import Path
-from typing import Dict, List, Tuple
-from shared.services.llm_servicio import LLMService
-from shared.services.lectorArchivos import LectorArchivos
-from tools.metricas import registrar_tokens
+from typing import Dict, List
 from config.settings import settings
+from shared.services.correccion_local import corregir_localmente
+from shared.services.llm_servicio import LLMService
+from shared.services.indice_rag import obtener_indice_rag, termino_estructura, termino_tipo
+from shared.services.servicioValidador import servicioValidador
+
+
+# Instrucciones fijas de la corrección (prefijo cacheable del prompt)
+PROMPT_CORRECCION_FIJO = """Eres un experto en corrección de pseudocódigo. Tu tarea es corregir el pseudocódigo que aparece al FINAL del mensaje basándote EXCLUSIVAMENTE en los ejemplos correctos proporcionados.
+
+**REGLAS ESTRICTAS DE LA GRAMÁTICA v2.0:**
+1. TODOS los parámetros DEBEN tener tipo: `int n`, `int A[]`, `bool flag`
+2. TODAS las variables locales DEBEN tener tipo: `int i`, `bool encontrado`
+3. Estructuras de control DEBEN usar palabras clave:
+   - IF: `if (condicion) then`
+   - WHILE: `while (condicion) do`
+   - FOR: `for var 🡨 inicio to fin do`
+4. Llamadas a subrutinas DEBEN usar CALL: `CALL nombreFuncion(params)`
+5. Declaraciones múltiples deben usar comas: `int i, j, k`
+
+**INSTRUCCIONES:**
+1. Corrige el pseudocódigo siguiendo EXACTAMENTE la sintaxis de los ejemplos
+2. NO inventes sintaxis nueva
+3. Mantén la lógica del algoritmo original
+4. Asegúrate de agregar tipos a TODAS las declaraciones
+5. Usa las palabras clave correctas (then, do, to, CALL)
+
+**ENTREGA EL RESULTADO CON LA HERRAMIENTA entregar_correccion:**
+- correcciones: lista breve de los cambios realizados
+- pseudocodigo: el pseudocódigo corregido completo (sin ```)
+"""
+
+# Salida estructurada de la corrección (ver LLMService.invocar_estructurado)
+HERRAMIENTA_CORRECCION = LLMService.herramienta(
+    "entregar_correccion",
+    "Pseudocódigo corregido y lista de cambios",
+    {
+        "correcciones": {"type": "array", "items": {"type": "string"}},
+        "pseudocodigo": {"type": "string", "description": "Pseudocódigo corregido completo, sin bloques ```"},
+    },
+)
 
 
 class ServicioCorrector:
@@ -19,123 +55,43 @@ class ServicioCorrector:
     
     Metodología RAG:
     1. Indexa ejemplos correctos de pseudocódigo (base de conocimiento)
-    2. Cuando hay errores, busca ejemplos similares
-    3. Genera correcciones basadas en patrones reales
-    4. No inventa sintaxis - usa ejemplos validados
+    2. Cuando hay errores, primero aplica las reglas locales (sin LLM); si el
+       programa queda válido no hay llamada
+    3. Si no, busca ejemplos similares en un índice BM25
+    4. Genera correcciones basadas en patrones reales
+    5. No inventa sintaxis - usa ejemplos validados
     """
     
     def __init__(self):
         """Inicializa el servicio corrector con la base de conocimiento"""
-        self.base_conocimiento = []
-        # Usar ruta relativa desde el archivo actual
-        # Backend/shared/services/servicioCorrector.py -> Backend/data/pseudocodigos/correctos
-        # __file__ = Backend/shared/services/servicioCorrector.py
-        # parent = Backend/shared/services/
-        # parent.parent = Backend/shared/
-        # parent.parent.parent = Backend/
-        self.ruta_ejemplos = Path(__file__).resolve().parent.parent.parent / "data" / "pseudocodigos" / "correctos"
-        self._cargar_base_conocimiento()
-    
-    def _cargar_base_conocimiento(self):
-        """
-        Carga todos los pseudocódigos correctos como base de conocimiento RAG.
-        Estos servirán como ejemplos de referencia para correcciones.
-        """
-        if not self.ruta_ejemplos.exists():
-            print(f"[WARN] Advertencia: No se encontró la carpeta {self.ruta_ejemplos}")
-            return
-        
-        archivos_correctos = sorted(self.ruta_ejemplos.glob("*.txt"))
-        
-        for archivo in archivos_correctos:
-            try:
-                lector = LectorArchivos(str(archivo))
-                if lector.leer_archivo():
-                    contenido = lector.obtener_contenido_completo()
-                    
-                    # Extraer metadatos del ejemplo
-                    nombre = archivo.stem
-                    tipo = self._detectar_tipo_algoritmo(contenido)
-                    estructuras = self._extraer_estructuras(contenido)
-                    
-                    self.base_conocimiento.append({
-                        'nombre': nombre,
-                        'contenido': contenido,
-                        'tipo': tipo,
-                        'estructuras': estructuras,
-                        'ruta': str(archivo)
-                    })
-            except Exception as e:
-                print(f"[WARN] Error cargando {archivo}: {e}")
-        
-        print(f"[OK] Base de conocimiento cargada: {len(self.base_conocimiento)} ejemplos correctos")
+        # Solo ejemplos en gramática v2.0: la corrección copia su sintaxis (ver shared/services/indice_rag.py)
+        self.indice = obtener_indice_rag("corrector")
+        self.base_conocimiento = self.indice.documentos
     
-    def _detectar_tipo_algoritmo(self, pseudocodigo: str) -> str:
-        """Detecta si el algoritmo es iterativo o recursivo"""
-        return "recursivo" if "CALL" in pseudocodigo and self._es_recursivo(pseudocodigo) else "iterativo"
-    
-    def _es_recursivo(self, pseudocodigo: str) -> bool:
-        """Verifica si hay llamadas recursivas"""
-        lineas = pseudocodigo.split('\n')
-        for linea in lineas:
-            # Buscar encabezado de función
-            match = re.match(r'^(\w+)\s*\(', linea.strip())
-            if match:
-                nombre_funcion = match.group(1)
-                # Buscar si se llama a sí misma
-                if f"CALL {nombre_funcion}" in pseudocodigo:
-                    return True
-        return False
-    
-    def _extraer_estructuras(self, pseudocodigo: str) -> Dict[str, int]:
-        """Extrae qué estructuras de control usa el pseudocódigo"""
-        estructuras = {
-            'if': len(re.findall(r'\bif\s+\(', pseudocodigo, re.IGNORECASE)),
-            'while': len(re.findall(r'\bwhile\s+\(', pseudocodigo, re.IGNORECASE)),
-            'for': len(re.findall(r'\bfor\s+\w+\s*🡨', pseudocodigo)),
-            'repeat': len(re.findall(r'\brepeat\b', pseudocodigo, re.IGNORECASE)),
-            'arrays': len(re.findall(r'\w+\[\w*\]', pseudocodigo)),
-            'call': len(re.findall(r'\bCALL\s+\w+', pseudocodigo))
-        }
-        return {k: v for k, v in estructuras.items() if v > 0}
-    
-    def _buscar_ejemplos_similares(self, errores: List[str], tipo_algoritmo: str = None) -> List[Dict]:
+    def _buscar_ejemplos_similares(
+        self,
+        pseudocodigo: str,
+        errores: List[str],
+        tipo_algoritmo: str = None
+    ) -> List[Dict]:
         """
         Busca ejemplos similares en la base de conocimiento (parte RAG).
         
         Args:
+            pseudocodigo: Pseudocódigo con errores (nombres de subrutinas y variables)
             errores: Lista de errores del validador
             tipo_algoritmo: 'Iterativo' o 'Recursivo'
         
         Returns:
             Lista de ejemplos relevantes ordenados por similitud
         """
-        ejemplos_relevantes = []
-        
-        # Categorizar errores
-        errores_categorias = self._categorizar_errores(errores)
-        
-        for ejemplo in self.base_conocimiento:
-            score = 0
-            
-            # Priorizar por tipo de algoritmo
-            if tipo_algoritmo and ejemplo['tipo'] == tipo_algoritmo.lower():
-                score += 3
-            
-            # Priorizar por estructuras similares
-            for categoria, presente in errores_categorias.items():
-                if presente and categoria in ejemplo['estructuras']:
-                    score += 2
-            
-            if score > 0:
-                ejemplos_relevantes.append({
-                    **ejemplo,
-                    'score': score
-                })
-        
-        # Ordenar por relevancia y retornar los 3 mejores
-        ejemplos_relevantes.sort(key=lambda x: x['score'], reverse=True)
-        return ejemplos_relevantes[:3]
+        # Priorizar por tipo de algoritmo y por las estructuras de los errores
+        extras = [termino_tipo(tipo_algoritmo.lower())] if tipo_algoritmo else []
+        extras += [
+            termino_estructura(categoria)
+            for categoria, presente in self._categorizar_errores(errores).items() if presente
+        ]
+        return self.indice.buscar(f"{pseudocodigo}\n" + "\n".join(errores), k=3, extras=extras)
     
     def _categorizar_errores(self, errores: List[str]) -> Dict[str, bool]:
         """Categoriza los errores para buscar ejemplos relevantes"""
@@ -186,6 +142,8 @@ class ServicioCorrector:
                 - 'pseudocodigo': str - Pseudocódigo corregido
                 - 'explicacion': str - Explicación de las correcciones
                 - 'ejemplos_usados': List[str] - Ejemplos de referencia
+                - 'correcciones_locales': List[str] - Cambios de las reglas locales
+                - 'local': bool - True si bastaron las reglas locales (sin LLM)
         """
         
         # Extraer errores del resultado de validación
@@ -199,9 +157,30 @@ class ServicioCorrector:
                 'ejemplos_usados': []
             }
         
+        # Reglas locales: si el programa queda válido no se llama al LLM; si no,
+        # el LLM parte de la versión parcialmente corregida y sus errores restantes
+        correcciones_locales = []
+        if settings.corrector_local:
+            local = corregir_localmente(pseudocodigo_erroneo, resultado_validacion)
+            correcciones_locales = local['correcciones']
+            if local['valido']:
+                cambios = "\n".join(f"- {cambio}" for cambio in correcciones_locales)
+                return {
+                    'corregido': True,
+                    'pseudocodigo': local['pseudocodigo'],
+                    'explicacion': f"### Correcciones realizadas (reglas locales, sin LLM):\n{cambios}",
+                    'ejemplos_usados': [],
+                    'correcciones_locales': correcciones_locales,
+                    'local': True
+                }
+            if correcciones_locales:
+                pseudocodigo_erroneo = local['pseudocodigo']
+                resultado_validacion = local['validacion']
+                errores = self._extraer_errores(resultado_validacion)
+        
         # Buscar ejemplos similares (RAG)
         tipo_algoritmo = resultado_validacion.get('tipo_algoritmo', None)
-        ejemplos_similares = self._buscar_ejemplos_similares(errores, tipo_algoritmo)
+        ejemplos_similares = self._buscar_ejemplos_similares(pseudocodigo_erroneo, errores, tipo_algoritmo)
         
         if not ejemplos_similares:
             return {
@@ -211,8 +190,8 @@ class ServicioCorrector:
                 'ejemplos_usados': []
             }
         
-        # Generar prompt con contexto RAG
-        prompt = self._generar_prompt_correccion(
+        # Generar mensajes con contexto RAG
+        mensajes = self._generar_prompt_correccion(
             pseudocodigo_erroneo,
             errores,
             ejemplos_similares
@@ -220,26 +199,25 @@ class ServicioCorrector:
         
         # Llamar al LLM con el contexto RAG
         try:
-            llm = LLMService.get_llm(temperature=0.3)  # Baja temperatura para ser más preciso
-            respuesta = llm.invoke(prompt)
+            # Baja temperatura para ser más preciso
+            llm = LLMService.get_llm(
+                temperature=0.3, max_tokens=settings.llm_max_tokens_correccion, etapa="correccion"
+            )
+            salida = LLMService.invocar_estructurado(
+                llm, mensajes, HERRAMIENTA_CORRECCION, verificar=self._verificar_correccion
+            )
             
-            # Registrar tokens
-            if hasattr(respuesta, 'response_metadata') and 'usage' in respuesta.response_metadata:
-                usage = respuesta.response_metadata['usage']
-                registrar_tokens(
-                    input_tokens=usage.get('input_tokens', 0),
-                    output_tokens=usage.get('output_tokens', 0),
-                    modelo=settings.model_name
-                )
-            
-            # Extraer pseudocódigo corregido de la respuesta
-            pseudocodigo_corregido = self._extraer_pseudocodigo(respuesta.content)
+            correcciones = "\n".join(
+                f"- {cambio}" for cambio in correcciones_locales + salida['correcciones']
+            )
             
             return {
                 'corregido': True,
-                'pseudocodigo': pseudocodigo_corregido,
-                'explicacion': respuesta.content,
-                'ejemplos_usados': [ej['nombre'] for ej in ejemplos_similares]
+                'pseudocodigo': salida['pseudocodigo'].strip(),
+                'explicacion': f"### Correcciones realizadas:\n{correcciones}",
+                'ejemplos_usados': [ej['nombre'] for ej in ejemplos_similares],
+                'correcciones_locales': correcciones_locales,
+                'local': False
             }
             
         except Exception as e:
@@ -250,6 +228,21 @@ class ServicioCorrector:
                 'ejemplos_usados': []
             }
     
+    @staticmethod
+    def _verificar_correccion(salida: Dict) -> None:
+        """
+        Verificación de confianza de la corrección: el pseudocódigo devuelto
+        debe pasar el validador. Si no, se escala al modelo fuerte.
+        
+        Raises:
+            ValueError: Si la corrección sigue teniendo errores
+        """
+        validacion = servicioValidador().validar(salida['pseudocodigo'].strip())
+        if not validacion['valido_general']:
+            raise ValueError(
+                f"La corrección sigue con {validacion['resumen']['errores_totales']} errores"
+            )
+    
     def _extraer_errores(self, resultado_validacion: Dict) -> List[str]:
         """Extrae todos los errores del resultado de validación por capas"""
         errores = []
@@ -266,10 +259,14 @@ class ServicioCorrector:
         pseudocodigo_erroneo: str,
         errores: List[str],
         ejemplos_similares: List[Dict]
-    ) -> str:
+    ) -> list:
         """
-        Genera el prompt para el LLM usando RAG.
+        Genera los mensajes para el LLM usando RAG.
         Incluye ejemplos correctos como contexto.
+        
+        Reglas e instrucciones forman un prefijo fijo, seguido de los ejemplos
+        y, al final, el pseudocódigo con sus errores (ver
+        LLMService.mensajes_cacheables).
         """
         
         # Preparar ejemplos
@@ -281,69 +278,19 @@ class ServicioCorrector:
         # Preparar lista de errores
         errores_texto = "\n".join([f"- {error}" for error in errores])
         
-        prompt = f"""Eres un experto en corrección de pseudocódigo. Tu tarea es corregir el siguiente pseudocódigo basándote EXCLUSIVAMENTE en los ejemplos correctos proporcionados.
-
-**REGLAS ESTRICTAS DE LA GRAMÁTICA v2.0:**
-1. TODOS los parámetros DEBEN tener tipo: `int n`, `int A[]`, `bool flag`
-2. TODAS las variables locales DEBEN tener tipo: `int i`, `bool encontrado`
-3. Estructuras de control DEBEN usar palabras clave:
-   - IF: `if (condicion) then`
-   - WHILE: `while (condicion) do`
-   - FOR: `for var 🡨 inicio to fin do`
-4. Llamadas a subrutinas DEBEN usar CALL: `CALL nombreFuncion(params)`
-5. Declaraciones múltiples deben usar comas: `int i, j, k`
-
-**EJEMPLOS CORRECTOS DE REFERENCIA:**
-{ejemplos_texto}
-
-**PSEUDOCÓDIGO CON ERRORES:**
+        ejemplos = f"""**EJEMPLOS CORRECTOS DE REFERENCIA:**
+{ejemplos_texto}"""
+        
+        a_corregir = f"""**PSEUDOCÓDIGO CON ERRORES:**
 ```
 {pseudocodigo_erroneo}
 ```
 
 **ERRORES DETECTADOS:**
 {errores_texto}
-
-**INSTRUCCIONES:**
-1. Corrige el pseudocódigo siguiendo EXACTAMENTE la sintaxis de los ejemplos
-2. NO inventes sintaxis nueva
-3. Mantén la lógica del algoritmo original
-4. Asegúrate de agregar tipos a TODAS las declaraciones
-5. Usa las palabras clave correctas (then, do, to, CALL)
-
-**RESPONDE EN ESTE FORMATO:**
-
-### Correcciones realizadas:
-[Lista breve de cambios]
-
-### Pseudocódigo corregido:
-```
-[pseudocódigo corregido aquí]
-```
 """
         
-        return prompt
-    
-    def _extraer_pseudocodigo(self, respuesta_llm: str) -> str:
-        """Extrae el pseudocódigo corregido de la respuesta del LLM"""
-        
-        # Buscar el bloque de código entre ``` después de "Pseudocódigo corregido:"
-        match = re.search(
-            r'###\s*Pseudocódigo corregido:\s*```(?:\w*\n)?(.*?)```',
-            respuesta_llm,
-            re.DOTALL | re.IGNORECASE
-        )
-        
-        if match:
-            return match.group(1).strip()
-        
-        # Fallback: buscar cualquier bloque de código
-        match = re.search(r'```(?:\w*\n)?(.*?)```', respuesta_llm, re.DOTALL)
-        if match:
-            return match.group(1).strip()
-        
-        # Si no encuentra, devolver la respuesta completa
-        return respuesta_llm.strip()
+        return LLMService.mensajes_cacheables([PROMPT_CORRECCION_FIJO, ejemplos], a_corregir)
     
     def obtener_estadisticas_base(self) -> Dict:
         """Retorna estadísticas de la base de conocimiento"""
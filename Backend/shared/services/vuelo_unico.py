@@ -0,0 +1,105 @@
+"""
+Vuelo Único (single-flight)
+===========================
+
+Coalesce ejecuciones idénticas y concurrentes: la primera solicitud con una
+clave ejecuta el cómputo y las que llegan mientras sigue en curso esperan y
+reciben el mismo resultado (o la misma excepción).
+
+Se usa delante de FlujoAnalisis.analizar y de cada llamada LLM, de modo que
+una ráfaga de N envíos iguales cuesta un solo análisis.
+"""
+
+import copy
+import hashlib
+import threading
+from typing import Any, Callable, Dict, TypeVar
+
+
+T = TypeVar("T")
+
+
+def clave_de(*partes: Any) -> str:
+    """Construye una clave estable (SHA-256) a partir de sus partes."""
+    return hashlib.sha256("\x1f".join(repr(p) for p in partes).encode("utf-8")).hexdigest()
+
+
+class _Vuelo:
+    """Cómputo en curso para una clave."""
+
+    def __init__(self):
+        self.terminado = threading.Event()
+        self.resultado: Any = None
+        self.error: BaseException = None
+        self.seguidores = 0
+
+
+class VueloUnico:
+    """
+    Grupo de ejecuciones coalescidas por clave.
+
+    Solo se coalescen ejecuciones simultáneas: una vez terminado el cómputo
+    la clave se libera y la siguiente solicitud vuelve a ejecutar.
+    """
+
+    def __init__(self, copiar_resultado: bool = True):
+        """
+        Args:
+            copiar_resultado: Si True, los seguidores reciben una copia profunda
+                              para que no compartan estructuras mutables con el líder
+        """
+        self.copiar_resultado = copiar_resultado
+        self._vuelos: Dict[str, _Vuelo] = {}
+        self._lock = threading.Lock()
+        self._stats = {'ejecutadas': 0, 'compartidas': 0}
+
+    def ejecutar(self, clave: str, funcion: Callable[[], T]) -> T:
+        """
+        Ejecuta `funcion` o se une a la ejecución en curso con la misma clave.
+
+        Args:
+            clave: Identificador normalizado del cómputo
+            funcion: Callable sin argumentos
+
+        Returns:
+            Resultado de la ejecución (propia o compartida)
+        """
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            if vuelo is None:
+                vuelo = self._vuelos[clave] = _Vuelo()
+                es_lider = True
+                self._stats['ejecutadas'] += 1
+            else:
+                vuelo.seguidores += 1
+                es_lider = False
+                self._stats['compartidas'] += 1
+
+        if not es_lider:
+            vuelo.terminado.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return copy.deepcopy(vuelo.resultado) if self.copiar_resultado else vuelo.resultado
+
+        try:
+            resultado = funcion()
+            # Los seguidores copian de una instantánea: el líder puede mutar la suya
+            vuelo.resultado = copy.deepcopy(resultado) if self.copiar_resultado else resultado
+            return resultado
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._vuelos[clave]
+            vuelo.terminado.set()
+
+    def en_curso(self) -> int:
+        """Número de claves con un cómputo en curso."""
+        with self._lock:
+            return len(self._vuelos)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Ejecuciones reales y solicitudes que reutilizaron un cómputo en curso."""
+        with self._lock:
+            return dict(self._stats)
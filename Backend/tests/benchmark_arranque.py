@@ -0,0 +1,255 @@
+"""
+Benchmark de Arranque en Frío
+=============================
+
+Mide cuánto tarda en estar listo cada punto de entrada del backend en un
+intérprete nuevo, como un worker recién escalado o una corrida de la CLI:
+
+- Tiempo de arranque (intérprete + importación) y de importación del módulo,
+  mediana de varias corridas de `python -X importtime -c "import <módulo>"`
+- Perfil de importación: tiempo propio agregado por paquete de primer nivel
+  (dónde se va el arranque)
+- Dependencias pesadas cargadas (LangChain, LangGraph, SymPy, scikit-learn...):
+  la API, el validador y su servicio liviano (app_validador.py) deben
+  arrancar sin ellas; el analizador las importa en la primera solicitud
+  (ver core/analizador/router.py)
+
+El resultado se guarda como JSON y se compara contra una línea base: un
+arranque que empeore más que el umbral, o una dependencia pesada que aparezca
+en un punto de entrada que antes no la cargaba, es una regresión y el script
+termina con código 1.
+
+Uso:
+    python tests/benchmark_arranque.py --guardar-baseline   # una vez
+    python tests/benchmark_arranque.py                      # compara
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+VERSION_FORMATO = 1
+
+BACKEND = Path(__file__).parent.parent
+CARPETA_RESULTADOS = Path(__file__).parent / "resultados_benchmark"
+BASELINE_DEFECTO = CARPETA_RESULTADOS / "arranque_baseline.json"
+
+# Punto de entrada -> módulo que importa
+OBJETIVOS = {
+    "app": "app",
+    "validador": "core.validador.router",
+    "servicio_validador": "app_validador",
+    "cli": "main",
+    "analizador": "flujo_analisis",
+}
+
+PESADOS = ("langchain_anthropic", "langchain_core", "langgraph", "sympy", "sklearn", "scipy")
+
+# Diferencias absolutas por debajo de este piso se consideran ruido
+PISO_SEGUNDOS = 0.05
+
+
+# ==================== PERFIL ====================
+def parsear_importtime(texto: str) -> List[Dict[str, Any]]:
+    """
+    Registros de `python -X importtime` en orden de aparición.
+
+    Returns:
+        Lista de dicts con modulo, propio_us, acumulado_us y nivel (0 = importado
+        directamente por el comando)
+    """
+    registros = []
+    for linea in texto.splitlines():
+        if not linea.startswith("import time:"):
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|", 2)
+        if not propio.strip().isdigit():
+            continue  # encabezado
+        modulo = nombre.rstrip()
+        registros.append({
+            'modulo': modulo.strip(),
+            'propio_us': int(propio),
+            'acumulado_us': int(acumulado),
+            'nivel': (len(modulo) - len(modulo.lstrip()) - 1) // 2,
+        })
+    return registros
+
+
+def por_paquete(registros: List[Dict[str, Any]], top: int = 10) -> List[Dict[str, Any]]:
+    """Tiempo propio de importación agregado por paquete de primer nivel, de mayor a menor."""
+    totales: Dict[str, int] = defaultdict(int)
+    for registro in registros:
+        totales[registro['modulo'].split(".")[0]] += registro['propio_us']
+    ordenados = sorted(totales.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{'paquete': paquete, 'ms': round(us / 1000, 1)} for paquete, us in ordenados]
+
+
+# ==================== MEDICIÓN ====================
+def _corrida(modulo: str) -> Dict[str, Any]:
+    """Un arranque en frío: intérprete nuevo que importa `modulo`."""
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=BACKEND, capture_output=True, text=True, timeout=300,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    arranque_s = time.perf_counter() - inicio
+    registros = parsear_importtime(proceso.stderr)
+    error = None
+    if proceso.returncode != 0:
+        otras = [l for l in proceso.stderr.splitlines() if l.strip() and not l.startswith("import time:")]
+        error = otras[-1] if otras else f"código {proceso.returncode}"
+    propio = next((r for r in reversed(registros) if r['modulo'] == modulo and r['nivel'] == 0), None)
+    return {
+        'arranque_s': arranque_s,
+        'importacion_s': propio['acumulado_us'] / 1e6 if propio else None,
+        'registros': registros,
+        'error': error,
+    }
+
+
+def medir_objetivo(modulo: str, repeticiones: int = 5, top: int = 10) -> Dict[str, Any]:
+    """
+    Arranque en frío de un punto de entrada (mediana de `repeticiones`).
+
+    Returns:
+        dict con modulo, exito, error, arranque_s, importacion_s, pesados
+        (dependencias pesadas cargadas) y paquetes (perfil por paquete)
+    """
+    corridas = [_corrida(modulo) for _ in range(repeticiones)]
+    ultima = corridas[-1]
+    importaciones = [c['importacion_s'] for c in corridas if c['importacion_s'] is not None]
+    cargados = {r['modulo'].split(".")[0] for r in ultima['registros']}
+    return {
+        'modulo': modulo,
+        'exito': ultima['error'] is None,
+        'error': ultima['error'],
+        'arranque_s': round(statistics.median(c['arranque_s'] for c in corridas), 3),
+        'importacion_s': round(statistics.median(importaciones), 3) if importaciones else None,
+        'pesados': [paquete for paquete in PESADOS if paquete in cargados],
+        'paquetes': por_paquete(ultima['registros'], top),
+    }
+
+
+# ==================== COMPARACIÓN ====================
+def comparar(
+    base: Dict[str, Any],
+    actual: Dict[str, Any],
+    umbral: float = 0.20,
+    piso: float = PISO_SEGUNDOS
+) -> List[Dict[str, Any]]:
+    """
+    Regresiones de `actual` respecto de `base` (documentos de este benchmark).
+
+    Returns:
+        Lista de dicts con objetivo, metrica, base y actual
+    """
+    regresiones = []
+    for objetivo, medido in actual['objetivos'].items():
+        previo = base.get('objetivos', {}).get(objetivo)
+        if not previo or not previo.get('exito') or not medido.get('exito'):
+            continue
+        if medido['arranque_s'] - previo['arranque_s'] > max(previo['arranque_s'] * umbral, piso):
+            regresiones.append({
+                'objetivo': objetivo, 'metrica': 'arranque_s',
+                'base': previo['arranque_s'], 'actual': medido['arranque_s'],
+            })
+        nuevos = [paquete for paquete in medido['pesados'] if paquete not in previo['pesados']]
+        if nuevos:
+            regresiones.append({
+                'objetivo': objetivo, 'metrica': 'pesados',
+                'base': previo['pesados'], 'actual': medido['pesados'],
+            })
+    return regresiones
+
+
+# ==================== REPORTE ====================
+def imprimir_perfil(documento: Dict[str, Any]) -> None:
+    print("\n" + "=" * 80)
+    print(f"ARRANQUE EN FRÍO (mediana de {documento['repeticiones']} corridas)")
+    print("=" * 80)
+    print(f"{'Punto de entrada':<14} {'Módulo':<24} {'Arranque (s)':>13} {'Import (s)':>11}  Pesados")
+    for objetivo, medido in documento['objetivos'].items():
+        if not medido['exito']:
+            print(f"{objetivo:<14} {medido['modulo']:<24} [ERROR] {medido['error']}")
+            continue
+        importacion = "-" if medido['importacion_s'] is None else f"{medido['importacion_s']:.3f}"
+        print(
+            f"{objetivo:<14} {medido['modulo']:<24} {medido['arranque_s']:>13.3f} {importacion:>11}  "
+            f"{', '.join(medido['pesados']) or '-'}"
+        )
+
+    for objetivo, medido in documento['objetivos'].items():
+        if not medido['paquetes']:
+            continue
+        print(f"\nPerfil de importación - {objetivo} (tiempo propio por paquete)")
+        for paquete in medido['paquetes']:
+            print(f"  {paquete['paquete']:<30} {paquete['ms']:>9.1f} ms")
+
+
+def imprimir_comparacion(regresiones: List[Dict[str, Any]], umbral: float) -> None:
+    if not regresiones:
+        print(f"\n[OK] Sin regresiones de arranque (umbral {umbral:.0%})")
+        return
+    print(f"\n[ERROR] {len(regresiones)} regresión(es) de arranque (umbral {umbral:.0%}):")
+    for regresion in regresiones:
+        print(f"  - {regresion['objetivo']} {regresion['metrica']}: {regresion['base']} -> {regresion['actual']}")
+
+
+# ==================== CLI ====================
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío del backend")
+    parser.add_argument("--objetivos", nargs="*", choices=list(OBJETIVOS), help="Puntos de entrada (por defecto todos)")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Corridas por punto de entrada (se usa la mediana)")
+    parser.add_argument("--top", type=int, default=10, help="Paquetes listados en el perfil de importación")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_DEFECTO, help="Archivo de línea base")
+    parser.add_argument("--guardar-baseline", action="store_true", help="Sobrescribir la línea base con esta corrida")
+    parser.add_argument("--salida", type=Path, help="Guardar los resultados de esta corrida en este archivo")
+    parser.add_argument("--umbral", type=float, default=0.20, help="Empeoramiento relativo tolerado (0.20 = 20%%)")
+    args = parser.parse_args(argv)
+
+    objetivos = args.objetivos or list(OBJETIVOS)
+    documento = {
+        'version_formato': VERSION_FORMATO,
+        'fecha': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'repeticiones': args.repeticiones,
+        'objetivos': {},
+    }
+    for objetivo in objetivos:
+        print(f"[INFO] Midiendo {objetivo} ({OBJETIVOS[objetivo]})...")
+        documento['objetivos'][objetivo] = medir_objetivo(OBJETIVOS[objetivo], args.repeticiones, args.top)
+
+    imprimir_perfil(documento)
+
+    CARPETA_RESULTADOS.mkdir(parents=True, exist_ok=True)
+    if args.salida:
+        args.salida.write_text(json.dumps(documento, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n[OK] Resultados guardados en: {args.salida}")
+
+    if args.guardar_baseline:
+        args.baseline.write_text(json.dumps(documento, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n[OK] Línea base guardada en: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"\n[WARN] No hay línea base en {args.baseline} (usar --guardar-baseline)")
+        return 0
+
+    base = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regresiones = comparar(base, documento, args.umbral)
+    imprimir_comparacion(regresiones, args.umbral)
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Benchmark de Arranque del Clasificador
+======================================
+
+Mide lo que cuesta tener el clasificador ML cargado en cada worker del
+servidor, con los tres pickles de scikit-learn (antes) y con el bundle de un
+archivo cargado con mmap (después, ver ml/bundle.py):
+
+- Tiempo de carga por worker (importar ml.clasificador y construir
+  ClasificadorAlgoritmos)
+- Memoria por worker con todos los workers vivos a la vez: RSS, PSS (reparte
+  las páginas compartidas entre los procesos que las usan) y memoria privada,
+  medidas como incremento sobre el worker antes de cargar
+
+Cada escenario corre en un proceso coordinador limpio que forkea los
+workers; con --precarga el coordinador carga el modelo antes de forkear
+(como gunicorn --preload) y los workers lo heredan copy-on-write.
+La memoria PSS y privada se lee de /proc (solo Linux).
+
+Uso:
+    python tests/benchmark_clasificador.py --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+import warnings
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+CARPETA_RESULTADOS = Path(__file__).parent / "resultados_benchmark"
+
+MODOS = ("pickles", "bundle")
+
+PSEUDOCODIGO = """busqueda(int A[], int n, int x)
+begin
+    int i
+    for i 🡨 1 to n do
+    begin
+        if (A[i] = x) then
+        begin
+            return i
+        end
+    end
+    return -1
+end"""
+
+
+# ==================== MEDICIÓN ====================
+def memoria_mb() -> Dict[str, Optional[float]]:
+    """RSS, PSS y memoria privada del proceso en MB (None si /proc no está disponible)."""
+    campos = {'Rss': None, 'Pss': None, 'Private_Clean': None, 'Private_Dirty': None}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for linea in f:
+                nombre, _, resto = linea.partition(":")
+                if nombre in campos:
+                    campos[nombre] = int(resto.split()[0]) / 1024
+    except OSError:
+        return {'rss': None, 'pss': None, 'privada': None}
+    privada = None
+    if campos['Private_Clean'] is not None and campos['Private_Dirty'] is not None:
+        privada = campos['Private_Clean'] + campos['Private_Dirty']
+    return {'rss': campos['Rss'], 'pss': campos['Pss'], 'privada': privada}
+
+
+def _cargar(modo: str):
+    """Importa y construye el clasificador (silenciando sus mensajes)."""
+    with redirect_stdout(StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        from ml.clasificador import ClasificadorAlgoritmos
+        clasificador = ClasificadorAlgoritmos(usar_bundle=(modo == "bundle"))
+        # Una clasificación para tocar las páginas que usa la inferencia
+        clasificador.clasificar(PSEUDOCODIGO)
+    return clasificador
+
+
+def _worker(modo: str, precargado, barrera, cola) -> None:
+    base = memoria_mb()
+    inicio = time.perf_counter()
+    clasificador = precargado if precargado is not None else _cargar(modo)
+    if precargado is not None:
+        with redirect_stdout(StringIO()):
+            clasificador.clasificar(PSEUDOCODIGO)
+    carga_ms = (time.perf_counter() - inicio) * 1000
+
+    # Medir con todos los workers cargados para que PSS refleje lo compartido
+    barrera.wait()
+    despues = memoria_mb()
+    cola.put({
+        'carga_ms': round(carga_ms, 2),
+        **{
+            f"{campo}_mb": round(despues[campo] - base[campo], 2) if despues[campo] is not None else None
+            for campo in ('rss', 'pss', 'privada')
+        },
+    })
+    barrera.wait()
+
+
+def _escenario(modo: str, workers: int, precarga: bool, salida) -> None:
+    """Coordinador: forkea los workers y devuelve sus mediciones."""
+    contexto = multiprocessing.get_context("fork")
+    inicio = time.perf_counter()
+    precargado = _cargar(modo) if precarga else None
+    carga_padre_ms = (time.perf_counter() - inicio) * 1000 if precarga else None
+
+    barrera = contexto.Barrier(workers)
+    cola = contexto.Queue()
+    procesos = [contexto.Process(target=_worker, args=(modo, precargado, barrera, cola)) for _ in range(workers)]
+    for proceso in procesos:
+        proceso.start()
+    mediciones = [cola.get(timeout=300) for _ in procesos]
+    for proceso in procesos:
+        proceso.join()
+    salida.put({'carga_padre_ms': round(carga_padre_ms, 2) if carga_padre_ms is not None else None, 'workers': mediciones})
+
+
+def ejecutar_escenario(modo: str, workers: int, precarga: bool) -> Dict[str, Any]:
+    """Corre un escenario en un coordinador recién lanzado (sin módulos del benchmark cargados)."""
+    contexto = multiprocessing.get_context("spawn")
+    salida = contexto.Queue()
+    coordinador = contexto.Process(target=_escenario, args=(modo, workers, precarga, salida))
+    coordinador.start()
+    resultado = salida.get(timeout=600)
+    coordinador.join()
+
+    mediciones = resultado['workers']
+    promedio = {
+        campo: round(sum(m[campo] for m in mediciones) / len(mediciones), 2)
+        if all(m[campo] is not None for m in mediciones) else None
+        for campo in ('carga_ms', 'rss_mb', 'pss_mb', 'privada_mb')
+    }
+    return {
+        'modo': modo,
+        'precarga': precarga,
+        'carga_padre_ms': resultado['carga_padre_ms'],
+        'por_worker': promedio,
+        'workers': mediciones,
+    }
+
+
+# ==================== REPORTE ====================
+def _fmt(valor: Optional[float]) -> str:
+    return "-" if valor is None else f"{valor:.2f}"
+
+
+def imprimir_tabla(escenarios: List[Dict[str, Any]], workers: int) -> None:
+    print("\n" + "=" * 80)
+    print(f"ARRANQUE DEL CLASIFICADOR ({workers} workers, promedio por worker)")
+    print("=" * 80)
+    print(f"{'Escenario':<24} {'Carga (ms)':>12} {'RSS (MB)':>10} {'PSS (MB)':>10} {'Privada (MB)':>13}")
+    for escenario in escenarios:
+        nombre = escenario['modo'] + (" + precarga" if escenario['precarga'] else "")
+        datos = escenario['por_worker']
+        print(
+            f"{nombre:<24} {_fmt(datos['carga_ms']):>12} {_fmt(datos['rss_mb']):>10} "
+            f"{_fmt(datos['pss_mb']):>10} {_fmt(datos['privada_mb']):>13}"
+        )
+
+
+# ==================== CLI ====================
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de arranque del clasificador ML")
+    parser.add_argument("--workers", type=int, default=4, help="Workers forkeados por escenario")
+    parser.add_argument("--modos", nargs="*", choices=MODOS, default=list(MODOS), help="Formatos a medir")
+    parser.add_argument("--sin-precarga", action="store_true", help="No medir los escenarios con precarga en el padre")
+    parser.add_argument("--salida", type=Path, help="Archivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    if sys.platform == "win32":
+        print("[ERROR] El benchmark necesita fork (Linux/macOS)")
+        return 1
+
+    escenarios = []
+    for precarga in ((False,) if args.sin_precarga else (False, True)):
+        for modo in args.modos:
+            print(f"[INFO] Midiendo {modo}{' con precarga' if precarga else ''}...")
+            escenarios.append(ejecutar_escenario(modo, args.workers, precarga))
+
+    imprimir_tabla(escenarios, args.workers)
+
+    documento = {
+        'fecha': datetime.now().isoformat(),
+        'workers': args.workers,
+        'escenarios': escenarios,
+    }
+    salida = args.salida or CARPETA_RESULTADOS / f"clasificador_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(documento, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\n[OK] Resultados guardados en: {salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+"""
+Benchmark End-to-End del Flujo de Análisis
+==========================================
+
+Ejecuta cada archivo del corpus (data/pseudocodigos/correctos, incorrectos y
+lenguaje_natural) a través de FlujoAnalisis y mide por caso:
+
+- Tiempo total y por fase (validación, clasificación, flowchart, nodos del
+  workflow, representación, resolución, reporte...) tomado de tools.metricas
+- Tokens de entrada/salida, totales y por fase
+- Memoria: pico de tracemalloc (opcional) y RSS máximo del proceso
+
+El resultado se guarda como JSON y se compara contra una línea base: toda
+fase cuyo tiempo o consumo de tokens empeore más que el umbral se reporta
+como regresión y el script termina con código 1.
+
+Para resultados reproducibles sin API, usar los casetes LLM:
+    LLM_MODO=record python tests/benchmark_flujo.py --guardar-baseline   # una vez, con API key
+    LLM_MODO=fail   python tests/benchmark_flujo.py                      # offline, compara
+"""
+
+import argparse
+import gc
+import json
+import logging
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.metricas import obtener_metricas, reset_metricas
+
+
+VERSION_FORMATO = 1
+
+CARPETA_CORPUS = Path(__file__).parent.parent / "data" / "pseudocodigos"
+CARPETA_RESULTADOS = Path(__file__).parent / "resultados_benchmark"
+BASELINE_DEFECTO = CARPETA_RESULTADOS / "baseline.json"
+
+# Corpus -> tipo_entrada de FlujoAnalisis.analizar
+CORPUS = {
+    "correctos": "pseudocodigo",
+    "incorrectos": "pseudocodigo",
+    "lenguaje_natural": "lenguaje_natural",
+}
+
+# Diferencias absolutas por debajo de este piso se consideran ruido
+PISO_SEGUNDOS = 0.005
+PISO_TOKENS = 50
+
+
+# ==================== CORPUS ====================
+def listar_casos(corpus: Optional[List[str]] = None, filtro: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Lista los casos del corpus.
+
+    Args:
+        corpus: Nombres de corpus a incluir (todos si es None)
+        filtro: Subcadena que debe contener el nombre del archivo
+
+    Returns:
+        Lista de dicts con id, corpus, tipo_entrada y ruta
+    """
+    casos = []
+    for nombre, tipo_entrada in CORPUS.items():
+        if corpus and nombre not in corpus:
+            continue
+        for ruta in sorted((CARPETA_CORPUS / nombre).glob("*.txt")):
+            if filtro and filtro not in ruta.name:
+                continue
+            casos.append({
+                'id': f"{nombre}/{ruta.stem}",
+                'corpus': nombre,
+                'tipo_entrada': tipo_entrada,
+                'ruta': ruta,
+            })
+    return casos
+
+
+# ==================== MEDICIÓN ====================
+def _rss_max_mb() -> Optional[float]:
+    """RSS máximo del proceso en MB (None si no está disponible)."""
+    if resource is None:
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB, macOS bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(maximo / divisor, 1)
+
+
+def _limpiar_caches() -> None:
+    """Vacía los cachés en memoria para que cada caso parta en frío."""
+    from core.analizador.tools.subroutine_costs import get_subroutine_cost_cache
+    from shared.services.cache_canonico import obtener_cache_canonico
+    from shared.services.indice_similitud import obtener_indice_similitud
+    get_subroutine_cost_cache().clear()
+    obtener_cache_canonico().limpiar()
+    obtener_indice_similitud().limpiar()
+
+
+def ejecutar_caso(flujo, caso: Dict[str, Any], medir_memoria: bool = False, verbose: bool = False) -> Dict[str, Any]:
+    """
+    Ejecuta un caso y devuelve sus métricas.
+
+    Returns:
+        dict con exito, total_s, fases {fase: segundos}, tokens, tokens_por_fase y memoria
+    """
+    entrada = caso['ruta'].read_text(encoding="utf-8")
+    _limpiar_caches()
+    reset_metricas()
+    gc.collect()
+
+    if medir_memoria:
+        tracemalloc.start()
+
+    salida = StringIO()
+    inicio = time.perf_counter()
+    try:
+        if verbose:
+            resultado = flujo.analizar(entrada=entrada, tipo_entrada=caso['tipo_entrada'])
+        else:
+            with redirect_stdout(salida), redirect_stderr(salida):
+                resultado = flujo.analizar(entrada=entrada, tipo_entrada=caso['tipo_entrada'])
+    except Exception as e:
+        resultado = {'exito': False, 'errores': [f"{type(e).__name__}: {e}"]}
+    total = time.perf_counter() - inicio
+
+    pico_mb = None
+    if medir_memoria:
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        pico_mb = round(pico / (1024 * 1024), 2)
+
+    # El benchmark no deja reportes sueltos en disco
+    ruta_reporte = resultado.get('ruta_reporte_guardado')
+    if ruta_reporte:
+        Path(ruta_reporte).unlink(missing_ok=True)
+
+    metricas = obtener_metricas()
+    return {
+        'exito': bool(resultado.get('exito')),
+        'fase_final': resultado.get('fase_actual'),
+        'errores': len(resultado.get('errores', [])),
+        'total_s': round(total, 4),
+        'fases': {fase: round(datos['total_segundos'], 4) for fase, datos in metricas['tiempos'].items()},
+        'tokens': {
+            'llamadas_llm': metricas['tokens']['llamadas_llm'],
+            'input_tokens': metricas['tokens']['input_tokens'],
+            'output_tokens': metricas['tokens']['output_tokens'],
+            'cache_read_tokens': metricas['tokens']['cache_read_tokens'],
+            'cache_write_tokens': metricas['tokens']['cache_write_tokens'],
+            'total_tokens': metricas['tokens']['total_tokens'],
+            'costo_usd': metricas['tokens']['costo_total_usd'],
+        },
+        'tokens_por_fase': {
+            fase: datos['input_tokens'] + datos['cache_read_tokens'] + datos['cache_write_tokens'] + datos['output_tokens']
+            for fase, datos in metricas['tokens_por_fase'].items()
+        },
+        'memoria': {'pico_tracemalloc_mb': pico_mb, 'rss_max_mb': _rss_max_mb()},
+    }
+
+
+def ejecutar_benchmark(
+    casos: List[Dict[str, Any]],
+    repeticiones: int = 1,
+    medir_memoria: bool = False,
+    verbose: bool = False
+) -> Dict[str, Any]:
+    """
+    Ejecuta todos los casos y arma el documento de resultados.
+
+    Con varias repeticiones se conserva la mediana de cada tiempo.
+    """
+    from flujo_analisis import FlujoAnalisis
+    from config.settings import settings
+
+    inicio = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        flujo = FlujoAnalisis(modo_verbose=verbose)
+    inicializacion = time.perf_counter() - inicio
+
+    # Cada corrida parte de cero: sin puntos de control, una repetición no reanuda la anterior
+    puntos_control, settings.puntos_control = settings.puntos_control, False
+    resultados = {}
+    try:
+        for i, caso in enumerate(casos, 1):
+            corridas = [ejecutar_caso(flujo, caso, medir_memoria, verbose) for _ in range(repeticiones)]
+            resultados[caso['id']] = _mediana_corridas(corridas)
+            r = resultados[caso['id']]
+            print(f"[{i:>2}/{len(casos)}] {'[OK]' if r['exito'] else '[WARN]'} {caso['id']:<40} "
+                  f"{r['total_s']:>8.3f}s  {r['tokens']['total_tokens']:>7} tokens")
+    finally:
+        settings.puntos_control = puntos_control
+
+    return {
+        'version': VERSION_FORMATO,
+        'fecha': datetime.now().isoformat(),
+        'modo_llm': settings.llm_modo,
+        'repeticiones': repeticiones,
+        'inicializacion_s': round(inicializacion, 4),
+        'casos': resultados,
+        'agregado': agregar(resultados),
+    }
+
+
+def _mediana_corridas(corridas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combina repeticiones de un caso tomando la mediana de los tiempos."""
+    if len(corridas) == 1:
+        return corridas[0]
+    combinado = dict(corridas[-1])
+    combinado['total_s'] = round(statistics.median(c['total_s'] for c in corridas), 4)
+    fases = {fase for c in corridas for fase in c['fases']}
+    combinado['fases'] = {
+        fase: round(statistics.median(c['fases'].get(fase, 0.0) for c in corridas), 4)
+        for fase in sorted(fases)
+    }
+    return combinado
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def agregar(resultados: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """p50/p95 del tiempo total y de cada fase, y tokens totales."""
+    if not resultados:
+        return {}
+    totales = [r['total_s'] for r in resultados.values()]
+    por_fase: Dict[str, List[float]] = {}
+    for r in resultados.values():
+        for fase, segundos in r['fases'].items():
+            por_fase.setdefault(fase, []).append(segundos)
+    return {
+        'casos': len(resultados),
+        'exitosos': sum(1 for r in resultados.values() if r['exito']),
+        'total_s': {'p50': _percentil(totales, 0.5), 'p95': _percentil(totales, 0.95), 'suma': round(sum(totales), 4)},
+        'fases': {
+            fase: {'p50': _percentil(v, 0.5), 'p95': _percentil(v, 0.95)}
+            for fase, v in sorted(por_fase.items())
+        },
+        'tokens_totales': sum(r['tokens']['total_tokens'] for r in resultados.values()),
+    }
+
+
+# ==================== COMPARACIÓN ====================
+def _es_regresion(base: float, actual: float, umbral: float, piso: float) -> bool:
+    return actual - base > piso and actual > base * (1 + umbral)
+
+
+def comparar(
+    baseline: Dict[str, Any],
+    actual: Dict[str, Any],
+    umbral: float = 0.20,
+    piso_segundos: float = PISO_SEGUNDOS,
+    piso_tokens: int = PISO_TOKENS
+) -> List[Dict[str, Any]]:
+    """
+    Compara una corrida contra la línea base.
+
+    Se marca regresión cuando un valor supera al de la línea base en más de
+    `umbral` (relativo) y además en más del piso absoluto, para no reportar
+    ruido en fases de pocos milisegundos. Casos que pasan de exitosos a
+    fallidos también son regresión.
+
+    Returns:
+        Lista de regresiones: {caso, metrica, base, actual, cambio}
+    """
+    regresiones = []
+
+    def anotar(caso, metrica, base, valor):
+        cambio = (valor - base) / base if base else float('inf')
+        regresiones.append({'caso': caso, 'metrica': metrica, 'base': base, 'actual': valor, 'cambio': cambio})
+
+    for caso, base in baseline.get('casos', {}).items():
+        nuevo = actual.get('casos', {}).get(caso)
+        if nuevo is None:
+            continue
+        if base['exito'] and not nuevo['exito']:
+            anotar(caso, 'exito', 1, 0)
+        if _es_regresion(base['total_s'], nuevo['total_s'], umbral, piso_segundos):
+            anotar(caso, 'total_s', base['total_s'], nuevo['total_s'])
+        for fase, segundos in nuevo['fases'].items():
+            previo = base['fases'].get(fase, 0.0)
+            if _es_regresion(previo, segundos, umbral, piso_segundos):
+                anotar(caso, f"fase:{fase}", previo, segundos)
+        tokens_base = base['tokens']['total_tokens']
+        tokens_nuevo = nuevo['tokens']['total_tokens']
+        if _es_regresion(tokens_base, tokens_nuevo, umbral, piso_tokens):
+            anotar(caso, 'total_tokens', tokens_base, tokens_nuevo)
+
+    return regresiones
+
+
+def imprimir_comparacion(regresiones: List[Dict[str, Any]], umbral: float) -> None:
+    if not regresiones:
+        print(f"\n[OK] Sin regresiones (umbral {umbral:.0%})")
+        return
+    print(f"\n[ERROR] {len(regresiones)} regresiones (umbral {umbral:.0%}):")
+    for r in regresiones:
+        cambio = "nuevo" if r['cambio'] == float('inf') else f"{r['cambio']:+.0%}"
+        print(f"   • {r['caso']:<40} {r['metrica']:<35} {r['base']} -> {r['actual']} ({cambio})")
+
+
+def imprimir_resumen(documento: Dict[str, Any]) -> None:
+    agregado = documento['agregado']
+    if not agregado:
+        return
+    print("\n" + "=" * 80)
+    print(f"RESUMEN ({agregado['exitosos']}/{agregado['casos']} exitosos, modo LLM: {documento['modo_llm']})")
+    print("=" * 80)
+    print(f"Inicialización: {documento['inicializacion_s']:.3f}s")
+    print(f"Total por caso: p50={agregado['total_s']['p50']:.3f}s  p95={agregado['total_s']['p95']:.3f}s")
+    print(f"Tokens totales: {agregado['tokens_totales']:,}")
+    print(f"\n{'Fase':<40} {'p50 (s)':>10} {'p95 (s)':>10}")
+    for fase, datos in agregado['fases'].items():
+        print(f"{fase:<40} {datos['p50']:>10.4f} {datos['p95']:>10.4f}")
+
+
+# ==================== CLI ====================
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end de FlujoAnalisis")
+    parser.add_argument("--corpus", nargs="*", choices=list(CORPUS), help="Corpus a ejecutar (por defecto todos)")
+    parser.add_argument("--filtro", help="Solo archivos cuyo nombre contenga este texto")
+    parser.add_argument("--repeticiones", type=int, default=1, help="Corridas por caso (se usa la mediana)")
+    parser.add_argument("--memoria", action="store_true", help="Medir pico de memoria con tracemalloc (más lento)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_DEFECTO, help="Archivo de línea base")
+    parser.add_argument("--guardar-baseline", action="store_true", help="Sobrescribir la línea base con esta corrida")
+    parser.add_argument("--salida", type=Path, help="Guardar los resultados de esta corrida en este archivo")
+    parser.add_argument("--umbral", type=float, default=0.20, help="Empeoramiento relativo tolerado (0.20 = 20%%)")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar la salida del flujo")
+    args = parser.parse_args(argv)
+
+    casos = listar_casos(args.corpus, args.filtro)
+    if not casos:
+        print("[ERROR] No hay casos que ejecutar")
+        return 2
+
+    from config.settings import settings
+    if settings.llm_modo == "live":
+        print("[WARN] LLM_MODO=live: los tiempos incluyen la latencia de la API y no son reproducibles")
+
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+    documento = ejecutar_benchmark(casos, args.repeticiones, args.memoria, args.verbose)
+    imprimir_resumen(documento)
+
+    salida = args.salida or CARPETA_RESULTADOS / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(documento, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\n[OK] Resultados guardados en: {salida}")
+
+    if args.guardar_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(documento, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"[OK] Línea base actualizada: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"[WARN] No hay línea base en {args.baseline} (usar --guardar-baseline)")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline.get('modo_llm') != documento['modo_llm']:
+        print(f"[WARN] La línea base se tomó con LLM_MODO={baseline.get('modo_llm')}")
+    regresiones = comparar(baseline, documento, args.umbral)
+    imprimir_comparacion(regresiones, args.umbral)
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,444 @@
+"""
+Prueba de Carga HTTP
+====================
+
+Generador de carga de lazo abierto (llegadas Poisson) contra la API FastAPI:
+/analisis/analizar, /analisis/analizar-con-reporte y /validador/validar.
+
+Para cada tasa de llegada (solicitudes/segundo) ejecuta una etapa de
+`--duracion` segundos y reporta throughput, latencias p50/p95/p99, tasa de
+errores y saturación (solicitudes en vuelo del cliente, análisis en curso y
+estado del gobernador LLM muestreados de /analisis/health). La secuencia de
+etapas forma la curva de saturación.
+
+Para no depender de la API paga, `--iniciar` levanta el stub local de
+Anthropic (tests/stub_anthropic.py) y la app apuntando a él:
+
+    python tests/prueba_carga.py --iniciar --tasas 0.5 1 2 4 --duracion 30 \\
+        --stub-latencia-ms 800 --stub-tasa-error 0.02
+
+Contra una app ya levantada:
+
+    python tests/prueba_carga.py --url http://127.0.0.1:8000 --tasas 1 2
+
+Servicio de validación liviano (app_validador.py, solo /validador/validar):
+
+    python tests/prueba_carga.py --iniciar --app validador --workers 4 --tasas 500 1000 2000
+
+Nota: solicitudes idénticas simultáneas se coalescen en un solo análisis
+(ver shared/services/vuelo_unico.py), igual que en producción.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+CARPETA_BACKEND = Path(__file__).parent.parent
+CARPETA_CORPUS = CARPETA_BACKEND / "data" / "pseudocodigos" / "correctos"
+CARPETA_RESULTADOS = Path(__file__).parent / "resultados_carga"
+
+ENDPOINTS = {
+    'analizar': "/analisis/analizar",
+    'analizar_con_reporte': "/analisis/analizar-con-reporte",
+    'validar': "/validador/validar",
+}
+
+MEZCLA_DEFECTO = {'analizar': 1.0, 'analizar_con_reporte': 1.0, 'validar': 2.0}
+
+# --app -> módulo ASGI que levanta --iniciar
+APPS = {
+    'completa': "app:app",
+    'validador': "app_validador:app",
+}
+
+INTERVALO_MUESTREO_S = 0.5
+
+
+# ==================== SOLICITUDES ====================
+def cargar_corpus(carpeta: Path = CARPETA_CORPUS) -> List[str]:
+    """Pseudocódigos usados como cuerpo de las solicitudes."""
+    return [ruta.read_text(encoding="utf-8") for ruta in sorted(carpeta.glob("*.txt"))]
+
+
+def construir_cuerpo(endpoint: str, pseudocodigo: str) -> Dict[str, Any]:
+    """Cuerpo JSON de la solicitud para el endpoint."""
+    if endpoint == 'validar':
+        return {'pseudocodigo': pseudocodigo, 'return_suggestions': False}
+    return {'entrada': pseudocodigo, 'tipo_entrada': "pseudocodigo", 'auto_corregir': True}
+
+
+def parsear_mezcla(texto: Optional[str]) -> Dict[str, float]:
+    """
+    Parsea "analizar=1,validar=2" a {endpoint: peso}.
+
+    Raises:
+        ValueError: Endpoint desconocido o sin pesos positivos
+    """
+    if not texto:
+        return dict(MEZCLA_DEFECTO)
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        nombre = nombre.strip()
+        if nombre not in ENDPOINTS:
+            raise ValueError(f"Endpoint desconocido: {nombre}. Opciones: {list(ENDPOINTS)}")
+        mezcla[nombre] = float(peso or 1)
+    if not any(peso > 0 for peso in mezcla.values()):
+        raise ValueError("La mezcla necesita al menos un peso positivo")
+    return mezcla
+
+
+# ==================== ESTADÍSTICAS ====================
+def percentil(valores: List[float], p: float) -> Optional[float]:
+    """Percentil por interpolación lineal (None si no hay valores)."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * p
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    fraccion = posicion - inferior
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * fraccion
+
+
+def _latencias(registros: List[Dict[str, Any]]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99 en ms de las solicitudes exitosas."""
+    valores = [r['latencia_s'] * 1000 for r in registros if r['ok']]
+    resultado = {}
+    for nombre, p in (('p50_ms', 0.50), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+        valor = percentil(valores, p)
+        resultado[nombre] = round(valor, 1) if valor is not None else None
+    return resultado
+
+
+def resumir(registros: List[Dict[str, Any]], duracion_s: float) -> Dict[str, Any]:
+    """
+    Resume una etapa.
+
+    Args:
+        registros: {endpoint, ok, codigo, latencia_s} por solicitud
+        duracion_s: Tiempo de la etapa (incluye el drenado de pendientes)
+
+    Returns:
+        dict con throughput, latencias, errores globales y por endpoint
+    """
+    exitosas = [r for r in registros if r['ok']]
+    errores: Dict[str, int] = {}
+    for r in registros:
+        if not r['ok']:
+            errores[str(r['codigo'])] = errores.get(str(r['codigo']), 0) + 1
+
+    por_endpoint = {}
+    for nombre in sorted({r['endpoint'] for r in registros}):
+        propios = [r for r in registros if r['endpoint'] == nombre]
+        por_endpoint[nombre] = {
+            'solicitudes': len(propios),
+            'tasa_error': round(sum(1 for r in propios if not r['ok']) / len(propios), 4),
+            **_latencias(propios),
+        }
+
+    return {
+        'solicitudes': len(registros),
+        'exitosas': len(exitosas),
+        'throughput_rps': round(len(exitosas) / duracion_s, 3) if duracion_s > 0 else 0.0,
+        'tasa_error': round(1 - len(exitosas) / len(registros), 4) if registros else 0.0,
+        'errores': errores,
+        **_latencias(registros),
+        'por_endpoint': por_endpoint,
+    }
+
+
+# ==================== GENERADOR ====================
+async def _enviar(cliente: httpx.AsyncClient, endpoint: str, cuerpo: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    inicio = time.perf_counter()
+    try:
+        respuesta = await cliente.post(ENDPOINTS[endpoint], json=cuerpo, timeout=timeout)
+        codigo = respuesta.status_code
+    except httpx.TimeoutException:
+        codigo = "timeout"
+    except httpx.HTTPError as e:
+        codigo = type(e).__name__
+    return {
+        'endpoint': endpoint,
+        'ok': codigo == 200,
+        'codigo': codigo,
+        'latencia_s': time.perf_counter() - inicio,
+    }
+
+
+async def _muestrear(cliente: httpx.AsyncClient, en_vuelo: Dict[str, int], muestras: List[Dict[str, Any]], fin: asyncio.Event):
+    """Muestrea periódicamente la saturación del cliente y del servidor."""
+    while not fin.is_set():
+        muestra = {'en_vuelo_cliente': en_vuelo['actual']}
+        try:
+            respuesta = await cliente.get("/analisis/health", timeout=2)
+            carga = respuesta.json().get('carga') or {}
+            muestra['analisis_en_curso'] = carga.get('analisis_en_curso')
+            llm = carga.get('llm') or {}
+            muestra['llm_en_vuelo'] = llm.get('en_vuelo')
+            muestra['llm_en_cola'] = llm.get('en_cola')
+            muestra['llm_limite'] = llm.get('limite_concurrencia')
+        except (httpx.HTTPError, ValueError):
+            pass
+        muestras.append(muestra)
+        try:
+            await asyncio.wait_for(fin.wait(), timeout=INTERVALO_MUESTREO_S)
+        except asyncio.TimeoutError:
+            pass
+
+
+def _maximo(muestras: List[Dict[str, Any]], campo: str) -> Optional[float]:
+    valores = [m[campo] for m in muestras if m.get(campo) is not None]
+    return max(valores) if valores else None
+
+
+async def ejecutar_etapa(
+    cliente: httpx.AsyncClient,
+    tasa: float,
+    duracion: float,
+    mezcla: Dict[str, float],
+    corpus: List[str],
+    rng: random.Random,
+    timeout: float = 120.0
+) -> Dict[str, Any]:
+    """
+    Ejecuta una etapa de lazo abierto a `tasa` solicitudes/segundo.
+
+    Las llegadas no esperan a que terminen las anteriores, así que si el
+    servidor no da abasto la cola crece y se refleja en la latencia.
+    """
+    nombres = list(mezcla)
+    pesos = [mezcla[n] for n in nombres]
+    en_vuelo = {'actual': 0}
+    muestras: List[Dict[str, Any]] = []
+    fin_muestreo = asyncio.Event()
+    muestreo = asyncio.create_task(_muestrear(cliente, en_vuelo, muestras, fin_muestreo))
+
+    async def lanzar(endpoint, cuerpo):
+        en_vuelo['actual'] += 1
+        try:
+            return await _enviar(cliente, endpoint, cuerpo, timeout)
+        finally:
+            en_vuelo['actual'] -= 1
+
+    tareas = []
+    inicio = time.perf_counter()
+    proxima = 0.0
+    while True:
+        proxima += rng.expovariate(tasa)
+        if proxima >= duracion:
+            break
+        espera = proxima - (time.perf_counter() - inicio)
+        if espera > 0:
+            await asyncio.sleep(espera)
+        endpoint = rng.choices(nombres, weights=pesos)[0]
+        cuerpo = construir_cuerpo(endpoint, rng.choice(corpus))
+        tareas.append(asyncio.create_task(lanzar(endpoint, cuerpo)))
+
+    registros = list(await asyncio.gather(*tareas))
+    total = max(time.perf_counter() - inicio, duracion)
+    fin_muestreo.set()
+    await muestreo
+
+    return {
+        'tasa_objetivo_rps': tasa,
+        'duracion_s': round(total, 3),
+        **resumir(registros, total),
+        'saturacion': {
+            'en_vuelo_cliente_max': _maximo(muestras, 'en_vuelo_cliente'),
+            'analisis_en_curso_max': _maximo(muestras, 'analisis_en_curso'),
+            'llm_en_vuelo_max': _maximo(muestras, 'llm_en_vuelo'),
+            'llm_en_cola_max': _maximo(muestras, 'llm_en_cola'),
+            'llm_limite_min': min((m['llm_limite'] for m in muestras if m.get('llm_limite') is not None), default=None),
+        },
+    }
+
+
+async def ejecutar_carga(
+    cliente: httpx.AsyncClient,
+    tasas: List[float],
+    duracion: float,
+    mezcla: Dict[str, float],
+    corpus: List[str],
+    semilla: Optional[int] = None,
+    timeout: float = 120.0
+) -> List[Dict[str, Any]]:
+    """Ejecuta una etapa por tasa (curva de saturación)."""
+    rng = random.Random(semilla)
+    etapas = []
+    for tasa in tasas:
+        print(f"[WAIT] Etapa {tasa} rps durante {duracion:.0f}s...")
+        etapa = await ejecutar_etapa(cliente, tasa, duracion, mezcla, corpus, rng, timeout)
+        etapas.append(etapa)
+        imprimir_etapa(etapa)
+    return etapas
+
+
+# ==================== REPORTE ====================
+def _fmt(valor: Optional[float]) -> str:
+    return "-" if valor is None else f"{valor:.0f}"
+
+
+def imprimir_etapa(etapa: Dict[str, Any]) -> None:
+    sat = etapa['saturacion']
+    print(f"   {'[OK]' if etapa['tasa_error'] == 0 else '[WARN]'} "
+          f"{etapa['exitosas']}/{etapa['solicitudes']} ok | {etapa['throughput_rps']:.2f} rps | "
+          f"p50 {_fmt(etapa['p50_ms'])} ms  p95 {_fmt(etapa['p95_ms'])} ms  p99 {_fmt(etapa['p99_ms'])} ms | "
+          f"errores {etapa['tasa_error']:.1%} | en vuelo máx {sat['en_vuelo_cliente_max']}")
+
+
+def imprimir_curva(etapas: List[Dict[str, Any]]) -> None:
+    print("\n" + "=" * 100)
+    print("CURVA DE SATURACIÓN")
+    print("=" * 100)
+    print(f"{'Tasa':>6} {'Throughput':>11} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'Errores':>8} "
+          f"{'En vuelo':>9} {'Análisis':>9} {'LLM vuelo':>10} {'LLM cola':>9}")
+    for e in etapas:
+        sat = e['saturacion']
+        print(f"{e['tasa_objetivo_rps']:>6.2f} {e['throughput_rps']:>11.2f} {_fmt(e['p50_ms']):>9} "
+              f"{_fmt(e['p95_ms']):>9} {_fmt(e['p99_ms']):>9} {e['tasa_error']:>8.1%} "
+              f"{_fmt(sat['en_vuelo_cliente_max']):>9} {_fmt(sat['analisis_en_curso_max']):>9} "
+              f"{_fmt(sat['llm_en_vuelo_max']):>10} {_fmt(sat['llm_en_cola_max']):>9}")
+
+
+# ==================== SERVIDORES LOCALES ====================
+def _esperar_salud(url: str, timeout: float = 60.0) -> None:
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"El servidor no respondió en {url}")
+
+
+def iniciar_servidores(args) -> List[subprocess.Popen]:
+    """Levanta el stub de Anthropic y la app apuntando a él (el servicio de validación no lo necesita)."""
+    if args.app == 'validador':
+        app = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", APPS['validador'], "--port", str(args.puerto),
+             "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+            cwd=CARPETA_BACKEND
+        )
+        try:
+            _esperar_salud(f"http://127.0.0.1:{args.puerto}/health", timeout=180)
+        except RuntimeError:
+            detener_servidores([app])
+            raise
+        print(f"[OK] Servicio de validación en :{args.puerto} ({args.workers} workers)")
+        return [app]
+
+    stub = subprocess.Popen([
+        sys.executable, str(Path(__file__).parent / "stub_anthropic.py"),
+        "--puerto", str(args.stub_puerto),
+        "--latencia-ms", str(args.stub_latencia_ms),
+        "--distribucion", args.stub_distribucion,
+        "--tasa-error", str(args.stub_tasa_error),
+    ])
+    entorno = {
+        **os.environ,
+        'ANTHROPIC_BASE_URL': f"http://127.0.0.1:{args.stub_puerto}",
+        'ANTHROPIC_API_KEY': os.environ.get('ANTHROPIC_API_KEY', 'stub'),
+        'LLM_MODO': "live",
+    }
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", APPS['completa'], "--port", str(args.puerto),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=CARPETA_BACKEND, env=entorno
+    )
+    procesos = [stub, app]
+    try:
+        _esperar_salud(f"http://127.0.0.1:{args.stub_puerto}/stats")
+        _esperar_salud(f"http://127.0.0.1:{args.puerto}/health", timeout=180)
+    except RuntimeError:
+        detener_servidores(procesos)
+        raise
+    print(f"[OK] Stub en :{args.stub_puerto} y app en :{args.puerto} ({args.workers} workers)")
+    return procesos
+
+
+def detener_servidores(procesos: List[subprocess.Popen]) -> None:
+    for proceso in procesos:
+        proceso.terminate()
+    for proceso in procesos:
+        try:
+            proceso.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+
+# ==================== CLI ====================
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga HTTP del analizador")
+    parser.add_argument("--url", help="URL base de una app ya levantada (por defecto la local de --puerto)")
+    parser.add_argument("--tasas", type=float, nargs="+", default=[0.5, 1, 2, 4], help="Solicitudes/segundo por etapa")
+    parser.add_argument("--duracion", type=float, default=30, help="Segundos por etapa")
+    parser.add_argument("--mezcla", help="Pesos por endpoint, p. ej. analizar=1,analizar_con_reporte=1,validar=2")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout por solicitud (s)")
+    parser.add_argument("--semilla", type=int, help="Semilla de llegadas y selección de cuerpos")
+    parser.add_argument("--salida", type=Path, help="Archivo JSON de resultados")
+    parser.add_argument("--iniciar", action="store_true", help="Levantar stub de Anthropic y app localmente")
+    parser.add_argument("--app", choices=list(APPS), default="completa", help="App a levantar con --iniciar")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn (con --iniciar)")
+    parser.add_argument("--stub-puerto", type=int, default=8765)
+    parser.add_argument("--stub-latencia-ms", type=float, default=800)
+    parser.add_argument("--stub-distribucion", default="lognormal")
+    parser.add_argument("--stub-tasa-error", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    mezcla = parsear_mezcla(args.mezcla or ("validar=1" if args.app == 'validador' else None))
+    corpus = cargar_corpus()
+    url = args.url or f"http://127.0.0.1:{args.puerto}"
+
+    procesos = iniciar_servidores(args) if args.iniciar else []
+    try:
+        async def correr():
+            limites = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+            async with httpx.AsyncClient(base_url=url, limits=limites) as cliente:
+                return await ejecutar_carga(cliente, args.tasas, args.duracion, mezcla, corpus, args.semilla, args.timeout)
+
+        etapas = asyncio.run(correr())
+    finally:
+        detener_servidores(procesos)
+
+    imprimir_curva(etapas)
+
+    documento = {
+        'fecha': datetime.now().isoformat(),
+        'url': url,
+        'mezcla': mezcla,
+        'app': APPS[args.app] if args.iniciar else None,
+        'duracion_etapa_s': args.duracion,
+        'stub': {
+            'latencia_ms': args.stub_latencia_ms,
+            'distribucion': args.stub_distribucion,
+            'tasa_error': args.stub_tasa_error,
+            'workers': args.workers,
+        } if args.iniciar else None,
+        'etapas': etapas,
+    }
+    salida = args.salida or CARPETA_RESULTADOS / f"carga_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(documento, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\n[OK] Resultados guardados en: {salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Stub local de la API de Anthropic
+=================================
+
+Servidor compatible con `POST /v1/messages` para pruebas de carga sin costo:
+responde con un texto fijo, latencia configurable (fija, exponencial o
+lognormal) y una tasa de errores 529/500 para ejercitar los reintentos del
+gobernador. Simula también la caché de prompts: los prefijos marcados con
+cache_control se escriben la primera vez y se leen en las siguientes. Si la
+solicitud fuerza una herramienta (tool_choice), responde con un bloque
+tool_use cuyo input es `entrada_herramienta`.
+
+Uso:
+    python tests/stub_anthropic.py --puerto 8765 --latencia-ms 800 --distribucion lognormal --tasa-error 0.02
+
+    # En otra terminal, apuntar el backend al stub:
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=stub uvicorn app:app --port 8000
+"""
+
+import argparse
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+DISTRIBUCIONES = ("fija", "exponencial", "lognormal")
+
+CONFIG_DEFECTO = {
+    'latencia_ms': 500.0,
+    'distribucion': "lognormal",
+    'sigma': 0.5,              # dispersión de la lognormal
+    'tasa_error': 0.0,         # fracción de respuestas con error
+    'codigo_error': 529,       # 529 overloaded / 429 rate limit / 500
+    'tokens_salida': 200,
+    'texto': '{"resultado": "respuesta simulada del stub de carga"}',
+    'entrada_herramienta': {},
+    'semilla': None,
+}
+
+
+def muestrear_latencia(config: Dict[str, Any], rng: random.Random) -> float:
+    """
+    Latencia de una respuesta en segundos.
+
+    La lognormal se parametriza para que su media sea `latencia_ms`.
+    """
+    media = config['latencia_ms'] / 1000
+    if media <= 0:
+        return 0.0
+    if config['distribucion'] == "exponencial":
+        return rng.expovariate(1 / media)
+    if config['distribucion'] == "lognormal":
+        sigma = config['sigma']
+        return rng.lognormvariate(math.log(media) - sigma ** 2 / 2, sigma)
+    return media
+
+
+def _prefijos_cacheables(cuerpo: Dict[str, Any]) -> Tuple[List[str], str]:
+    """
+    Prefijos del prompt que terminan en un bloque con cache_control, en orden,
+    y el texto completo (sistema + mensajes).
+    """
+    bloques = []
+    for parte in [cuerpo.get('system')] + [m.get('content') for m in cuerpo.get('messages', [])]:
+        if isinstance(parte, str):
+            bloques.append({'text': parte})
+        elif isinstance(parte, list):
+            bloques.extend(b for b in parte if isinstance(b, dict))
+
+    prefijos, acumulado = [], ""
+    for bloque in bloques:
+        acumulado += str(bloque.get('text', ''))
+        if bloque.get('cache_control'):
+            prefijos.append(acumulado)
+    return prefijos, acumulado
+
+
+def crear_app(config: Optional[Dict[str, Any]] = None) -> FastAPI:
+    """
+    Crea la app del stub.
+
+    Args:
+        config: Sobrescribe valores de CONFIG_DEFECTO
+
+    Returns:
+        FastAPI con /v1/messages y /stats
+    """
+    config = {**CONFIG_DEFECTO, **(config or {})}
+    if config['distribucion'] not in DISTRIBUCIONES:
+        raise ValueError(f"Distribución inválida: {config['distribucion']}. Opciones: {DISTRIBUCIONES}")
+
+    rng = random.Random(config['semilla'])
+    lock = threading.Lock()
+    stats = {'solicitudes': 0, 'errores': 0, 'en_vuelo': 0, 'max_en_vuelo': 0, 'aciertos_cache': 0}
+    cache_prompts = set()
+
+    app = FastAPI(title="Stub Anthropic")
+    app.state.config = config
+    app.state.stats = stats
+
+    @app.post("/v1/messages")
+    async def mensajes(request: Request):
+        cuerpo = await request.json()
+        with lock:
+            stats['solicitudes'] += 1
+            stats['en_vuelo'] += 1
+            stats['max_en_vuelo'] = max(stats['max_en_vuelo'], stats['en_vuelo'])
+            latencia = muestrear_latencia(config, rng)
+            falla = rng.random() < config['tasa_error']
+        try:
+            await asyncio.sleep(latencia)
+        finally:
+            with lock:
+                stats['en_vuelo'] -= 1
+
+        if falla:
+            with lock:
+                stats['errores'] += 1
+            tipo = {429: "rate_limit_error", 529: "overloaded_error"}.get(config['codigo_error'], "api_error")
+            return JSONResponse(
+                status_code=config['codigo_error'],
+                content={'type': 'error', 'error': {'type': tipo, 'message': "Error simulado por el stub"}}
+            )
+
+        # Caché de prompts: se lee el prefijo marcado más largo ya visto y se escribe el resto
+        prefijos, texto = _prefijos_cacheables(cuerpo)
+        with lock:
+            claves = [hashlib.sha256(p.encode()).hexdigest() for p in prefijos]
+            leido = max((len(p) for p, c in zip(prefijos, claves) if c in cache_prompts), default=0)
+            escrito = max((len(p) for p in prefijos), default=0) - leido
+            cache_prompts.update(claves)
+            if leido:
+                stats['aciertos_cache'] += 1
+        cache_read, cache_write = leido // 4, max(escrito, 0) // 4
+
+        eleccion = cuerpo.get('tool_choice') or {}
+        if eleccion.get('type') == 'tool':
+            contenido = [{
+                'type': 'tool_use',
+                'id': f"toolu_stub_{uuid.uuid4().hex[:16]}",
+                'name': eleccion['name'],
+                'input': config['entrada_herramienta'],
+            }]
+            fin = 'tool_use'
+        else:
+            contenido, fin = [{'type': 'text', 'text': config['texto']}], 'end_turn'
+
+        return {
+            'id': f"msg_stub_{uuid.uuid4().hex[:16]}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': cuerpo.get('model', 'stub'),
+            'content': contenido,
+            'stop_reason': fin,
+            'stop_sequence': None,
+            'usage': {
+                # ≈4 caracteres por token; input_tokens excluye lo leído/escrito en caché
+                'input_tokens': max(1, len(texto) // 4 - cache_read - cache_write),
+                'cache_read_input_tokens': cache_read,
+                'cache_creation_input_tokens': cache_write,
+                'output_tokens': min(config['tokens_salida'], cuerpo.get('max_tokens', config['tokens_salida'])),
+            },
+        }
+
+    @app.get("/stats")
+    async def estadisticas():
+        with lock:
+            return {**stats, 'config': config}
+
+    return app
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Stub local compatible con la API de Anthropic")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--latencia-ms", type=float, default=CONFIG_DEFECTO['latencia_ms'])
+    parser.add_argument("--distribucion", choices=DISTRIBUCIONES, default=CONFIG_DEFECTO['distribucion'])
+    parser.add_argument("--sigma", type=float, default=CONFIG_DEFECTO['sigma'])
+    parser.add_argument("--tasa-error", type=float, default=CONFIG_DEFECTO['tasa_error'])
+    parser.add_argument("--codigo-error", type=int, default=CONFIG_DEFECTO['codigo_error'])
+    parser.add_argument("--tokens-salida", type=int, default=CONFIG_DEFECTO['tokens_salida'])
+    parser.add_argument("--semilla", type=int)
+    args = parser.parse_args(argv)
+
+    app = crear_app({
+        'latencia_ms': args.latencia_ms,
+        'distribucion': args.distribucion,
+        'sigma': args.sigma,
+        'tasa_error': args.tasa_error,
+        'codigo_error': args.codigo_error,
+        'tokens_salida': args.tokens_salida,
+        'semilla': args.semilla,
+    })
+    print(f"[OK] Stub Anthropic en http://{args.host}:{args.puerto} "
+          f"({args.distribucion}, {args.latencia_ms:.0f} ms, errores {args.tasa_error:.1%})")
+    uvicorn.run(app, host=args.host, port=args.puerto, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
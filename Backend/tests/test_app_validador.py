@@ -0,0 +1,68 @@
+"""
+Test del servicio de validación liviano
+=======================================
+Verifica que app_validador.py sirva /validador con la clasificación ML, que
+arranque sin las dependencias del analizador y que la prueba de carga pueda
+ejercitarlo en memoria.
+"""
+
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.benchmark_arranque import medir_objetivo
+from tests.prueba_carga import cargar_corpus, ejecutar_etapa
+
+
+def test_valida_y_clasifica():
+    from app_validador import app
+
+    with TestClient(app) as cliente:
+        salud = cliente.get("/health").json()
+        respuesta = cliente.post("/validador/validar", json={
+            'pseudocodigo': cargar_corpus()[0], 'return_suggestions': True
+        })
+
+    assert salud['status'] == "healthy" and salud['service'] == "validador"
+    datos = respuesta.json()
+    assert respuesta.status_code == 200
+    assert 'valido_general' in datos
+    assert datos.get('clasificacion')
+
+
+def test_servicio_arranca_sin_dependencias_pesadas():
+    medido = medir_objetivo("app_validador", repeticiones=1)
+
+    assert medido['exito'], medido['error']
+    assert medido['pesados'] == []
+
+
+def test_etapa_corta_contra_el_servicio():
+    from app_validador import app
+
+    async def correr():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://prueba") as cliente:
+            return await ejecutar_etapa(
+                cliente, tasa=20, duracion=0.5, mezcla={'validar': 1.0},
+                corpus=cargar_corpus()[:3], rng=random.Random(7)
+            )
+
+    etapa = asyncio.run(correr())
+
+    assert etapa['solicitudes'] > 0
+    assert etapa['tasa_error'] == 0
+    # Sin analizador no hay métricas de saturación del LLM
+    assert etapa['saturacion']['llm_limite_min'] is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,72 @@
+"""
+Test del benchmark de arranque
+==============================
+Verifica el perfil de `python -X importtime`, la detección de regresiones
+contra la línea base y que los puntos de entrada livianos arranquen sin
+LangChain, LangGraph, SymPy ni scikit-learn.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.benchmark_arranque import comparar, medir_objetivo, parsear_importtime, por_paquete
+
+
+SALIDA_IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 | _io
+import time:      1500 |       1500 |     sympy.core
+import time:       800 |       2300 |   sympy
+import time:       300 |        300 |   fastapi.routing
+import time:       200 |       2800 | app
+"""
+
+
+def _documento(arranque_s, pesados=()):
+    return {'objetivos': {'app': {'exito': True, 'arranque_s': arranque_s, 'pesados': list(pesados)}}}
+
+
+def test_parsear_importtime_y_perfil_por_paquete():
+    registros = parsear_importtime(SALIDA_IMPORTTIME)
+
+    assert [r['modulo'] for r in registros] == ['_io', 'sympy.core', 'sympy', 'fastapi.routing', 'app']
+    assert registros[-1] == {'modulo': 'app', 'propio_us': 200, 'acumulado_us': 2800, 'nivel': 0}
+    assert registros[1]['nivel'] == 2
+    assert por_paquete(registros, top=2) == [{'paquete': 'sympy', 'ms': 2.3}, {'paquete': 'fastapi', 'ms': 0.3}]
+
+
+def test_comparar_detecta_arranque_lento_y_dependencias_nuevas():
+    base = _documento(0.5)
+
+    assert comparar(base, _documento(0.52)) == []  # ruido bajo el piso
+    lento = comparar(base, _documento(0.9))
+    assert [(r['objetivo'], r['metrica']) for r in lento] == [('app', 'arranque_s')]
+    pesado = comparar(base, _documento(0.5, pesados=['sympy']))
+    assert [(r['metrica'], r['actual']) for r in pesado] == [('pesados', ['sympy'])]
+
+
+@pytest.mark.parametrize("modulo", ["core.validador.router", "shared.services.llm_servicio", "tools.metricas"])
+def test_modulos_livianos_no_cargan_dependencias_pesadas(modulo):
+    medido = medir_objetivo(modulo, repeticiones=1)
+
+    assert medido['exito'], medido['error']
+    assert medido['pesados'] == []
+
+
+def test_app_arranca_sin_el_analizador():
+    if importlib.util.find_spec("python_multipart") is None and importlib.util.find_spec("multipart") is None:
+        pytest.skip("python-multipart no instalado (requerido por FastAPI para /analisis/analizar-archivo)")
+
+    medido = medir_objetivo("app", repeticiones=1)
+
+    assert medido['exito'], medido['error']
+    assert medido['pesados'] == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
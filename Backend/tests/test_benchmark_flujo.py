@@ -0,0 +1,81 @@
+"""
+Test del benchmark end-to-end
+=============================
+Verifica la detección de regresiones contra la línea base y que un caso del
+corpus se mida por fase sin llamar a la API (casetera en modo fail).
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.services import casetes_llm
+from shared.services.casetes_llm import CaseteraLLM
+from tests.benchmark_flujo import agregar, comparar, ejecutar_benchmark, listar_casos
+
+
+def _caso(total_s, fases, tokens=0, exito=True):
+    return {
+        'exito': exito,
+        'total_s': total_s,
+        'fases': fases,
+        'tokens': {'total_tokens': tokens},
+    }
+
+
+def test_listar_casos_incluye_los_tres_corpus():
+    casos = listar_casos()
+    corpus = {c['corpus'] for c in casos}
+
+    assert corpus == {'correctos', 'incorrectos', 'lenguaje_natural'}
+    assert all(c['ruta'].exists() for c in casos)
+    assert {c['tipo_entrada'] for c in casos if c['corpus'] == 'lenguaje_natural'} == {'lenguaje_natural'}
+
+
+def test_comparar_detecta_regresiones_sobre_el_umbral():
+    base = {'casos': {'a': _caso(1.0, {'validacion': 0.10, 'flowchart': 0.001}, tokens=1000)}}
+    actual = {'casos': {'a': _caso(1.1, {'validacion': 0.20, 'flowchart': 0.004}, tokens=1500)}}
+
+    metricas = {r['metrica'] for r in comparar(base, actual, umbral=0.20)}
+
+    # total +10% no supera el umbral; flowchart empeora 4x pero está bajo el piso absoluto
+    assert metricas == {'fase:validacion', 'total_tokens'}
+
+
+def test_comparar_marca_casos_que_dejan_de_funcionar():
+    base = {'casos': {'a': _caso(1.0, {})}}
+    actual = {'casos': {'a': _caso(0.5, {}, exito=False)}}
+
+    assert [r['metrica'] for r in comparar(base, actual)] == ['exito']
+
+
+def test_agregar_percentiles():
+    resultados = {str(i): _caso(float(i), {'validacion': i / 10}) for i in range(1, 11)}
+    agregado = agregar(resultados)
+
+    assert agregado['casos'] == 10
+    assert agregado['total_s']['p50'] in (5.0, 6.0)
+    assert agregado['total_s']['p95'] == 10.0
+    assert 'validacion' in agregado['fases']
+
+
+def test_benchmark_mide_fases_offline(tmp_path, monkeypatch):
+    monkeypatch.setattr(casetes_llm, "_casetera_instance", CaseteraLLM("fail", tmp_path))
+    casos = listar_casos(['correctos'], '01-busqueda-lineal')
+
+    documento = ejecutar_benchmark(casos)
+    caso = documento['casos']['correctos/01-busqueda-lineal']
+
+    assert documento['modo_llm'] in ('live', 'record', 'replay', 'fail')
+    assert caso['total_s'] > 0
+    assert 'validacion' in caso['fases']
+    assert 'workflow.parse_lines' in caso['fases']
+    assert comparar(documento, documento) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
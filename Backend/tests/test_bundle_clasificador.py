@@ -0,0 +1,136 @@
+"""
+Test del bundle del clasificador
+================================
+Verifica que el bundle reproduzca exactamente la predicción y las
+probabilidades del SVM de scikit-learn, que el bundle incluido se cargue sin
+importar scikit-learn y que el encabezado versionado rechace archivos ajenos.
+"""
+
+import json
+import subprocess
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml.bundle import FIRMA, VERSION, BundleClasificador, exportar_bundle
+from ml.clasificador import ClasificadorAlgoritmos
+
+
+BACKEND = Path(__file__).parent.parent
+DATASET = BACKEND / "ml" / "dataset" / "dataset_completo.json"
+
+
+def _ejemplos():
+    with open(DATASET, encoding="utf-8") as f:
+        dataset = json.load(f)
+    preprocesar = ClasificadorAlgoritmos._preprocesar_texto
+    return [preprocesar(None, ejemplo['pseudocodigo']) for ejemplo in dataset], [e['label'] for e in dataset]
+
+
+def test_reproduce_el_svm_de_scikit_learn(tmp_path):
+    pytest.importorskip("sklearn")
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.svm import SVC
+
+    textos, labels = _ejemplos()
+    # Mismos hiperparámetros que entrenar_clasificador.py
+    vectorizer = TfidfVectorizer(max_features=500, ngram_range=(1, 3), min_df=2, token_pattern=r'\b\w+\b')
+    X = vectorizer.fit_transform(textos[::2])
+    encoder = LabelEncoder()
+    y = encoder.fit_transform(labels[::2])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        modelo = SVC(kernel='rbf', C=10.0, gamma='scale', probability=True, random_state=42).fit(X, y)
+
+    bundle = BundleClasificador(exportar_bundle(vectorizer, encoder, modelo, tmp_path / "modelo.bundle"))
+
+    prueba = textos[1::2] + ["", "begin end"]
+    X_prueba = vectorizer.transform(prueba)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        esperadas, probabilidades = modelo.predict(X_prueba), modelo.predict_proba(X_prueba)
+    for texto, esperada, probabilidad in zip(prueba, esperadas, probabilidades):
+        prediccion, obtenida = bundle.predecir(texto)
+        assert prediccion == esperada
+        np.testing.assert_allclose(obtenida, probabilidad, atol=1e-9)
+
+    assert bundle.categorias == list(encoder.classes_)
+    # Los arreglos son vistas de solo lectura sobre el archivo mapeado
+    assert not bundle._idf.flags.writeable and not bundle._coef_dual.flags.writeable
+
+
+@pytest.mark.parametrize("tipo", ["logistica", "sgd", "nb"])
+def test_reproduce_modelos_lineales(tmp_path, tipo):
+    pytest.importorskip("sklearn")
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.naive_bayes import MultinomialNB
+    from sklearn.preprocessing import LabelEncoder
+
+    textos, labels = _ejemplos()
+    vectorizer = TfidfVectorizer(max_features=500, ngram_range=(1, 3), min_df=2, token_pattern=r'\b\w+\b')
+    X = vectorizer.fit_transform(textos[::2])
+    encoder = LabelEncoder()
+    y = encoder.fit_transform(labels[::2])
+    modelo = {
+        'logistica': LogisticRegression(C=10.0, max_iter=2000),
+        'sgd': SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42),
+        'nb': MultinomialNB(alpha=0.1),
+    }[tipo].fit(X, y)
+
+    bundle = BundleClasificador(exportar_bundle(vectorizer, encoder, modelo, tmp_path / "modelo.bundle"))
+
+    prueba = textos[1::2] + ["", "begin end"]
+    X_prueba = vectorizer.transform(prueba)
+    for texto, esperada, probabilidad in zip(prueba, modelo.predict(X_prueba), modelo.predict_proba(X_prueba)):
+        prediccion, obtenida = bundle.predecir(texto)
+        assert prediccion == esperada
+        np.testing.assert_allclose(obtenida, probabilidad, atol=1e-9)
+
+    assert bundle.modelo == "lineal"
+
+
+def test_bundle_incluido_no_importa_scikit_learn():
+    script = (
+        "import sys\n"
+        "from ml.clasificador import ClasificadorAlgoritmos\n"
+        "c = ClasificadorAlgoritmos()\n"
+        "r = c.clasificar('for i 🡨 1 to n do\\nbegin\\n    if (A[i] = x) then return i\\nend')\n"
+        "assert c.bundle is not None and r['top_predicciones'], r\n"
+        "assert not any(m.split('.')[0] in ('sklearn', 'scipy') for m in sys.modules)\n"
+    )
+    proceso = subprocess.run([sys.executable, "-c", script], cwd=BACKEND, capture_output=True, text=True, timeout=120)
+    assert proceso.returncode == 0, proceso.stderr
+
+
+def test_bundle_incluido_clasifica_el_dataset():
+    bundle = BundleClasificador(BACKEND / "ml" / "modelos" / "clasificador.bundle")
+    textos, labels = _ejemplos()
+
+    aciertos = sum(bundle.categorias[bundle.predecir(t)[0]] == label for t, label in zip(textos, labels))
+
+    assert aciertos / len(labels) >= 0.9
+
+
+def test_encabezado_versionado(tmp_path):
+    original = (BACKEND / "ml" / "modelos" / "clasificador.bundle").read_bytes()
+    otra_version = tmp_path / "otra_version.bundle"
+    otra_version.write_bytes(FIRMA + (VERSION + 1).to_bytes(4, 'little') + original[12:])
+    ajeno = tmp_path / "ajeno.bundle"
+    ajeno.write_bytes(b"\x80\x04" + original[2:])
+
+    with pytest.raises(ValueError, match="Versión"):
+        BundleClasificador(otra_version)
+    with pytest.raises(ValueError, match="No es un bundle"):
+        BundleClasificador(ajeno)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,162 @@
+"""
+Test de la caché de prompts
+===========================
+Verifica que cada etapa envíe un prefijo fijo marcado con cache_control y el
+contenido variable al final, y que los tokens leídos/escritos en la caché se
+registren en tools.metricas (incluido el ciclo completo contra el stub).
+"""
+
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import uvicorn
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from core.analizador.tools.llm_analyzer import LLMAnalyzer
+from shared.services import casetes_llm
+from shared.services.casetes_llm import CaseteraLLM
+from shared.services.llm_servicio import CACHE_EFIMERO, LLMService
+from shared.services.servicioCorrector import ServicioCorrector
+from shared.services.servicioTraductor import ServicioTraductor
+from tests.stub_anthropic import crear_app
+from tools.metricas import obtener_metricas, registrar_tokens, reset_metricas
+
+
+BUSQUEDA = """busqueda(int A[], int n, int x)
+begin
+    int i
+    for i 🡨 1 to n do
+    begin
+        if (A[i] = x) then
+        begin
+            return i
+        end
+    end
+    return -1
+end"""
+
+MAXIMO = """maximo(int A[], int n)
+begin
+    int i, m
+    m 🡨 A[1]
+    for i 🡨 2 to n do
+    begin
+        if (A[i] > m) then
+        begin
+            m 🡨 A[i]
+        end
+    end
+    return m
+end"""
+
+
+def _analizador():
+    analizador = LLMAnalyzer.__new__(LLMAnalyzer)
+    analizador.category = "busqueda"
+    return analizador
+
+
+def test_mensajes_con_prefijo_marcado():
+    mensajes = LLMService.mensajes_cacheables(["reglas", "ejemplos"], "pseudocódigo", sistema="sistema")
+
+    assert mensajes[0].content == [{"type": "text", "text": "sistema", "cache_control": CACHE_EFIMERO}]
+    bloques = mensajes[1].content
+    assert [b.get("cache_control") for b in bloques] == [CACHE_EFIMERO, CACHE_EFIMERO, None]
+    assert bloques[-1]["text"] == "pseudocódigo"
+
+
+def test_cache_desactivada_no_marca_bloques(monkeypatch):
+    monkeypatch.setattr(settings, "llm_cache_prompts", False)
+    mensajes = LLMService.mensajes_cacheables(["reglas"], "pseudocódigo", sistema="sistema")
+
+    assert all("cache_control" not in b for m in mensajes for b in m.content)
+
+
+def test_prefijo_del_analizador_no_depende_del_pseudocodigo():
+    analizador = _analizador()
+    primero = analizador._case_messages("worst_case", True, BUSQUEDA, "busqueda")
+    segundo = analizador._case_messages("worst_case", True, MAXIMO, "maximo", callee_costs="T_aux = c1")
+
+    assert primero[0].content == segundo[0].content
+    assert primero[1].content[0] == segundo[1].content[0]
+    assert "return -1" in primero[1].content[-1]["text"]
+    assert "T_aux = c1" in segundo[1].content[-1]["text"]
+
+
+def test_prefijo_del_corrector_y_traductor():
+    corrector = ServicioCorrector()
+    ejemplos = corrector.base_conocimiento[:2]
+    uno = corrector._generar_prompt_correccion(BUSQUEDA, ["Falta then"], ejemplos)
+    otro = corrector._generar_prompt_correccion(MAXIMO, ["Falta do"], ejemplos)
+    assert uno[0].content[:2] == otro[0].content[:2]
+    assert "Falta do" in otro[0].content[-1]["text"]
+
+    traductor = ServicioTraductor()
+    ejemplos = traductor.base_conocimiento[:2]
+    uno = traductor._generar_prompt_traduccion("buscar un elemento en un arreglo", ejemplos)
+    otro = traductor._generar_prompt_traduccion("ordenar un arreglo de enteros", ejemplos)
+    assert uno[0].content[:2] == otro[0].content[:2]
+
+
+def test_metricas_registran_tokens_de_cache():
+    reset_metricas()
+    try:
+        registrar_tokens(input_tokens=100, output_tokens=50, modelo="default",
+                         cache_read_tokens=900, cache_write_tokens=0)
+        registrar_tokens(input_tokens=1000, output_tokens=50, modelo="default")
+        tokens = obtener_metricas()['tokens']
+        detalle = obtener_metricas()['detalle_llamadas']
+    finally:
+        reset_metricas()
+
+    assert tokens['cache_read_tokens'] == 900
+    assert tokens['total_tokens'] == 2100
+    assert tokens['tasa_acierto_cache'] == pytest.approx(900 / 2000)
+    # Con 90% del prompt leído de caché la entrada cuesta mucho menos
+    assert detalle[0]['costo_input_usd'] < detalle[1]['costo_input_usd'] / 4
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_llamadas_repetidas_leen_el_prefijo_de_cache(monkeypatch):
+    puerto = _puerto_libre()
+    servidor = uvicorn.Server(uvicorn.Config(crear_app({'latencia_ms': 0}), port=puerto, log_level="warning"))
+    hilo = threading.Thread(target=servidor.run, daemon=True)
+    hilo.start()
+    while not servidor.started:
+        time.sleep(0.01)
+
+    reset_metricas()
+    try:
+        monkeypatch.setattr(settings, "anthropic_base_url", f"http://127.0.0.1:{puerto}")
+        monkeypatch.setattr(settings, "anthropic_api_key", "stub")
+        monkeypatch.setattr(casetes_llm, "_casetera_instance", CaseteraLLM("live"))
+
+        llm = LLMService.get_llm()
+        analizador = _analizador()
+        LLMService.invocar(llm, analizador._case_messages("worst_case", True, BUSQUEDA, "busqueda"))
+        LLMService.invocar(llm, analizador._case_messages("worst_case", True, MAXIMO, "maximo"))
+
+        primera, segunda = obtener_metricas()['detalle_llamadas']
+        assert primera['cache_write_tokens'] > 0 and primera['cache_read_tokens'] == 0
+        assert segunda['cache_read_tokens'] == primera['cache_write_tokens']
+        assert segunda['input_tokens'] < primera['cache_write_tokens']
+    finally:
+        reset_metricas()
+        servidor.should_exit = True
+        hilo.join(timeout=5)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,229 @@
+"""
+Test de la forma canónica y su caché
+====================================
+Verifica que dos entregas del mismo algoritmo con otros nombres, espacios,
+comentarios y mayúsculas compartan la forma canónica, que los resultados se
+traduzcan a los nombres y líneas de cada usuario, y que el flujo reutilice
+clasificación, validación y fases 6-8.5 de un programa equivalente.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from core.analizador.models.omega_table import OmegaTable
+from core.analizador.tools.canonico import a_canonico, a_original, canonizar
+from flujo_analisis import FlujoAnalisis
+from shared.services import cache_canonico, indice_similitud
+from shared.services.cache_canonico import CacheCanonico
+from shared.services.indice_similitud import bloque_referencia
+from shared.services.servicioValidador import servicioValidador
+
+
+MAXIMO = """maximo(int A[], int n)
+begin
+    int m, i
+    m 🡨 A[1]
+    for i 🡨 2 to n do
+    begin
+        if (A[i] > m) then
+        begin
+            m 🡨 A[i]
+        end
+    end
+    return m
+end"""
+
+MAXIMO_RENOMBRADO = """
+► Busca el mayor elemento
+maximo(int V[], int tam)
+begin
+  int mejor,   k
+
+  mejor 🡨 V[1]     ► primer candidato
+  for k 🡨 2 to tam do
+  begin
+      if (V[k] > mejor) then
+      begin
+         mejor 🡨 V[k]
+      end
+  end
+  return mejor
+end"""
+
+
+def test_entregas_equivalentes_comparten_la_forma_canonica():
+    original, renombrado = canonizar(MAXIMO), canonizar(MAXIMO_RENOMBRADO)
+
+    assert original['clave'] == renombrado['clave']
+    assert renombrado['nombres'] == {'v1': 'V', 'v2': 'tam', 'v3': 'mejor', 'v4': 'k'}
+    assert original['texto'].split("\n")[:2] == ["maximo(int v1[], int v2)", "begin"]
+
+    # Otra lógica, otra forma
+    assert canonizar(MAXIMO.replace("A[i] > m", "A[i] < m"))['clave'] != original['clave']
+
+
+def test_conserva_subrutinas_clases_y_atributos():
+    programa = "Nodo {izq der}\naltura(Nodo r)\nbegin\n    Nodo h\n    h 🡨 r.izq\n    return CALL altura(h)\nend"
+
+    forma = canonizar(programa)
+
+    assert "v2 🡨 v1.izq" in forma['texto']
+    assert "CALL altura(v2)" in forma['texto']
+    assert forma['nombres'] == {'v1': 'r', 'v2': 'h'}
+
+
+def test_mayusculas_de_palabras_reservadas():
+    forma = canonizar(MAXIMO.replace("begin", "BEGIN").replace("for", "For"))
+
+    assert forma['clave'] == canonizar(MAXIMO)['clave']
+    assert not forma['exacta']
+    assert canonizar(MAXIMO)['exacta']
+
+
+def test_resultados_se_traducen_a_los_nombres_y_lineas_del_usuario():
+    original, renombrado = canonizar(MAXIMO), canonizar(MAXIMO_RENOMBRADO)
+    resultado = {
+        'parameters': {'A[]': "array", 'n': "int"},
+        'peor_caso': "T(n) = 4*n + 2",
+        'line_by_line_analysis': [{'line_number': 4, 'code': "m 🡨 A[1]", 'C_op': 2}],
+    }
+
+    traducido = a_original(a_canonico(resultado, original), renombrado)
+
+    assert traducido['parameters'] == {'V[]': "array", 'tam': "int"}
+    assert traducido['peor_caso'] == "T(tam) = 4*tam + 2"
+    assert traducido['line_by_line_analysis'] == [{'line_number': 7, 'code': "mejor 🡨 V[1]", 'C_op': 2}]
+
+
+def test_no_se_guarda_lo_que_seria_ambiguo():
+    # Una variable que se llama como una palabra de las explicaciones
+    forma = canonizar("doble(int a)\nbegin\n    return 2 * a\nend")
+    assert a_canonico({'explicacion': "se asigna a la variable"}, forma) is None
+
+    # Un costo que cita una línea sin código
+    assert a_canonico({'line_number': 99, 'code': ""}, canonizar(MAXIMO)) is None
+
+
+def test_no_se_guarda_si_una_variable_choca_con_la_notacion():
+    resultado = {'peor_caso': "T(m) = c1*m + c2", 'complejidad': "O(m)"}
+    # Un arreglo T: renombrarlo también renombraría T(n)
+    assert a_canonico(resultado, canonizar(MAXIMO.replace("A", "T").replace(" n", " m"))) is None
+    # n como variable local (no es el tamaño de la entrada)
+    local = "doble(int m)\nbegin\n    int n\n    n 🡨 2 * m\n    return n\nend"
+    assert a_canonico(resultado, canonizar(local)) is None
+    # n como parámetro es el tamaño: se traduce
+    assert a_canonico({'peor_caso': "T(n) = n"}, canonizar(MAXIMO)) == {'peor_caso': "T(v2) = v2"}
+
+
+class _Contador:
+    def __init__(self, respuesta):
+        self.respuesta = respuesta
+        self.llamadas = 0
+
+    def __call__(self, *args, **kwargs):
+        self.llamadas += 1
+        return self.respuesta
+
+
+class _Respuesta:
+    mejor_caso = caso_promedio = peor_caso = "T(n) = n"
+    ecuaciones_iguales = True
+    casos_base = []
+
+    def model_dump(self):
+        return {'mejor_caso': self.mejor_caso}
+
+
+class _Componente:
+    def __init__(self, **metodos):
+        self.__dict__.update(metodos)
+
+
+@pytest.fixture
+def flujo(monkeypatch):
+    """Flujo con componentes de prueba y un caché canónico vacío."""
+    monkeypatch.setattr(settings, "puntos_control", False)
+    monkeypatch.setattr(settings, "cache_canonico", True)
+    monkeypatch.setattr(cache_canonico, "_cache_canonico_instance", CacheCanonico())
+
+    flujo = FlujoAnalisis.__new__(FlujoAnalisis)
+    flujo.verbose = False
+    flujo.validador = servicioValidador()
+    flujo.clasificador = _Componente(clasificar=_Contador({
+        'categoria_principal': "busqueda_lineal", 'confianza': 0.9, 'top_predicciones': [],
+    }))
+    flujo.generador_flowchart = _Componente(generar=lambda pseudocodigo: "graph TD")
+    flujo.reportador = _Componente(generar_reporte_completo=lambda resultado: {'markdown': ""})
+    flujo.resolver = _Componente(resolver_casos=lambda ecuaciones: {
+        'mejor_caso': {'exito': False}, 'caso_promedio': {'exito': False}, 'peor_caso': {'exito': False},
+        'complejidades': {caso: "O(n)" for caso in ('mejor_caso', 'caso_promedio', 'peor_caso')},
+    })
+    flujo.validador_complejidades = _Componente(
+        validar_complejidades=lambda **kwargs: {'concordancia': True, 'confianza': 1.0}
+    )
+    flujo.agente_matematicas = _Componente(generar_ecuaciones=_Contador(_Respuesta()))
+    monkeypatch.setattr(flujo, "_ejecutar_workflow", _Contador({
+        'omega_table': OmegaTable(algorithm_name="maximo", scenarios=[], control_variables=["n"]),
+    }))
+    monkeypatch.setattr(flujo, "_guardar_analisis", lambda *args: None)
+    return flujo
+
+
+def test_flujo_reutiliza_las_fases_de_un_programa_equivalente(flujo):
+    primero = flujo.analizar(entrada=MAXIMO, tipo_entrada="pseudocodigo")
+    segundo = flujo.analizar(entrada=MAXIMO_RENOMBRADO, tipo_entrada="pseudocodigo")
+
+    assert primero['exito'] and primero['fases_cache'] == []
+    assert segundo['exito'] and segundo['errores'] == []
+    assert segundo['fases_cache'] == ['clasificacion', 'validacion', 'fases_costos']
+    assert (flujo.clasificador.clasificar.llamadas, flujo._ejecutar_workflow.llamadas) == (1, 1)
+    assert flujo.agente_matematicas.generar_ecuaciones.llamadas == 1
+
+    # Con los nombres del segundo usuario
+    assert segundo['validacion']['parameters'] == {'V[]': "array", 'tam': "int"}
+    assert segundo['omega_table'].control_variables == ["tam"]
+    assert segundo['ecuaciones']['peor_caso'] == "T(tam) = tam"
+    assert FlujoAnalisis.estadisticas_carga()['cache_canonico']['entradas'] == 3
+
+
+
+def test_arreglo_llamado_t_no_contamina_el_cache(flujo):
+    con_t = MAXIMO.replace("A", "T").replace(" n", " m")
+    otro = MAXIMO.replace("A", "B").replace(" n", " m")
+    flujo.agente_matematicas.generar_ecuaciones.respuesta.peor_caso = "T(m) = c1*m + c2"
+
+    primero = flujo.analizar(entrada=con_t, tipo_entrada="pseudocodigo")
+    segundo = flujo.analizar(entrada=otro, tipo_entrada="pseudocodigo")
+
+    assert primero['exito'] and segundo['exito']
+    # El programa con el arreglo T no se guardó: el segundo se analiza por su cuenta
+    assert 'fases_costos' not in segundo['fases_cache']
+    assert flujo._ejecutar_workflow.llamadas == 2
+    assert segundo['ecuaciones']['peor_caso'] == "T(m) = c1*m + c2"
+
+
+def test_programa_parecido_recibe_la_referencia_del_vecino(flujo, monkeypatch):
+    monkeypatch.setattr(settings, "similitud_umbral", 0.5)
+    monkeypatch.setattr(indice_similitud, "_indice_instance", None)
+    referencias = []
+    workflow = flujo._ejecutar_workflow
+    monkeypatch.setattr(flujo, "_ejecutar_workflow", lambda *args: (
+        referencias.append(bloque_referencia("maximo")), workflow(*args)
+    )[1])
+
+    primero = flujo.analizar(entrada=MAXIMO, tipo_entrada="pseudocodigo")
+    segundo = flujo.analizar(entrada=MAXIMO.replace("A[i] > m", "A[i] >= m"), tipo_entrada="pseudocodigo")
+
+    assert segundo['fases_cache'] == []
+    assert segundo['analisis_similar']['analisis_id'] == primero['analisis_id']
+    assert referencias[0] == "" and "ANÁLISIS DE REFERENCIA" in referencias[1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,111 @@
+"""
+Test de la casetera LLM (record / replay / fail)
+================================================
+Verifica que las respuestas se graben por hash de prompt y se reproduzcan
+sin llamar a la API.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.services import casetes_llm
+from shared.services.casetes_llm import CaseteraLLM, CaseteNoEncontradoError
+from shared.services.llm_servicio import LLMService
+
+
+def _respuesta_real(llamadas):
+    def llamar():
+        llamadas.append(1)
+        return AIMessage(
+            content="O(n log n)",
+            response_metadata={'usage': {'input_tokens': 12, 'output_tokens': 5}}
+        )
+    return llamar
+
+
+def test_record_y_fail_reproducen_sin_llamar(tmp_path):
+    llamadas = []
+    CaseteraLLM("record", tmp_path).invocar("abc123", "prompt", _respuesta_real(llamadas))
+
+    reproductor = CaseteraLLM("fail", tmp_path)
+    respuesta = reproductor.invocar("abc123", "prompt", _respuesta_real(llamadas))
+
+    assert len(llamadas) == 1
+    assert respuesta.content == "O(n log n)"
+    assert respuesta.response_metadata['usage']['output_tokens'] == 5
+    assert reproductor.estadisticas()['reproducidas'] == 1
+
+
+def test_fail_lanza_con_prompt_no_grabado(tmp_path):
+    llamadas = []
+    with pytest.raises(CaseteNoEncontradoError):
+        CaseteraLLM("fail", tmp_path).invocar("no-existe", "prompt", _respuesta_real(llamadas))
+    assert llamadas == []
+
+
+def test_replay_graba_lo_que_falta_y_simula_latencia(tmp_path):
+    llamadas = []
+    casetera = CaseteraLLM("replay", tmp_path, latencia_ms=50)
+
+    casetera.invocar("k1", "prompt", _respuesta_real(llamadas))
+    inicio = time.monotonic()
+    casetera.invocar("k1", "prompt", _respuesta_real(llamadas))
+
+    assert len(llamadas) == 1
+    assert time.monotonic() - inicio >= 0.05
+    assert casetera.estadisticas()['grabadas'] == 1
+
+
+def test_replay_no_reproduce_llamadas_con_temperatura(tmp_path):
+    llamadas = []
+    casetera = CaseteraLLM("replay", tmp_path)
+
+    casetera.invocar("k1", "prompt", _respuesta_real(llamadas), determinista=False)
+    casetera.invocar("k1", "prompt", _respuesta_real(llamadas), determinista=False)
+
+    assert len(llamadas) == 2
+    assert casetera.estadisticas()['grabadas'] == 0
+
+
+def test_modo_invalido():
+    with pytest.raises(ValueError):
+        CaseteraLLM("grabar")
+
+
+class LLMFalso:
+    model = "modelo-prueba"
+    temperature = 0.0
+    max_tokens = 100
+
+    def __init__(self):
+        self.llamadas = 0
+
+    def invoke(self, entrada, **kwargs):
+        self.llamadas += 1
+        return AIMessage(content=f"eco: {entrada}")
+
+
+def test_llm_service_usa_la_casetera(tmp_path, monkeypatch):
+    llm = LLMFalso()
+
+    monkeypatch.setattr(casetes_llm, "_casetera_instance", CaseteraLLM("record", tmp_path))
+    grabada = LLMService.invocar(llm, "analiza este algoritmo")
+
+    monkeypatch.setattr(casetes_llm, "_casetera_instance", CaseteraLLM("fail", tmp_path))
+    reproducida = LLMService.invocar(llm, "analiza este algoritmo")
+
+    assert llm.llamadas == 1
+    assert reproducida.content == grabada.content
+    with pytest.raises(CaseteNoEncontradoError):
+        LLMService.invocar(llm, "otro prompt")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
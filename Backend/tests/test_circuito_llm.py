@@ -0,0 +1,199 @@
+"""
+Test del interruptor de circuito del proveedor LLM
+==================================================
+Verifica que el circuito se abra con la tasa de fallos configurada, que las
+llamadas fallen al instante sin reintentos mientras está abierto, que una
+llamada de prueba lo cierre o lo reabra, y que las etapas usen sus caminos
+deterministas (escenario heurístico con conteo estático de ciclos).
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.analizador.agents.nodes.llm_analyze_worst_case_node import llm_analyze_worst_case_node
+from core.analizador.models.scenario_state import ScenarioState
+from core.analizador.tools.loop_counter import LoopCounter
+from shared.services import casetes_llm, circuito_llm
+from shared.services.casetes_llm import CaseteraLLM
+from shared.services.circuito_llm import (
+    ABIERTO,
+    CERRADO,
+    SEMIABIERTO,
+    CircuitoAbiertoError,
+    CircuitoLLM,
+    llm_disponible,
+)
+from shared.services.gobernador_llm import GobernadorLLM
+from shared.services.llm_servicio import LLMService
+from shared.services.presupuesto_llm import PresupuestoAnalisis, usar_presupuesto
+from tools.metricas import MedirTiempo
+
+
+CORRECTOS = Path(__file__).parent.parent / "data" / "pseudocodigos" / "correctos"
+
+BURBUJA = """burbuja(int A[], int n)
+begin
+    for i 🡨 1 to n-1 do
+    begin
+        for j 🡨 1 to n do
+        begin
+            if (A[j] > A[j+1]) then
+            begin
+                intercambiar(A, j)
+            end
+        end
+    end
+end"""
+
+
+class ErrorProveedor(Exception):
+    status_code = 529
+
+
+def _circuito_abierto(espera_s=60.0):
+    circuito = CircuitoLLM(tasa_fallos=0.5, min_intentos=2, ventana=4, espera_s=espera_s)
+    circuito.registrar_fallo()
+    circuito.registrar_fallo()
+    return circuito
+
+
+@pytest.fixture
+def circuito_caido(monkeypatch):
+    """Circuito global abierto durante el test."""
+    monkeypatch.setattr(casetes_llm, "_casetera_instance", CaseteraLLM("live"))
+    circuito = _circuito_abierto()
+    monkeypatch.setattr(circuito_llm, "_circuito_instance", circuito)
+    return circuito
+
+
+def test_se_abre_con_la_tasa_de_fallos():
+    circuito = CircuitoLLM(tasa_fallos=0.5, min_intentos=4, ventana=4)
+    circuito.registrar_fallo()
+    circuito.registrar_fallo()
+    # Menos intentos que el mínimo: todavía no se evalúa la tasa
+    assert circuito.estado() == CERRADO
+
+    circuito.registrar_exito()
+    circuito.registrar_fallo()
+    assert circuito.estado() == ABIERTO
+    with pytest.raises(CircuitoAbiertoError):
+        circuito.permitir()
+    assert circuito.estadisticas()['rechazadas'] == 1
+
+
+def test_llamada_de_prueba_cierra_o_reabre():
+    circuito = _circuito_abierto(espera_s=0.05)
+    time.sleep(0.06)
+    assert circuito.estado() == SEMIABIERTO
+
+    # Una sola prueba a la vez
+    circuito.permitir()
+    assert not circuito.disponible()
+    with pytest.raises(CircuitoAbiertoError):
+        circuito.permitir()
+
+    circuito.registrar_fallo()
+    assert circuito.estado() == ABIERTO
+
+    time.sleep(0.06)
+    circuito.permitir()
+    circuito.registrar_exito()
+    assert circuito.estado() == CERRADO
+    assert circuito.estadisticas()['pruebas'] == 2
+    # La ventana vuelve a empezar: los fallos que lo abrieron ya no cuentan
+    assert circuito.estadisticas()['intentos_ventana'] == 1
+    assert circuito.estadisticas()['fallos_ventana'] == 0
+
+
+def test_gobernador_deja_de_reintentar_con_el_circuito_abierto():
+    circuito = CircuitoLLM(tasa_fallos=0.5, min_intentos=2, ventana=4)
+    gobernador = GobernadorLLM(max_reintentos=5, backoff_base=0.001, backoff_max=0.001, circuito=circuito)
+    llamadas = []
+
+    def caida():
+        llamadas.append(1)
+        raise ErrorProveedor("overloaded")
+
+    with pytest.raises(ErrorProveedor):
+        gobernador.ejecutar(caida)
+    assert len(llamadas) == 2
+
+    # Abierto: falla al instante sin llegar al proveedor
+    with pytest.raises(CircuitoAbiertoError):
+        gobernador.ejecutar(caida)
+    assert len(llamadas) == 2
+    assert gobernador.estadisticas()['en_vuelo'] == 0
+
+
+def test_errores_ajenos_al_proveedor_no_abren_el_circuito():
+    circuito = CircuitoLLM(tasa_fallos=0.5, min_intentos=2, ventana=4)
+    gobernador = GobernadorLLM(circuito=circuito)
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            gobernador.ejecutar(lambda: (_ for _ in ()).throw(ValueError("salida inválida")))
+    assert circuito.estado() == CERRADO
+
+
+def test_invocar_falla_al_instante_y_registra_la_degradacion(circuito_caido):
+    class LLM:
+        model = "modelo-prueba"
+        temperature = 0.0
+        max_tokens = 100
+
+        def invoke(self, entrada, **kwargs):
+            raise AssertionError("no debe llegar al proveedor")
+
+    presupuesto = PresupuestoAnalisis()
+    with usar_presupuesto(presupuesto), MedirTiempo("traduccion"):
+        with pytest.raises(CircuitoAbiertoError):
+            LLMService.invocar(LLM(), "prompt")
+        assert not llm_disponible("validacion_complejidades")
+
+    assert [d['etapa'] for d in presupuesto.degradaciones] == ["traduccion", "validacion_complejidades"]
+
+
+def test_conteo_estatico_de_ciclos():
+    contador = LoopCounter()
+    assert contador.estimar_peor_caso(BURBUJA) == "(n-1)*n"
+    assert contador.estimar_peor_caso("f(int n)\nbegin\n    return n\nend") is None
+
+    secuenciales = "f(int n)\nbegin\n    for i 🡨 1 to n do\n    begin\n        x 🡨 i\n    end\n" \
+                   "    while (x > 0) do\n    begin\n        x 🡨 x - 1\n    end\nend"
+    assert contador.estimar_peor_caso(secuenciales) == "n"
+
+
+@pytest.mark.parametrize("archivo", sorted(CORRECTOS.glob("*.txt")), ids=lambda archivo: archivo.stem)
+def test_conteo_estatico_solo_depende_de_n(archivo):
+    costo = LoopCounter().estimar_peor_caso(archivo.read_text(encoding="utf-8"))
+
+    # Sin variables de ciclos externos ni locales/parámetros como der o n1
+    assert costo is None or set(re.findall(r'[A-Za-z_]\w*', costo)) <= {"n"}
+
+
+def test_conteo_estatico_acota_por_n():
+    contador = LoopCounter()
+    assert contador.estimar_peor_caso((CORRECTOS / "03-bubble-sort.txt").read_text(encoding="utf-8")) == "(n - 1)*n"
+    assert contador.estimar_peor_caso((CORRECTOS / "04-merge-sort.txt").read_text(encoding="utf-8")) == "n"
+    assert contador.estimar_peor_caso((CORRECTOS / "05-quick-sort.txt").read_text(encoding="utf-8")) == "n"
+
+
+def test_peor_caso_usa_el_conteo_estatico_con_el_circuito_abierto(circuito_caido):
+    estado = ScenarioState(pseudocode=BURBUJA, algorithm_name="burbuja", is_iterative=True)
+
+    resultado = llm_analyze_worst_case_node(estado)
+
+    escenario, = resultado.raw_scenarios
+    assert escenario['id'] == "S_worst_case_fallback"
+    assert escenario['cost_T'] == "(n-1)*n"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
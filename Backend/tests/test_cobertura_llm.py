@@ -0,0 +1,160 @@
+"""
+Test de las solicitudes de cobertura (hedging)
+==============================================
+Verifica que una llamada lenta respecto del percentil de su etapa se duplique,
+que gane la primera respuesta y se descarte la otra, y que el respaldo no se
+lance sin muestras, fuera del camino interactivo ni sin presupuesto.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from shared.services.cobertura_llm import CoberturaLLM
+from shared.services.gobernador_llm import (
+    PRIORIDAD_BATCH,
+    GobernadorLLM,
+    SolicitudCancelada,
+    prioridad_llm,
+)
+from shared.services.llm_servicio import LLMService
+from shared.services.presupuesto_llm import PresupuestoAnalisis, usar_presupuesto
+from tools.metricas import MedirTiempo, obtener_metricas, reset_metricas
+
+
+def _cobertura_con_historial(etapa="llm", latencia=0.01, muestras=5):
+    cobertura = CoberturaLLM(percentil=95, min_muestras=muestras)
+    for _ in range(muestras):
+        cobertura.registrar_latencia(etapa, latencia)
+    return cobertura
+
+
+class LlamadaLenta:
+    """La primera invocación tarda `lenta` segundos; las siguientes responden enseguida."""
+
+    def __init__(self, lenta=1.0):
+        self.lenta = lenta
+        self.invocaciones = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, cancelada):
+        with self._lock:
+            self.invocaciones += 1
+            numero = self.invocaciones
+        if numero == 1:
+            time.sleep(self.lenta)
+        return f"respuesta {numero}"
+
+
+def test_umbral_requiere_muestras_y_usa_el_percentil():
+    cobertura = CoberturaLLM(percentil=90, min_muestras=10)
+    for i in range(9):
+        cobertura.registrar_latencia("caso", i + 1)
+    assert cobertura.umbral("caso") is None
+
+    cobertura.registrar_latencia("caso", 10)
+    assert cobertura.umbral("caso") == 10
+    assert cobertura.umbral("otra_etapa") is None
+
+
+def test_respaldo_gana_a_la_llamada_lenta():
+    reset_metricas()
+    cobertura = _cobertura_con_historial()
+    descartadas = []
+    llamada = LlamadaLenta(lenta=0.5)
+
+    inicio = time.monotonic()
+    resultado = cobertura.ejecutar(llamada, al_descartar=descartadas.append)
+
+    assert resultado == "respuesta 2"
+    assert time.monotonic() - inicio < 0.4
+    assert cobertura.estadisticas()['respaldos'] == 1
+    assert cobertura.estadisticas()['tasa_victoria'] == 1.0
+    assert obtener_metricas()['cobertura']['ganados_por_respaldo'] == 1
+
+    # La respuesta perdedora se descarta pero se entrega para registrar sus tokens
+    time.sleep(0.6)
+    assert descartadas == ["respuesta 1"]
+    reset_metricas()
+
+
+def test_llamada_rapida_o_no_cubierta_no_duplica():
+    cobertura = _cobertura_con_historial(latencia=1.0)
+    assert cobertura.ejecutar(LlamadaLenta(lenta=0.01)) == "respuesta 1"
+
+    cobertura = _cobertura_con_historial()
+    llamada = LlamadaLenta(lenta=0.1)
+    assert cobertura.ejecutar(llamada, cubrir=False) == "respuesta 1"
+    assert llamada.invocaciones == 1
+    assert cobertura.estadisticas()['respaldos'] == 0
+
+
+def test_latencias_por_etapa():
+    cobertura = _cobertura_con_historial(etapa="workflow.llm_analyze_worst_case")
+    llamada = LlamadaLenta(lenta=0.2)
+
+    # Otra etapa no tiene historial: no se cubre
+    with MedirTiempo("traduccion"):
+        cobertura.ejecutar(llamada)
+    assert llamada.invocaciones == 1
+
+
+def test_sin_presupuesto_no_hay_respaldo():
+    cobertura = _cobertura_con_historial()
+    llamada = LlamadaLenta(lenta=0.1)
+
+    with usar_presupuesto(PresupuestoAnalisis(tokens_max=150)):
+        assert cobertura.ejecutar(llamada, tokens_estimados=100) == "respuesta 1"
+    assert llamada.invocaciones == 1
+
+
+def test_si_ambas_fallan_se_propaga_el_error_original():
+    cobertura = _cobertura_con_historial()
+    invocaciones = []
+
+    def fallar(cancelada):
+        invocaciones.append(1)
+        numero = len(invocaciones)
+        time.sleep(0.05)
+        raise RuntimeError(f"falla {numero}")
+
+    with pytest.raises(RuntimeError, match="falla 1"):
+        cobertura.ejecutar(fallar)
+    assert len(invocaciones) == 2
+
+
+def test_gobernador_retira_la_solicitud_cancelada():
+    gobernador = GobernadorLLM(rpm=1000, tpm=10**6)
+    cancelada = threading.Event()
+    cancelada.set()
+    llamadas = []
+
+    with pytest.raises(SolicitudCancelada):
+        gobernador.ejecutar(lambda: llamadas.append(1), cancelada=cancelada)
+    assert llamadas == []
+    assert gobernador.estadisticas()['en_vuelo'] == 0
+
+
+def test_solo_se_cubren_llamadas_interactivas_deterministas(monkeypatch):
+    monkeypatch.setattr(settings, "llm_cobertura", True)
+
+    class LLM:
+        temperature = 0.0
+
+    assert LLMService._admite_cobertura(LLM(), None)
+    with prioridad_llm(PRIORIDAD_BATCH):
+        assert not LLMService._admite_cobertura(LLM(), None)
+
+    LLM.temperature = 0.4
+    assert not LLMService._admite_cobertura(LLM(), None)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
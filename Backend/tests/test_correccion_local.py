@@ -0,0 +1,159 @@
+"""
+Test de la corrección local
+===========================
+Verifica las reparaciones deterministas (flechas, then/do, CALL, tipos y
+comas en declaraciones, begin/end por indentación) sobre los pseudocódigos de
+data/pseudocodigos/incorrectos, y que ServicioCorrector solo llame al LLM
+cuando las reglas no alcanzan (con un LLM falso: no hace llamadas reales).
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.services.correccion_local import corregir_localmente
+from shared.services.llm_servicio import LLMService
+from shared.services.servicioCorrector import ServicioCorrector
+from shared.services.servicioValidador import servicioValidador
+
+INCORRECTOS = sorted((Path(__file__).parent.parent / "data" / "pseudocodigos" / "incorrectos").glob("*.txt"))
+
+
+@pytest.mark.parametrize("archivo", INCORRECTOS, ids=lambda archivo: archivo.stem)
+def test_corrige_los_incorrectos_sin_llm(archivo):
+    original = archivo.read_text(encoding="utf-8")
+
+    resultado = corregir_localmente(original)
+
+    assert resultado['errores_iniciales'] > 0
+    assert resultado['valido'] and resultado['correcciones']
+    assert servicioValidador().validar(resultado['pseudocodigo'])['valido_general']
+
+
+def test_flechas_encabezados_y_operadores():
+    codigo = "\n".join([
+        "suma(A[], n)",
+        "begin",
+        "    s i",
+        "    s <- 0",
+        "    for i = 1 hasta n",
+        "    begin",
+        "        if A[i] != 0 && s >= 0   ► solo positivos",
+        "        begin",
+        "            s := s + CALL doble(A[i]);",
+        "        end",
+        "    end",
+        "    return s",
+        "end",
+        "",
+        "doble(int x)",
+        "begin",
+        "    return 2 * x",
+        "end",
+    ])
+
+    resultado = corregir_localmente(codigo)
+
+    assert resultado['valido']
+    lineas = resultado['pseudocodigo'].split("\n")
+    assert lineas[0] == "suma(int A[], int n)"
+    assert lineas[2:5] == ["    int s, i", "    s 🡨 0", "    for i 🡨 1 to n do"]
+    assert lineas[6] == "        if (A[i] ≠ 0 and s >= 0) then ► solo positivos"
+    assert lineas[8] == "            s 🡨 s + CALL doble(A[i])"
+
+
+def test_call_y_tipos_inferidos():
+    codigo = "\n".join([
+        "fib(n)",
+        "begin",
+        "    listo",
+        "    listo 🡨 F",
+        "    if (n ≤ 1) then",
+        "    begin",
+        "        return n",
+        "    end",
+        "    return fib(n - 1) + fib(n - 2)",
+        "end",
+    ])
+
+    resultado = corregir_localmente(codigo)
+
+    assert resultado['valido']
+    assert "    bool listo" in resultado['pseudocodigo']
+    assert "fib(int n)" in resultado['pseudocodigo']
+    assert "return CALL fib(n - 1) + CALL fib(n - 2)" in resultado['pseudocodigo']
+
+
+def test_bloques_por_indentacion():
+    codigo = "\n".join([
+        "maximo(int A[], int n)",
+        "begin",
+        "    int m, i",
+        "    m 🡨 A[1]",
+        "    for i 🡨 2 to n do",
+        "    begin",
+        "        if (A[i] > m) then",
+        "        begin",
+        "            m 🡨 A[i]",
+        "    end",
+        "    return m",
+        "end",
+    ])
+
+    resultado = corregir_localmente(codigo)
+
+    assert resultado['valido']
+    assert resultado['pseudocodigo'].split("\n")[9:11] == ["        end", "    end"]
+
+
+def test_sin_reglas_aplicables_devuelve_el_original():
+    # Cuerpo en la misma línea del if y bloque sin indentar: no se adivina
+    codigo = "f(int n)\nbegin\nif n > 0 then n 🡨 1\nif (n > 1) then\nbegin\nn 🡨 2\nreturn n\nend"
+
+    resultado = corregir_localmente(codigo)
+
+    assert not resultado['valido']
+    assert resultado['pseudocodigo'] == codigo and resultado['correcciones'] == []
+    assert resultado['errores_restantes'] == resultado['errores_iniciales']
+
+
+def test_corrector_no_llama_al_llm_si_bastan_las_reglas(monkeypatch):
+    def sin_llm(*args, **kwargs):
+        raise AssertionError("no debería llamar al LLM")
+
+    monkeypatch.setattr(LLMService, "invocar_estructurado", staticmethod(sin_llm))
+    original = INCORRECTOS[0].read_text(encoding="utf-8")
+
+    resultado = ServicioCorrector().corregir(original, servicioValidador().validar(original))
+
+    assert resultado['corregido'] and resultado['local']
+    assert resultado['ejemplos_usados'] == []
+    assert "sin LLM" in resultado['explicacion']
+
+
+def test_corrector_escala_con_el_programa_parcialmente_corregido(monkeypatch):
+    codigo = "f(n)\nbegin\n    if n > 0 then n 🡨 1\n    return n\nend"
+    corregido = "f(int n)\nbegin\n    if (n > 0) then\n    begin\n        n 🡨 1\n    end\n    return n\nend"
+    recibidos = []
+
+    def invocar_estructurado(llm, mensajes, herramienta, verificar=None):
+        recibidos.append(mensajes[-1].content[-1]['text'])
+        return {'correcciones': ["Cuerpo del if en un bloque"], 'pseudocodigo': corregido}
+
+    monkeypatch.setattr(LLMService, "get_llm", staticmethod(lambda **kwargs: object()))
+    monkeypatch.setattr(LLMService, "invocar_estructurado", staticmethod(invocar_estructurado))
+
+    resultado = ServicioCorrector().corregir(codigo, servicioValidador().validar(codigo))
+
+    assert resultado['corregido'] and not resultado['local']
+    # El LLM recibe el parámetro ya tipado y solo el error que quedó
+    assert "f(int n)" in recibidos[0] and "Falta tipo" not in recibidos[0]
+    assert resultado['correcciones_locales'] and "Cuerpo del if" in resultado['explicacion']
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
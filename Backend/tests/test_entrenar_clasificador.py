@@ -0,0 +1,113 @@
+"""
+Test del entrenamiento del clasificador
+=======================================
+Verifica la caché de la matriz TF-IDF, la búsqueda paralela de modelos con
+su reporte (entrenamiento, latencia por muestra y accuracy por candidato) y
+la actualización incremental con partial_fit. Los modelos se escriben en un
+directorio temporal, nunca en ml/modelos.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml.bundle import BundleClasificador
+from ml.entrenar_clasificador import EntrenadorClasificador, cargar_ejemplos, seleccionar_modelo
+
+DATASET = Path(__file__).parent.parent / "ml" / "dataset" / "dataset_completo.json"
+
+
+def test_cache_de_la_matriz_tfidf(tmp_path):
+    textos = json.loads(DATASET.read_text(encoding="utf-8"))
+    textos = [ejemplo['pseudocodigo'] for ejemplo in textos]
+    primero = EntrenadorClasificador(DATASET, model_dir=tmp_path)
+    X = primero.vectorizar(textos)
+
+    segundo = EntrenadorClasificador(DATASET, model_dir=tmp_path)
+    X_cache = segundo.vectorizar(textos)
+
+    assert not primero.tfidf_desde_cache and segundo.tfidf_desde_cache
+    assert (X != X_cache).nnz == 0
+    assert segundo.vectorizer.vocabulary_ == primero.vectorizer.vocabulary_
+    # Otros textos invalidan la caché
+    segundo.vectorizar(textos[1:])
+    assert not segundo.tfidf_desde_cache
+
+
+def test_seleccionar_el_mas_rapido_que_alcanza_el_objetivo():
+    resultados = [
+        {'modelo': 'svm', 'accuracy': 0.95, 'latencia_ms': 0.5},
+        {'modelo': 'sgd', 'accuracy': 0.91, 'latencia_ms': 0.1},
+        {'modelo': 'nb', 'accuracy': 0.80, 'latencia_ms': 0.05},
+    ]
+
+    assert seleccionar_modelo(resultados, 0.9)['modelo'] == "sgd"
+    assert seleccionar_modelo(resultados, 0.94)['modelo'] == "svm"
+    # Si ninguno llega, el más preciso
+    assert seleccionar_modelo(resultados, 0.99)['modelo'] == "svm"
+
+
+def test_busqueda_paralela_y_reporte(tmp_path):
+    grilla = {'svm': [{'C': 10.0}], 'sgd': [{'alpha': 1e-4}, {'alpha': 1e-3}], 'nb': [{'alpha': 0.1}]}
+    entrenador = EntrenadorClasificador(DATASET, model_dir=tmp_path)
+
+    reporte = entrenador.buscar_modelos(
+        modelos=['svm', 'sgd', 'nb'], grilla=grilla, n_jobs=2, precision_objetivo=0.5, muestras_latencia=10
+    )
+
+    candidatos = reporte['candidatos']
+    assert len(candidatos) == 4
+    for candidato in candidatos:
+        assert 0 <= candidato['accuracy'] <= 1
+        assert candidato['entrenamiento_s'] > 0
+        assert candidato['latencia_pickles_ms'] > 0 and candidato['latencia_bundle_ms'] > 0
+    assert [c['latencia_ms'] for c in candidatos] == sorted(c['latencia_ms'] for c in candidatos)
+    aptos = [c for c in candidatos if c['accuracy'] >= 0.5]
+    assert reporte['seleccionado'] == aptos[0]
+    assert json.loads((tmp_path / "clasificador_busqueda.json").read_text(encoding="utf-8")) == reporte
+    # El elegido queda guardado y el bundle lo sirve
+    assert (tmp_path / "clasificador.bundle").exists()
+
+
+def test_actualizacion_incremental(tmp_path):
+    entrenador = EntrenadorClasificador(DATASET, model_dir=tmp_path)
+    entrenador.entrenar_completo(modelo_tipo='sgd')
+    coef_antes = entrenador.modelo.coef_.copy()
+    nuevos = tmp_path / "nuevos.jsonl"
+    ejemplo = {'pseudocodigo': "funcion bfs(G, s)\n    cola = [s]\n    mientras cola no vacia\n", 'label': "grafos"}
+    nuevos.write_text("\n".join(json.dumps(ejemplo) for _ in range(5)), encoding="utf-8")
+
+    resultado = EntrenadorClasificador(DATASET, model_dir=tmp_path).actualizar_incremental(cargar_ejemplos(nuevos))
+
+    assert resultado['ejemplos'] == 5 and resultado['modelo'] == "SGDClassifier"
+    actualizado = EntrenadorClasificador(DATASET, model_dir=tmp_path)
+    actualizado.cargar_modelo()
+    assert not np.allclose(actualizado.modelo.coef_, coef_antes)
+    # El bundle se reescribe con el modelo actualizado
+    texto = actualizado.preprocesar_texto(ejemplo['pseudocodigo'])
+    _, probabilidades = BundleClasificador(tmp_path / "clasificador.bundle").predecir(texto)
+    np.testing.assert_allclose(
+        probabilidades, actualizado.modelo.predict_proba(actualizado.vectorizer.transform([texto]))[0], atol=1e-9
+    )
+
+    with pytest.raises(ValueError, match="Etiquetas desconocidas"):
+        actualizado.actualizar_incremental([{'pseudocodigo': "x", 'label': "cuantico"}])
+
+
+def test_incremental_requiere_modelo_con_partial_fit(tmp_path):
+    EntrenadorClasificador(DATASET, model_dir=tmp_path).entrenar_completo(modelo_tipo='random_forest')
+
+    with pytest.raises(ValueError, match="no admite actualización incremental"):
+        EntrenadorClasificador(DATASET, model_dir=tmp_path).actualizar_incremental([])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,113 @@
+"""
+Test del generador de dataset
+=============================
+Verifica la generación concurrente por subcategoría con deduplicación por
+hash normalizado, el JSONL de solo agregado y la reanudación desde los
+puntos de control (con un LLM falso: no hace llamadas reales).
+"""
+
+import itertools
+import json
+import re
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml.generar_dataset import GeneradorDataset, hash_pseudocodigo
+from shared.services.llm_servicio import LLMService
+
+
+def _respuesta(prompt, numeros, repetir=True):
+    """Respuesta en el formato ---INICIO---/---FIN--- con un ejemplo repetido."""
+    subcategoria = re.search(r"DIFERENTES de (\w+)", prompt).group(1).lower()
+    cantidad = int(re.search(r"Genera (\d+)", prompt).group(1))
+    codigos = [f"funcion {subcategoria}_{next(numeros)}(A, n)\n    retornar n\nfin funcion" for _ in range(cantidad)]
+    if repetir:
+        codigos.append(codigos[0].upper())
+    return SimpleNamespace(content="".join(f"---INICIO---\n{c}\n---FIN---\n" for c in codigos))
+
+
+def _llm_falso(monkeypatch, prompts, fallar_desde=None, numeros=None):
+    numeros = numeros or itertools.count(1)
+    llamadas = itertools.count(1)
+
+    def invocar(llm, prompt, prioridad=None):
+        if fallar_desde is not None and next(llamadas) >= fallar_desde:
+            raise RuntimeError("proveedor caído")
+        prompts.append(prompt)
+        return _respuesta(prompt, numeros)
+
+    monkeypatch.setattr(LLMService, "invocar", staticmethod(invocar))
+
+
+def test_hash_normalizado():
+    original = "funcion suma(A, n)\n    total = 0  // acumulador\n    retornar total"
+    variante = "FUNCION suma(A,  n)\n\n  total = 0\n retornar   total\n"
+
+    assert hash_pseudocodigo(original) == hash_pseudocodigo(variante)
+    assert hash_pseudocodigo(original) != hash_pseudocodigo(original.replace("total", "acc"))
+
+
+def test_generacion_concurrente_y_deduplicada(monkeypatch, tmp_path):
+    prompts = []
+    _llm_falso(monkeypatch, prompts)
+    generador = GeneradorDataset(output_dir=tmp_path, llm=object())
+
+    resumen = generador.generar_todo(factor=2, concurrencia=3, categorias=["busqueda"], confirmar=False)
+
+    generados = generador.leer_generados()
+    assert all(r['completa'] and r['ejemplos'] == 30 for r in resumen)
+    assert len(generados) == 90
+    assert len({e['hash'] for e in generados}) == 90
+    assert len({e['id'] for e in generados}) == 90
+    # Cada subcategoría pide dos lotes de 15 y el segundo pide variantes nuevas
+    assert len(prompts) == 6 and sum("lote 2" in p for p in prompts) == 3
+
+    completo = json.loads((tmp_path / "dataset_completo.json").read_text(encoding="utf-8"))
+    assert len(completo) == 90 and 'hash' not in completo[0]
+    progreso = generador.leer_progreso("busqueda", "binaria")
+    assert progreso['lotes'] == 2 and progreso['duplicados'] == 2
+
+
+def test_reanuda_desde_el_punto_de_control(monkeypatch, tmp_path):
+    prompts, numeros = [], itertools.count(1)
+    _llm_falso(monkeypatch, prompts, fallar_desde=2, numeros=numeros)
+    primera = GeneradorDataset(output_dir=tmp_path, llm=object()).generar_todo(
+        factor=2, concurrencia=1, categorias=["busqueda"], confirmar=False
+    )
+    assert [r['ejemplos'] for r in primera] == [15, 0, 0]
+
+    prompts.clear()
+    _llm_falso(monkeypatch, prompts, numeros=numeros)
+    generador = GeneradorDataset(output_dir=tmp_path, llm=object())
+    segunda = generador.generar_todo(factor=2, concurrencia=1, categorias=["busqueda"], confirmar=False)
+
+    assert all(r['completa'] for r in segunda)
+    # La subcategoría interrumpida sigue por su segundo lote
+    assert len(prompts) == 5
+    assert "lote 2" in prompts[0]
+    assert len(generador.leer_generados()) == 90
+
+
+def test_linea_cortada_y_existentes(tmp_path):
+    base = [{"id": "busqueda_lineal_1", "categoria": "busqueda", "subcategoria": "lineal",
+             "pseudocodigo": "funcion a()\nfin", "label": "busqueda"}]
+    (tmp_path / "dataset_completo.json").write_text(json.dumps(base), encoding="utf-8")
+    nuevo = dict(base[0], id="busqueda_lineal_2", pseudocodigo="funcion b()\nfin")
+    with open(tmp_path / "generado.jsonl", "w", encoding="utf-8") as f:
+        f.write(json.dumps(nuevo) + "\n" + json.dumps(base[0]) + "\n" + '{"id": "cortada", "ps')
+
+    generador = GeneradorDataset(output_dir=tmp_path, llm=object())
+
+    assert len(generador.leer_generados()) == 2
+    assert generador._conteo[("busqueda", "lineal")] == 2
+    assert [e['id'] for e in generador.exportar()] == ["busqueda_lineal_1", "busqueda_lineal_2"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
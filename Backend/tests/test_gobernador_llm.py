@@ -0,0 +1,198 @@
+"""
+Test del GobernadorLLM
+======================
+Prueba reintentos, concurrencia adaptativa, límites de tasa y prioridades
+con funciones locales en lugar de llamadas reales a la API.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from shared.services.gobernador_llm import (
+    GobernadorLLM,
+    PRIORIDAD_BATCH,
+    PRIORIDAD_INTERACTIVA,
+    _tokens_reales,
+    es_error_transitorio,
+    es_limitacion,
+)
+from shared.services.presupuesto_llm import (
+    PresupuestoAgotadoError,
+    PresupuestoAnalisis,
+    usar_presupuesto,
+)
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+
+
+def _gobernador(**kwargs):
+    config = dict(rpm=6000, tpm=10_000_000, concurrencia_max=4, backoff_base=0.001, backoff_max=0.01)
+    config.update(kwargs)
+    return GobernadorLLM(**config)
+
+
+def test_clasificacion_de_errores():
+    assert es_limitacion(ErrorHTTP(429))
+    assert es_limitacion(Exception("Overloaded"))
+    assert es_error_transitorio(ErrorHTTP(503))
+    assert not es_error_transitorio(ErrorHTTP(400))
+    assert not es_error_transitorio(ValueError("JSON inválido"))
+
+
+def test_tokens_reales_incluyen_la_cache_de_prompts(monkeypatch):
+    respuesta = AIMessage(content="ok", response_metadata={'usage': {
+        'input_tokens': 100, 'output_tokens': 50,
+        'cache_creation_input_tokens': 1000, 'cache_read_input_tokens': 2000,
+    }})
+
+    monkeypatch.setattr(settings, "llm_tpm_cuenta_cache_leida", False)
+    assert _tokens_reales(respuesta) == 1150
+    monkeypatch.setattr(settings, "llm_tpm_cuenta_cache_leida", True)
+    assert _tokens_reales(respuesta) == 3150
+    assert _tokens_reales(AIMessage(content="ok", response_metadata={'usage': {
+        'input_tokens': 10, 'output_tokens': 5, 'cache_read_input_tokens': None,
+    }})) == 15
+    assert _tokens_reales("sin metadata") is None
+
+
+def test_reintenta_y_reduce_concurrencia_ante_429():
+    gobernador = _gobernador()
+    intentos = []
+
+    def llamada():
+        intentos.append(1)
+        if len(intentos) < 3:
+            raise ErrorHTTP(529)
+        return "ok"
+
+    assert gobernador.ejecutar(llamada) == "ok"
+
+    stats = gobernador.estadisticas()
+    assert len(intentos) == 3
+    assert stats['reintentos'] == 2
+    assert stats['limitadas'] == 2
+    assert stats['limite_concurrencia'] < 4
+    assert stats['en_vuelo'] == 0
+
+
+def test_error_no_transitorio_no_se_reintenta():
+    gobernador = _gobernador()
+    intentos = []
+
+    def llamada():
+        intentos.append(1)
+        raise ErrorHTTP(400)
+
+    with pytest.raises(ErrorHTTP):
+        gobernador.ejecutar(llamada)
+
+    assert len(intentos) == 1
+    assert gobernador.estadisticas()['fallidas'] == 1
+
+
+def test_agota_reintentos():
+    gobernador = _gobernador(max_reintentos=2)
+
+    with pytest.raises(ErrorHTTP):
+        gobernador.ejecutar(lambda: (_ for _ in ()).throw(ErrorHTTP(429)))
+
+    assert gobernador.estadisticas()['reintentos'] == 2
+
+
+def test_espera_de_turno_termina_al_vencer_el_plazo():
+    gobernador = _gobernador(concurrencia_max=1, concurrencia_min=1)
+    liberar = threading.Event()
+    hilo = threading.Thread(target=gobernador.ejecutar, args=(lambda: liberar.wait(5),))
+    hilo.start()
+    while gobernador.estadisticas()['en_vuelo'] == 0:
+        time.sleep(0.005)
+
+    inicio = time.monotonic()
+    with usar_presupuesto(PresupuestoAnalisis(segundos_max=0.2)), pytest.raises(PresupuestoAgotadoError):
+        gobernador.ejecutar(lambda: "no debería llegar")
+    transcurrido = time.monotonic() - inicio
+
+    liberar.set()
+    hilo.join()
+    assert transcurrido < 0.6
+    assert gobernador.estadisticas()['en_cola'] == 0
+
+
+def test_respeta_limite_de_concurrencia():
+    gobernador = _gobernador(concurrencia_max=2)
+    activos, maximo = [0], [0]
+    lock = threading.Lock()
+
+    def llamada():
+        with lock:
+            activos[0] += 1
+            maximo[0] = max(maximo[0], activos[0])
+        time.sleep(0.02)
+        with lock:
+            activos[0] -= 1
+
+    hilos = [threading.Thread(target=gobernador.ejecutar, args=(llamada,)) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert maximo[0] <= 2
+
+
+def test_cubeta_rpm_espacia_solicitudes():
+    # 600 RPM = 10 por segundo; la cubeta empieza llena con 600
+    gobernador = _gobernador(rpm=600)
+    gobernador._cubo_rpm.nivel = 0
+
+    inicio = time.monotonic()
+    for _ in range(3):
+        gobernador.ejecutar(lambda: None)
+
+    assert time.monotonic() - inicio >= 0.25
+
+
+def test_interactivas_pasan_antes_que_batch():
+    gobernador = _gobernador(concurrencia_max=1)
+    orden = []
+    bloqueo = threading.Event()
+
+    def ocupar():
+        bloqueo.wait(timeout=2)
+
+    ocupante = threading.Thread(target=gobernador.ejecutar, args=(ocupar,))
+    ocupante.start()
+    time.sleep(0.05)
+
+    def encolar(nombre, prioridad):
+        gobernador.ejecutar(lambda: orden.append(nombre), prioridad=prioridad)
+
+    batch = threading.Thread(target=encolar, args=("batch", PRIORIDAD_BATCH))
+    batch.start()
+    time.sleep(0.05)
+    interactiva = threading.Thread(target=encolar, args=("interactiva", PRIORIDAD_INTERACTIVA))
+    interactiva.start()
+    time.sleep(0.05)
+
+    bloqueo.set()
+    for hilo in (ocupante, batch, interactiva):
+        hilo.join()
+
+    assert orden == ["interactiva", "batch"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,99 @@
+"""
+Test del índice de recuperación de ejemplos
+===========================================
+Verifica la normalización de términos, el ranking BM25 con postings ordenados
+por impacto, el artefacto prearmado y que traductor y corrector reciban
+ejemplos en gramática v2.0 como referencia de sintaxis.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from shared.services.indice_rag import IndiceRAG, obtener_indice_rag, termino_tipo, terminos
+from shared.services.servicioCorrector import ServicioCorrector
+from shared.services.servicioTraductor import ServicioTraductor
+
+
+def _ejemplo(nombre, contenido, tipo="iterativo", **metadatos):
+    return {'nombre': nombre, 'contenido': contenido, 'tipo': tipo, 'estructuras': {}, 'sintaxis': True, **metadatos}
+
+
+def test_terminos_normalizados():
+    assert terminos("bubbleSort") == ["burbuj", "ordena"]
+    assert terminos("Ordenamiento de los arreglos por búsqueda") == ["ordena", "arregl", "busque"]
+    # Palabras vacías y reservadas de la gramática no cuentan
+    assert terminos("for i 🡨 1 to n do begin end") == []
+
+
+def test_ranking_bm25_y_coincidencias():
+    indice = IndiceRAG([
+        _ejemplo("suma", "sumar los elementos del arreglo"),
+        _ejemplo("burbuja", "intercambiar elementos adyacentes", categoria="ordenamiento"),
+        _ejemplo("factorial", "multiplicar numeros", tipo="recursivo"),
+    ])
+
+    resultado = indice.buscar("Ordenar los elementos con el método de burbuja", k=2)
+
+    assert [r['nombre'] for r in resultado] == ["burbuja", "suma"]
+    assert resultado[0]['palabras_coincidentes'] == ["ordenar", "elementos", "burbuja"]
+    assert resultado[0]['score'] > resultado[1]['score']
+    # Los términos de metadatos se agregan tal cual y no cuentan como palabras
+    recursivo = indice.buscar("algo", k=1, extras=[termino_tipo("recursivo")])
+    assert recursivo[0]['nombre'] == "factorial" and recursivo[0]['palabras_coincidentes'] == []
+
+
+def test_postings_max_acota_la_consulta():
+    ejemplos = [_ejemplo(f"e{i}", "arreglo " * (i + 1)) for i in range(10)]
+
+    completo = IndiceRAG(ejemplos).buscar("arreglo", k=10)
+    acotado = IndiceRAG(ejemplos, postings_max=3).buscar("arreglo", k=10)
+
+    # Solo se recorren las 3 entradas de mayor impacto, que son las mejores del completo
+    assert [r['nombre'] for r in acotado] == [r['nombre'] for r in completo[:3]]
+
+
+def test_artefacto_y_huella(tmp_path):
+    indice = IndiceRAG([_ejemplo("burbuja", "intercambiar adyacentes"), _ejemplo("suma", "sumar")])
+    ruta = tmp_path / "indice.json"
+    indice.guardar(ruta, "huella-1")
+
+    cargado = IndiceRAG.cargar(ruta, "huella-1")
+
+    assert cargado.buscar("burbuja") == indice.buscar("burbuja")
+    assert IndiceRAG.cargar(ruta, "huella-2") is None
+    assert IndiceRAG.cargar(tmp_path / "no_existe.json", "huella-1") is None
+
+
+def test_colecciones_del_traductor_y_del_corrector():
+    traductor = obtener_indice_rag("traductor")
+    corrector = obtener_indice_rag("corrector")
+
+    assert all(ejemplo['sintaxis'] for ejemplo in corrector.documentos)
+    assert any(not ejemplo['sintaxis'] for ejemplo in traductor.documentos)
+    # Los ejemplos en gramática van primero
+    assert traductor.documentos[:len(corrector.documentos)] == corrector.documentos
+
+
+def test_traductor_incluye_referencia_de_sintaxis():
+    ejemplos = ServicioTraductor()._buscar_ejemplos_similares("Problema de la mochila con programación dinámica")
+
+    assert ejemplos[0]['categoria'] == "programacion_dinamica"
+    assert any(ejemplo['sintaxis'] for ejemplo in ejemplos)
+
+
+def test_corrector_busca_por_pseudocodigo_y_errores():
+    pseudocodigo = "bubbleSort(A[], n)\nbegin\n    for i 🡨 1 to n - 1\n    begin\n    end\nend"
+
+    ejemplos = ServicioCorrector()._buscar_ejemplos_similares(pseudocodigo, ["Falta 'do' en el for"], "Iterativo")
+
+    assert ejemplos[0]['nombre'] == "03-bubble-sort"
+    assert all(ejemplo['sintaxis'] for ejemplo in ejemplos)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,137 @@
+"""
+Test del índice de análisis similares
+=====================================
+Verifica que el índice MinHash/LSH encuentre el programa ya analizado que
+difiere en una línea (y no uno distinto), que la consulta siga por debajo
+del milisegundo con muchos análisis guardados, y que el análisis del vecino
+llegue como referencia a los prompts del algoritmo principal.
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from core.analizador.tools.canonico import canonizar
+from core.analizador.tools.llm_analyzer import LLMAnalyzer
+from shared.services.indice_similitud import IndiceSimilitud, bloque_referencia, usar_referencia
+
+
+BURBUJA = """burbuja(int A[], int n)
+begin
+    int i, j, t
+    for i 🡨 1 to n - 1 do
+    begin
+        for j 🡨 1 to n - i do
+        begin
+            if (A[j] > A[j + 1]) then
+            begin
+                t 🡨 A[j]
+                A[j] 🡨 A[j + 1]
+                A[j + 1] 🡨 t
+            end
+        end
+    end
+end"""
+
+# Una línea distinta y otros nombres
+BURBUJA_VARIANTE = re.sub(r"\bt\b", "aux", BURBUJA.replace("n - i do", "n - 1 do"))
+
+SUMA = """suma(int A[], int n)
+begin
+    int s, i
+    s 🡨 0
+    for i 🡨 1 to n do
+    begin
+        s 🡨 s + A[i]
+    end
+    return s
+end"""
+
+REFERENCIA = {
+    'algorithm_name': "burbuja",
+    'pseudocodigo': BURBUJA,
+    'casos': {'worst_case': {'T': "n*(n-1)/2", 'P': "1/n!"}},
+    'ecuaciones': {'peor_caso': "T(n) = n^2"},
+    'complejidades': {'peor_caso': "O(n^2)"},
+    'subrutinas': {},
+}
+
+
+def _firma(indice, programa):
+    return indice.firma(canonizar(programa)['texto'])
+
+
+def test_encuentra_el_vecino_que_difiere_en_una_linea():
+    indice = IndiceSimilitud()
+    indice.agregar("burbuja", _firma(indice, BURBUJA), REFERENCIA)
+    indice.agregar("suma", _firma(indice, SUMA), {})
+
+    vecino = indice.buscar(_firma(indice, BURBUJA_VARIANTE), umbral=0.7)
+
+    assert vecino['analisis_id'] == "burbuja"
+    assert 0.7 <= vecino['similitud'] < 1.0
+    assert vecino['referencia'] is REFERENCIA
+
+    # Renombrar no cambia la firma; el propio análisis se puede excluir
+    assert indice.buscar(_firma(indice, re.sub(r"\bt\b", "tmp", BURBUJA)))['similitud'] == 1.0
+    assert indice.buscar(_firma(indice, BURBUJA), excluir="burbuja") is None
+
+
+def test_capacidad_descarta_los_mas_antiguos():
+    indice = IndiceSimilitud(capacidad=1)
+    indice.agregar("burbuja", _firma(indice, BURBUJA), REFERENCIA)
+    indice.agregar("suma", _firma(indice, SUMA), {})
+
+    assert len(indice) == 1
+    assert indice.buscar(_firma(indice, BURBUJA)) is None
+    assert indice.buscar(_firma(indice, SUMA))['analisis_id'] == "suma"
+
+
+def test_consulta_sub_milisegundo_con_muchos_analisis():
+    indice = IndiceSimilitud()
+    generador = np.random.default_rng(7)
+    for i in range(20000):
+        indice.agregar(str(i), generador.integers(0, 2**32, size=64, dtype=np.uint64), {})
+    indice.agregar("burbuja", _firma(indice, BURBUJA), REFERENCIA)
+    consulta = _firma(indice, BURBUJA_VARIANTE)
+
+    inicio = time.perf_counter()
+    for _ in range(200):
+        vecino = indice.buscar(consulta, umbral=0.7)
+    promedio_ms = (time.perf_counter() - inicio) / 200 * 1000
+
+    assert vecino['analisis_id'] == "burbuja"
+    assert promedio_ms < 1.0
+
+
+def test_referencia_solo_en_prompts_del_algoritmo_principal(monkeypatch):
+    vecino = {'analisis_id': "burbuja", 'similitud': 0.9, 'referencia': REFERENCIA}
+
+    with usar_referencia(vecino, "burbuja"):
+        datos = LLMAnalyzer._analysis_data(BURBUJA_VARIANTE, "burbuja")
+        assert "ANÁLISIS DE REFERENCIA" in datos
+        assert "Ecuación peor_caso: T(n) = n^2 → O(n^2)" in datos
+        # Una subrutina auxiliar analizada por separado no lleva la referencia
+        assert bloque_referencia("intercambiar") == ""
+
+        # Sin presupuesto para el código se envían solo los resultados; sin presupuesto, nada
+        monkeypatch.setattr(settings, "similitud_tokens", 120)
+        solo_resultados = bloque_referencia("burbuja")
+        assert "Resultados de referencia" in solo_resultados
+        assert "Pseudocodigo de referencia" not in solo_resultados
+        monkeypatch.setattr(settings, "similitud_tokens", 10)
+        assert bloque_referencia("burbuja") == ""
+
+    assert bloque_referencia("burbuja") == ""
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,180 @@
+"""
+Test del presupuesto por análisis
+=================================
+Verifica que LLMService descuente los tokens reales del presupuesto activo,
+rechace las llamadas que no caben o llegan con el plazo vencido, que las
+etapas opcionales se omitan por debajo de la reserva y que las degradaciones
+lleguen al resultado del flujo.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from core.analizador.agents.nodes.llm_analyze_best_case_node import llm_analyze_best_case_node
+from core.analizador.models.scenario_state import ScenarioState
+from flujo_analisis import FlujoAnalisis
+from shared.services import casetes_llm, gobernador_llm
+from shared.services.casetes_llm import CaseteraLLM
+from shared.services.gobernador_llm import GobernadorLLM
+from shared.services.llm_servicio import LLMService
+from shared.services.presupuesto_llm import (
+    PresupuestoAgotadoError,
+    PresupuestoAnalisis,
+    permite_opcional,
+    presupuesto_actual,
+    usar_presupuesto,
+)
+from tools.metricas import MedirTiempo
+
+
+class LLMFalso:
+    model = "modelo-prueba"
+    temperature = 0.0
+    max_tokens = 100
+
+    def __init__(self):
+        self.llamadas = 0
+
+    def invoke(self, entrada, **kwargs):
+        self.llamadas += 1
+        return AIMessage(
+            content="ok",
+            response_metadata={'usage': {
+                'input_tokens': 300, 'output_tokens': 100,
+                'cache_read_input_tokens': 50, 'cache_creation_input_tokens': 0,
+            }},
+        )
+
+
+@pytest.fixture(autouse=True)
+def casetera_live(monkeypatch):
+    monkeypatch.setattr(casetes_llm, "_casetera_instance", CaseteraLLM("live"))
+
+
+def test_descuenta_tokens_y_rechaza_la_llamada_que_no_cabe():
+    llm = LLMFalso()
+    presupuesto = PresupuestoAnalisis(tokens_max=500)
+
+    with usar_presupuesto(presupuesto):
+        LLMService.invocar(llm, "primer prompt")
+        assert presupuesto.tokens_consumidos == 450
+
+        with MedirTiempo("correccion"), pytest.raises(PresupuestoAgotadoError):
+            LLMService.invocar(llm, "segundo prompt")
+
+    assert llm.llamadas == 1
+    assert presupuesto.degradaciones[0]['etapa'] == "correccion"
+    assert "50 de 500" in presupuesto.degradaciones[0]['motivo']
+    assert presupuesto_actual() is None
+
+
+def test_plazo_vencido_rechaza_llamadas():
+    llm = LLMFalso()
+    presupuesto = PresupuestoAnalisis(segundos_max=0.01)
+    time.sleep(0.02)
+
+    with usar_presupuesto(presupuesto), pytest.raises(PresupuestoAgotadoError, match="plazo"):
+        LLMService.invocar(llm, "prompt")
+    assert llm.llamadas == 0
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+
+
+class LLMDemorado(LLMFalso):
+    """Cada intento se cuelga hasta su timeout o falla con 529 (`sobrecargado`)."""
+
+    def __init__(self, sobrecargado=False):
+        super().__init__()
+        self.sobrecargado = sobrecargado
+        self.timeouts = []
+
+    def invoke(self, entrada, timeout=None, **kwargs):
+        self.llamadas += 1
+        self.timeouts.append(timeout)
+        if self.sobrecargado:
+            raise ErrorHTTP(529)
+        time.sleep(timeout)
+        raise TimeoutError("Request timed out")
+
+
+@pytest.mark.parametrize("sobrecargado", [False, True], ids=["llamada_colgada", "529_repetidos"])
+def test_reintentos_terminan_al_vencer_el_plazo(monkeypatch, sobrecargado):
+    # Backoff mucho mayor que el plazo: sin acotarlo la llamada tardaría varios segundos
+    monkeypatch.setattr(gobernador_llm, "_gobernador_instance",
+                        GobernadorLLM(backoff_base=5.0, backoff_max=30.0))
+    llm = LLMDemorado(sobrecargado)
+    presupuesto = PresupuestoAnalisis(segundos_max=0.3)
+
+    inicio = time.monotonic()
+    with usar_presupuesto(presupuesto), pytest.raises(PresupuestoAgotadoError, match="plazo"):
+        LLMService.invocar(llm, "prompt")
+    transcurrido = time.monotonic() - inicio
+
+    assert 0.25 <= transcurrido < 1.0
+    assert llm.llamadas >= 1
+    assert all(t <= 0.3 for t in llm.timeouts)
+    assert "cortada" in presupuesto.degradaciones[-1]['motivo']
+
+
+def test_etapas_opcionales_respetan_la_reserva(monkeypatch):
+    monkeypatch.setattr(settings, "analisis_reserva_opcional", 0.25)
+    presupuesto = PresupuestoAnalisis(tokens_max=1000)
+
+    with usar_presupuesto(presupuesto):
+        assert permite_opcional("flowchart")
+        presupuesto.consumir(800)
+        assert not permite_opcional("validacion_complejidades")
+
+    assert [d['etapa'] for d in presupuesto.degradaciones] == ["validacion_complejidades"]
+    # Sin presupuesto activo no se omite nada
+    assert permite_opcional("flowchart")
+
+
+def test_nodo_de_caso_usa_el_escenario_heuristico():
+    estado = ScenarioState(
+        pseudocode="maximo(int A[], int n)\nbegin\n    return A[1]\nend",
+        algorithm_name="maximo",
+        is_iterative=True,
+    )
+    presupuesto = PresupuestoAnalisis(tokens_max=10)
+
+    with usar_presupuesto(presupuesto), MedirTiempo("workflow.llm_analyze_best_case"):
+        resultado = llm_analyze_best_case_node(estado)
+
+    assert resultado.raw_scenarios[0]['id'] == "S_best_case_fallback"
+    assert presupuesto.degradaciones[0]['etapa'] == "workflow.llm_analyze_best_case"
+
+
+def test_flujo_reporta_las_degradaciones(monkeypatch):
+    monkeypatch.setattr(settings, "puntos_control", False)
+    flujo = FlujoAnalisis.__new__(FlujoAnalisis)
+    flujo.verbose = False
+
+    def analizar(*args):
+        presupuesto_actual().consumir(1000)
+        return {'flowchart': "graph TD" if permite_opcional("flowchart") else None, 'errores': []}
+
+    monkeypatch.setattr(flujo, "_analizar", analizar)
+    resultado = flujo.analizar(entrada="x <- 1", presupuesto_tokens=1200, limite_segundos=30)
+
+    assert resultado['flowchart'] is None
+    assert resultado['presupuesto']['tokens_max'] == 1200
+    assert resultado['presupuesto']['tokens_consumidos'] == 1000
+    assert resultado['presupuesto']['segundos_max'] == 30
+    assert [d['etapa'] for d in resultado['presupuesto']['degradaciones']] == ["flowchart"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,146 @@
+"""
+Test de la prueba de carga y del stub de Anthropic
+==================================================
+Verifica el stub compatible con /v1/messages (incluido el cliente real de
+LangChain apuntando a él) y una etapa corta del generador de carga contra la
+app en memoria.
+"""
+
+import asyncio
+import random
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+import uvicorn
+from fastapi.testclient import TestClient
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from shared.services import casetes_llm
+from shared.services.casetes_llm import CaseteraLLM
+from shared.services.llm_servicio import LLMService
+from tests.prueba_carga import cargar_corpus, ejecutar_etapa, parsear_mezcla, percentil, resumir
+from tests.stub_anthropic import crear_app
+
+
+def test_stub_responde_formato_messages():
+    cliente = TestClient(crear_app({'latencia_ms': 0, 'tokens_salida': 7}))
+    respuesta = cliente.post("/v1/messages", json={
+        'model': "modelo-prueba", 'max_tokens': 100,
+        'messages': [{'role': 'user', 'content': "hola"}]
+    })
+
+    datos = respuesta.json()
+    assert respuesta.status_code == 200
+    assert datos['type'] == 'message'
+    assert datos['content'][0]['type'] == 'text'
+    assert datos['usage']['output_tokens'] == 7
+    assert cliente.get("/stats").json()['solicitudes'] == 1
+
+
+def test_stub_simula_errores():
+    cliente = TestClient(crear_app({'latencia_ms': 0, 'tasa_error': 1.0, 'codigo_error': 529}))
+    respuesta = cliente.post("/v1/messages", json={'messages': []})
+
+    assert respuesta.status_code == 529
+    assert respuesta.json()['error']['type'] == 'overloaded_error'
+
+
+def test_stub_lognormal_respeta_la_media():
+    from tests.stub_anthropic import muestrear_latencia
+    rng = random.Random(1)
+    config = {'latencia_ms': 200, 'distribucion': 'lognormal', 'sigma': 0.5}
+    media = sum(muestrear_latencia(config, rng) for _ in range(5000)) / 5000
+
+    assert media == pytest.approx(0.2, rel=0.05)
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_llm_service_contra_el_stub(monkeypatch):
+    puerto = _puerto_libre()
+    servidor = uvicorn.Server(uvicorn.Config(crear_app({'latencia_ms': 0}), port=puerto, log_level="warning"))
+    hilo = threading.Thread(target=servidor.run, daemon=True)
+    hilo.start()
+    while not servidor.started:
+        time.sleep(0.01)
+
+    try:
+        monkeypatch.setattr(settings, "anthropic_base_url", f"http://127.0.0.1:{puerto}")
+        monkeypatch.setattr(settings, "anthropic_api_key", "stub")
+        monkeypatch.setattr(casetes_llm, "_casetera_instance", CaseteraLLM("live"))
+
+        respuesta = LLMService.invocar(LLMService.get_llm(), "analiza este algoritmo")
+
+        assert "stub" in respuesta.content
+        assert respuesta.response_metadata['usage']['output_tokens'] > 0
+    finally:
+        servidor.should_exit = True
+        hilo.join(timeout=5)
+
+
+def test_estadisticas_de_etapa():
+    registros = [
+        {'endpoint': 'validar', 'ok': True, 'codigo': 200, 'latencia_s': i / 100}
+        for i in range(1, 101)
+    ] + [{'endpoint': 'analizar', 'ok': False, 'codigo': 500, 'latencia_s': 1.0}]
+
+    resumen = resumir(registros, duracion_s=10)
+
+    assert resumen['throughput_rps'] == 10.0
+    assert resumen['errores'] == {'500': 1}
+    assert resumen['p50_ms'] == pytest.approx(505, abs=1)
+    assert resumen['por_endpoint']['analizar']['tasa_error'] == 1.0
+    assert percentil([], 0.5) is None
+
+
+def test_parsear_mezcla():
+    assert parsear_mezcla("analizar=1,validar=3") == {'analizar': 1.0, 'validar': 3.0}
+    with pytest.raises(ValueError):
+        parsear_mezcla("inexistente=1")
+
+
+def _app_validador():
+    """App con el router del validador y el health de carga del análisis."""
+    from fastapi import FastAPI
+    from core.validador.router import router as validador_router
+    from flujo_analisis import FlujoAnalisis
+
+    app = FastAPI()
+    app.include_router(validador_router)
+    app.get("/analisis/health")(lambda: {"status": "ok", "carga": FlujoAnalisis.estadisticas_carga()})
+    return app
+
+
+def test_etapa_corta_contra_la_app():
+    app = _app_validador()
+
+    async def correr():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://prueba") as cliente:
+            return await ejecutar_etapa(
+                cliente, tasa=20, duracion=0.5, mezcla={'validar': 1.0},
+                corpus=cargar_corpus()[:3], rng=random.Random(7)
+            )
+
+    etapa = asyncio.run(correr())
+
+    assert etapa['solicitudes'] > 0
+    assert etapa['tasa_error'] == 0
+    assert etapa['p50_ms'] is not None
+    assert etapa['saturacion']['llm_limite_min'] is not None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,232 @@
+"""
+Test de los puntos de control por fase
+======================================
+Verifica que el almacén persista las fases completadas, que el checkpointer
+del workflow retome un grafo interrumpido desde otro proceso, y que un
+reintento (o reanudar) del flujo no repita las fases ya completadas.
+"""
+
+import sys
+from pathlib import Path
+from typing import TypedDict
+
+import pytest
+from langgraph.graph import END, StateGraph
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from core.analizador.models.omega_table import OmegaTable
+from flujo_analisis import FlujoAnalisis
+from shared.services import puntos_control
+from shared.services.puntos_control import AlmacenPuntosControl, PuntosControlGrafo, _leer
+from shared.services.servicioValidador import servicioValidador
+
+
+MAXIMO = "maximo(int A[], int n)\nbegin\n    int m\n    m 🡨 A[1]\n    return m\nend"
+
+
+@pytest.fixture
+def directorio(tmp_path, monkeypatch):
+    """Puntos de control en una carpeta temporal."""
+    monkeypatch.setattr(settings, "puntos_control", True)
+    monkeypatch.setattr(settings, "puntos_control_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "cache_canonico", False)
+    monkeypatch.setattr(puntos_control, "_puntos_control_instance", None)
+    return tmp_path
+
+
+def test_almacen_guarda_fases_y_se_indexa_por_clave(directorio):
+    almacen = AlmacenPuntosControl(directorio)
+    almacen.iniciar("a1", "clave", {'entrada': "x"})
+    almacen.guardar_fase("a1", "traduccion", {'pseudocodigo': "y"})
+
+    # Otra instancia (otro proceso) ve lo mismo
+    otro = AlmacenPuntosControl(directorio)
+    assert otro.buscar_por_clave("clave") == "a1"
+    assert otro.fase("a1", "traduccion") == {'pseudocodigo': "y"}
+    assert otro.obtener("a1")['parametros'] == {'entrada': "x"}
+
+    otro.eliminar("a1")
+    assert almacen.obtener("a1") is None
+    assert almacen.buscar_por_clave("clave") is None
+
+
+def test_registros_vencidos_se_descartan(directorio):
+    almacen = AlmacenPuntosControl(directorio, ttl_h=0)
+    almacen.iniciar("a1", "clave", {})
+
+    assert almacen.obtener("a1") is None
+    assert almacen.limpiar_vencidos() == 1
+    assert not list(directorio.glob("*.ckpt"))
+
+
+class Estado(TypedDict):
+    pasos: list
+
+
+def _grafo(checkpointer, segundo):
+    grafo = StateGraph(Estado)
+    grafo.add_node("primero", lambda estado: {'pasos': estado['pasos'] + ["primero"]})
+    grafo.add_node("segundo", segundo)
+    grafo.set_entry_point("primero")
+    grafo.add_edge("primero", "segundo")
+    grafo.add_edge("segundo", END)
+    return grafo.compile(checkpointer=checkpointer)
+
+
+def test_grafo_interrumpido_se_retoma_desde_otro_proceso(directorio):
+    config = {"configurable": {"thread_id": "a1"}}
+
+    def caer(estado):
+        raise RuntimeError("el proceso murió")
+
+    with pytest.raises(RuntimeError):
+        _grafo(PuntosControlGrafo(directorio), caer).invoke({'pasos': []}, config, durability="sync")
+
+    # Checkpointer nuevo sobre la misma carpeta: solo falta el segundo nodo
+    grafo = _grafo(PuntosControlGrafo(directorio), lambda estado: {'pasos': estado['pasos'] + ["segundo"]})
+    assert grafo.get_state(config).next == ("segundo",)
+    assert grafo.invoke(None, config)['pasos'] == ["primero", "segundo"]
+
+    grafo.checkpointer.delete_thread("a1")
+    assert not list((directorio / "grafo").glob("*.ckpt"))
+
+
+
+def test_hilos_abandonados_del_grafo_se_desalojan(directorio):
+    config = {"configurable": {"thread_id": "fallido"}}
+
+    def caer(estado):
+        raise RuntimeError("fase fallida")
+
+    grafo = _grafo(PuntosControlGrafo(directorio, ttl_h=0), caer)
+    with pytest.raises(RuntimeError):
+        grafo.invoke({'pasos': []}, config, durability="sync")
+
+    # Vencido: se borra de memoria y de disco, aunque nadie lo reanude
+    assert grafo.checkpointer.limpiar_vencidos() == 1
+    assert "fallido" not in grafo.checkpointer.storage
+    assert not list((directorio / "grafo").glob("*.ckpt"))
+
+    # Con TTL vigente el hilo se conserva para reanudar
+    vigente = _grafo(PuntosControlGrafo(directorio), caer)
+    with pytest.raises(RuntimeError):
+        vigente.invoke({'pasos': []}, config, durability="sync")
+    assert vigente.checkpointer.limpiar_vencidos() == 0
+    assert PuntosControlGrafo(directorio).get_tuple(config) is not None
+
+
+def test_cada_hilo_persiste_solo_sus_entradas(directorio):
+    checkpointer = PuntosControlGrafo(directorio)
+    configs = [{"configurable": {"thread_id": hilo}} for hilo in ("h1", "h2")]
+
+    def caer(estado):
+        raise RuntimeError("fase fallida")
+
+    for config in configs:
+        with pytest.raises(RuntimeError):
+            _grafo(checkpointer, caer).invoke({'pasos': []}, config, durability="sync")
+
+    for hilo in ("h1", "h2"):
+        datos = _leer(directorio / "grafo" / f"{hilo}.ckpt")
+        assert datos['writes'] and datos['blobs']
+        assert {clave[0] for clave in [*datos['writes'], *datos['blobs']]} == {hilo}
+        assert set(datos['writes']) == {k for k in checkpointer.writes if k[0] == hilo}
+        assert set(datos['blobs']) == {k for k in checkpointer.blobs if k[0] == hilo}
+
+    # Otro proceso recarga el hilo con su índice y lo sigue persistiendo completo
+    recargado = PuntosControlGrafo(directorio)
+    grafo = _grafo(recargado, lambda estado: {'pasos': estado['pasos'] + ["segundo"]})
+    assert grafo.invoke(None, configs[0])['pasos'] == ["primero", "segundo"]
+    datos = _leer(directorio / "grafo" / "h1.ckpt")
+    assert set(datos['blobs']) == {k for k in recargado.blobs if k[0] == "h1"}
+
+    checkpointer.delete_thread("h2")
+    assert "h2" not in checkpointer._claves_writes and "h2" not in checkpointer._claves_blobs
+
+
+class _Respuesta:
+    mejor_caso = caso_promedio = peor_caso = "T(n) = 1"
+    ecuaciones_iguales = True
+    casos_base = []
+
+    def model_dump(self):
+        return {'mejor_caso': self.mejor_caso}
+
+
+class _Llamadas:
+    """Cuenta las llamadas y falla en las primeras `fallas`."""
+
+    def __init__(self, respuesta, fallas=0):
+        self.respuesta = respuesta
+        self.fallas = fallas
+        self.llamadas = 0
+
+    def __call__(self, *args, **kwargs):
+        self.llamadas += 1
+        if self.llamadas <= self.fallas:
+            raise RuntimeError("proveedor caído")
+        return self.respuesta
+
+
+class _Componente:
+    def __init__(self, **metodos):
+        self.__dict__.update(metodos)
+
+
+def _flujo(monkeypatch, fallas_representacion):
+    flujo = FlujoAnalisis.__new__(FlujoAnalisis)
+    flujo.verbose = False
+    flujo.clasificador = None
+    flujo.validador = servicioValidador()
+    flujo.generador_flowchart = _Componente(generar=lambda pseudocodigo: "graph TD")
+    flujo.reportador = _Componente(generar_reporte_completo=lambda resultado: {'markdown': ""})
+    flujo.resolver = _Componente(resolver_casos=lambda ecuaciones: {
+        'mejor_caso': {'exito': False}, 'caso_promedio': {'exito': False}, 'peor_caso': {'exito': False},
+        'complejidades': {'mejor_caso': "O(1)", 'caso_promedio': "O(1)", 'peor_caso': "O(1)"},
+    })
+    flujo.validador_complejidades = _Componente(
+        validar_complejidades=lambda **kwargs: {'concordancia': True, 'confianza': 1.0}
+    )
+    representacion = _Llamadas(_Respuesta(), fallas=fallas_representacion)
+    flujo.agente_matematicas = _Componente(generar_ecuaciones=representacion)
+
+    workflow = _Llamadas({'omega_table': OmegaTable(algorithm_name="maximo", scenarios=[], control_variables=[])})
+    monkeypatch.setattr(flujo, "_ejecutar_workflow", workflow)
+    monkeypatch.setattr(flujo, "_guardar_analisis", lambda *args: None)
+    return flujo, workflow, representacion
+
+
+def test_reintento_continua_desde_la_ultima_fase(directorio, monkeypatch):
+    flujo, workflow, representacion = _flujo(monkeypatch, fallas_representacion=1)
+
+    primero = flujo.analizar(entrada=MAXIMO, tipo_entrada="pseudocodigo")
+    assert any("representación matemática" in error for error in primero['errores'])
+
+    segundo = flujo.analizar(entrada=MAXIMO, tipo_entrada="pseudocodigo")
+    assert segundo['analisis_id'] == primero['analisis_id']
+    assert segundo['fases_restauradas'] == ['analisis_costos']
+    assert segundo['errores'] == []
+    assert (workflow.llamadas, representacion.llamadas) == (1, 2)
+
+    # Terminó sin errores: los puntos de control se descartan
+    assert flujo.reanudar(primero['analisis_id']) is None
+
+
+def test_reanudar_por_id(directorio, monkeypatch):
+    flujo, workflow, representacion = _flujo(monkeypatch, fallas_representacion=1)
+    primero = flujo.analizar(entrada=MAXIMO, tipo_entrada="pseudocodigo")
+
+    reanudado = flujo.reanudar(primero['analisis_id'])
+
+    assert reanudado['exito']
+    assert reanudado['analisis_id'] == primero['analisis_id']
+    assert reanudado['fases_restauradas'] == ['analisis_costos']
+    assert workflow.llamadas == 1
+    assert flujo.reanudar("no-existe") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
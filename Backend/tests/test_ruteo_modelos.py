@@ -0,0 +1,153 @@
+"""
+Test del ruteo de modelos por etapa
+===================================
+Verifica que cada etapa use el modelo de su nivel en settings.llm_ruteo_etapas
+y que las llamadas del modelo rápido se escalen al fuerte cuando la salida no
+cumple el esquema o la verificación de confianza de la etapa.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+from langchain_core.messages import AIMessage
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from shared.services import casetes_llm
+from shared.services.casetes_llm import CaseteraLLM
+from shared.services.llm_servicio import LLMService
+from shared.services.servicioCorrector import ServicioCorrector
+from tools.metricas import obtener_metricas, reset_metricas
+
+
+HERRAMIENTA = LLMService.herramienta(
+    "entregar_prueba", "Salida de prueba", {"valor": {"type": "integer"}}
+)
+
+
+class LLMFalso:
+    temperature = 0.0
+    max_tokens = 100
+
+    def __init__(self, model, argumentos):
+        self.model = model
+        self.argumentos = argumentos
+        self.llamadas = 0
+
+    def bind_tools(self, herramientas, tool_choice=None):
+        return self
+
+    def invoke(self, entrada, **kwargs):
+        self.llamadas += 1
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": "entregar_prueba", "args": self.argumentos, "id": "toolu_1"}],
+            response_metadata={"stop_reason": "tool_use"},
+        )
+
+
+@pytest.fixture
+def modelos(monkeypatch):
+    """Modelo rápido y fuerte falsos; get_llm devuelve el fuerte al escalar."""
+    monkeypatch.setattr(casetes_llm, "_casetera_instance", CaseteraLLM("live"))
+    monkeypatch.setattr(settings, "llm_escalado", True)
+    rapido = LLMFalso(settings.llm_modelo_rapido, {})
+    fuerte = LLMFalso(settings.model_name, {"valor": 2})
+    monkeypatch.setattr(LLMService, "get_llm", staticmethod(lambda **kwargs: fuerte))
+    reset_metricas()
+    yield rapido, fuerte
+    reset_metricas()
+
+
+def test_ruteo_por_etapa(monkeypatch):
+    monkeypatch.setattr(settings, "llm_ruteo_etapas", {"correccion": "rapido", "caso": "fuerte"})
+
+    assert LLMService.modelo_de_etapa("correccion") == settings.llm_modelo_rapido
+    assert LLMService.modelo_de_etapa("caso") == settings.model_name
+    assert LLMService.modelo_de_etapa("desconocida") == settings.model_name
+    assert LLMService.modelo_de_etapa(None) == settings.model_name
+
+
+def test_get_llm_usa_el_modelo_de_la_etapa(monkeypatch):
+    monkeypatch.setattr(settings, "anthropic_api_key", "sk-prueba")
+    monkeypatch.setattr(settings, "llm_ruteo_etapas", {"validacion": "rapido"})
+
+    assert LLMService.get_llm(max_tokens=64, etapa="validacion").model == settings.llm_modelo_rapido
+    assert LLMService.get_llm(max_tokens=64).model == settings.model_name
+
+
+def test_salida_sin_campos_obligatorios_escala_al_modelo_fuerte(modelos):
+    rapido, fuerte = modelos
+
+    assert LLMService.invocar_estructurado(rapido, "prompt", HERRAMIENTA) == {"valor": 2}
+    assert (rapido.llamadas, fuerte.llamadas) == (1, 1)
+
+    escalado, = obtener_metricas()['escalados']
+    assert escalado['herramienta'] == "entregar_prueba"
+    assert escalado['modelo'] == settings.llm_modelo_rapido
+    assert "campos obligatorios" in escalado['motivo']
+
+
+def test_verificacion_de_confianza_escala_y_no_se_repite(modelos):
+    rapido, fuerte = modelos
+    rapido.argumentos = {"valor": 1}
+    verificadas = []
+
+    def verificar(salida):
+        verificadas.append(salida)
+        if salida["valor"] < 2:
+            raise ValueError("confianza baja")
+
+    assert LLMService.invocar_estructurado(rapido, "otro prompt", HERRAMIENTA, verificar=verificar) == {"valor": 2}
+    # La salida del modelo fuerte se acepta sin volver a verificarla
+    assert verificadas == [{"valor": 1}]
+
+
+@pytest.mark.parametrize("metodo, caso", [
+    ("analyze_best_case", "best_case"),
+    ("analyze_worst_case", "worst_case"),
+    ("analyze_average_case", "average_case"),
+])
+def test_analisis_por_caso_verifica_dentro_del_escalado(modelos, monkeypatch, metodo, caso):
+    from core.analizador.tools.llm_analyzer import LLMAnalyzer
+
+    recibidas = []
+
+    def invocar_estructurado(llm, mensajes, herramienta, verificar=None):
+        recibidas.append(verificar)
+        return {"scenario_type": caso}
+
+    monkeypatch.setattr(LLMService, "invocar_estructurado", staticmethod(invocar_estructurado))
+
+    # La verificación viaja al escalado y no se repite después de la llamada
+    assert getattr(LLMAnalyzer(), metodo)(pseudocode="f(int n)\nbegin\nend") == {"scenario_type": caso}
+    with pytest.raises(ValueError):
+        recibidas[0]({"scenario_type": "otro"})
+
+
+def test_modelo_fuerte_o_escalado_desactivado_no_escalan(modelos, monkeypatch):
+    rapido, fuerte = modelos
+    fuerte.argumentos = {}
+
+    with pytest.raises(ValueError, match="campos obligatorios"):
+        LLMService.invocar_estructurado(fuerte, "p1", HERRAMIENTA)
+
+    monkeypatch.setattr(settings, "llm_escalado", False)
+    with pytest.raises(ValueError, match="campos obligatorios"):
+        LLMService.invocar_estructurado(rapido, "p2", HERRAMIENTA)
+    assert obtener_metricas()['escalados'] == []
+
+
+def test_corrector_verifica_que_la_correccion_sea_valida():
+    valida = "maximo(int A[], int n)\nbegin\n    int m\n    m 🡨 A[1]\n    return m\nend"
+
+    ServicioCorrector._verificar_correccion({'correcciones': [], 'pseudocodigo': valida})
+    with pytest.raises(ValueError, match="errores"):
+        ServicioCorrector._verificar_correccion({'correcciones': [], 'pseudocodigo': "maximo(A, n)\nm = A[1]"})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
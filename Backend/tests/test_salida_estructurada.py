@@ -0,0 +1,164 @@
+"""
+Test de la salida estructurada de las etapas LLM
+================================================
+Verifica que LLMService.invocar_estructurado fuerce la herramienta de salida,
+devuelva sus argumentos ya decodificados (también desde casetes y contra el
+stub de Anthropic) y que cada etapa use esos campos sin recortar texto.
+"""
+
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import uvicorn
+from langchain_core.messages import AIMessage
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agentes.agenteValidadorComplejidades import AgenteValidadorComplejidades
+from config.settings import settings
+from core.analizador.tools.few_shot import FEW_SHOT_EXAMPLES
+from core.analizador.tools.output_schemas import case_schema
+from shared.services import casetes_llm, servicioTraductor
+from shared.services.casetes_llm import CaseteraLLM, CaseteNoEncontradoError
+from shared.services.llm_servicio import LLMService
+from shared.services.servicioTraductor import ServicioTraductor
+from tests.stub_anthropic import crear_app
+
+
+HERRAMIENTA = LLMService.herramienta(
+    "entregar_prueba", "Salida de prueba", {"valor": {"type": "integer"}}
+)
+
+
+class LLMFalso:
+    model = "modelo-prueba"
+    temperature = 0.0
+    max_tokens = 100
+
+    def __init__(self, respuesta):
+        self.respuesta = respuesta
+        self.herramientas = []
+        self.llamadas = 0
+
+    def bind_tools(self, herramientas, tool_choice=None):
+        self.herramientas.append((herramientas, tool_choice))
+        return self
+
+    def invoke(self, entrada, **kwargs):
+        self.llamadas += 1
+        return self.respuesta
+
+
+def _uso(argumentos, stop_reason="tool_use"):
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": "entregar_prueba", "args": argumentos, "id": "toolu_1"}],
+        response_metadata={"stop_reason": stop_reason},
+    )
+
+
+@pytest.fixture(autouse=True)
+def casetera_live(monkeypatch):
+    monkeypatch.setattr(casetes_llm, "_casetera_instance", CaseteraLLM("live"))
+
+
+def test_devuelve_los_argumentos_de_la_herramienta_forzada():
+    llm = LLMFalso(_uso({"valor": 3}))
+
+    assert LLMService.invocar_estructurado(llm, "prompt", HERRAMIENTA) == {"valor": 3}
+    assert llm.herramientas == [([HERRAMIENTA], "entregar_prueba")]
+
+
+def test_respuesta_sin_herramienta_o_truncada_es_error():
+    with pytest.raises(ValueError, match="salida estructurada"):
+        LLMService.invocar_estructurado(LLMFalso(AIMessage(content="texto libre")), "p1", HERRAMIENTA)
+
+    truncada = LLMFalso(_uso({"valor": 1}, stop_reason="max_tokens"))
+    with pytest.raises(ValueError, match="max_tokens"):
+        LLMService.invocar_estructurado(truncada, "p2", HERRAMIENTA)
+    assert LLMService.invocar_estructurado(truncada, "p2", HERRAMIENTA, permitir_truncado=True) == {"valor": 1}
+
+
+def test_casete_reproduce_la_salida_estructurada(tmp_path, monkeypatch):
+    llm = LLMFalso(_uso({"valor": 7}))
+
+    monkeypatch.setattr(casetes_llm, "_casetera_instance", CaseteraLLM("record", tmp_path))
+    LLMService.invocar_estructurado(llm, "prompt", HERRAMIENTA)
+
+    monkeypatch.setattr(casetes_llm, "_casetera_instance", CaseteraLLM("fail", tmp_path))
+    assert LLMService.invocar_estructurado(llm, "prompt", HERRAMIENTA) == {"valor": 7}
+    assert llm.llamadas == 1
+
+    # El esquema es parte de la clave: otra herramienta no reutiliza el casete
+    otra = LLMService.herramienta("entregar_prueba", "Otra salida", {"valor": {"type": "string"}})
+    with pytest.raises(CaseteNoEncontradoError):
+        LLMService.invocar_estructurado(llm, "prompt", otra)
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_herramienta_contra_el_stub(monkeypatch):
+    puerto = _puerto_libre()
+    app = crear_app({'latencia_ms': 0, 'entrada_herramienta': {"valor": 42}})
+    servidor = uvicorn.Server(uvicorn.Config(app, port=puerto, log_level="warning"))
+    hilo = threading.Thread(target=servidor.run, daemon=True)
+    hilo.start()
+    while not servidor.started:
+        time.sleep(0.01)
+
+    try:
+        monkeypatch.setattr(settings, "anthropic_base_url", f"http://127.0.0.1:{puerto}")
+        monkeypatch.setattr(settings, "anthropic_api_key", "stub")
+
+        llm = LLMService.get_llm(max_tokens=64)
+        assert LLMService.invocar_estructurado(llm, "dame un valor", HERRAMIENTA) == {"valor": 42}
+    finally:
+        servidor.should_exit = True
+        hilo.join(timeout=5)
+
+
+@pytest.mark.parametrize("ejemplo", FEW_SHOT_EXAMPLES, ids=lambda ej: ej["id"])
+def test_ejemplos_few_shot_cumplen_el_esquema(ejemplo):
+    esquema = case_schema(ejemplo["case_type"], ejemplo["is_iterative"])
+
+    assert set(esquema["required"]) <= set(ejemplo["result"])
+    assert set(ejemplo["result"]) <= set(esquema["properties"])
+
+
+def test_traductor_usa_los_campos_de_la_salida(monkeypatch):
+    def invocar_estructurado(llm, mensajes, herramienta, **kwargs):
+        assert herramienta["name"] == "entregar_traduccion"
+        assert llm.max_tokens == settings.llm_max_tokens_traduccion
+        return {"analisis": "Búsqueda lineal", "pseudocodigo": "  buscar(int n)\nbegin\nend\n",
+                "explicacion": "Recorre el arreglo"}
+
+    monkeypatch.setattr(servicioTraductor.LLMService, "invocar_estructurado", staticmethod(invocar_estructurado))
+    resultado = ServicioTraductor().traducir("buscar un elemento en un arreglo de enteros")
+
+    assert resultado['traducido'] is True
+    assert resultado['pseudocodigo'] == "buscar(int n)\nbegin\nend"
+    assert "Recorre el arreglo" in resultado['explicacion']
+
+
+def test_validador_convierte_la_notacion():
+    agente = AgenteValidadorComplejidades(use_llm=False)
+    complejidades = agente._convertir_notacion({
+        "mejor_caso": "1", "caso_promedio": "O(n log n)", "peor_caso": " n^2 ", "justificacion": "x"
+    })
+
+    assert complejidades == {
+        'mejor_caso': "Ω(1)", 'caso_promedio': "Θ(n log n)", 'peor_caso': "O(n^2)", 'justificacion': "x"
+    }
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,138 @@
+"""
+Test de la herramienta de subrutinas y del re-análisis incremental
+===================================================================
+Verifica la separación por subrutinas, la comparación por hash normalizado
+y que el programa parcial (con stubs) siga siendo válido para el validador.
+"""
+
+import sys
+from pathlib import Path
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.analizador.models.omega_table import OmegaTable
+from core.analizador.tools.subrutinas import (
+    separar_subrutinas,
+    comparar_subrutinas,
+    hay_cambios_estructurales,
+    construir_programa_parcial,
+    normalizar_linea,
+)
+from flujo_analisis import FlujoAnalisis
+from shared.services.almacen_analisis import AlmacenAnalisis
+from shared.services.servicioValidador import servicioValidador
+
+
+RUTA_QUICKSORT = Path(__file__).parent.parent / "data" / "pseudocodigos" / "correctos" / "05-quick-sort.txt"
+
+
+def _quicksort() -> str:
+    return RUTA_QUICKSORT.read_text(encoding="utf-8")
+
+
+def test_separar_subrutinas():
+    secciones = separar_subrutinas(_quicksort())
+    nombres = [sub['nombre'] for sub in secciones['subrutinas']]
+
+    assert nombres == ['quickSort', 'particionar']
+    assert secciones['subrutinas'][0]['es_recursiva']
+    assert 'particionar' in secciones['subrutinas'][0]['llamadas']
+    assert not secciones['subrutinas'][1]['es_recursiva']
+
+
+def test_cambios_de_formato_no_son_estructurales():
+    original = _quicksort()
+    editado = original.replace("    pivote", "        pivote") + "\n► comentario final\n"
+
+    cambios = comparar_subrutinas(
+        separar_subrutinas(original)['subrutinas'],
+        separar_subrutinas(editado)['subrutinas']
+    )
+
+    assert cambios['sin_cambios'] == ['quickSort', 'particionar']
+    assert not hay_cambios_estructurales(cambios)
+
+
+def test_detecta_subrutina_modificada():
+    original = _quicksort()
+    editado = original.replace("i 🡨 izq - 1", "i 🡨 izq")
+
+    cambios = comparar_subrutinas(
+        separar_subrutinas(original)['subrutinas'],
+        separar_subrutinas(editado)['subrutinas']
+    )
+
+    assert cambios['sin_cambios'] == ['quickSort']
+    assert cambios['modificadas'] == ['particionar']
+    assert hay_cambios_estructurales(cambios)
+
+
+def _fases_previas(pseudocodigo: str) -> dict:
+    lineas = pseudocodigo.split("\n")
+    numero = next(i for i, linea in enumerate(lineas, 1) if normalizar_linea(linea) == "pivote 🡨 A[der]")
+    costo = {'line_number': numero, 'code': "pivote 🡨 A[der]", 'C_op': 2, 'Freq': "n", 'Total': "2*n"}
+    omega = OmegaTable(algorithm_name="quickSort", scenarios=[], control_variables=["n"], metadata={
+        'llm_analysis': {'worst_case': {'line_by_line_analysis': [costo]}},
+    })
+    return {'omega_table': omega, 'costos_por_linea': omega.model_dump(), 'ecuaciones': {'peor_caso': "T(n) = n^2"}}
+
+
+def test_fases_reutilizadas_se_renumeran_al_nuevo_formato():
+    original = _quicksort()
+    editado = "► Ordenamiento rápido\n\n" + original.replace("    pivote 🡨 A[der]", "\n    pivote   🡨 A[der]  ► último")
+    previo = {'pseudocodigo': original, 'resultado': _fases_previas(original)}
+    flujo = FlujoAnalisis.__new__(FlujoAnalisis)
+    flujo.verbose = False
+    resultado = {'incremental': {'fases_reutilizadas': []}}
+
+    assert flujo._reutilizar_fases_costos(previo, editado, resultado)
+
+    esperado = _fases_previas(editado)['costos_por_linea']['metadata']
+    assert resultado['omega_table'].metadata == esperado
+    assert resultado['costos_por_linea']['metadata'] == esperado
+    assert resultado['ecuaciones'] == {'peor_caso': "T(n) = n^2"}
+    # El registro previo no se modifica
+    assert previo['resultado']['omega_table'].metadata == _fases_previas(original)['omega_table'].metadata
+
+    # Subrutinas en otro orden: la numeración no se puede trasladar y se recalculan las fases
+    secciones = separar_subrutinas(original)['subrutinas']
+    invertido = "\n".join(sub['texto'] for sub in reversed(secciones))
+    assert not flujo._reutilizar_fases_costos(previo, invertido, {'incremental': {'fases_reutilizadas': []}})
+
+
+def test_programa_parcial_es_valido():
+    secciones = separar_subrutinas(_quicksort())
+    parcial = construir_programa_parcial(secciones, ['particionar'])
+
+    assert "CALL quickSort" not in parcial
+    assert "pivote 🡨 A[der]" in parcial
+
+    validacion = servicioValidador().validar(parcial)
+    assert validacion['valido_general']
+    assert validacion['resumen']['subrutinas_encontradas'] == 2
+
+
+def test_almacen_lru_devuelve_copias():
+    almacen = AlmacenAnalisis(capacidad=2)
+    almacen.guardar('a', {'valor': [1]})
+    almacen.guardar('b', {'valor': [2]})
+
+    copia = almacen.obtener('a')
+    copia['valor'].append(99)
+    assert almacen.obtener('a') == {'valor': [1]}
+
+    # 'a' fue usado más recientemente: se desaloja 'b'
+    almacen.guardar('c', {'valor': [3]})
+    assert almacen.obtener('b') is None
+    assert len(almacen) == 2
+
+
+if __name__ == "__main__":
+    test_separar_subrutinas()
+    test_cambios_de_formato_no_son_estructurales()
+    test_detecta_subrutina_modificada()
+    test_fases_reutilizadas_se_renumeran_al_nuevo_formato()
+    test_programa_parcial_es_valido()
+    test_almacen_lru_devuelve_copias()
+    print("[OK] Todos los tests de subrutinas pasaron")
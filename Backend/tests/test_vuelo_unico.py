@@ -0,0 +1,165 @@
+"""
+Test de VueloUnico (coalescencia de solicitudes idénticas)
+==========================================================
+Verifica que ejecuciones concurrentes con la misma clave compartan un único
+cómputo, tanto de forma directa como a través de LLMService.invocar.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Agregar Backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import settings
+from shared.services import casetes_llm
+from shared.services.casetes_llm import CaseteraLLM
+from shared.services.vuelo_unico import VueloUnico, clave_de
+from shared.services.llm_servicio import LLMService
+from flujo_analisis import FlujoAnalisis
+
+
+def _en_paralelo(funcion, n=8):
+    resultados = [None] * n
+    errores = [None] * n
+
+    def trabajador(i):
+        try:
+            resultados[i] = funcion()
+        except Exception as e:
+            errores[i] = e
+
+    hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(n)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados, errores
+
+
+def test_coalesce_ejecuciones_concurrentes():
+    vuelos = VueloUnico()
+    ejecuciones = []
+
+    def calcular():
+        ejecuciones.append(1)
+        time.sleep(0.1)
+        return {'valor': [1, 2, 3]}
+
+    resultados, errores = _en_paralelo(lambda: vuelos.ejecutar("misma", calcular))
+
+    assert len(ejecuciones) == 1
+    assert all(r == {'valor': [1, 2, 3]} for r in resultados)
+    assert errores == [None] * 8
+    assert vuelos.estadisticas() == {'ejecutadas': 1, 'compartidas': 7}
+    assert vuelos.en_curso() == 0
+
+    # Cada solicitud recibe su propia copia
+    resultados[0]['valor'].append(4)
+    assert resultados[1]['valor'] == [1, 2, 3]
+
+
+def test_propaga_la_excepcion_a_todos():
+    vuelos = VueloUnico()
+
+    def fallar():
+        time.sleep(0.05)
+        raise ValueError("fallo compartido")
+
+    _, errores = _en_paralelo(lambda: vuelos.ejecutar("clave", fallar), n=4)
+
+    assert all(isinstance(e, ValueError) for e in errores)
+    assert vuelos.estadisticas()['ejecutadas'] == 1
+
+
+def test_claves_distintas_no_se_coalescen():
+    vuelos = VueloUnico()
+    assert vuelos.ejecutar(clave_de("a", 1), lambda: "a") == "a"
+    assert vuelos.ejecutar(clave_de("b", 1), lambda: "b") == "b"
+    assert vuelos.estadisticas()['ejecutadas'] == 2
+
+
+def test_entrada_normalizada_ignora_comentarios_y_espacios():
+    original = "suma(int n)\nbegin\n    return n\nend"
+    editada = "suma(int  n)   ► comentario\n\nbegin\n  return n\nend\n"
+
+    assert FlujoAnalisis._normalizar_entrada(original) == FlujoAnalisis._normalizar_entrada(editada)
+
+
+class LLMFalso:
+    """Objeto con la interfaz mínima de ChatAnthropic usada por LLMService.invocar."""
+
+    model = "modelo-prueba"
+    temperature = 0.0
+    max_tokens = 100
+
+    def __init__(self):
+        self.llamadas = 0
+
+    def invoke(self, entrada, **kwargs):
+        self.llamadas += 1
+        time.sleep(0.1)
+        return f"respuesta a {entrada}"
+
+
+def test_llm_invocar_coalesce_prompts_identicos(monkeypatch):
+    monkeypatch.setattr(casetes_llm, "_casetera_instance", CaseteraLLM("live"))
+    llm = LLMFalso()
+
+    resultados, errores = _en_paralelo(lambda: LLMService.invocar(llm, "mismo prompt"), n=6)
+
+    assert errores == [None] * 6
+    assert llm.llamadas == 1
+    assert set(resultados) == {"respuesta a mismo prompt"}
+
+
+
+def test_llm_invocar_no_coalesce_con_temperatura(monkeypatch):
+    monkeypatch.setattr(casetes_llm, "_casetera_instance", CaseteraLLM("live"))
+    llm = LLMFalso()
+    llm.temperature = 0.4
+
+    _, errores = _en_paralelo(lambda: LLMService.invocar(llm, "mismo prompt"), n=4)
+
+    # Cada llamada con temperatura es una muestra distinta
+    assert errores == [None] * 4
+    assert llm.llamadas == 4
+
+
+def test_seguidor_recibe_su_propia_entrada(monkeypatch):
+    monkeypatch.setattr(settings, "puntos_control", False)
+    flujo = FlujoAnalisis.__new__(FlujoAnalisis)
+    flujo.verbose = False
+    ejecuciones = []
+
+    def analizar(presupuesto, entrada, *args):
+        ejecuciones.append(entrada)
+        time.sleep(0.2)
+        return {'pseudocodigo_original': entrada, 'pseudocodigo_validado': entrada, 'exito': True}
+
+    monkeypatch.setattr(flujo, "_analizar_con_presupuesto", analizar)
+    entradas = ["suma(int n)\nbegin\n    return n\nend", "suma(int n)   ► otra versión\nbegin\n  return n\nend\n"]
+    resultados = [None, None]
+
+    def solicitar(i):
+        resultados[i] = flujo.analizar(entrada=entradas[i], tipo_entrada="pseudocodigo")
+
+    hilos = [threading.Thread(target=solicitar, args=(i,)) for i in range(2)]
+    for hilo in hilos:
+        hilo.start()
+        time.sleep(0.05)
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(ejecuciones) == 1
+    for entrada, resultado in zip(entradas, resultados):
+        assert resultado['pseudocodigo_original'] == entrada
+        assert resultado['pseudocodigo_validado'] == entrada
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
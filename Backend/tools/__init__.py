@@ -1,3 +1,10 @@
-from .sympy_tools import sympy_expression_builder, series_generator
+# Importación diferida: tools.metricas se usa en todo el backend y no debe
+# arrastrar SymPy (ver tools/sympy_tools.py)
+__all__ = ["sympy_expression_builder", "series_generator"]
 
-__all__ = ["sympy_expression_builder", "series_generator"]
\ No newline at end of file
+
+def __getattr__(nombre):
+    if nombre in __all__:
+        from . import sympy_tools
+        return getattr(sympy_tools, nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
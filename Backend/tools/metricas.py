@@ -4,9 +4,12 @@ Sistema de Métricas y Medición de Costos
 
 Decoradores y utilidades para medir:
 - Tiempo de ejecución de cada fase
-- Tokens consumidos por llamadas LLM
+- Tokens consumidos por llamadas LLM (incluidos los de la caché de prompts)
 - Costo estimado en USD
 
+Los tokens se atribuyen a la fase activa (la de MedirTiempo/medir_tiempo más
+interna en el contexto actual), lo que permite ver tokens por fase.
+
 Uso:
     from tools.metricas import medir_tiempo, registrar_tokens, obtener_metricas
     
@@ -14,13 +17,14 @@ Uso:
     def validar(pseudocodigo):
         ...
     
-    registrar_tokens(prompt_tokens=150, completion_tokens=300, modelo="claude-3-5-sonnet")
+    registrar_tokens(input_tokens=150, output_tokens=300, modelo="claude-3-5-sonnet")
     
     metricas = obtener_metricas()
 """
 
 import time
 import json
+from contextvars import ContextVar
 from functools import wraps
 from typing import Dict, Any, Optional, Callable
 from datetime import datetime
@@ -38,6 +42,16 @@ PRECIOS_POR_1M_TOKENS = {
         "input": 3.00,
         "output": 15.00
     },
+    # Claude Sonnet 4.5 (modelo fuerte por defecto)
+    "claude-sonnet-4-5-20250929": {
+        "input": 3.00,
+        "output": 15.00
+    },
+    # Claude Haiku 4.5 (modelo rápido del ruteo por etapa)
+    "claude-haiku-4-5-20251001": {
+        "input": 1.00,
+        "output": 5.00
+    },
     # Claude 3 Haiku (más económico)
     "claude-3-haiku-20240307": {
         "input": 0.25,
@@ -51,6 +65,15 @@ PRECIOS_POR_1M_TOKENS = {
 }
 
 
+# Multiplicadores del precio de entrada para la caché de prompts de Anthropic
+FACTOR_CACHE_ESCRITURA = 1.25
+FACTOR_CACHE_LECTURA = 0.10
+
+
+# Fase activa en el contexto actual (para atribuir tokens)
+_fase_actual: ContextVar[Optional[str]] = ContextVar("fase_metricas", default=None)
+
+
 # ==================== ALMACENAMIENTO GLOBAL ====================
 class RegistroMetricas:
     """Singleton para almacenar métricas globales"""
@@ -66,6 +89,8 @@ class RegistroMetricas:
         """Inicializa los registros"""
         self.tiempos = {}  # {fase: [tiempo1, tiempo2, ...]}
         self.tokens = []   # [{modelo, input, output, costo}]
+        self.escalados = []  # [{fase, herramienta, modelo, motivo}]
+        self.coberturas = []  # [{fase, gano_respaldo}]
         self.inicio_sesion = time.time()
         self.metadata = {
             'inicio': datetime.now().isoformat(),
@@ -82,21 +107,41 @@ class RegistroMetricas:
             self.tiempos[fase] = []
         self.tiempos[fase].append(duracion)
     
-    def registrar_tokens(self, modelo: str, input_tokens: int, output_tokens: int):
-        """Registra consumo de tokens y calcula costo"""
+    def registrar_tokens(
+        self,
+        modelo: str,
+        input_tokens: int,
+        output_tokens: int,
+        cache_read_tokens: int = 0,
+        cache_write_tokens: int = 0
+    ):
+        """
+        Registra consumo de tokens y calcula costo.
+
+        input_tokens son los tokens de entrada procesados sin caché; los
+        leídos/escritos en la caché de prompts se cobran con su factor.
+        """
         precios = PRECIOS_POR_1M_TOKENS.get(modelo, PRECIOS_POR_1M_TOKENS['default'])
         
         # Calcular costo en USD
-        costo_input = (input_tokens / 1_000_000) * precios['input']
+        tokens_input_equivalentes = (
+            input_tokens
+            + cache_write_tokens * FACTOR_CACHE_ESCRITURA
+            + cache_read_tokens * FACTOR_CACHE_LECTURA
+        )
+        costo_input = (tokens_input_equivalentes / 1_000_000) * precios['input']
         costo_output = (output_tokens / 1_000_000) * precios['output']
         costo_total = costo_input + costo_output
         
         registro = {
             'timestamp': datetime.now().isoformat(),
+            'fase': _fase_actual.get(),
             'modelo': modelo,
             'input_tokens': input_tokens,
             'output_tokens': output_tokens,
-            'total_tokens': input_tokens + output_tokens,
+            'cache_read_tokens': cache_read_tokens,
+            'cache_write_tokens': cache_write_tokens,
+            'total_tokens': input_tokens + cache_read_tokens + cache_write_tokens + output_tokens,
             'costo_usd': round(costo_total, 6),
             'costo_input_usd': round(costo_input, 6),
             'costo_output_usd': round(costo_output, 6)
@@ -104,6 +149,20 @@ class RegistroMetricas:
         
         self.tokens.append(registro)
     
+    def registrar_escalado(self, herramienta: str, modelo: str, motivo: str):
+        """Registra una llamada del modelo rápido repetida con el modelo fuerte"""
+        self.escalados.append({
+            'fase': _fase_actual.get(),
+            'herramienta': herramienta,
+            'modelo': modelo,
+            'motivo': motivo,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    def registrar_cobertura(self, fase: str, gano_respaldo: bool):
+        """Registra una solicitud de respaldo (hedging) y si ganó la carrera"""
+        self.coberturas.append({'fase': fase, 'gano_respaldo': gano_respaldo})
+    
     def obtener_resumen(self) -> Dict[str, Any]:
         """Genera resumen completo de métricas"""
         # Tiempo total
@@ -123,17 +182,34 @@ class RegistroMetricas:
         # Resumen de tokens
         total_input = sum(t['input_tokens'] for t in self.tokens)
         total_output = sum(t['output_tokens'] for t in self.tokens)
-        total_tokens = total_input + total_output
+        total_cache_read = sum(t.get('cache_read_tokens', 0) for t in self.tokens)
+        total_cache_write = sum(t.get('cache_write_tokens', 0) for t in self.tokens)
+        total_tokens = total_input + total_cache_read + total_cache_write + total_output
         costo_total = sum(t['costo_usd'] for t in self.tokens)
+        entrada_total = total_input + total_cache_read + total_cache_write
         
         tokens_resumen = {
             'llamadas_llm': len(self.tokens),
             'input_tokens': total_input,
             'output_tokens': total_output,
+            'cache_read_tokens': total_cache_read,
+            'cache_write_tokens': total_cache_write,
+            # Fracción de la entrada servida desde la caché de prompts
+            'tasa_acierto_cache': round(total_cache_read / entrada_total, 4) if entrada_total else 0.0,
             'total_tokens': total_tokens,
             'costo_total_usd': round(costo_total, 6)
         }
         
+        # Solicitudes de respaldo: tasa sobre las llamadas y tasa de victoria
+        respaldos = len(self.coberturas)
+        ganados = sum(1 for c in self.coberturas if c['gano_respaldo'])
+        cobertura = {
+            'respaldos': respaldos,
+            'ganados_por_respaldo': ganados,
+            'tasa_respaldo': round(respaldos / len(self.tokens), 4) if self.tokens else 0.0,
+            'tasa_victoria': round(ganados / respaldos, 4) if respaldos else 0.0
+        }
+        
         # Tokens por modelo
         tokens_por_modelo = {}
         for registro in self.tokens:
@@ -154,6 +230,20 @@ class RegistroMetricas:
         for modelo in tokens_por_modelo:
             tokens_por_modelo[modelo]['costo_usd'] = round(tokens_por_modelo[modelo]['costo_usd'], 6)
         
+        # Tokens por fase
+        tokens_por_fase = {}
+        for registro in self.tokens:
+            fase = registro.get('fase') or 'sin_fase'
+            datos = tokens_por_fase.setdefault(fase, {
+                'llamadas': 0, 'input_tokens': 0, 'output_tokens': 0,
+                'cache_read_tokens': 0, 'cache_write_tokens': 0
+            })
+            datos['llamadas'] += 1
+            datos['input_tokens'] += registro['input_tokens']
+            datos['output_tokens'] += registro['output_tokens']
+            datos['cache_read_tokens'] += registro.get('cache_read_tokens', 0)
+            datos['cache_write_tokens'] += registro.get('cache_write_tokens', 0)
+        
         return {
             'metadata': {
                 **self.metadata,
@@ -163,6 +253,9 @@ class RegistroMetricas:
             'tiempos': tiempos_por_fase,
             'tokens': tokens_resumen,
             'tokens_por_modelo': tokens_por_modelo,
+            'tokens_por_fase': tokens_por_fase,
+            'escalados': self.escalados,
+            'cobertura': cobertura,
             'detalle_llamadas': self.tokens
         }
     
@@ -203,6 +296,9 @@ class RegistroMetricas:
             lineas.append(f"| Llamadas LLM | {resumen['tokens']['llamadas_llm']} |")
             lineas.append(f"| Tokens entrada | {resumen['tokens']['input_tokens']:,} |")
             lineas.append(f"| Tokens salida | {resumen['tokens']['output_tokens']:,} |")
+            lineas.append(f"| Tokens leídos de caché | {resumen['tokens']['cache_read_tokens']:,} |")
+            lineas.append(f"| Tokens escritos en caché | {resumen['tokens']['cache_write_tokens']:,} |")
+            lineas.append(f"| Acierto de caché | {resumen['tokens']['tasa_acierto_cache']:.1%} |")
             lineas.append(f"| **Total tokens** | **{resumen['tokens']['total_tokens']:,}** |")
             lineas.append(f"| **Costo total** | **${resumen['tokens']['costo_total_usd']:.6f} USD** |")
             lineas.append("")
@@ -240,13 +336,8 @@ def medir_tiempo(fase: str):
     def decorador(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs):
-            inicio = time.time()
-            try:
-                resultado = func(*args, **kwargs)
-                return resultado
-            finally:
-                duracion = time.time() - inicio
-                _registro.registrar_tiempo(fase, duracion)
+            with MedirTiempo(fase):
+                return func(*args, **kwargs)
         return wrapper
     return decorador
 
@@ -255,17 +346,44 @@ def medir_tiempo(fase: str):
 def registrar_tokens(
     input_tokens: int,
     output_tokens: int,
-    modelo: str = "claude-3-5-sonnet-20241022"
+    modelo: str = "claude-3-5-sonnet-20241022",
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0
 ):
     """
     Registra consumo de tokens de una llamada LLM.
     
     Args:
-        input_tokens: Tokens de entrada (prompt)
+        input_tokens: Tokens de entrada (prompt) procesados sin caché
         output_tokens: Tokens de salida (respuesta)
         modelo: Nombre del modelo usado
+        cache_read_tokens: Tokens de entrada leídos de la caché de prompts
+        cache_write_tokens: Tokens de entrada escritos en la caché de prompts
+    """
+    _registro.registrar_tokens(modelo, input_tokens, output_tokens, cache_read_tokens, cache_write_tokens)
+
+
+def registrar_escalado(herramienta: str, modelo: str, motivo: str):
     """
-    _registro.registrar_tokens(modelo, input_tokens, output_tokens)
+    Registra el escalado de una etapa del modelo rápido al fuerte.
+    
+    Args:
+        herramienta: Herramienta de salida de la llamada
+        modelo: Modelo rápido que falló la verificación
+        motivo: Error de esquema o de confianza
+    """
+    _registro.registrar_escalado(herramienta, modelo, motivo)
+
+
+def registrar_cobertura(fase: str, gano_respaldo: bool):
+    """
+    Registra una solicitud de respaldo (hedging).
+    
+    Args:
+        fase: Etapa de la llamada cubierta
+        gano_respaldo: True si el respaldo respondió antes que la original
+    """
+    _registro.registrar_cobertura(fase, gano_respaldo)
 
 
 def obtener_metricas() -> Dict[str, Any]:
@@ -273,6 +391,11 @@ def obtener_metricas() -> Dict[str, Any]:
     return _registro.obtener_resumen()
 
 
+def fase_actual() -> Optional[str]:
+    """Fase activa en el contexto actual (None fuera de MedirTiempo/medir_tiempo)"""
+    return _fase_actual.get()
+
+
 def reset_metricas():
     """Reinicia todas las métricas"""
     _registro.reset()
@@ -306,11 +429,14 @@ class MedirTiempo:
     def __init__(self, fase: str):
         self.fase = fase
         self.inicio = None
+        self._token = None
     
     def __enter__(self):
-        self.inicio = time.time()
+        self._token = _fase_actual.set(self.fase)
+        self.inicio = time.perf_counter()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        duracion = time.time() - self.inicio
+        duracion = time.perf_counter() - self.inicio
+        _fase_actual.reset(self._token)
         _registro.registrar_tiempo(self.fase, duracion)